@@ -0,0 +1,1077 @@
+# Fichier: backtest.py
+"""
+Backtest événementiel de la stratégie Darwin, hors ligne, sur le code live.
+
+Les bougies viennent d'une archive locale (DB_BASE_DIR/ohlcv/<tf>/<symbole>.csv.gz,
+alimentée par `python backtest.py download`) et passent par les mêmes fonctions que
+le bot: utils.add_indicators, trader.detect_signal, les gates de
+execute_signal_with_gates et la gestion des positions (TP dynamique, BE, trailing,
+pyramiding, sorties partielles).
+
+Déroulé, bougie par bougie (bougie t close, t+1 en formation):
+  1) sorties intrabar: SL/TP contre high/low de t (SL prioritaire si les deux sont touchés) ;
+  2) exécution du meilleur signal en attente (détecté à t-1), à l'ouverture de t+1 ;
+  3) gestion des positions ouvertes (prix courant = ouverture de t+1) ;
+  4) scan: les signaux détectés à t passent en attente.
+
+Performance:
+  - indicateurs calculés une seule fois sur tout l'historique (vectoriel), y compris
+    ceux de la bougie « en formation » vue à son ouverture ;
+  - pré-filtre vectoriel: detect_signal n'est appelé que si une des 3 dernières
+    bougies closes touche la BB20 (même tolérance que detect_signal) ;
+  - la détection ne dépend pas du portefeuille → scan en parallèle par symbole
+    (process), puis boucle portefeuille séquentielle.
+
+Résultats: base SQLite au schéma du bot (database.setup_database) — table trades
+(status CLOSED*, timestamps en secondes, pnl/pnl_percent, meta JSON) + stats
+(reporting.calculate_performance_stats) dans la table settings.
+
+Usage:
+  python backtest.py download --symbols BTC/USDT:USDT,ETH/USDT:USDT --days 365
+  python backtest.py run --timeframe 1h --start 2024-01-01 --end 2025-01-01 --set MIN_RR=3
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import contextlib
+import multiprocessing
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+import database
+import utils
+
+ARCHIVE_DIR = os.getenv("OHLCV_ARCHIVE_DIR", os.path.join(database.DB_BASE_DIR, "ohlcv"))
+RESULTS_DIR = os.getenv("BACKTEST_RESULTS_DIR", os.path.join(database.DB_BASE_DIR, "backtests"))
+DEFAULT_TIMEFRAME = os.getenv("TIMEFRAME", "1h")
+DEFAULT_FEE_PCT = float(os.getenv("BACKTEST_FEE_PCT", "0.06"))          # taker, par côté
+DEFAULT_SLIPPAGE_PCT = float(os.getenv("BACKTEST_SLIPPAGE_PCT", "0.02"))
+DOWNLOAD_BATCH = 200
+
+# fetch_and_prepare_df(limit=200) - lignes NaN de BB80 ≈ 120 bougies closes vues par le live
+WINDOW_BARS = 120
+_MIN_ROWS = 100
+
+_COLS = ["open", "high", "low", "close", "volume", "mm80",
+         "bb20_up", "bb20_mid", "bb20_lo", "bb80_up", "bb80_mid", "bb80_lo", "atr"]
+_FORMING_COLS = ["f_mm80", "f_bb20_up", "f_bb20_mid", "f_bb20_lo",
+                 "f_bb80_up", "f_bb80_mid", "f_bb80_lo", "f_atr"]
+_OHLCV = ["timestamp", "open", "high", "low", "close", "volume"]
+
+
+@contextlib.contextmanager
+def _quiet(enabled: bool = True):
+    """Coupe les print() du code live (très bavard) pendant la simulation."""
+    if not enabled:
+        yield
+        return
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+# ==============================================================================
+# ARCHIVE OHLCV
+# ==============================================================================
+
+def archive_path(symbol: str, timeframe: str, archive_dir: Optional[str] = None) -> str:
+    safe = symbol.replace("/", "_").replace(":", "_")
+    return os.path.join(archive_dir or ARCHIVE_DIR, timeframe, f"{safe}.csv.gz")
+
+
+def list_archived_symbols(timeframe: str, archive_dir: Optional[str] = None) -> List[str]:
+    folder = os.path.join(archive_dir or ARCHIVE_DIR, timeframe)
+    out = []
+    try:
+        for name in sorted(os.listdir(folder)):
+            stem = name[:-7] if name.endswith(".csv.gz") else name[:-4] if name.endswith(".csv") else None
+            if not stem:
+                continue
+            parts = stem.split("_")
+            if len(parts) == 3:
+                out.append(f"{parts[0]}/{parts[1]}:{parts[2]}")
+            elif len(parts) == 2:
+                out.append(f"{parts[0]}/{parts[1]}")
+    except Exception:
+        pass
+    return out
+
+
+def _read_archive(symbol: str, timeframe: str, archive_dir: Optional[str] = None) -> Optional[pd.DataFrame]:
+    path = archive_path(symbol, timeframe, archive_dir)
+    if not os.path.exists(path) and os.path.exists(path[:-3]):
+        path = path[:-3]  # .csv non compressé accepté
+    if not os.path.exists(path):
+        return None
+    try:
+        raw = pd.read_csv(path)
+        raw = raw[_OHLCV].dropna()
+        raw["timestamp"] = raw["timestamp"].astype("int64")
+        return raw.drop_duplicates("timestamp").sort_values("timestamp").reset_index(drop=True)
+    except Exception as e:
+        print(f"⚠️ Archive illisible {path}: {e}")
+        return None
+
+
+def _write_archive(symbol: str, timeframe: str, raw: pd.DataFrame, archive_dir: Optional[str] = None) -> None:
+    path = archive_path(symbol, timeframe, archive_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    raw[_OHLCV].to_csv(tmp, index=False, compression="gzip")
+    os.replace(tmp, path)
+
+
+def download_history(symbols: Iterable[str], timeframe: Optional[str] = None, days: int = 365,
+                     archive_dir: Optional[str] = None, exchange_id: str = "bitget") -> Dict[str, int]:
+    """
+    Complète l'archive locale (incrémental: reprend après la dernière bougie connue).
+    La bougie en cours n'est jamais archivée. Retourne {symbole: nb de bougies ajoutées}.
+    """
+    import ccxt
+    import resilience
+
+    timeframe = timeframe or DEFAULT_TIMEFRAME
+    ex = getattr(ccxt, exchange_id)({"enableRateLimit": True, "options": {"defaultType": "swap"}})
+    tf_ms = int(ex.parse_timeframe(timeframe) * 1000)
+    added: Dict[str, int] = {}
+
+    for symbol in symbols:
+        now_ms = int(time.time() * 1000)
+        current_open = now_ms - (now_ms % tf_ms)
+        existing = _read_archive(symbol, timeframe, archive_dir)
+        if existing is not None and len(existing):
+            since = int(existing["timestamp"].iloc[-1]) + tf_ms
+        else:
+            since = now_ms - int(days) * 86_400_000
+
+        rows: List[list] = []
+        try:
+            while since < current_open:
+                batch = resilience.call(ex, "fetch_ohlcv", symbol, timeframe, since=since, limit=DOWNLOAD_BATCH)
+                if not batch:
+                    break
+                rows.extend(batch)
+                nxt = int(batch[-1][0]) + tf_ms
+                if nxt <= since:
+                    break
+                since = nxt
+        except Exception as e:
+            print(f"⚠️ Téléchargement {symbol} interrompu: {e}")
+
+        fresh = pd.DataFrame(rows, columns=_OHLCV)
+        fresh = fresh[fresh["timestamp"] < current_open]
+        merged = pd.concat([existing, fresh]) if existing is not None else fresh
+        merged = merged.drop_duplicates("timestamp").sort_values("timestamp")
+        if len(merged):
+            _write_archive(symbol, timeframe, merged, archive_dir)
+        added[symbol] = int(len(fresh))
+        print(f"📥 {symbol} {timeframe}: +{len(fresh)} bougies ({len(merged)} au total)")
+    return added
+
+
+# ==============================================================================
+# HISTORIQUE PRÉPARÉ (indicateurs vectorisés)
+# ==============================================================================
+
+def _add_forming_indicators(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Indicateurs de la bougie t+1 vue à son ouverture (open=high=low=close), stockés
+    sur la ligne t: c'est la dernière ligne du DataFrame que voit le live en début
+    d'heure (BB20/BB80/MM80 avec close=open, ATR Wilder avec TR=|open - close_t|).
+    """
+    close = df["close"]
+    nxt_open = df["open"].shift(-1)
+    for n, prefix in ((20, "bb20"), (80, "bb80")):
+        s = close.rolling(n - 1).sum()
+        s2 = (close * close).rolling(n - 1).sum()
+        mean = (s + nxt_open) / n
+        std = np.sqrt(((s2 + nxt_open * nxt_open) / n - mean * mean).clip(lower=0.0))
+        df[f"f_{prefix}_mid"] = mean
+        df[f"f_{prefix}_up"] = mean + 2 * std
+        df[f"f_{prefix}_lo"] = mean - 2 * std
+    df["f_mm80"] = df["f_bb80_mid"]
+    df["f_atr"] = (df["atr"] * 13 + (nxt_open - close).abs()) / 14
+    return df
+
+
+class SymbolHistory:
+    """Historique préparé d'un symbole (tableaux numpy) + fabrique de fenêtres « live »."""
+
+    def __init__(self, symbol: str, ts: np.ndarray, values: np.ndarray, forming: np.ndarray):
+        self.symbol = symbol
+        self.ts = ts
+        self.index = pd.to_datetime(np.asarray(ts, dtype="int64"), unit="ns", utc=True)
+        self.values = values
+        self.forming = forming
+        self._pos = {int(t): i for i, t in enumerate(ts)}
+
+    @classmethod
+    def from_frame(cls, symbol: str, df: pd.DataFrame) -> "SymbolHistory":
+        # ts toujours en ns (pandas 3 garde la résolution ms de to_datetime(unit="ms"))
+        ts = pd.DatetimeIndex(df.index).tz_convert("UTC").astype("datetime64[ns, UTC]").asi8.copy()
+        return cls(symbol, ts, df[_COLS].to_numpy(dtype=float),
+                   df[_FORMING_COLS].to_numpy(dtype=float))
+
+    def __len__(self) -> int:
+        return len(self.ts)
+
+    def loc(self, ts_ns: int) -> Optional[int]:
+        return self._pos.get(int(ts_ns))
+
+    def bar(self, i: int) -> Tuple[float, float, float, float]:
+        o, h, l, c = self.values[i, :4]
+        return float(o), float(h), float(l), float(c)
+
+    def window(self, i: int, bars: int = WINDOW_BARS) -> Optional[pd.DataFrame]:
+        """
+        DataFrame tel que fetch_and_prepare_df le renvoie à l'ouverture de t+1:
+        `bars` bougies closes jusqu'à t incluse + la bougie t+1 en formation.
+        """
+        if i < bars - 1 or i + 1 >= len(self.ts):
+            return None
+        op = self.values[i + 1, 0]
+        forming = np.concatenate(([op, op, op, op, 0.0], self.forming[i]))
+        arr = np.vstack([self.values[i - bars + 1: i + 1], forming])
+        return pd.DataFrame(arr, index=self.index[i - bars + 1: i + 2], columns=_COLS)
+
+
+def load_history(symbol: str, timeframe: str, archive_dir: Optional[str] = None) -> Optional[SymbolHistory]:
+    raw = _read_archive(symbol, timeframe, archive_dir)
+    if raw is None or len(raw) < _MIN_ROWS + WINDOW_BARS:
+        return None
+    df = raw.drop(columns=["timestamp"])
+    df.index = pd.to_datetime(raw["timestamp"], unit="ms", utc=True).astype("datetime64[ns, UTC]")
+    df.index.name = "timestamp"
+    for c in ["open", "high", "low", "close", "volume"]:
+        df[c] = pd.to_numeric(df[c], errors="coerce")
+    df = utils.add_indicators(df)
+    df = _add_forming_indicators(df)
+    df = df.dropna(subset=_COLS)
+    if len(df) < _MIN_ROWS:
+        return None
+    return SymbolHistory.from_frame(symbol, df)
+
+
+def _cache_dir(cache_dir: str, symbol: str) -> str:
+    return os.path.join(cache_dir, symbol.replace("/", "_").replace(":", "_"))
+
+
+def save_history_cache(histories: Dict[str, SymbolHistory], cache_dir: str) -> None:
+    """Écrit les tableaux préparés en .npy (relus en memmap, partagés entre process)."""
+    for sym, hist in histories.items():
+        folder = _cache_dir(cache_dir, sym)
+        os.makedirs(folder, exist_ok=True)
+        np.save(os.path.join(folder, "ts.npy"), np.asarray(hist.ts, dtype="int64"))
+        np.save(os.path.join(folder, "values.npy"), np.asarray(hist.values))
+        np.save(os.path.join(folder, "forming.npy"), np.asarray(hist.forming))
+    with open(os.path.join(cache_dir, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump({"symbols": sorted(histories), "columns": _COLS, "created": int(time.time())}, f)
+
+
+def load_history_cache(cache_dir: str, symbols: Optional[Iterable[str]] = None) -> Dict[str, SymbolHistory]:
+    """Historiques en lecture seule (mmap): les pages sont partagées par tous les workers."""
+    try:
+        with open(os.path.join(cache_dir, "manifest.json"), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except Exception:
+        return {}
+    wanted = set(symbols) if symbols else None
+    out: Dict[str, SymbolHistory] = {}
+    for sym in manifest.get("symbols", []):
+        if wanted is not None and sym not in wanted:
+            continue
+        folder = _cache_dir(cache_dir, sym)
+        try:
+            out[sym] = SymbolHistory(
+                sym,
+                np.load(os.path.join(folder, "ts.npy")),
+                np.load(os.path.join(folder, "values.npy"), mmap_mode="r"),
+                np.load(os.path.join(folder, "forming.npy"), mmap_mode="r"),
+            )
+        except Exception as e:
+            print(f"⚠️ Cache {sym} illisible: {e}")
+    return out
+
+
+def _shift(a: np.ndarray, s: int) -> np.ndarray:
+    if s == 0:
+        return a
+    out = np.full_like(a, np.nan)
+    out[s:] = a[:-s]
+    return out
+
+
+def candidate_mask(hist: SymbolHistory) -> np.ndarray:
+    """
+    Bougies t où detect_signal peut trouver un contact: une des 3 dernières closes
+    touche BB20 bas/haut avec la tolérance de detect_signal (% OU ATR de la bougie t).
+    Toutes les branches (tendance et CT) exigent ce contact BB20.
+    """
+    try:
+        tol = float(database.get_setting('BB_CONTACT_TOLERANCE_PCT', '0.2')) / 100.0
+    except Exception:
+        tol = 0.002
+    try:
+        use_atr = str(database.get_setting('BB_CONTACT_USE_ATR', 'true')).lower() == 'true'
+        atr_k = float(database.get_setting('BB_CONTACT_ATR_K', '0.3')) if use_atr else 0.0
+    except Exception:
+        atr_k = 0.3
+
+    v = hist.values
+    atr = v[:, 12]
+    slack_atr = np.where(atr > 0, atr * atr_k, 0.0)
+    hit = np.zeros(len(v), dtype=bool)
+    with np.errstate(invalid="ignore"):
+        for s in range(3):
+            low, bb_lo = _shift(v[:, 2], s), _shift(v[:, 8], s)
+            high, bb_up = _shift(v[:, 1], s), _shift(v[:, 6], s)
+            hit |= low <= bb_lo + np.maximum(bb_lo * tol, slack_atr)
+            hit |= high >= bb_up - np.maximum(bb_up * tol, slack_atr)
+    hit[:WINDOW_BARS - 1] = False
+    hit[-1] = False  # pas de bougie suivante
+    return hit
+
+
+# ==============================================================================
+# SCAN (parallélisable par symbole)
+# ==============================================================================
+
+def _plain(obj):
+    if isinstance(obj, dict):
+        return {k: _plain(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_plain(v) for v in obj]
+    if isinstance(obj, np.generic):
+        return obj.item()
+    return obj
+
+
+def detect_signals(hist: SymbolHistory, start_ns: Optional[int] = None,
+                   end_ns: Optional[int] = None) -> Tuple[List[Dict[str, Any]], int]:
+    """Signaux de detect_signal sur l'historique préparé → (signaux, nb d'appels)."""
+    import trader
+
+    symbol = hist.symbol
+    found: List[Dict[str, Any]] = []
+    calls = 0
+    for i in np.flatnonzero(candidate_mask(hist)):
+        ts = int(hist.ts[i])
+        if (start_ns is not None and ts < start_ns) or (end_ns is not None and ts > end_ns):
+            continue
+        w = hist.window(int(i))
+        if w is None:
+            continue
+        calls += 1
+        try:
+            sig = trader.detect_signal(symbol, w)
+        except Exception:
+            sig = None
+        if sig:
+            found.append({"symbol": symbol, "ts": ts, "signal": _plain(sig)})
+    return found, calls
+
+
+# Réglages neutres pour une détection « une fois pour toutes »: SL/TP = ancres brutes,
+# aucun rejet RR. reprice_signals applique ensuite offsets + MIN_RR de chaque jeu.
+DETECTION_NEUTRAL = {"SL_OFFSET_PCT": "0", "TP_OFFSET_PCT": "0", "MIN_RR": "0"}
+
+
+def _setting_float(key: str, default: float) -> float:
+    try:
+        return float(database.get_setting(key, default))
+    except Exception:
+        return default
+
+
+def reprice_signals(signals: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Signaux détectés sous DETECTION_NEUTRAL → signaux tels que detect_signal les
+    aurait rendus avec les réglages courants (SL_OFFSET_PCT, TP_OFFSET_PCT, MIN_RR):
+    mêmes formules (ancre × (1 ± offset/100)), même seuil RR, mêmes clés.
+    """
+    import trader
+
+    sl_off = _setting_float('SL_OFFSET_PCT', 0.3) / 100
+    tp_off = _setting_float('TP_OFFSET_PCT', 0.3) / 100
+    min_rr = _setting_float('MIN_RR', 2.8)
+    out: List[Dict[str, Any]] = []
+    for item in signals:
+        sig = item["signal"]
+        if sig.get("sl") is None or sig.get("tp") is None or sig.get("entry") is None:
+            out.append(item)  # skip sans niveaux (pas de pattern, pas de réintégration)
+            continue
+        sig = dict(sig)
+        is_long = sig.get("side") == "buy"
+        sig["sl"] = float(sig["sl"]) * ((1 - sl_off) if is_long else (1 + sl_off))
+        sig["tp"] = float(sig["tp"]) * ((1 + tp_off) if is_long else (1 - tp_off))
+        rr = trader.calculate_rr(float(sig["entry"]), sig["sl"], sig["tp"], sig["side"])
+        sig["rr"] = rr
+        if rr < min_rr:
+            sig["skip_reason"] = f"RR insuffisant (x{rr:.2f} < x{min_rr})"
+        elif sig.pop("skip_reason", None) is not None:
+            sig["contact_index"] = sig.get("contact_idx")
+            sig["reaction_index"] = sig.get("reaction_idx")
+            sig["entry_index"] = WINDOW_BARS
+        out.append({**item, "signal": sig})
+    return out
+
+
+def scan_symbol(symbol: str, timeframe: str, archive_dir: Optional[str] = None,
+                start_ns: Optional[int] = None, end_ns: Optional[int] = None) -> Tuple[List[Dict[str, Any]], int]:
+    hist = load_history(symbol, timeframe, archive_dir)
+    if hist is None:
+        return [], 0
+    return detect_signals(hist, start_ns, end_ns)
+
+
+def _init_scan_worker(overrides: Optional[Dict[str, Any]], verbose: bool) -> None:
+    database.set_settings_overlay(overrides or {})
+    if not verbose:
+        sys.stdout = open(os.devnull, "w")
+
+
+def _scan_task(task) -> Tuple[str, List[Dict[str, Any]], int]:
+    symbol, timeframe, archive_dir, start_ns, end_ns = task
+    try:
+        found, calls = scan_symbol(symbol, timeframe, archive_dir, start_ns, end_ns)
+    except Exception as e:
+        print(f"⚠️ Scan {symbol} en erreur: {e}")
+        found, calls = [], 0
+    return symbol, found, calls
+
+
+def scan_all(symbols: List[str], timeframe: str, archive_dir: Optional[str], start_ns: Optional[int],
+             end_ns: Optional[int], overrides: Optional[Dict[str, Any]], workers: int,
+             verbose: bool = False) -> Tuple[List[Dict[str, Any]], int]:
+    tasks = [(s, timeframe, archive_dir, start_ns, end_ns) for s in symbols]
+    signals: List[Dict[str, Any]] = []
+    calls = 0
+    if workers <= 1 or len(tasks) <= 1:
+        for task in tasks:
+            with _quiet(not verbose):
+                _, found, n = _scan_task(task)
+            signals.extend(found)
+            calls += n
+        return signals, calls
+
+    # spawn: même choix que le pool de rendu (pas de fork d'un process multi-thread)
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                             initializer=_init_scan_worker, initargs=(overrides, verbose)) as pool:
+        futures = [pool.submit(_scan_task, t) for t in tasks]
+        for k, fut in enumerate(as_completed(futures), 1):
+            _, found, n = fut.result()
+            signals.extend(found)
+            calls += n
+            if k % 25 == 0 or k == len(futures):
+                print(f"   🔎 Scan {k}/{len(futures)} symboles ({len(signals)} signaux)")
+    return signals, calls
+
+
+# ==============================================================================
+# EXCHANGE SIMULÉ
+# ==============================================================================
+
+class SimExchange:
+    """
+    Exchange de substitution: ordres marché remplis au prix de référence (ouverture
+    de bougie) avec slippage défavorable + frais taker ; SL/TP déclenchés contre le
+    high/low de la bougie (gap → exécution à l'ouverture).
+    """
+
+    def __init__(self, fee_pct: float = DEFAULT_FEE_PCT, slippage_pct: float = DEFAULT_SLIPPAGE_PCT):
+        self.fee_rate = float(fee_pct) / 100.0
+        self.slippage = float(slippage_pct) / 100.0
+
+    # Interface CCXT minimale utilisée par les fonctions live (should_pyramid_position…)
+    def amount_to_precision(self, symbol: str, amount: float) -> float:
+        return float(amount)
+
+    def price_to_precision(self, symbol: str, price: float) -> float:
+        return float(price)
+
+    def fill_price(self, side: str, ref_price: float) -> float:
+        return ref_price * (1 + self.slippage) if side == 'buy' else ref_price * (1 - self.slippage)
+
+    def fee(self, price: float, qty: float) -> float:
+        return abs(price * qty) * self.fee_rate
+
+    def check_stops(self, pos: Dict[str, Any], o: float, h: float, l: float) -> Optional[Tuple[float, str]]:
+        sl, tp = float(pos['sl_price']), float(pos['tp_price'])
+        if pos['side'] == 'buy':
+            if l <= sl:
+                return min(o, sl), "SL touché"
+            if h >= tp:
+                return max(o, tp), "TP atteint"
+        else:
+            if h >= sl:
+                return max(o, sl), "SL touché"
+            if l <= tp:
+                return min(o, tp), "TP atteint"
+        return None
+
+
+# ==============================================================================
+# MOTEUR
+# ==============================================================================
+
+class Backtest:
+    def __init__(self, histories: Dict[str, SymbolHistory], signals: List[Dict[str, Any]],
+                 timeframe: str, initial_balance: float, exchange: SimExchange):
+        import trader
+        self.trader = trader
+        self.data = histories
+        self.timeframe = timeframe
+        self.ex = exchange
+        self.initial_balance = float(initial_balance)
+        self.balance = float(initial_balance)
+        self.open_positions: List[Dict[str, Any]] = []
+        self.closed: List[Dict[str, Any]] = []
+        self.skips: Counter = Counter()
+        self._next_id = 1
+        self._signals_by_ts: Dict[int, List[Dict[str, Any]]] = {}
+        for s in signals:
+            if s["symbol"] in histories:
+                self._signals_by_ts.setdefault(int(s["ts"]), []).append(s)
+
+    # ------------------------------------------------------------------
+    def run(self, start_ns: Optional[int] = None, end_ns: Optional[int] = None) -> None:
+        if not self.data:
+            return
+        timeline = np.unique(np.concatenate([h.ts for h in self.data.values()]))
+        if start_ns is not None:
+            timeline = timeline[timeline >= start_ns]
+        if end_ns is not None:
+            timeline = timeline[timeline <= end_ns]
+
+        pendings: List[Dict[str, Any]] = []
+        for ts in timeline:
+            ts = int(ts)
+            self._check_exits(ts)
+            if pendings:
+                self._execute_best(pendings, ts)
+            for pos in list(self.open_positions):
+                self._manage(pos, ts)
+            pendings = self._signals_by_ts.get(ts, [])
+
+        last_ts = int(timeline[-1]) if len(timeline) else 0
+        for pos in list(self.open_positions):
+            h = self.data[pos['symbol']]
+            i = int(np.searchsorted(h.ts, last_ts, side="right")) - 1
+            self._close(pos, h.bar(max(i, 0))[3], "Fin du backtest", last_ts, market=False)
+
+    # ------------------------------------------------------------------
+    def _check_exits(self, ts: int) -> None:
+        for pos in list(self.open_positions):
+            if ts < pos['_active_from']:
+                continue
+            h = self.data[pos['symbol']]
+            i = h.loc(ts)
+            if i is None:
+                continue
+            o, hi, lo, _ = h.bar(i)
+            hit = self.ex.check_stops(pos, o, hi, lo)
+            if hit:
+                self._close(pos, hit[0], hit[1], ts)
+
+    def _execute_best(self, pendings: List[Dict[str, Any]], ts: int) -> None:
+        """select_and_execute_best_pending_signal: tri RR décroissant, filtre RR absurdes, un seul trade."""
+        t = self.trader
+        ordered = sorted(pendings, key=lambda p: -float(p["signal"].get("rr", 0) or 0))
+        valid = [p for p in ordered if t.validate_rr_realistic(p["signal"], max_rr=20.0)]
+        if not valid:
+            return
+        ok, reason = self._open_position(valid[0], ts)
+        if not ok:
+            self.skips[reason] += 1
+
+    def _open_position(self, pending: Dict[str, Any], ts: int) -> Tuple[bool, str]:
+        """Gates de execute_signal_with_gates, dans le même ordre, puis remplissage simulé."""
+        t = self.trader
+        symbol = pending["symbol"]
+        h = self.data[symbol]
+        i = h.loc(ts)
+        w = h.window(i) if i is not None else None
+        if w is None:
+            return False, "df_short_for_entry_gate"
+
+        signal = dict(pending["signal"])
+        side = (signal.get('side') or '').lower()
+        regime = str(signal.get('regime', 'Tendance'))
+        is_long = (side == 'buy')
+        if signal.get('skip_reason'):
+            return False, "skip_reason"
+
+        # Entrée = OPEN de la bougie en formation (CT_ENTRY_ON_NEXT_BAR) + indices du signal
+        n = len(w)
+        entry_px = float(w['open'].iloc[-1])
+        signal['entry_index'] = n - 1
+        signal['reaction_index'] = n - 2
+        try:
+            contact_idx = t._find_contact_index(w, base_exclude_last=True, max_lookback=5)
+            if contact_idx is not None:
+                signal['contact_index'] = int(contact_idx)
+        except Exception:
+            pass
+
+        if not t.is_good_trading_session(h.index[i + 1].to_pydatetime()):
+            return False, "bad_trading_session"
+
+        existing = next((p for p in self.open_positions if p['symbol'] == symbol), None)
+        if existing is not None and existing['side'] == side:
+            return False, "position_already_open"
+
+        if t.correlation_rejection_reason(self.open_positions, symbol, side):
+            return False, "correlation_risk"
+        if not t._check_reaction_before_entry(w, signal, is_long):
+            return False, "no_reaction_pattern"
+        if t._is_first_after_prolonged_bb80_exit(w, is_long, min_streak=5, lookback=50):
+            return False, "gate3_volatility_excess"
+
+        sl, tp, err = t._recalc_sl_tp_live(
+            df=w, side=side, regime=regime, entry_price=entry_px,
+            symbol=symbol, timeframe=self.timeframe, signal=signal
+        )
+        if err:
+            return False, err.split(":")[0]
+        rr = t.calculate_rr(entry_px, sl, tp, side)
+        # Comme le live: MIN_RR lu dans les réglages (surcharge --set / optimize)
+        try:
+            min_rr = float(database.get_setting('MIN_RR', t.MIN_RR))
+        except Exception:
+            min_rr = t.MIN_RR
+        if rr < min_rr:
+            return False, "rr_below_min"
+
+        try:
+            risk_pct = float(database.get_setting('RISK_PER_TRADE_PERCENT', t.RISK_PER_TRADE_PERCENT))
+        except Exception:
+            risk_pct = t.RISK_PER_TRADE_PERCENT
+        qty = t.calculate_position_size(self.balance, risk_pct, entry_px, sl)
+
+        # Marge: notional total ≤ solde × levier (équivalent simplifié de _cap_qty_for_margin_and_filters)
+        used = sum(float(p['entry_price']) * float(p['quantity']) for p in self.open_positions if p is not existing)
+        room = max(0.0, self.balance * float(t.LEVERAGE) - used)
+        if qty * entry_px > room:
+            qty = room / entry_px
+        if qty <= 0:
+            return False, "insufficient_margin"
+        try:
+            min_notional = float(database.get_setting('MIN_NOTIONAL_USDT', '5.0'))
+        except Exception:
+            min_notional = 5.0
+        if qty * entry_px < min_notional:
+            return False, "notional_too_small"
+
+        # Fermeture de la position inverse éventuelle (comme le live, après les gates)
+        if existing is not None:
+            self._close(existing, entry_px, "Position inverse", ts)
+
+        fill = self.ex.fill_price(side, entry_px)
+        open_ts = int(h.ts[i + 1])
+        pos = {
+            'id': self._next_id,
+            'symbol': symbol,
+            'side': side,
+            'regime': regime,
+            'status': 'OPEN',
+            'entry_price': fill,
+            'sl_price': float(sl),
+            'tp_price': float(tp),
+            'quantity': float(qty),
+            'risk_percent': risk_pct,
+            'management_strategy': 'NORMAL',
+            'breakeven_status': 'PENDING',
+            'open_timestamp': open_ts // 1_000_000_000,
+            'entry_atr': float(w['atr'].iloc[-2]),
+            'meta': {'signal_rr': rr, 'pattern': signal.get('pattern')},
+            'partial_exits': {},
+            '_active_from': open_ts,
+            '_initial_entry': fill,
+            '_initial_qty': float(qty),
+            '_realized': 0.0,
+            '_fees': self.ex.fee(fill, qty),
+        }
+        self._next_id += 1
+        self.open_positions.append(pos)
+        return True, "opened"
+
+    # ------------------------------------------------------------------
+    def _manage(self, pos: Dict[str, Any], ts: int) -> None:
+        """Étapes 3 à 8 de manage_open_positions sur la position en mémoire."""
+        t = self.trader
+        h = self.data[pos['symbol']]
+        i = h.loc(ts)
+        w = h.window(i) if i is not None else None
+        if w is None:
+            return
+
+        symbol, side = pos['symbol'], pos['side']
+        is_long = (side == 'buy')
+        entry_price = float(pos['entry_price'])
+        sl_price = float(pos['sl_price'])
+        tp_price = float(pos['tp_price'])
+        regime = pos.get('regime', 'NORMAL')
+        breakeven_status = pos.get('breakeven_status', 'PENDING')
+        current_price = float(w['close'].iloc[-1])
+
+        # 3. TP dynamique
+        new_tp = t._dynamic_tp_level(w, is_long, regime)
+        if abs(new_tp - tp_price) / tp_price > 0.001:
+            pos['tp_price'] = new_tp
+
+        # 4. Breakeven (contact BB20_mid) + validation stricte
+        if breakeven_status == 'PENDING':
+            should_activate_be, _ = t._detect_be_trigger(
+                w, symbol, is_long, entry_price, current_price, pos['open_timestamp']
+            )
+            if should_activate_be:
+                is_valid, _ = t._validate_be_strict(symbol, side, entry_price, entry_price, sl_price)
+                if not is_valid:
+                    return
+                pos['breakeven_status'] = 'ACTIVE'
+                pos['sl_price'] = entry_price
+
+        tp_distance = abs(tp_price - entry_price)
+        if tp_distance < 0.000001:
+            return
+        progress = ((current_price - entry_price) if is_long else (entry_price - current_price)) / tp_distance * 100.0
+
+        # 5. Trailing multi-paliers (SL ne recule jamais)
+        if breakeven_status == 'ACTIVE':
+            new_sl = t._trailing_sl_level(is_long, entry_price, tp_distance, progress)
+            if new_sl is not None and ((is_long and new_sl > pos['sl_price']) or (not is_long and new_sl < pos['sl_price'])):
+                pos['sl_price'] = new_sl
+
+        # 6. Pyramiding
+        if progress >= 80.0:
+            info = t.should_pyramid_position(self.ex, pos, w)
+            if info:
+                self._pyramid(pos, info)
+
+        # 7. Sorties partielles
+        exit_info = t.should_take_partial_profit(pos, current_price)
+        if exit_info:
+            self._partial_exit(pos, exit_info, ts)
+            if pos['status'] != 'OPEN':
+                return
+
+        # 8. TP mobile (amélioration seulement) + BE suiveur BB20_mid (>80% TP)
+        if progress >= 80.0:
+            mobile_tp = t._dynamic_tp_level(w, is_long, regime)
+            if abs(mobile_tp - tp_price) / tp_price > 0.001:
+                if (is_long and mobile_tp > tp_price) or (not is_long and mobile_tp < tp_price):
+                    pos['tp_price'] = mobile_tp
+            if breakeven_status == 'ACTIVE':
+                bb20_mid = float(w['bb20_mid'].iloc[-1])
+                cur_sl = float(pos['sl_price'])
+                if is_long:
+                    improves = bb20_mid > entry_price and bb20_mid > cur_sl
+                else:
+                    improves = bb20_mid < entry_price and bb20_mid < cur_sl
+                if improves and abs(bb20_mid - cur_sl) / cur_sl > 0.001:
+                    pos['sl_price'] = bb20_mid
+
+    def _pyramid(self, pos: Dict[str, Any], info: Dict[str, Any]) -> None:
+        """execute_pyramid_add: prix moyen, SL à PYRAMID_SL_OFFSET_PCT du nouveau prix moyen, TP étendu si activé."""
+        is_long = pos['side'] == 'buy'
+        add_qty = float(info['add_qty'])
+        fill = self.ex.fill_price(pos['side'], float(info['current_price']))
+        old_qty, old_entry = float(pos['quantity']), float(pos['entry_price'])
+        total = old_qty + add_qty
+        avg = (old_qty * old_entry + add_qty * fill) / total
+
+        try:
+            offset = float(database.get_setting('PYRAMID_SL_OFFSET_PCT', '1.0'))
+        except Exception:
+            offset = 1.0
+        if is_long:
+            pos['sl_price'] = max(float(pos['sl_price']), avg * (1 - offset / 100))
+        else:
+            pos['sl_price'] = min(float(pos['sl_price']), avg * (1 + offset / 100))
+        try:
+            if str(database.get_setting('PYRAMID_EXTEND_TP', 'false')).lower() == 'true':
+                ext = float(database.get_setting('PYRAMID_TP_EXTENSION_PCT', '5.0'))
+                pos['tp_price'] = float(pos['tp_price']) * ((1 + ext / 100) if is_long else (1 - ext / 100))
+        except Exception:
+            pass
+
+        pos['entry_price'] = avg
+        pos['quantity'] = total
+        pos['_fees'] += self.ex.fee(fill, add_qty)
+        pos['meta']['pyramid_count'] = int(pos['meta'].get('pyramid_count', 0)) + 1
+
+    def _partial_exit(self, pos: Dict[str, Any], info: Dict[str, Any], ts: int) -> None:
+        """execute_partial_exit: clôture d'une fraction + SL resserré (PARTIAL_EXIT_SL_TIGHTEN_PCT)."""
+        is_long = pos['side'] == 'buy'
+        close_side = 'sell' if is_long else 'buy'
+        entry = float(pos['entry_price'])
+        close_qty = min(float(info['close_qty']), float(pos['quantity']))
+        fill = self.ex.fill_price(close_side, float(info['current_price']))
+        pos['_realized'] += (fill - entry) * close_qty if is_long else (entry - fill) * close_qty
+        pos['_fees'] += self.ex.fee(fill, close_qty)
+        pos['quantity'] = float(pos['quantity']) - close_qty
+        pos['partial_exits'][info['palier']] = {
+            'qty_closed': close_qty, 'exit_price': fill, 'timestamp': ts // 1_000_000_000,
+        }
+        if pos['quantity'] <= 0:
+            self._close(pos, fill, "Sorties partielles complètes", ts, market=False, status='CLOSED_PARTIAL_COMPLETE')
+            return
+        try:
+            tighten = float(database.get_setting('PARTIAL_EXIT_SL_TIGHTEN_PCT', '50'))
+        except Exception:
+            tighten = 50.0
+        profit_range = (float(info['current_price']) - entry) if is_long else (entry - float(info['current_price']))
+        if is_long:
+            pos['sl_price'] = max(float(pos['sl_price']), entry + profit_range * tighten / 100)
+        else:
+            pos['sl_price'] = min(float(pos['sl_price']), entry - profit_range * tighten / 100)
+
+    def _close(self, pos: Dict[str, Any], price: float, reason: str, ts: int,
+               market: bool = True, status: str = 'CLOSED') -> None:
+        is_long = pos['side'] == 'buy'
+        qty = float(pos['quantity'])
+        fill = self.ex.fill_price('sell' if is_long else 'buy', price) if market else float(price)
+        entry = float(pos['entry_price'])
+        if qty > 0:
+            pos['_realized'] += (fill - entry) * qty if is_long else (entry - fill) * qty
+            pos['_fees'] += self.ex.fee(fill, qty)
+        pnl = pos['_realized'] - pos['_fees']
+        notional = abs(pos['_initial_entry'] * pos['_initial_qty'])
+        self.balance += pnl
+
+        meta = dict(pos['meta'])
+        meta.update({
+            'backtest': True,
+            'exit_reason': reason,
+            'exit_price': fill,
+            'initial_quantity': pos['_initial_qty'],
+            'fees': round(pos['_fees'], 8),
+        })
+        if pos['partial_exits']:
+            meta['partial_exits'] = pos['partial_exits']
+        pos.update({
+            'status': status,
+            'pnl': pnl,
+            'pnl_percent': (pnl / notional * 100.0) if notional > 0 else 0.0,
+            'close_timestamp': ts // 1_000_000_000,
+            'exit_price': fill,
+            'meta': meta,
+        })
+        self.open_positions.remove(pos)
+        self.closed.append(pos)
+
+    # ------------------------------------------------------------------
+    def trade_rows(self) -> List[Dict[str, Any]]:
+        """Trades au schéma database.trades (meta sérialisé en JSON)."""
+        cols = ['id', 'symbol', 'side', 'regime', 'status', 'entry_price', 'sl_price', 'tp_price',
+                'quantity', 'risk_percent', 'management_strategy', 'breakeven_status', 'pnl',
+                'pnl_percent', 'open_timestamp', 'close_timestamp', 'entry_atr']
+        rows = []
+        for pos in sorted(self.closed, key=lambda p: (p['close_timestamp'], p['id'])):
+            row = {c: pos.get(c) for c in cols}
+            row['meta'] = json.dumps(pos['meta'], default=str)
+            rows.append(row)
+        return rows
+
+
+# ==============================================================================
+# ORCHESTRATION
+# ==============================================================================
+
+def _to_ns(value) -> Optional[int]:
+    if value is None or value == "":
+        return None
+    ts = pd.Timestamp(value)
+    ts = ts.tz_localize("UTC") if ts.tzinfo is None else ts.tz_convert("UTC")
+    return int(ts.value)
+
+
+def save_results(db_path: str, rows: List[Dict[str, Any]], stats: Dict[str, Any], params: Dict[str, Any]) -> None:
+    os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+    database.setup_database(db_path)
+    with database.get_db_connection(db_path) as conn:
+        if rows:
+            cols = list(rows[0].keys())
+            conn.executemany(
+                f"INSERT OR REPLACE INTO trades ({', '.join(cols)}) VALUES ({', '.join('?' for _ in cols)})",
+                [tuple(r[c] for c in cols) for r in rows],
+            )
+        for key, value in (("BACKTEST_STATS", stats), ("BACKTEST_PARAMS", params)):
+            conn.execute("INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)",
+                         (key, json.dumps(value, default=str)))
+        conn.commit()
+
+
+def simulate(histories: Dict[str, SymbolHistory], signals: List[Dict[str, Any]], timeframe: str,
+             initial_balance: float = 1000.0, fee_pct: float = DEFAULT_FEE_PCT,
+             slippage_pct: float = DEFAULT_SLIPPAGE_PCT, start_ns: Optional[int] = None,
+             end_ns: Optional[int] = None) -> Backtest:
+    """Boucle portefeuille seule (signaux déjà détectés), sur la fenêtre [start_ns, end_ns]."""
+    if start_ns is not None or end_ns is not None:
+        signals = [s for s in signals
+                   if (start_ns is None or s["ts"] >= start_ns) and (end_ns is None or s["ts"] <= end_ns)]
+    used = {s["symbol"] for s in signals}
+    bt = Backtest({k: v for k, v in histories.items() if k in used}, signals, timeframe,
+                  initial_balance, SimExchange(fee_pct, slippage_pct))
+    bt.run(start_ns, end_ns)
+    return bt
+
+
+def summarize(bt: Backtest, rows: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+    import reporting
+
+    rows = bt.trade_rows() if rows is None else rows
+    stats = reporting.calculate_performance_stats(rows)
+    stats.update({
+        "initial_balance": round(bt.initial_balance, 2),
+        "final_balance": round(bt.balance, 2),
+        "return_pct": round((bt.balance / bt.initial_balance - 1) * 100.0, 2) if bt.initial_balance else 0.0,
+        "skips": dict(bt.skips),
+    })
+    return stats
+
+
+def run_backtest(symbols: Optional[List[str]] = None, timeframe: Optional[str] = None,
+                 start=None, end=None, initial_balance: float = 1000.0,
+                 overrides: Optional[Dict[str, Any]] = None,
+                 fee_pct: float = DEFAULT_FEE_PCT, slippage_pct: float = DEFAULT_SLIPPAGE_PCT,
+                 workers: Optional[int] = None, archive_dir: Optional[str] = None,
+                 db_path: Optional[str] = None, save: bool = True, verbose: bool = False) -> Dict[str, Any]:
+    """
+    Lance un backtest complet. `overrides` remplace des paramètres (table settings)
+    le temps du run. Retourne {'stats', 'trades', 'db_path'}.
+    """
+    t0 = time.perf_counter()
+    timeframe = timeframe or DEFAULT_TIMEFRAME
+    symbols = list(symbols or list_archived_symbols(timeframe, archive_dir))
+    start_ns, end_ns = _to_ns(start), _to_ns(end)
+    if workers is None:
+        workers = int(os.getenv("BACKTEST_WORKERS", str(os.cpu_count() or 1)))
+
+    database.set_settings_overlay(overrides or {})
+    try:
+        print(f"🧪 Backtest {timeframe} sur {len(symbols)} symbole(s)...")
+        signals, calls = scan_all(symbols, timeframe, archive_dir, start_ns, end_ns,
+                                  overrides, workers, verbose)
+        t_scan = time.perf_counter() - t0
+
+        with _quiet(not verbose):
+            histories = {}
+            for sym in sorted({s["symbol"] for s in signals}):
+                hist = load_history(sym, timeframe, archive_dir)
+                if hist is not None:
+                    histories[sym] = hist
+            bt = simulate(histories, signals, timeframe, initial_balance, fee_pct, slippage_pct, start_ns, end_ns)
+            rows = bt.trade_rows()
+            stats = summarize(bt, rows)
+    finally:
+        database.set_settings_overlay(None)
+
+    stats.update({
+        "symbols": len(symbols),
+        "signals": len(signals),
+        "detect_calls": calls,
+        "scan_seconds": round(t_scan, 2),
+        "elapsed_seconds": round(time.perf_counter() - t0, 2),
+    })
+    params = {
+        "timeframe": timeframe, "start": str(start or ""), "end": str(end or ""),
+        "fee_pct": fee_pct, "slippage_pct": slippage_pct, "overrides": overrides or {},
+    }
+
+    if save:
+        if not db_path:
+            os.makedirs(RESULTS_DIR, exist_ok=True)
+            db_path = os.path.join(RESULTS_DIR, f"bt_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.db")
+        save_results(db_path, rows, stats, params)
+    return {"stats": stats, "trades": rows, "db_path": db_path if save else None}
+
+
+def format_stats(stats: Dict[str, Any]) -> str:
+    pf = stats.get("profit_factor")
+    pf_txt = "∞" if pf == float("inf") else ("-" if pf is None else f"{pf:.2f}")
+    return (
+        f"📊 Trades: {stats.get('total_trades', 0)} | Winrate: {stats.get('win_rate', 0)}% | PF: {pf_txt}\n"
+        f"💰 PnL: {stats.get('total_pnl', 0)} USDT | Solde: {stats.get('initial_balance')} → "
+        f"{stats.get('final_balance')} ({stats.get('return_pct', 0):+}%)\n"
+        f"📉 Max DD: {stats.get('max_drawdown_percent', 0)}% | Sharpe: {stats.get('sharpe_ratio', 0)}\n"
+        f"🔎 Signaux: {stats.get('signals', 0)} ({stats.get('detect_calls', 0)} appels detect_signal) | "
+        f"⏱️ {stats.get('elapsed_seconds', 0)} s (scan {stats.get('scan_seconds', 0)} s)"
+    )
+
+
+def _parse_symbols(value: Optional[str], path: Optional[str]) -> Optional[List[str]]:
+    if path:
+        with open(path, "r", encoding="utf-8") as f:
+            return [l.strip() for l in f if l.strip() and not l.startswith("#")]
+    if value:
+        return [s.strip() for s in value.split(",") if s.strip()]
+    return None
+
+
+def _parse_overrides(items: Optional[List[str]]) -> Dict[str, str]:
+    out = {}
+    for item in items or []:
+        if "=" in item:
+            k, v = item.split("=", 1)
+            out[k.strip()] = v.strip()
+    return out
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Backtest Darwin (archive OHLCV locale)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_dl = sub.add_parser("download", help="Compléter l'archive OHLCV")
+    p_dl.add_argument("--symbols", help="Liste séparée par des virgules")
+    p_dl.add_argument("--symbols-file")
+    p_dl.add_argument("--timeframe", default=DEFAULT_TIMEFRAME)
+    p_dl.add_argument("--days", type=int, default=365)
+    p_dl.add_argument("--exchange", default="bitget")
+    p_dl.add_argument("--archive-dir")
+
+    p_run = sub.add_parser("run", help="Lancer un backtest")
+    p_run.add_argument("--symbols", help="Défaut: tous les symboles archivés")
+    p_run.add_argument("--symbols-file")
+    p_run.add_argument("--timeframe", default=DEFAULT_TIMEFRAME)
+    p_run.add_argument("--start")
+    p_run.add_argument("--end")
+    p_run.add_argument("--balance", type=float, default=1000.0)
+    p_run.add_argument("--fee-pct", type=float, default=DEFAULT_FEE_PCT)
+    p_run.add_argument("--slippage-pct", type=float, default=DEFAULT_SLIPPAGE_PCT)
+    p_run.add_argument("--workers", type=int)
+    p_run.add_argument("--set", action="append", metavar="CLE=VALEUR", help="Surcharge d'un paramètre (répétable)")
+    p_run.add_argument("--archive-dir")
+    p_run.add_argument("--out", help="Base SQLite de résultats")
+    p_run.add_argument("--verbose", action="store_true")
+
+    args = parser.parse_args(argv)
+    symbols = _parse_symbols(args.symbols, args.symbols_file)
+
+    if args.command == "download":
+        if not symbols:
+            print("❌ --symbols ou --symbols-file requis")
+            return 1
+        download_history(symbols, args.timeframe, args.days, args.archive_dir, args.exchange)
+        return 0
+
+    result = run_backtest(
+        symbols=symbols, timeframe=args.timeframe, start=args.start, end=args.end,
+        initial_balance=args.balance, overrides=_parse_overrides(args.set),
+        fee_pct=args.fee_pct, slippage_pct=args.slippage_pct, workers=args.workers,
+        archive_dir=args.archive_dir, db_path=args.out, verbose=args.verbose,
+    )
+    print(format_stats(result["stats"]))
+    if result["db_path"]:
+        print(f"💾 Résultats: {result['db_path']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
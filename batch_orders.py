@@ -0,0 +1,244 @@
+# Fichier: batch_orders.py
+"""
+Couche d'ordres groupés (Bitget batch-place / batch-cancel via ccxt).
+
+- cancel_orders(ex, symbol, orders)  : ex.cancel_orders si supporté, sinon un par un
+- create_orders(ex, requests)        : ex.create_orders si supporté, sinon un par un
+                                       (ordres plan TP/SL toujours un par un)
+- replace_orders(ex, symbol, ...)    : "flatten & re-arm" (annulation groupée + placement groupé)
+
+Les ordres trigger (TP/SL "plan") et les ordres classiques sont annulés par
+lots séparés: Bitget les expose sur deux endpoints distincts. Les TP/SL de
+position (preset attachés à l'entrée, planType pos_profit/pos_loss) ne sont
+listés qu'avec planType=profit_loss: fetch_all_open_orders les inclut.
+Aucune fonction ne lève: les échecs sont retournés à l'appelant.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional, List, Tuple
+
+# Taille max d'un lot Bitget (batch-place / batch-cancel)
+BITGET_BATCH_MAX = 20
+
+
+def _chunks(items: list, size: int) -> List[list]:
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def _has(ex, capability: str) -> bool:
+    try:
+        return bool((getattr(ex, "has", {}) or {}).get(capability))
+    except Exception:
+        return False
+
+
+def _is_trigger_order(order: Dict[str, Any]) -> bool:
+    """Vrai pour les ordres plan (TP/SL/trigger) — annulés via l'endpoint plan."""
+    info = order.get("info", {}) or {}
+    if order.get("triggerPrice") or order.get("stopPrice"):
+        return True
+    if order.get("stopLossPrice") or order.get("takeProfitPrice"):
+        return True
+    return bool(info.get("planType") or info.get("triggerPrice"))
+
+
+# planType Bitget des TP/SL (position ou partiels): listés/annulés avec planType=profit_loss
+_PROFIT_LOSS_PLAN_TYPES = frozenset({"pos_profit", "pos_loss", "profit_plan", "loss_plan", "moving_plan"})
+_CANCEL_PARAMS = {
+    "normal": {},
+    "plan": {"trigger": True},
+    "profit_loss": {"trigger": True, "planType": "profit_loss"},
+}
+
+
+def _cancel_group(order: Dict[str, Any]) -> str:
+    info = order.get("info", {}) or {}
+    if str(info.get("planType") or "") in _PROFIT_LOSS_PLAN_TYPES:
+        return "profit_loss"
+    return "plan" if _is_trigger_order(order) else "normal"
+
+
+def protective_kind(order: Dict[str, Any]) -> Optional[str]:
+    """'tp' / 'sl' pour un ordre TP/SL (plan ou preset de position), sinon None."""
+    info = order.get("info", {}) or {}
+    plan = str(info.get("planType") or "")
+    if plan in ("pos_profit", "profit_plan") or order.get("takeProfitPrice"):
+        return "tp"
+    if plan in ("pos_loss", "loss_plan") or order.get("stopLossPrice"):
+        return "sl"
+    return None
+
+
+def _batch_ok(res: Any) -> bool:
+    """Un élément de réponse batch est valide s'il porte un id et pas de code d'erreur."""
+    if not isinstance(res, dict):
+        return False
+    info = res.get("info", {}) or {}
+    if info.get("errorCode") or info.get("errorMsg"):
+        return False
+    return bool(res.get("id") or info.get("orderId") or info.get("clientOid"))
+
+
+# ==============================================================================
+# ANNULATION
+# ==============================================================================
+
+def cancel_orders(ex, symbol: str, orders: List[Dict[str, Any]]) -> int:
+    """
+    Annule les ordres donnés (dicts ccxt) en lots. Retourne le nombre d'ordres annulés.
+    Fallback séquentiel ordre par ordre si le lot échoue ou n'est pas supporté.
+    """
+    groups: Dict[str, List[str]] = {g: [] for g in _CANCEL_PARAMS}
+    for o in orders or []:
+        oid = o.get("id")
+        if oid:
+            groups[_cancel_group(o)].append(str(oid))
+
+    cancelled = 0
+    for group, ids in groups.items():
+        if not ids:
+            continue
+        params = dict(_CANCEL_PARAMS[group])
+        remaining = list(ids)
+
+        if _has(ex, "cancelOrders"):
+            remaining = []
+            for chunk in _chunks(ids, BITGET_BATCH_MAX):
+                try:
+                    res = ex.cancel_orders(chunk, symbol, params) or []
+                    ok_ids = {str(r.get("id")) for r in res if _batch_ok(r)}
+                    if not res:
+                        ok_ids = set(chunk)  # certaines versions ne renvoient pas le détail
+                    cancelled += len(ok_ids)
+                    remaining.extend(i for i in chunk if i not in ok_ids)
+                except Exception:
+                    remaining.extend(chunk)
+
+        for oid in remaining:
+            try:
+                ex.cancel_order(oid, symbol, params)
+                cancelled += 1
+            except Exception:
+                # Déjà annulé/exécuté: on continue
+                continue
+    return cancelled
+
+
+def fetch_all_open_orders(ex, symbol: str) -> List[Dict[str, Any]]:
+    """
+    Ordres ouverts du symbole: classiques + plan (trigger) + TP/SL de position
+    (profit_loss), dédoublonnés par id. Une liste en échec est ignorée.
+    """
+    out: Dict[str, Dict[str, Any]] = {}
+    for params in ({}, {"trigger": True}, {"trigger": True, "planType": "profit_loss"}):
+        try:
+            for o in ex.fetch_open_orders(symbol, None, None, dict(params)) or []:
+                if o.get("id") is not None:
+                    out.setdefault(str(o["id"]), o)
+        except Exception:
+            continue
+    return list(out.values())
+
+
+def cancel_all_open_orders(ex, symbol: str) -> int:
+    """fetch_all_open_orders + annulation groupée. Ne lève pas."""
+    orders = fetch_all_open_orders(ex, symbol)
+    if not orders:
+        return 0
+    return cancel_orders(ex, symbol, orders)
+
+
+def cancel_protective_orders(ex, symbol: str, kinds: Tuple[str, ...] = ("tp", "sl")) -> int:
+    """
+    Annule les TP et/ou SL du symbole, y compris les TP/SL preset attachés à la
+    position à l'entrée (sinon l'ancien TP/SL reste actif sur toute la position).
+    """
+    orders = [o for o in fetch_all_open_orders(ex, symbol) if protective_kind(o) in kinds]
+    if not orders:
+        return 0
+    return cancel_orders(ex, symbol, orders)
+
+
+# ==============================================================================
+# PLACEMENT
+# ==============================================================================
+
+def order_request(symbol: str, type: str, side: str, amount: float,
+                  price: Optional[float] = None, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Construit une requête au format ccxt.create_orders."""
+    return {"symbol": symbol, "type": type, "side": side, "amount": amount,
+            "price": price, "params": dict(params or {})}
+
+
+# Paramètres ccxt qui transforment un ordre en ordre plan (TP/SL/trigger)
+_TRIGGER_PARAMS = ("stopLossPrice", "takeProfitPrice", "triggerPrice", "stopPrice")
+
+
+def _is_trigger_request(req: Dict[str, Any]) -> bool:
+    """Vrai pour une requête d'ordre plan: refusée par l'endpoint batch-place de Bitget."""
+    params = req.get("params") or {}
+    return any(params.get(k) for k in _TRIGGER_PARAMS)
+
+
+def _create_one(ex, req: Dict[str, Any]) -> Tuple[Optional[Dict[str, Any]], Optional[Exception]]:
+    try:
+        order = ex.create_order(
+            req["symbol"], req["type"], req["side"], req["amount"],
+            req.get("price"), req.get("params") or {}
+        )
+        return order, None
+    except Exception as e:
+        return None, e
+
+
+def create_orders(ex, requests: List[Dict[str, Any]],
+                  parallel: bool = False) -> List[Tuple[Optional[Dict[str, Any]], Optional[Exception]]]:
+    """
+    Place une liste d'ordres. Retourne [(order|None, erreur|None)] dans l'ordre des requêtes.
+    Utilise ex.create_orders (1 aller-retour) si tous les ordres sont sur le même symbole,
+    puis rejoue un par un les éléments refusés par le lot.
+    Les ordres plan (TP/SL/trigger), que le batch Bitget refuse, partent directement
+    en ordres unitaires. parallel=True (pose des protections): aucune tentative
+    batch, ordres unitaires en parallèle dès le premier aller-retour.
+    """
+    results: List[Tuple[Optional[Dict[str, Any]], Optional[Exception]]] = [(None, None)] * len(requests)
+    direct = [parallel or _is_trigger_request(r) for r in requests]
+    todo = [i for i, d in enumerate(direct) if d]
+    batchable = [i for i, d in enumerate(direct) if not d]
+
+    same_symbol = len({requests[i].get("symbol") for i in batchable}) == 1
+    if len(batchable) > 1 and same_symbol and _has(ex, "createOrders"):
+        for chunk in _chunks(batchable, BITGET_BATCH_MAX):
+            try:
+                res = ex.create_orders([requests[i] for i in chunk]) or []
+                for pos, idx in enumerate(chunk):
+                    r = res[pos] if pos < len(res) else None
+                    if _batch_ok(r):
+                        results[idx] = (r, None)
+                    else:
+                        todo.append(idx)
+            except Exception:
+                todo.extend(chunk)
+    else:
+        todo.extend(batchable)
+    todo.sort()
+
+    if parallel and len(todo) > 1:
+        with ThreadPoolExecutor(max_workers=min(len(todo), 4)) as pool:
+            outs = list(pool.map(lambda i: _create_one(ex, requests[i]), todo))
+        for idx, out in zip(todo, outs):
+            results[idx] = out
+        return results
+
+    for idx in todo:
+        results[idx] = _create_one(ex, requests[idx])
+    return results
+
+
+def replace_orders(ex, symbol: str, requests: List[Dict[str, Any]],
+                   cancel_existing: bool = True) -> List[Tuple[Optional[Dict[str, Any]], Optional[Exception]]]:
+    """Flatten & re-arm: annule les ordres ouverts du symbole puis place les nouveaux, en lots."""
+    if cancel_existing:
+        cancel_all_open_orders(ex, symbol)
+    if not requests:
+        return []
+    return create_orders(ex, requests)
@@ -0,0 +1,486 @@
+# Fichier: benchmarks.py
+"""
+Benchmarks des chemins chauds du bot (scan, gestion des positions, reporting),
+exécutés contre l'exchange simulé (fake_exchange) sur OHLCV synthétique
+déterministe, dans une base SQLite temporaire.
+
+Couverts:
+  - utils.fetch_and_prepare_df
+  - trader.detect_signal (univers complet, 500 symboles par défaut)
+  - main.select_and_execute_best_pending_signal
+  - trader.manage_open_positions (10 / 50 / 200 positions)
+  - trader.sync_positions_with_exchange
+  - database.save_execution_open (10k exécutions existantes)
+  - database.recompute_stats_from_executions
+  - charting.generate_trade_chart
+
+Chaque bench: préparation hors chrono (place simulée + base remises à zéro si
+besoin), 1 tour d'échauffement, puis N tours chronométrés → min / médiane /
+p95 / moyenne en ms. Le rapport JSON sert de référence (baseline):
+
+  python benchmarks.py run --out baseline.json
+  python benchmarks.py run --only manage_open_positions --out current.json
+  python benchmarks.py compare baseline.json current.json --threshold 15
+
+`compare` sort en code 1 si une médiane régresse au-delà du seuil (%).
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import tempfile
+import subprocess
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional, Callable
+
+BENCH_SEED = int(os.getenv("BENCH_SEED", "42"))
+BENCH_SYMBOLS = int(os.getenv("BENCH_SYMBOLS", "500"))
+BENCH_TIMEFRAME = os.getenv("BENCH_TIMEFRAME", "1h")
+BENCH_REPEAT = int(os.getenv("BENCH_REPEAT", "5"))
+BENCH_THRESHOLD_PCT = float(os.getenv("BENCH_THRESHOLD_PCT", "15"))
+BENCH_MIN_DELTA_MS = float(os.getenv("BENCH_MIN_DELTA_MS", "0.5"))
+
+MANAGE_SIZES = (10, 50, 200)
+EXECUTIONS_EXISTING = 10_000
+
+
+# ==============================================================================
+# REGISTRE
+# ==============================================================================
+
+class _Bench:
+    def __init__(self, name: str, fn: Callable, setup: Optional[Callable] = None,
+                 repeat: Optional[int] = None, fresh: bool = False, params: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.fn = fn
+        self.setup = setup
+        self.repeat = repeat
+        self.fresh = fresh          # True: setup() avant CHAQUE tour (le bench modifie l'état)
+        self.params = dict(params or {})
+
+
+_BENCHES: List[_Bench] = []
+
+
+def _register(name: str, setup: Optional[Callable] = None, repeat: Optional[int] = None,
+              fresh: bool = False, **params):
+    def deco(fn):
+        _BENCHES.append(_Bench(name, fn, setup, repeat, fresh, params))
+        return fn
+    return deco
+
+
+def _percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    s = sorted(values)
+    return s[min(len(s) - 1, max(0, int(round(q * (len(s) - 1)))))]
+
+
+def _run_one(b: _Bench, repeat: int) -> Dict[str, Any]:
+    ctx = b.setup(**b.params) if b.setup else dict(b.params)
+    b.fn(ctx)  # échauffement (caches, imports paresseux, JIT numpy/pandas)
+    samples: List[float] = []
+    for _ in range(max(1, int(b.repeat or repeat))):
+        if b.fresh and b.setup:
+            ctx = b.setup(**b.params)
+        t0 = time.perf_counter()
+        b.fn(ctx)
+        samples.append((time.perf_counter() - t0) * 1000.0)
+    return {
+        "runs": len(samples),
+        "min_ms": round(min(samples), 3),
+        "median_ms": round(_percentile(samples, 0.50), 3),
+        "p95_ms": round(_percentile(samples, 0.95), 3),
+        "mean_ms": round(sum(samples) / len(samples), 3),
+        "params": b.params,
+    }
+
+
+# ==============================================================================
+# PRÉPARATION (place simulée, base, positions)
+# ==============================================================================
+
+_STATE: Dict[str, Any] = {}
+
+
+def _fresh_exchange():
+    """Nouvelle place simulée (même graine, même horloge figée) + client du bot."""
+    import fake_exchange
+    import main as bot
+
+    fake_exchange.configure(n_symbols=_STATE["symbols"], timeframe=_STATE["timeframe"], data="synthetic",
+                            clock="virtual", start=_STATE["start_ms"], seed=_STATE["seed"],
+                            balance=1e9, rate_limits=False, latency_ms=0.0, jitter_ms=0.0,
+                            error_rate=0.0, ws_disconnect_rate=0.0)
+    ex = bot.create_exchange()
+    ex.load_markets()
+    return ex, fake_exchange.get_venue()
+
+
+def _reset_db() -> None:
+    import database
+    import state
+
+    with database.get_db_connection() as conn:
+        conn.execute("DELETE FROM trades")
+        conn.commit()
+    database._invalidate_open_positions()
+    database._save_json_setting('EXECUTIONS_LOG', [])
+    state.clear_pending_signals()
+
+
+def _symbols(n: int) -> List[str]:
+    import fake_exchange
+    return list(fake_exchange.get_venue().markets.keys())[:n]
+
+
+def _seed_positions(ex, venue, n: int, db_extra: int = 0, exchange_extra: int = 0) -> List[str]:
+    """
+    Ouvre `n` positions côté place simulée (SL/TP attachés) et les trades OPEN
+    correspondants en base. `db_extra`: trades en base sans position (clôtures à
+    détecter) ; `exchange_extra`: positions sans trade (imports).
+    """
+    import database
+
+    rng = random.Random(f"{_STATE['seed']}:positions:{n}")
+    symbols = _symbols(n + db_extra + exchange_extra)
+    for i, sym in enumerate(symbols):
+        px = venue.price(sym)
+        side = "buy" if rng.random() < 0.5 else "sell"
+        sl = px * (0.97 if side == "buy" else 1.03)
+        tp = px * (1.06 if side == "buy" else 0.94)
+        qty = float(ex.amount_to_precision(sym, 100.0 / px))
+        if i < n + exchange_extra:
+            venue.leverage[sym] = 10
+            venue.create_order(sym, "market", side, qty, None,
+                               {"stopLoss": {"triggerPrice": sl}, "takeProfit": {"triggerPrice": tp}})
+        if i < n or i >= n + exchange_extra:
+            database.create_trade(sym, side, "Tendance", px, sl, tp, qty, 1.0, "NORMAL",
+                                  entry_atr=px * 0.01, entry_rsi=50.0)
+    return symbols
+
+
+def _synthetic_signal(df, side: str = "buy") -> Dict[str, Any]:
+    """Signal Darwin plausible sur la dernière bougie close (indices dans la fenêtre)."""
+    last = df.iloc[-2]
+    entry = float(last["close"])
+    atr = float(last.get("atr", entry * 0.01) or entry * 0.01)
+    if side == "buy":
+        sl, tp = entry - 2 * atr, entry + 6 * atr
+    else:
+        sl, tp = entry + 2 * atr, entry - 6 * atr
+    n = len(df)
+    return {
+        "side": side, "regime": "Tendance", "entry": entry, "sl": sl, "tp": tp,
+        "rr": abs(tp - entry) / max(1e-12, abs(entry - sl)),
+        "contact_idx": n - 4, "contact_index": n - 4, "reaction_idx": n - 3, "reaction_index": n - 3,
+        "entry_index": n - 1, "pattern": "bench", "ts": int(df.index[-2].timestamp() * 1000),
+    }
+
+
+def _make_executions(n: int, closed_ratio: float = 0.9) -> List[Dict[str, Any]]:
+    rng = random.Random(f"{_STATE['seed']}:executions:{n}")
+    now_ms = int(time.time() * 1000)
+    symbols = _symbols(50)
+    out = []
+    for i in range(n):
+        opened = now_ms - rng.randint(0, 45 * 24 * 3600 * 1000)
+        entry = rng.uniform(0.1, 50000.0)
+        pnl_pct = rng.gauss(0.3, 2.5)
+        e = {
+            "exec_id": f"bench{i:08d}", "exchange": "bitget", "account_mode": "LIVE",
+            "symbol": symbols[i % len(symbols)], "side": rng.choice(("buy", "sell")),
+            "qty": round(100.0 / entry, 6), "leverage": 10, "avg_entry": entry,
+            "sl": entry * 0.97, "tp1": entry * 1.06, "tp2": None,
+            "opened_at": opened, "created_at": opened, "updated_at": opened, "status": "open",
+        }
+        if rng.random() < closed_ratio:
+            e.update({"status": "closed", "closed_at": opened + rng.randint(600, 72 * 3600) * 1000,
+                      "close_price": entry * (1 + pnl_pct / 100), "pnl_pct": pnl_pct,
+                      "pnl_abs": pnl_pct, "fees": 0.12})
+        out.append(e)
+    return out
+
+
+# ---------------- setups ----------------
+
+def _setup_fetch(**params) -> Dict[str, Any]:
+    ex, _ = _fresh_exchange()
+    return {"ex": ex, "symbols": _symbols(params.get("symbols", 20))}
+
+
+def _setup_detect(**params) -> Dict[str, Any]:
+    import utils
+
+    ex, _ = _fresh_exchange()
+    dfs = []
+    for sym in _symbols(params.get("symbols", _STATE["symbols"])):
+        df = utils.fetch_and_prepare_df(ex, sym, _STATE["timeframe"])
+        if df is not None:
+            dfs.append((sym, df))
+    return {"dfs": dfs}
+
+
+def _setup_select(**params) -> Dict[str, Any]:
+    import utils
+    import state
+
+    _reset_db()
+    ex, _ = _fresh_exchange()
+    for i, sym in enumerate(_symbols(params.get("pending", 20))):
+        df = utils.fetch_and_prepare_df(ex, sym, _STATE["timeframe"])
+        if df is None:
+            continue
+        sig = _synthetic_signal(df, "buy" if i % 2 == 0 else "sell")
+        state.set_pending_signal(sym, {"symbol": sym, "signal": sig, "candle_timestamp": df.index[-2], "df": df})
+    return {"ex": ex}
+
+
+def _setup_positions(**params) -> Dict[str, Any]:
+    _reset_db()
+    ex, venue = _fresh_exchange()
+    _seed_positions(ex, venue, params.get("positions", 10),
+                    db_extra=params.get("db_extra", 0), exchange_extra=params.get("exchange_extra", 0))
+    return {"ex": ex}
+
+
+def _setup_executions(**params) -> Dict[str, Any]:
+    import database
+
+    _fresh_exchange()
+    database._save_json_setting('EXECUTIONS_LOG', _make_executions(params.get("existing", EXECUTIONS_EXISTING)))
+    return {"seq": [0]}
+
+
+def _setup_chart(**params) -> Dict[str, Any]:
+    import utils
+
+    ex, _ = _fresh_exchange()
+    sym = _symbols(1)[0]
+    df = utils.fetch_and_prepare_df(ex, sym, _STATE["timeframe"])
+    return {"symbol": sym, "df": df, "signal": _synthetic_signal(df)}
+
+
+# ==============================================================================
+# BENCHES
+# ==============================================================================
+
+@_register("fetch_and_prepare_df", setup=_setup_fetch, symbols=20)
+def _bench_fetch(ctx):
+    import utils
+    for sym in ctx["symbols"]:
+        utils.fetch_and_prepare_df(ctx["ex"], sym, _STATE["timeframe"])
+
+
+@_register("detect_signal", setup=_setup_detect, repeat=3)
+def _bench_detect(ctx):
+    import trader
+    for sym, df in ctx["dfs"]:
+        trader.detect_signal(sym, df)
+
+
+@_register("select_and_execute_best_pending_signal", setup=_setup_select, fresh=True, pending=20)
+def _bench_select(ctx):
+    import main as bot
+    bot.select_and_execute_best_pending_signal(ctx["ex"])
+
+
+for _n in MANAGE_SIZES:
+    @_register(f"manage_open_positions[{_n}]", setup=_setup_positions, fresh=True,
+               repeat=3 if _n >= 200 else None, positions=_n)
+    def _bench_manage(ctx):
+        import trader
+        trader.manage_open_positions(ctx["ex"])
+
+
+@_register("sync_positions_with_exchange", setup=_setup_positions, fresh=True,
+           positions=50, db_extra=5, exchange_extra=5)
+def _bench_sync(ctx):
+    import trader
+    trader.sync_positions_with_exchange(ctx["ex"])
+
+
+@_register("save_execution_open", setup=_setup_executions, existing=EXECUTIONS_EXISTING)
+def _bench_save_execution(ctx):
+    import database
+    ctx["seq"][0] += 1
+    i = ctx["seq"][0]
+    database.save_execution_open({
+        "exec_id": f"benchnew{i:08d}", "exchange": "bitget", "account_mode": "LIVE",
+        "symbol": "BTC/USDT:USDT", "side": "buy", "qty": 0.001, "leverage": 10,
+        "avg_entry": 60000.0, "sl": 58200.0, "tp1": 63600.0, "opened_at": int(time.time() * 1000),
+    })
+
+
+@_register("recompute_stats_from_executions", setup=_setup_executions, existing=EXECUTIONS_EXISTING)
+def _bench_recompute(ctx):
+    import database
+    for horizon in ("7d", "30d", "all"):
+        database.recompute_stats_from_executions(horizon)
+
+
+@_register("generate_trade_chart", setup=_setup_chart)
+def _bench_chart(ctx):
+    import charting
+    buf = charting.generate_trade_chart(ctx["symbol"], ctx["df"], ctx["signal"])
+    if buf is None:
+        raise RuntimeError("generate_trade_chart a retourné None")
+
+
+# ==============================================================================
+# RAPPORTS
+# ==============================================================================
+
+def _git_rev() -> Optional[str]:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5)
+        return out.stdout.strip() or None
+    except Exception:
+        return None
+
+
+def run_benchmarks(only: Optional[List[str]] = None, repeat: int = BENCH_REPEAT) -> Dict[str, Any]:
+    """Exécute les benches sélectionnés (préfixes de nom acceptés) et retourne le rapport."""
+    import database
+
+    database.setup_database()
+    database.set_setting("PAPER_TRADING_MODE", "false")
+    results: Dict[str, Any] = {}
+    for b in _BENCHES:
+        if only and not any(b.name == o or b.name.startswith(o) for o in only):
+            continue
+        print(f"⏱️ {b.name}...", flush=True)
+        try:
+            r = _run_one(b, repeat)
+            print(f"   médiane {r['median_ms']:.1f} ms | min {r['min_ms']:.1f} | p95 {r['p95_ms']:.1f} ({r['runs']} tours)")
+        except Exception as e:
+            r = {"error": f"{type(e).__name__}: {e}", "params": b.params}
+            print(f"   ❌ {r['error']}")
+        results[b.name] = r
+    return {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "git": _git_rev(), "python": platform.python_version(), "platform": platform.platform(),
+            "seed": _STATE["seed"], "symbols": _STATE["symbols"], "timeframe": _STATE["timeframe"],
+            "repeat": repeat,
+        },
+        "results": results,
+    }
+
+
+def compare_reports(baseline: Dict[str, Any], current: Dict[str, Any],
+                    threshold_pct: float = BENCH_THRESHOLD_PCT,
+                    min_delta_ms: float = BENCH_MIN_DELTA_MS) -> List[Dict[str, Any]]:
+    """
+    Compare les médianes bench par bench. Régression: hausse > threshold_pct %
+    ET > min_delta_ms en absolu (évite le bruit sur les benches très courts).
+    """
+    rows = []
+    base, cur = baseline.get("results", {}), current.get("results", {})
+    for name in sorted(set(base) | set(cur)):
+        b, c = base.get(name), cur.get(name)
+        row: Dict[str, Any] = {"name": name, "baseline_ms": None, "current_ms": None,
+                               "delta_pct": None, "status": "ok"}
+        if not b or "median_ms" not in b:
+            row["status"] = "new"
+        if not c or "median_ms" not in c:
+            row["status"] = "error" if c else "missing"
+        if b and "median_ms" in b:
+            row["baseline_ms"] = b["median_ms"]
+        if c and "median_ms" in c:
+            row["current_ms"] = c["median_ms"]
+        if row["baseline_ms"] is not None and row["current_ms"] is not None:
+            bm, cm = row["baseline_ms"], row["current_ms"]
+            row["delta_pct"] = round((cm - bm) / bm * 100.0, 1) if bm > 0 else 0.0
+            if row["delta_pct"] > threshold_pct and cm - bm > min_delta_ms:
+                row["status"] = "regression"
+            elif row["delta_pct"] < -threshold_pct and bm - cm > min_delta_ms:
+                row["status"] = "improved"
+        rows.append(row)
+    return rows
+
+
+def _load(path: str) -> Dict[str, Any]:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks des chemins chauds (exchange simulé)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_run = sub.add_parser("run", help="Exécuter les benchmarks et écrire un rapport JSON")
+    p_run.add_argument("--only", help="Noms (ou préfixes) séparés par des virgules")
+    p_run.add_argument("--repeat", type=int, default=BENCH_REPEAT)
+    p_run.add_argument("--symbols", type=int, default=BENCH_SYMBOLS)
+    p_run.add_argument("--timeframe", default=BENCH_TIMEFRAME)
+    p_run.add_argument("--seed", type=int, default=BENCH_SEED)
+    p_run.add_argument("--db-dir", help="Dossier de la base (défaut: dossier temporaire)")
+    p_run.add_argument("--out", help="Fichier JSON (défaut: <db-dir>/benchmarks/bench_<date>.json)")
+
+    p_cmp = sub.add_parser("compare", help="Comparer un rapport à une référence")
+    p_cmp.add_argument("baseline")
+    p_cmp.add_argument("current")
+    p_cmp.add_argument("--threshold", type=float, default=BENCH_THRESHOLD_PCT, help="Seuil de régression en %%")
+    p_cmp.add_argument("--min-delta-ms", type=float, default=BENCH_MIN_DELTA_MS)
+
+    sub.add_parser("list", help="Lister les benchmarks")
+    args = parser.parse_args(argv)
+
+    if args.command == "list":
+        for b in _BENCHES:
+            print(f"- {b.name} {json.dumps(b.params) if b.params else ''}")
+        return 0
+
+    if args.command == "compare":
+        rows = compare_reports(_load(args.baseline), _load(args.current), args.threshold, args.min_delta_ms)
+        icons = {"ok": "✅", "improved": "🚀", "regression": "❌", "new": "🆕", "missing": "➖", "error": "⚠️"}
+        for r in rows:
+            base_ms = f"{r['baseline_ms']:.1f} ms" if r["baseline_ms"] is not None else "-"
+            cur_ms = f"{r['current_ms']:.1f} ms" if r["current_ms"] is not None else "-"
+            delta = f"{r['delta_pct']:+.1f}%" if r["delta_pct"] is not None else ""
+            print(f"{icons[r['status']]} {r['name']:<42} {base_ms:>12} → {cur_ms:>12} {delta}")
+        bad = [r for r in rows if r["status"] in ("regression", "error")]
+        if bad:
+            print(f"❌ {len(bad)} régression(s) au-delà de {args.threshold}%")
+            return 1
+        print(f"✅ Aucune régression au-delà de {args.threshold}%")
+        return 0
+
+    # Avant tout import de database/main: base isolée, exchange simulé, pas de Telegram
+    db_dir = args.db_dir or tempfile.mkdtemp(prefix="darwin_bench_")
+    os.environ["EXCHANGE_BACKEND"] = "fake"
+    os.environ["DB_BASE_DIR"] = db_dir
+    os.environ["TELEGRAM_BOT_TOKEN"] = ""
+    os.environ["RATE_SCHEDULER_ENABLED"] = "false"
+    os.environ.setdefault("LOOP_DELAY", "0")
+    os.environ.setdefault("TIMEFRAME", args.timeframe)
+
+    import fake_exchange
+
+    # Horloge figée alignée sur une bougie: mêmes données d'un run à l'autre
+    tf_ms = fake_exchange.timeframe_ms(args.timeframe)
+    _STATE.update({"seed": args.seed, "symbols": args.symbols, "timeframe": args.timeframe,
+                   "start_ms": 1_700_000_000_000 - 1_700_000_000_000 % tf_ms})
+    only = [o.strip() for o in args.only.split(",") if o.strip()] if args.only else None
+    report = run_benchmarks(only=only, repeat=args.repeat)
+
+    out = args.out or os.path.join(db_dir, "benchmarks",
+                                   f"bench_{datetime.now(timezone.utc).strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, default=str)
+    print(f"💾 {out}")
+    return 0 if all("error" not in r for r in report["results"].values()) else 1
+
+
+if __name__ == "__main__":
+    # main.py importe `fake_exchange`; les benches passent par `benchmarks` (et non
+    # __main__) pour partager le même état de module.
+    import benchmarks
+    sys.exit(benchmarks.main())
@@ -1,9 +1,51 @@
 # Charting.py
 import io
+import os
+import time
+import threading
+import multiprocessing
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+import matplotlib
+matplotlib.use("Agg")  # rendu sans affichage, sûr hors thread principal / en sous-process
 import pandas as pd
 import mplfinance as mpf
 from typing import Dict, Any, Optional
 
+# ==============================================================================
+# STYLE (construit une seule fois par process)
+# ==============================================================================
+
+_STYLE = None
+
+
+def _get_style():
+    """Thème sombre mplfinance (couleurs de marché + style), mis en cache."""
+    global _STYLE
+    if _STYLE is None:
+        bg_fig   = '#121417'   # fond global
+        bg_ax    = '#0f1215'   # fond axe
+        grid_col = '#1f2937'
+
+        mc = mpf.make_marketcolors(
+            up='#22c55e',
+            down='#ef4444',
+            edge='inherit',
+            wick='inherit',
+            volume='in'
+        )
+        _STYLE = mpf.make_mpf_style(
+            base_mpf_style='nightclouds',
+            marketcolors=mc,
+            gridstyle='-',
+            gridcolor=grid_col,
+            facecolor=bg_ax,
+            figcolor=bg_fig,
+            edgecolor=bg_ax
+        )
+    return _STYLE
+
+
 def generate_trade_chart(symbol: str, df: pd.DataFrame, signal: Dict[str, Any]) -> Optional[io.BytesIO]:
     """Génère une image PNG (fond sombre) pour un trade, avec:
        - BB20 turquoise (lignes pleines) + MM20 turquoise pointillé
@@ -42,27 +84,7 @@ def generate_trade_chart(symbol: str, df: pd.DataFrame, signal: Dict[str, Any])
             return None
         df_plot.columns = ['Open', 'High', 'Low', 'Close', 'Volume']
 
-        # Thème sombre
-        bg_fig   = '#121417'   # fond global
-        bg_ax    = '#0f1215'   # fond axe
-        grid_col = '#1f2937'
-
-        mc = mpf.make_marketcolors(
-            up='#22c55e',
-            down='#ef4444',
-            edge='inherit',
-            wick='inherit',
-            volume='in'
-        )
-        style = mpf.make_mpf_style(
-            base_mpf_style='nightclouds',
-            marketcolors=mc,
-            gridstyle='-',
-            gridcolor=grid_col,
-            facecolor=bg_ax,
-            figcolor=bg_fig,
-            edgecolor=bg_ax
-        )
+        style = _get_style()
 
         # Couleurs BB
         col_turq = '#2dd4bf'   # BB20
@@ -298,3 +320,100 @@ def generate_trade_chart(symbol: str, df: pd.DataFrame, signal: Dict[str, Any])
     except Exception as e:
         print(f"Erreur de génération de graphique: {e}")
         return None
+
+
+# ==============================================================================
+# POOL DE RENDU (hors thread trading)
+# ==============================================================================
+
+CHART_RENDER_MODE = os.getenv("CHART_RENDER_MODE", "process").lower()   # process | thread
+CHART_RENDER_WORKERS = int(os.getenv("CHART_RENDER_WORKERS", "1"))
+
+_pool = None
+_pool_lock = threading.Lock()
+_render_times: deque = deque(maxlen=200)
+
+
+def _warm_worker() -> None:
+    """Initialisation d'un worker: style construit et polices chargées avant le 1er rendu."""
+    try:
+        import matplotlib.pyplot as plt
+        from matplotlib import font_manager
+        _get_style()
+        font_manager.findfont(matplotlib.rcParams.get("font.family", ["sans-serif"])[0])
+        fig = plt.figure(figsize=(1, 1))
+        fig.text(0.5, 0.5, "0.123 Entrée")
+        fig.canvas.draw()
+        plt.close(fig)
+    except Exception as e:
+        print(f"⚠️ Préchauffage rendu graphique: {e}")
+
+
+def _render_png(symbol: str, df: pd.DataFrame, signal: Dict[str, Any]):
+    """Exécuté dans le worker: retourne (png_bytes ou None, durée s). Résultat picklable."""
+    t0 = time.perf_counter()
+    buf = generate_trade_chart(symbol, df, signal)
+    return (buf.getvalue() if buf is not None else None), time.perf_counter() - t0
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                workers = max(1, CHART_RENDER_WORKERS)
+                if CHART_RENDER_MODE == "process":
+                    try:
+                        # spawn: pas de fork d'un process multi-thread (verrous hérités)
+                        _pool = ProcessPoolExecutor(max_workers=workers,
+                                                    mp_context=multiprocessing.get_context("spawn"),
+                                                    initializer=_warm_worker)
+                    except Exception as e:
+                        print(f"⚠️ Pool de rendu process indisponible ({e}), repli sur threads")
+                if _pool is None:
+                    _pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="chart-render",
+                                               initializer=_warm_worker)
+    return _pool
+
+
+def submit_trade_chart(symbol: str, df: pd.DataFrame, signal: Dict[str, Any]) -> "Future":
+    """
+    Rendu asynchrone de generate_trade_chart. Retourne un Future résolu en
+    io.BytesIO (ou None si le rendu a échoué) ; n'attend jamais le PNG.
+    """
+    out: Future = Future()
+    t_submit = time.perf_counter()
+
+    def _done(inner: "Future") -> None:
+        try:
+            png, render_s = inner.result()
+        except Exception as e:
+            print(f"Erreur de génération de graphique (pool): {e}")
+            png, render_s = None, None
+        if render_s is not None:
+            _render_times.append((render_s, time.perf_counter() - t_submit))
+        out.set_result(io.BytesIO(png) if png else None)
+
+    try:
+        _get_pool().submit(_render_png, symbol, df, signal).add_done_callback(_done)
+    except Exception as e:
+        print(f"Erreur soumission rendu graphique: {e}")
+        out.set_result(None)
+    return out
+
+
+def get_render_stats() -> Dict[str, Any]:
+    """Durées de rendu (worker) et de bout en bout (file + rendu + transfert), en secondes."""
+    samples = list(_render_times)
+    if not samples:
+        return {"count": 0}
+    render = sorted(r for r, _ in samples)
+    total = sorted(t for _, t in samples)
+    n = len(samples)
+    return {
+        "count": n,
+        "render_avg_s": sum(render) / n,
+        "render_p95_s": render[min(n - 1, int(0.95 * (n - 1)))],
+        "total_avg_s": sum(total) / n,
+        "total_p95_s": total[min(n - 1, int(0.95 * (n - 1)))],
+    }
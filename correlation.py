@@ -0,0 +1,195 @@
+# Fichier: correlation.py
+"""
+Matrice de corrélation glissante (EWMA) des log-rendements de l'univers,
+alimentée par les bougies déjà chargées par le scan.
+
+- record(symbol, df): intègre les bougies closes pas encore vues du symbole.
+  Pour chaque nouvelle bougie b de rendement r_i:
+      cov[i, j] ← λ·cov[i, j] + (1-λ)·r_i·r_j   pour les j ayant déjà r_j(b)
+      var[i]    ← λ·var[i]    + (1-λ)·r_i²
+  soit O(N) par symbole et par bougie (chaque paire est mise à jour une seule
+  fois par bougie, par le second des deux symboles scannés). Les rendements
+  récents sont gardés dans un anneau de CORR_RING_BARS bougies par symbole.
+- corr(a, b): corrélation courante, None tant que la paire a moins de
+  CORR_MIN_OBS bougies communes (poids EWMA).
+- exposure(new_symbol, new_side, positions): exposition corrélée signée d'un
+  nouveau trade = Σ ρ(new, pos) × sens(new) × sens(pos), sans lecture DB.
+
+Paramètres (env): CORR_EWMA_LAMBDA (0.97 ≈ demi-vie 23 bougies),
+CORR_MIN_OBS, CORR_RING_BARS.
+"""
+import os
+import math
+import threading
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+
+CORR_EWMA_LAMBDA = float(os.getenv("CORR_EWMA_LAMBDA", "0.97"))
+CORR_MIN_OBS = int(os.getenv("CORR_MIN_OBS", "30"))
+CORR_RING_BARS = int(os.getenv("CORR_RING_BARS", "256"))
+
+
+class CorrelationEngine:
+    def __init__(self, lam: float = CORR_EWMA_LAMBDA, min_obs: int = CORR_MIN_OBS,
+                 ring: int = CORR_RING_BARS, capacity: int = 64):
+        self.lam = float(lam)
+        self.min_weight = 1.0 - self.lam ** max(1, int(min_obs))
+        self.ring = max(2, int(ring))
+        self._lock = threading.Lock()
+        self._index: Dict[str, int] = {}
+        self._n = 0
+        self._alloc(capacity)
+
+    def _alloc(self, capacity: int) -> None:
+        old_n = self._n
+        cov = np.zeros((capacity, capacity))
+        weight = np.zeros((capacity, capacity))       # Σ (1-λ)λ^k des bougies communes
+        ring_ret = np.zeros((capacity, self.ring))
+        ring_bar = np.full((capacity, self.ring), -1, dtype=np.int64)
+        last_bar = np.full(capacity, -1, dtype=np.int64)
+        last_close = np.zeros(capacity)
+        if old_n:
+            cov[:old_n, :old_n] = self._cov[:old_n, :old_n]
+            weight[:old_n, :old_n] = self._weight[:old_n, :old_n]
+            ring_ret[:old_n] = self._ring_ret[:old_n]
+            ring_bar[:old_n] = self._ring_bar[:old_n]
+            last_bar[:old_n] = self._last_bar[:old_n]
+            last_close[:old_n] = self._last_close[:old_n]
+        self._cov, self._weight = cov, weight
+        self._ring_ret, self._ring_bar = ring_ret, ring_bar
+        self._last_bar, self._last_close = last_bar, last_close
+        self._capacity = capacity
+
+    def _slot(self, symbol: str) -> int:
+        i = self._index.get(symbol)
+        if i is None:
+            if self._n >= self._capacity:
+                self._alloc(self._capacity * 2)
+            i = self._index[symbol] = self._n
+            self._n += 1
+        return i
+
+    # ---------------- mise à jour ----------------
+    def _update(self, i: int, bar: int, r: float) -> None:
+        """Une bougie de rendement r pour le symbole i: O(N)."""
+        n, lam = self._n, self.lam
+        k = bar % self.ring
+        partners = np.flatnonzero(self._ring_bar[:n, k] == bar)
+        partners = partners[partners != i]
+        if partners.size:
+            rj = self._ring_ret[partners, k]
+            row = lam * self._cov[i, partners] + (1.0 - lam) * r * rj
+            w = lam * self._weight[i, partners] + (1.0 - lam)
+            self._cov[i, partners] = row
+            self._cov[partners, i] = row
+            self._weight[i, partners] = w
+            self._weight[partners, i] = w
+        self._cov[i, i] = lam * self._cov[i, i] + (1.0 - lam) * r * r
+        self._weight[i, i] = lam * self._weight[i, i] + (1.0 - lam)
+        self._ring_ret[i, k] = r
+        self._ring_bar[i, k] = bar
+
+    def update_closes(self, symbol: str, bars: List[int], closes: List[float]) -> int:
+        """Intègre les bougies closes (index de bougie croissants) ; retourne le nombre ajouté."""
+        added = 0
+        with self._lock:
+            i = self._slot(symbol)
+            last_bar = int(self._last_bar[i])
+            prev = float(self._last_close[i])
+            # Premier passage: on ne remonte pas au-delà de l'anneau
+            start = max(0, len(bars) - self.ring - 1) if last_bar < 0 else 0
+            for b, c in zip(bars[start:], closes[start:]):
+                if b <= last_bar or not (c > 0):
+                    continue
+                if prev > 0 and b == last_bar + 1:
+                    self._update(i, b, math.log(c / prev))
+                    added += 1
+                last_bar, prev = b, c
+            self._last_bar[i] = last_bar
+            self._last_close[i] = prev
+        return added
+
+    # ---------------- lecture ----------------
+    def corr(self, a: str, b: str) -> Optional[float]:
+        i, j = self._index.get(a), self._index.get(b)
+        if i is None or j is None:
+            return None
+        if i == j:
+            return 1.0
+        if self._weight[i, j] < self.min_weight:
+            return None
+        vi, vj = self._cov[i, i], self._cov[j, j]
+        if vi <= 0 or vj <= 0:
+            return None
+        return float(max(-1.0, min(1.0, self._cov[i, j] / math.sqrt(vi * vj))))
+
+    def exposure(self, new_symbol: str, new_side: str,
+                 positions: List[Dict[str, Any]]) -> Tuple[float, int, List[Tuple[str, float]]]:
+        """
+        (exposition corrélée signée, nb de paires sans corrélation fiable, détail
+        [(symbole, contribution)]). sens: buy=+1, sell=-1.
+        """
+        s_new = 1.0 if new_side == 'buy' else -1.0
+        total, unknown, detail = 0.0, 0, []
+        for pos in positions:
+            sym = pos.get('symbol', '')
+            if sym == new_symbol:
+                continue
+            rho = self.corr(new_symbol, sym)
+            if rho is None:
+                unknown += 1
+                continue
+            contrib = rho * s_new * (1.0 if pos.get('side') == 'buy' else -1.0)
+            total += contrib
+            detail.append((sym, contrib))
+        return total, unknown, detail
+
+    def matrix(self, symbols: Optional[List[str]] = None) -> Tuple[List[str], "np.ndarray"]:
+        """Matrice de corrélation (NaN si paire non fiable) pour diagnostic."""
+        with self._lock:
+            syms = [s for s in (symbols or list(self._index)) if s in self._index]
+            idx = np.array([self._index[s] for s in syms], dtype=np.int64)
+            cov = self._cov[np.ix_(idx, idx)]
+            w = self._weight[np.ix_(idx, idx)]
+        d = np.sqrt(np.clip(np.diag(cov), 1e-300, None))
+        out = cov / np.outer(d, d)
+        out[w < self.min_weight] = np.nan
+        np.fill_diagonal(out, 1.0)
+        return syms, np.clip(out, -1.0, 1.0)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            n = self._n
+            reliable = int((self._weight[:n, :n] >= self.min_weight).sum() - n) // 2 if n else 0
+        return {"symbols": n, "reliable_pairs": max(0, reliable), "pairs": n * (n - 1) // 2,
+                "lambda": self.lam, "capacity": self._capacity}
+
+
+_ENGINE = CorrelationEngine()
+
+
+def get_engine() -> CorrelationEngine:
+    return _ENGINE
+
+
+def record(symbol: str, df, tf_ms: int) -> int:
+    """Alimente le moteur avec les bougies closes d'un DataFrame du scan (index UTC)."""
+    try:
+        closed = df.iloc[:-1]  # dernière ligne = bougie en cours
+        bars = [int(ts.value // 10**6) // tf_ms for ts in closed.index]
+        return _ENGINE.update_closes(symbol, bars, closed['close'].astype(float).tolist())
+    except Exception:
+        return 0
+
+
+def corr(a: str, b: str) -> Optional[float]:
+    return _ENGINE.corr(a, b)
+
+
+def exposure(new_symbol: str, new_side: str, positions: List[Dict[str, Any]]):
+    return _ENGINE.exposure(new_symbol, new_side, positions)
+
+
+def get_stats() -> Dict[str, Any]:
+    return _ENGINE.get_stats()
@@ -15,14 +15,50 @@ except Exception:
     pass
 
 
+# -------- Comptage des écritures (bancs de charge) --------
+_WRITE_TRACKING = os.getenv("DB_TRACK_WRITES", "false").lower() in ("1", "true", "yes")
+_WRITE_VERBS = ("INSERT", "UPDATE", "DELETE", "REPLACE")
+_write_count = 0
+
+
+def _trace_write(sql: str) -> None:
+    global _write_count
+    if sql.lstrip()[:7].upper().startswith(_WRITE_VERBS):
+        _write_count += 1
+
+
+def enable_write_tracking(enabled: bool = True) -> None:
+    """Compte les requêtes INSERT/UPDATE/DELETE des connexions ouvertes ensuite."""
+    global _WRITE_TRACKING
+    _WRITE_TRACKING = bool(enabled)
+
+
+def get_write_count() -> int:
+    return _write_count
+
+
+# -------- Cache des positions ouvertes (invalidé à chaque écriture de trade) --------
+_open_positions_cache: Optional[List[Dict[str, Any]]] = None
+_trades_version = 0
+
+
+def _invalidate_open_positions() -> None:
+    global _open_positions_cache, _trades_version
+    _trades_version += 1
+    _open_positions_cache = None
+
+
 # -------- Connexion + pragmas sécu/perf --------
-def get_db_connection() -> sqlite3.Connection:
+def get_db_connection(db_path: Optional[str] = None) -> sqlite3.Connection:
     """
     Connexion unique vers la base SQLite, stockée sur disque persistant
-    (par défaut /var/data/darwin_bot.db sur Render).
+    (par défaut /var/data/darwin_bot.db sur Render). `db_path` permet de viser
+    une autre base au même schéma (ex: résultats de backtest).
     """
-    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+    conn = sqlite3.connect(db_path or DB_PATH, check_same_thread=False)
     conn.row_factory = sqlite3.Row
+    if _WRITE_TRACKING:
+        conn.set_trace_callback(_trace_write)
     with conn:  # appliquer des pragmas sûrs
         conn.execute("PRAGMA journal_mode=WAL;")
         conn.execute("PRAGMA synchronous=NORMAL;")
@@ -31,9 +67,9 @@ def get_db_connection() -> sqlite3.Connection:
 
 
 # -------- Création / Migrations idempotentes --------
-def setup_database():
+def setup_database(db_path: Optional[str] = None):
     print("Initialisation de la base de données SQLite...")
-    with get_db_connection() as conn:
+    with get_db_connection(db_path) as conn:
         cur = conn.cursor()
         cur.executescript("""
             CREATE TABLE IF NOT EXISTS trades (
@@ -130,6 +166,7 @@ def update_trade_core(trade_id: int,
         cur = conn.cursor()
         cur.execute(f"UPDATE trades SET {', '.join(sets)} WHERE id = ?", params)
         conn.commit()
+        _invalidate_open_positions()
 
 
 def _store():
@@ -272,6 +309,7 @@ def create_trade(
             entry_atr, entry_rsi
         ))
         conn.commit()
+        _invalidate_open_positions()
         return cur.lastrowid
 
 
@@ -375,6 +413,7 @@ def update_trade_to_breakeven(trade_id: int, remaining_quantity: float, new_sl:
              WHERE id = ?
         """, (remaining_quantity, new_sl, trade_id))
         conn.commit()
+        _invalidate_open_positions()
     print(f"DB: Trade #{trade_id} mis à breakeven. Quantité restante: {remaining_quantity}")
 
 
@@ -433,6 +472,7 @@ def close_trade(trade_id: int, status: str, pnl: float):
              WHERE id = ?
         """, (str(status), float(pnl_val), float(pnl_pct), int(close_ts), int(trade_id)))
         conn.commit()
+        _invalidate_open_positions()
 
     print(
         f"DB: Trade #{trade_id} fermé avec le statut '{status}'. "
@@ -446,6 +486,7 @@ def update_trade_tp(trade_id: int, new_tp_price: float):
         cur = conn.cursor()
         cur.execute("UPDATE trades SET tp_price = ? WHERE id = ?", (new_tp_price, trade_id))
         conn.commit()
+        _invalidate_open_positions()
     print(f"DB: TP pour le trade #{trade_id} mis à jour à {new_tp_price}.")
 
 
@@ -455,6 +496,7 @@ def update_trade_sl(trade_id: int, new_sl_price: float):
         cur = conn.cursor()
         cur.execute("UPDATE trades SET sl_price = ? WHERE id = ?", (new_sl_price, trade_id))
         conn.commit()
+        _invalidate_open_positions()
     print(f"DB: SL pour le trade #{trade_id} mis à jour à {new_sl_price}.")
 
 
@@ -494,6 +536,7 @@ def update_trade_pyramid(
             int(trade_id)
         ))
         conn.commit()
+        _invalidate_open_positions()
     
     print(f"DB: Trade #{trade_id} pyramiding - qty={new_quantity:.6f}, avg_entry={new_avg_entry:.2f}, count={pyramid_count}")
 
@@ -514,6 +557,7 @@ def update_trade_quantity(trade_id: int, new_quantity: float) -> None:
              WHERE id = ?
         """, (float(new_quantity), int(trade_id)))
         conn.commit()
+        _invalidate_open_positions()
     
     print(f"DB: Trade #{trade_id} quantity updated to {new_quantity:.6f}")
 
@@ -552,6 +596,7 @@ def update_trade_meta(trade_id: int, meta_dict: dict) -> None:
                  WHERE id = ?
             """, (meta_json, int(trade_id)))
             conn.commit()
+            _invalidate_open_positions()
         
         print(f"DB: Trade #{trade_id} meta updated")
     
@@ -573,6 +618,21 @@ def get_open_positions() -> List[Dict[str, Any]]:
         return [dict(r) for r in cur.fetchall()]
 
 
+def get_open_positions_cached() -> List[Dict[str, Any]]:
+    """
+    get_open_positions() servi depuis la mémoire tant qu'aucun trade n'a été
+    créé / modifié / fermé par ce process (gates de risque appelées souvent).
+    """
+    global _open_positions_cache
+    cached = _open_positions_cache
+    if cached is None:
+        version = _trades_version
+        cached = get_open_positions()
+        if version == _trades_version:
+            _open_positions_cache = cached
+    return [dict(p) for p in cached]
+
+
 def get_trade_by_id(trade_id: int) -> Optional[Dict[str, Any]]:
     with get_db_connection() as conn:
         cur = conn.cursor()
@@ -605,11 +665,47 @@ def get_closed_trades_since(timestamp: int) -> List[Dict[str, Any]]:
 
 
 # -------- Settings (key/value) --------
+# Surcouche mémoire des paramètres (backtest / optimisation) : quand elle est
+# active, get_setting ne lit plus la table settings (1 connexion SQLite par appel).
+_SETTINGS_OVERLAY: Optional[Dict[str, Any]] = None
+
+
+def settings_snapshot() -> Dict[str, Any]:
+    """Copie de la table settings (clé -> valeur brute), {} si la base est indisponible."""
+    values: Dict[str, Any] = {}
+    try:
+        with get_db_connection() as conn:
+            for row in conn.execute("SELECT key, value FROM settings"):
+                values[row["key"]] = row["value"]
+    except Exception:
+        pass
+    return values
+
+
+def set_settings_overlay(overrides: Optional[Dict[str, Any]], snapshot: bool = True) -> None:
+    """
+    Active une surcouche de paramètres pour le process courant.
+    snapshot=True: la table settings est copiée une fois en mémoire, puis `overrides`
+    s'applique par-dessus. None désactive la surcouche.
+    """
+    global _SETTINGS_OVERLAY
+    if overrides is None:
+        _SETTINGS_OVERLAY = None
+        return
+    values: Dict[str, Any] = settings_snapshot() if snapshot else {}
+    values.update({k: (str(v) if v is not None else None) for k, v in overrides.items()})
+    _SETTINGS_OVERLAY = values
+
+
 def get_setting(key: str, default: Any = None) -> Any:
     """
     Lecture robuste d'un paramètre. Retourne `default` si la clé est absente
     ou en cas d'erreur DB (table/connexion/etc.).
     """
+    overlay = _SETTINGS_OVERLAY
+    if overlay is not None:
+        val = overlay.get(key)
+        return default if (val is None or val == "") else val
     try:
         with get_db_connection() as conn:
             cur = conn.cursor()
@@ -0,0 +1,1180 @@
+# Fichier: fake_exchange.py
+"""
+Exchange local déterministe (remplaçant de ccxt.bitget / ccxt.pro.bitget) pour
+les tests de charge, de latence et de non-régression, sans Bitget.
+
+- Méthodes CCXT utilisées par le bot: load_markets, market, fetch_ohlcv,
+  fetch_ticker(s), fetch_positions, fetch_open_orders, fetch_balance,
+  create_order(s), cancel_order(s), set_leverage/margin_mode/position_mode,
+  amount_to_precision/price_to_precision ; côté ccxt.pro: watch_ticker,
+  watch_ohlcv, watch_positions, watch_orders.
+- Données de marché: synthétiques (marche aléatoire graine + symbole + bougie,
+  donc identiques quel que soit l'ordre des appels) ou rejouées depuis
+  l'archive OHLCV du backtest (OHLCV_ARCHIVE_DIR).
+- Horloge murale ou virtuelle (figée, avancée explicitement par le banc).
+- Fautes configurables: latence (moyenne + gigue), taux d'erreurs réseau,
+  limites de débit Bitget (rate_limiter.BITGET_BUCKETS) → RateLimitExceeded,
+  coupures WS 1006. Tirages reproductibles par (graine, méthode, n° d'appel).
+- Compte simulé: mode one-way, marge croisée, frais taker, glissement,
+  ordres trigger (SL/TP) déclenchés sur le dernier prix.
+
+Activation dans le bot: EXCHANGE_BACKEND=fake (voir main.create_exchange).
+Banc de charge:
+  python fake_exchange.py run --symbols 200 --cycles 5 --latency-ms 40 --error-rate 0.01
+"""
+import os
+import abc
+import sys
+import json
+import math
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+import threading
+from array import array
+from collections import deque
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional, Tuple
+
+import ccxt
+
+import rate_limiter
+
+EXCHANGE_BACKEND = os.getenv("EXCHANGE_BACKEND", "bitget").strip().lower()
+
+FAKE_SEED = int(os.getenv("FAKE_EXCHANGE_SEED", "42"))
+FAKE_SYMBOLS = int(os.getenv("FAKE_SYMBOLS", "50"))
+FAKE_TIMEFRAME = os.getenv("FAKE_TIMEFRAME", os.getenv("TIMEFRAME", "1h"))
+FAKE_DATA = os.getenv("FAKE_DATA", "synthetic").lower()          # synthetic | archive
+FAKE_CLOCK = os.getenv("FAKE_CLOCK", "wall").lower()             # wall | virtual
+FAKE_START = os.getenv("FAKE_START", "")                         # ms epoch ou ISO (horloge virtuelle)
+FAKE_BALANCE = float(os.getenv("FAKE_BALANCE", "1000"))
+FAKE_LATENCY_MS = float(os.getenv("FAKE_LATENCY_MS", "0"))
+FAKE_LATENCY_JITTER_MS = float(os.getenv("FAKE_LATENCY_JITTER_MS", "0"))
+FAKE_ERROR_RATE = float(os.getenv("FAKE_ERROR_RATE", "0"))
+FAKE_RATE_LIMITS = os.getenv("FAKE_RATE_LIMITS", "true").lower() in ("1", "true", "yes")
+FAKE_WS_DISCONNECT_RATE = float(os.getenv("FAKE_WS_DISCONNECT_RATE", "0"))
+FAKE_FEE_PCT = float(os.getenv("FAKE_FEE_PCT", "0.06"))
+FAKE_SLIPPAGE_PCT = float(os.getenv("FAKE_SLIPPAGE_PCT", "0.02"))
+# ccxt: sur un swap, `amount` d'un market BUY est une quantité. true = interprété comme un coût USDT.
+FAKE_MARKET_BUY_IS_COST = os.getenv("FAKE_MARKET_BUY_IS_COST", "false").lower() in ("1", "true", "yes")
+
+_INJECTED_ERRORS = (ccxt.RequestTimeout, ccxt.NetworkError, ccxt.ExchangeNotAvailable)
+
+_MAJORS = [
+    ("BTC", 60000.0), ("ETH", 3000.0), ("SOL", 150.0), ("BNB", 550.0), ("XRP", 0.55),
+    ("ADA", 0.45), ("DOGE", 0.12), ("LINK", 15.0), ("AVAX", 30.0), ("DOT", 6.5),
+    ("LTC", 80.0), ("BCH", 400.0), ("NEAR", 5.0), ("APT", 8.0), ("ARB", 0.9),
+    ("OP", 1.8), ("SUI", 1.2), ("TON", 5.5), ("ETC", 25.0), ("ATOM", 7.0),
+]
+
+
+def is_enabled() -> bool:
+    return os.getenv("EXCHANGE_BACKEND", EXCHANGE_BACKEND).strip().lower() == "fake"
+
+
+def timeframe_ms(timeframe: str) -> int:
+    units = {"m": 60, "h": 3600, "d": 86400, "w": 604800}
+    try:
+        return int(timeframe[:-1]) * units[timeframe[-1]] * 1000
+    except Exception:
+        raise ccxt.BadRequest(f"timeframe non supporté: {timeframe}")
+
+
+def _iso(ms: int) -> str:
+    return datetime.fromtimestamp(ms / 1000.0, tz=timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z"
+
+
+def _parse_start(value) -> Optional[int]:
+    if value in (None, ""):
+        return None
+    try:
+        return int(float(value))
+    except Exception:
+        pass
+    dt = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return int(dt.timestamp() * 1000)
+
+
+def _decimals(step: float) -> int:
+    return max(0, int(round(-math.log10(step)))) if step < 1 else 0
+
+
+# ==============================================================================
+# HORLOGE
+# ==============================================================================
+
+class SimClock:
+    """'wall' = temps réel ; 'virtual' = figé sur start_ms, avancé par advance()."""
+
+    def __init__(self, mode: str = "wall", start_ms: Optional[int] = None):
+        self.mode = mode
+        self._t = int(start_ms if start_ms is not None else time.time() * 1000)
+        self._lock = threading.Lock()
+
+    def now_ms(self) -> int:
+        if self.mode != "virtual":
+            return int(time.time() * 1000)
+        with self._lock:
+            return self._t
+
+    def advance(self, ms: int) -> int:
+        with self._lock:
+            self._t += int(ms)
+            return self._t
+
+
+# ==============================================================================
+# DONNÉES DE MARCHÉ
+# ==============================================================================
+
+class _MarketData(abc.ABC):
+    """Bougies indexées par n° absolu (ts // timeframe) ; la bougie en cours suit son chemin intrabar."""
+
+    def __init__(self, timeframe: str):
+        self.timeframe = timeframe
+        self.tf_ms = timeframe_ms(timeframe)
+        self.symbols: List[str] = []
+        self.prices: Dict[str, float] = {}       # prix de référence (précisions du marché)
+
+    @abc.abstractmethod
+    def bar(self, symbol: str, i: int) -> Optional[Tuple[float, float, float, float, float]]:
+        """(open, high, low, close, volume) de la bougie i, None hors données."""
+
+    @abc.abstractmethod
+    def path(self, symbol: str, i: int) -> Optional[List[float]]:
+        """Chemin intrabar (prix successifs) de la bougie i, None hors données."""
+
+    def forming(self, symbol: str, now_ms: int) -> Optional[Tuple[int, float, float, float, float, float]]:
+        i, rem = divmod(now_ms, self.tf_ms)
+        full = self.bar(symbol, i)
+        pts = self.path(symbol, i)
+        if full is None or not pts:
+            return None
+        k = 1 + int(math.ceil((rem / self.tf_ms) * (len(pts) - 1)))
+        seen = pts[:max(1, k)]
+        frac = (len(seen) - 1) / max(1, len(pts) - 1)
+        return (i * self.tf_ms, seen[0], max(seen), min(seen), seen[-1], full[4] * frac)
+
+    def last_price(self, symbol: str, now_ms: int) -> Optional[float]:
+        f = self.forming(symbol, now_ms)
+        if f is not None:
+            return f[4]
+        # Après la fin des données (archive): dernière clôture connue
+        b = self.bar(symbol, now_ms // self.tf_ms - 1)
+        return b[3] if b else None
+
+    def ohlcv(self, symbol: str, timeframe: str, now_ms: int, since: Optional[int] = None,
+              limit: Optional[int] = None) -> List[List[float]]:
+        tf = timeframe_ms(timeframe)
+        if tf % self.tf_ms:
+            raise ccxt.NotSupported(f"timeframe {timeframe} plus fin que les données ({self.timeframe})")
+        k = tf // self.tf_ms
+        limit = int(limit or 100)
+        cur = now_ms // tf
+        start = -(-int(since) // tf) if since is not None else cur - limit + 1
+        stop = min(cur, start + limit - 1)
+        out: List[List[float]] = []
+        for j in range(start, stop + 1):
+            row = self._aggregate(symbol, j, k, now_ms)
+            if row is not None:
+                out.append(row)
+        return out
+
+    def _aggregate(self, symbol: str, j: int, k: int, now_ms: int) -> Optional[List[float]]:
+        cur = now_ms // self.tf_ms
+        o = h = l = c = None
+        v = 0.0
+        for i in range(j * k, j * k + k):
+            if i > cur:
+                break
+            if i == cur:
+                f = self.forming(symbol, now_ms)
+                b = f[1:] if f else None
+            else:
+                b = self.bar(symbol, i)
+            if b is None:
+                continue
+            if o is None:
+                o, h, l = b[0], b[1], b[2]
+            h, l, c = max(h, b[1]), min(l, b[2]), b[3]
+            v += b[4]
+        if o is None:
+            return None
+        return [j * k * self.tf_ms, o, h, l, c, v]
+
+    def day_stats(self, symbol: str, now_ms: int) -> Dict[str, float]:
+        n = max(1, 86_400_000 // self.tf_ms)
+        cur = now_ms // self.tf_ms
+        f = self.forming(symbol, now_ms)
+        bars = [self.bar(symbol, i) for i in range(cur - n, cur)]
+        bars = [b for b in bars if b] + ([f[1:]] if f else [])
+        if not bars:
+            return {}
+        base_vol = sum(b[4] for b in bars)
+        last = bars[-1][3]
+        return {
+            "open": bars[0][0], "high": max(b[1] for b in bars), "low": min(b[2] for b in bars),
+            "close": last, "baseVolume": base_vol, "quoteVolume": base_vol * last,
+        }
+
+
+class SyntheticMarket(_MarketData):
+    """
+    Marche aléatoire log-normale par symbole, volatilité propre + cycle lent de régime
+    et sauts rares. Chaque bougie ne dépend que de (graine, symbole, n°) et du prix à sa
+    frontière: on l'étend paresseusement vers le futur ET vers le passé depuis l'ancre.
+    """
+
+    SUBSTEPS = 12
+
+    def __init__(self, n_symbols: int, timeframe: str, seed: int, anchor_ms: int):
+        super().__init__(timeframe)
+        self.seed = seed
+        self.anchor = anchor_ms // self.tf_ms
+        self._lock = threading.RLock()
+        self._fwd: Dict[str, List[array]] = {}   # bougies anchor, anchor+1, ...
+        self._bwd: Dict[str, List[array]] = {}   # bougies anchor-1, anchor-2, ...
+        self._params: Dict[str, Tuple[float, float, float]] = {}
+
+        scale = math.sqrt(self.tf_ms / 3_600_000)
+        for n in range(max(1, n_symbols)):
+            if n < len(_MAJORS):
+                base, px = _MAJORS[n]
+            else:
+                base = f"SYN{n:04d}"
+                px = 10 ** random.Random(f"{seed}:{base}:px").uniform(-3, 2)
+            sym = f"{base}/USDT:USDT"
+            rng = random.Random(f"{seed}:{sym}:params")
+            vol = 0.008 * scale * rng.uniform(0.5, 2.0)       # ~0.8 %/h, dispersion ×4
+            self._params[sym] = (vol, rng.uniform(0, 2 * math.pi), 10 ** rng.uniform(4.5, 7.5) / px)
+            self.symbols.append(sym)
+            self.prices[sym] = px
+
+    def _sigma(self, symbol: str, i: int) -> float:
+        vol, phase, _ = self._params[symbol]
+        return vol * (1.0 + 0.5 * math.sin(2 * math.pi * i / 500.0 + phase))
+
+    def _steps(self, symbol: str, i: int) -> Tuple[List[float], float]:
+        rng = random.Random(f"{self.seed}:{symbol}:{i}")
+        sigma = self._sigma(symbol, i)
+        step = sigma / math.sqrt(self.SUBSTEPS)
+        rets = []
+        for _ in range(self.SUBSTEPS):
+            r = rng.gauss(0.0, step)
+            if rng.random() < 0.002:
+                r += (1 if rng.random() < 0.5 else -1) * 3.0 * sigma
+            rets.append(r)
+        volume = self._params[symbol][2] * math.exp(rng.gauss(0.0, 0.5)) * (sigma / self._params[symbol][0])
+        return rets, volume
+
+    def _forward_path(self, symbol: str, i: int, open_px: float) -> Tuple[List[float], float]:
+        rets, volume = self._steps(symbol, i)
+        pts = [open_px]
+        for r in rets:
+            pts.append(pts[-1] * math.exp(r))
+        return pts, volume
+
+    def _series(self, symbol: str, i: int) -> Tuple[Optional[List[array]], int]:
+        if symbol not in self._params:
+            return None, 0
+        with self._lock:
+            if symbol not in self._fwd:
+                self._fwd[symbol] = [array("d") for _ in range(5)]
+                self._bwd[symbol] = [array("d") for _ in range(5)]
+            if i >= self.anchor:
+                cols, k = self._fwd[symbol], i - self.anchor
+                while len(cols[0]) <= k:
+                    n = len(cols[0])
+                    open_px = cols[3][n - 1] if n else self.prices[symbol]
+                    pts, vol = self._forward_path(symbol, self.anchor + n, open_px)
+                    for col, val in zip(cols, (pts[0], max(pts), min(pts), pts[-1], vol)):
+                        col.append(val)
+            else:
+                cols, k = self._bwd[symbol], self.anchor - 1 - i
+                while len(cols[0]) <= k:
+                    n = len(cols[0])
+                    close_px = cols[0][n - 1] if n else self.prices[symbol]
+                    rets, vol = self._steps(symbol, self.anchor - 1 - n)
+                    pts = [close_px]
+                    for r in reversed(rets):
+                        pts.append(pts[-1] * math.exp(-r))
+                    for col, val in zip(cols, (pts[-1], max(pts), min(pts), pts[0], vol)):
+                        col.append(val)
+            return cols, k
+
+    def bar(self, symbol, i):
+        cols, k = self._series(symbol, i)
+        if cols is None:
+            return None
+        return cols[0][k], cols[1][k], cols[2][k], cols[3][k], cols[4][k]
+
+    def path(self, symbol, i):
+        b = self.bar(symbol, i)
+        return self._forward_path(symbol, i, b[0])[0] if b else None
+
+
+class ArchiveMarket(_MarketData):
+    """Rejoue l'archive OHLCV du backtest ; la bougie en cours suit O→H→L→C (ou O→L→H→C)."""
+
+    def __init__(self, symbols: Optional[List[str]], timeframe: str, archive_dir: Optional[str] = None):
+        super().__init__(timeframe)
+        import backtest
+
+        self._data: Dict[str, Tuple[int, List[array]]] = {}
+        for sym in symbols or backtest.list_archived_symbols(timeframe, archive_dir):
+            raw = backtest._read_archive(sym, timeframe, archive_dir)
+            if raw is None or raw.empty:
+                continue
+            first = int(raw["timestamp"].iloc[0]) // self.tf_ms
+            cols = [array("d") for _ in range(5)]
+            prev_close = None
+            for ts, o, h, l, c, v in raw[["timestamp", "open", "high", "low", "close", "volume"]].itertuples(index=False):
+                idx = int(ts) // self.tf_ms - first
+                while len(cols[0]) < idx:        # trous: bougies plates au dernier prix
+                    for col, val in zip(cols, (prev_close, prev_close, prev_close, prev_close, 0.0)):
+                        col.append(val)
+                if len(cols[0]) > idx:
+                    continue
+                for col, val in zip(cols, (o, h, l, c, v)):
+                    col.append(float(val))
+                prev_close = float(c)
+            self._data[sym] = (first, cols)
+            self.symbols.append(sym)
+            self.prices[sym] = cols[3][-1]
+
+    def span_ms(self) -> Tuple[int, int]:
+        starts = [first for first, _ in self._data.values()]
+        ends = [first + len(cols[0]) for first, cols in self._data.values()]
+        return min(starts) * self.tf_ms, max(ends) * self.tf_ms
+
+    def bar(self, symbol, i):
+        item = self._data.get(symbol)
+        if item is None:
+            return None
+        first, cols = item
+        k = i - first
+        if k < 0 or k >= len(cols[0]):
+            return None
+        return cols[0][k], cols[1][k], cols[2][k], cols[3][k], cols[4][k]
+
+    def path(self, symbol, i):
+        b = self.bar(symbol, i)
+        if b is None:
+            return None
+        o, h, l, c, _ = b
+        return [o, h, l, c] if c < o else [o, l, h, c]
+
+
+# ==============================================================================
+# PLACE DE MARCHÉ SIMULÉE
+# ==============================================================================
+
+class FakeVenue:
+    """État partagé entre le client REST et le client WS (marchés, compte, fautes)."""
+
+    def __init__(self, market: _MarketData, clock: SimClock, balance: float = FAKE_BALANCE,
+                 seed: int = FAKE_SEED, latency_ms: float = FAKE_LATENCY_MS,
+                 jitter_ms: float = FAKE_LATENCY_JITTER_MS, error_rate: float = FAKE_ERROR_RATE,
+                 rate_limits: bool = FAKE_RATE_LIMITS, ws_disconnect_rate: float = FAKE_WS_DISCONNECT_RATE,
+                 fee_pct: float = FAKE_FEE_PCT, slippage_pct: float = FAKE_SLIPPAGE_PCT,
+                 market_buy_is_cost: bool = FAKE_MARKET_BUY_IS_COST):
+        self.market = market
+        self.clock = clock
+        self.seed = seed
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.rate_limits = rate_limits
+        self.ws_disconnect_rate = ws_disconnect_rate
+        self.fee_rate = fee_pct / 100.0
+        self.slippage = slippage_pct / 100.0
+        self.market_buy_is_cost = market_buy_is_cost
+
+        self.lock = threading.RLock()
+        self.cash = float(balance)
+        self.positions: Dict[str, Dict[str, Any]] = {}
+        self.orders: Dict[str, Dict[str, Any]] = {}       # ordres ouverts
+        self.leverage: Dict[str, int] = {}
+        self._order_seq = 0
+        self._event_seq = 0
+        self.order_events: deque = deque(maxlen=10000)    # (seq, ordre)
+        self.position_events: deque = deque(maxlen=10000)  # (seq, position)
+
+        self._calls: Dict[str, int] = {}
+        self._buckets: Dict[str, List[float]] = {}
+        self.stats: Dict[str, int] = {"calls": 0, "rest_calls": 0, "injected_errors": 0, "rate_limited": 0,
+                                      "orders": 0, "fills": 0, "triggers": 0, "ws_disconnects": 0}
+        self.markets = self._build_markets()
+
+    # ---------------- marchés ----------------
+    def _build_markets(self) -> Dict[str, Dict[str, Any]]:
+        out = {}
+        for sym in self.market.symbols:
+            base = sym.split("/")[0]
+            px = self.market.prices.get(sym) or 1.0
+            tick = 10 ** (math.floor(math.log10(px)) - 4)
+            step = 10 ** min(0, math.floor(math.log10(5.0 / px)))
+            out[sym] = {
+                "id": f"{base}USDT", "symbol": sym, "base": base, "quote": "USDT", "settle": "USDT",
+                "baseId": base, "quoteId": "USDT", "settleId": "USDT",
+                "type": "swap", "spot": False, "margin": False, "swap": True, "future": False,
+                "option": False, "contract": True, "linear": True, "inverse": False,
+                "contractSize": 1.0, "active": True, "taker": self.fee_rate, "maker": self.fee_rate / 3,
+                "precision": {"amount": step, "price": tick},
+                "limits": {"amount": {"min": step, "max": None}, "price": {"min": tick, "max": None},
+                           "cost": {"min": 5.0, "max": None}, "leverage": {"min": 1, "max": 125}},
+                "info": {"symbol": f"{base}USDT", "productType": "USDT-FUTURES"},
+            }
+        return out
+
+    def market_of(self, symbol: str) -> Dict[str, Any]:
+        m = self.markets.get(symbol)
+        if m is None:
+            raise ccxt.BadSymbol(f"fake does not have market symbol {symbol}")
+        return m
+
+    def price(self, symbol: str) -> float:
+        px = self.market.last_price(symbol, self.clock.now_ms())
+        if px is None:
+            raise ccxt.BadSymbol(f"fake: pas de données pour {symbol}")
+        return px
+
+    # ---------------- fautes ----------------
+    def _rng(self, method: str) -> random.Random:
+        with self.lock:
+            n = self._calls.get(method, 0) + 1
+            self._calls[method] = n
+            self.stats["calls"] += 1
+        return random.Random(f"{self.seed}:{method}:{n}")
+
+    def _take_token(self, method: str) -> bool:
+        bucket = (rate_limiter.route_for(method) or rate_limiter.DEFAULT_ROUTE)[0]
+        rate, burst = rate_limiter.BITGET_BUCKETS.get(bucket, rate_limiter.BITGET_BUCKETS["default"])
+        now = time.monotonic()
+        with self.lock:
+            b = self._buckets.get(bucket)
+            if b is None:
+                b = self._buckets[bucket] = [burst, now]
+            b[0] = min(burst, b[0] + (now - b[1]) * rate)
+            b[1] = now
+            if b[0] < 1.0:
+                self.stats["rate_limited"] += 1
+                return False
+            b[0] -= 1.0
+            return True
+
+    def gate(self, method: str) -> None:
+        """Latence, limite de débit puis erreur injectée (avant tout effet de bord)."""
+        rng = self._rng(method)
+        with self.lock:
+            self.stats["rest_calls"] += 1
+        delay = max(0.0, rng.gauss(self.latency_ms, self.jitter_ms)) if self.jitter_ms else self.latency_ms
+        if delay > 0:
+            time.sleep(delay / 1000.0)
+        if self.rate_limits and not self._take_token(method):
+            raise ccxt.RateLimitExceeded(f"fake {method}: 429 Too Many Requests")
+        if self.error_rate > 0 and rng.random() < self.error_rate:
+            with self.lock:
+                self.stats["injected_errors"] += 1
+            err = _INJECTED_ERRORS[rng.randrange(len(_INJECTED_ERRORS))]
+            raise err(f"fake {method}: erreur injectée")
+
+    def ws_gate(self, channel: str) -> None:
+        rng = self._rng(f"ws:{channel}")
+        if self.ws_disconnect_rate > 0 and rng.random() < self.ws_disconnect_rate:
+            with self.lock:
+                self.stats["ws_disconnects"] += 1
+            raise ccxt.NetworkError("fake ws: 1006 Connection closed abnormally")
+
+    # ---------------- compte ----------------
+    def _signed(self, symbol: str) -> float:
+        p = self.positions.get(symbol)
+        if not p:
+            return 0.0
+        return p["contracts"] if p["side"] == "long" else -p["contracts"]
+
+    def _upnl(self, symbol: str, p: Dict[str, Any]) -> float:
+        sign = 1.0 if p["side"] == "long" else -1.0
+        return (self.price(symbol) - p["entryPrice"]) * p["contracts"] * sign
+
+    def equity(self) -> Tuple[float, float]:
+        """(équité, marge utilisée)."""
+        with self.lock:
+            upnl = sum(self._upnl(s, p) for s, p in self.positions.items())
+            used = sum(p["contracts"] * p["entryPrice"] / max(1, p["leverage"]) for p in self.positions.values())
+            return self.cash + upnl, used
+
+    def _emit_position(self, symbol: str) -> None:
+        self._event_seq += 1
+        self.position_events.append((self._event_seq, self.position_view(symbol)))
+
+    def _emit_order(self, order: Dict[str, Any]) -> None:
+        self._event_seq += 1
+        self.order_events.append((self._event_seq, self.order_view(order)))
+
+    def _fill(self, symbol: str, side: str, qty: float, price: float, reduce_only: bool) -> float:
+        """Exécute qty au prix donné ; retourne la quantité réellement exécutée."""
+        cur = self._signed(symbol)
+        delta = qty if side == "buy" else -qty
+        if reduce_only:
+            if cur == 0 or (cur > 0) == (delta > 0):
+                raise ccxt.InvalidOrder(f"fake {symbol}: reduceOnly sans position à réduire")
+            delta = -min(abs(cur), qty) if cur > 0 else min(abs(cur), qty)
+        new = cur + delta
+
+        # Marge requise pour la partie qui augmente l'exposition
+        added = max(0.0, abs(new) - abs(cur)) if (new == 0 or cur == 0 or (new > 0) == (cur > 0)) else abs(new)
+        if added > 0:
+            equity, used = self.equity()
+            lev = self.leverage.get(symbol, 1)
+            if added * price / lev > equity - used:
+                raise ccxt.InsufficientFunds(f"fake {symbol}: marge insuffisante")
+
+        self.cash -= abs(delta) * price * self.fee_rate
+        p = self.positions.get(symbol)
+        if cur != 0 and (new == 0 or (new > 0) != (cur > 0) or abs(new) < abs(cur)):
+            closed = min(abs(cur), abs(delta))
+            sign = 1.0 if cur > 0 else -1.0
+            self.cash += (price - p["entryPrice"]) * closed * sign
+        if new == 0:
+            self.positions.pop(symbol, None)
+            # Bitget annule les TP/SL de la position à sa clôture
+            for oid, o in list(self.orders.items()):
+                if o["symbol"] == symbol and o["reduceOnly"]:
+                    o["status"] = "canceled"
+                    self.orders.pop(oid, None)
+                    self._emit_order(o)
+        elif cur == 0 or (new > 0) != (cur > 0):
+            self.positions[symbol] = {"side": "long" if new > 0 else "short", "contracts": abs(new),
+                                      "entryPrice": price, "leverage": self.leverage.get(symbol, 1),
+                                      "timestamp": self.clock.now_ms()}
+        elif abs(new) > abs(cur):
+            p["entryPrice"] = (p["entryPrice"] * abs(cur) + price * abs(delta)) / abs(new)
+            p["contracts"] = abs(new)
+        else:
+            p["contracts"] = abs(new)
+        self.stats["fills"] += 1
+        self._emit_position(symbol)
+        return abs(delta)
+
+    def _new_order(self, symbol: str, type_: str, side: str, amount: float, price: Optional[float],
+                   params: Dict[str, Any]) -> Dict[str, Any]:
+        self._order_seq += 1
+        self.stats["orders"] += 1
+        now = self.clock.now_ms()
+        trigger = None
+        kind = None
+        for key, k in (("stopLossPrice", "sl"), ("takeProfitPrice", "tp"), ("triggerPrice", "trigger"),
+                       ("stopPrice", "trigger")):
+            if params.get(key):
+                trigger, kind = float(params[key]), k
+                break
+        return {
+            "id": f"{self._order_seq:012d}", "clientOrderId": params.get("clientOrderId"),
+            "timestamp": now, "symbol": symbol, "type": type_, "side": side,
+            "amount": float(amount), "price": price, "filled": 0.0, "average": None,
+            "status": "open", "reduceOnly": bool(params.get("reduceOnly")),
+            "trigger": trigger, "kind": kind, "above": None, "fee": 0.0,
+        }
+
+    def create_order(self, symbol: str, type_: str, side: str, amount: float,
+                     price: Optional[float] = None, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        params = dict(params or {})
+        side = (side or "").lower()
+        type_ = (type_ or "market").lower()
+        if side not in ("buy", "sell"):
+            raise ccxt.InvalidOrder(f"fake: side invalide {side}")
+        m = self.market_of(symbol)
+        with self.lock:
+            last = self.price(symbol)
+            amount = float(amount)
+            if self.market_buy_is_cost and type_ == "market" and side == "buy" and not params.get("reduceOnly"):
+                amount = amount / last
+            if amount < m["limits"]["amount"]["min"]:
+                raise ccxt.InvalidOrder(f"fake {symbol}: quantité {amount} < min {m['limits']['amount']['min']}")
+            order = self._new_order(symbol, type_, side, amount, price, params)
+
+            if order["trigger"] is not None:
+                order["above"] = order["trigger"] >= last
+                self.orders[order["id"]] = order
+                self._emit_order(order)
+                return self.order_view(order)
+
+            if type_ == "limit" and price is not None:
+                marketable = (side == "buy" and last <= price) or (side == "sell" and last >= price)
+                if not marketable:
+                    self.orders[order["id"]] = order
+                    self._emit_order(order)
+                    return self.order_view(order)
+                fill_px = float(price)
+            else:
+                if amount * last < m["limits"]["cost"]["min"] and not order["reduceOnly"]:
+                    raise ccxt.InvalidOrder(f"fake {symbol}: notionnel < {m['limits']['cost']['min']} USDT")
+                fill_px = last * (1 + self.slippage) if side == "buy" else last * (1 - self.slippage)
+
+            self._execute(order, fill_px)
+            # TP/SL attachés (params unifiés stopLoss/takeProfit)
+            for key, kind in (("stopLoss", "stopLossPrice"), ("takeProfit", "takeProfitPrice")):
+                spec = params.get(key)
+                trig = spec.get("triggerPrice") if isinstance(spec, dict) else spec
+                if trig and order["filled"] > 0:
+                    close_side = "sell" if side == "buy" else "buy"
+                    child = self._new_order(symbol, "market", close_side, order["filled"], None,
+                                            {kind: trig, "reduceOnly": True})
+                    child["above"] = child["trigger"] >= last
+                    child["preset"] = True  # TP/SL de position (planType pos_*)
+                    self.orders[child["id"]] = child
+                    self._emit_order(child)
+            return self.order_view(order)
+
+    def _execute(self, order: Dict[str, Any], fill_px: float) -> None:
+        filled = self._fill(order["symbol"], order["side"], order["amount"], fill_px, order["reduceOnly"])
+        order.update(filled=filled, average=fill_px, status="closed", fee=filled * fill_px * self.fee_rate)
+        self.orders.pop(order["id"], None)
+        self._emit_order(order)
+
+    def process_orders(self) -> None:
+        """Déclenche les ordres trigger / limites touchés au dernier prix."""
+        with self.lock:
+            for oid, o in list(self.orders.items()):
+                if oid not in self.orders:
+                    continue
+                try:
+                    last = self.price(o["symbol"])
+                except Exception:
+                    continue
+                if o["trigger"] is not None:
+                    hit = last >= o["trigger"] if o["above"] else last <= o["trigger"]
+                    if not hit:
+                        continue
+                    self.stats["triggers"] += 1
+                    px = last * (1 + self.slippage) if o["side"] == "buy" else last * (1 - self.slippage)
+                elif o["price"] is not None:
+                    hit = last <= o["price"] if o["side"] == "buy" else last >= o["price"]
+                    if not hit:
+                        continue
+                    px = float(o["price"])
+                else:
+                    continue
+                try:
+                    self._execute(o, px)
+                except ccxt.BaseError:
+                    o["status"] = "rejected"
+                    self.orders.pop(oid, None)
+                    self._emit_order(o)
+
+    def cancel_order(self, order_id: str, symbol: Optional[str] = None) -> Dict[str, Any]:
+        with self.lock:
+            o = self.orders.pop(str(order_id), None)
+            if o is None or (symbol and o["symbol"] != symbol):
+                raise ccxt.OrderNotFound(f"fake: ordre {order_id} introuvable")
+            o["status"] = "canceled"
+            self._emit_order(o)
+            return self.order_view(o)
+
+    # ---------------- vues CCXT ----------------
+    def order_view(self, o: Dict[str, Any]) -> Dict[str, Any]:
+        info = {"orderId": o["id"], "symbol": self.markets[o["symbol"]]["id"], "status": o["status"]}
+        view = {
+            "id": o["id"], "clientOrderId": o["clientOrderId"], "timestamp": o["timestamp"],
+            "datetime": _iso(o["timestamp"]), "lastTradeTimestamp": None, "symbol": o["symbol"],
+            "type": o["type"], "side": o["side"], "price": o["price"], "amount": o["amount"],
+            "filled": o["filled"], "remaining": o["amount"] - o["filled"], "average": o["average"],
+            "cost": (o["average"] or 0.0) * o["filled"], "status": o["status"],
+            "reduceOnly": o["reduceOnly"], "triggerPrice": o["trigger"], "stopPrice": o["trigger"],
+            "stopLossPrice": o["trigger"] if o["kind"] == "sl" else None,
+            "takeProfitPrice": o["trigger"] if o["kind"] == "tp" else None,
+            "fee": {"cost": o["fee"], "currency": "USDT"}, "trades": [], "info": info,
+        }
+        if o["kind"] in ("sl", "tp"):
+            prefix = "pos_" if o.get("preset") else ""
+            info["planType"] = prefix + ("loss" if o["kind"] == "sl" else "profit") + ("" if prefix else "_plan")
+            info["triggerPrice"] = str(o["trigger"])
+        return view
+
+    def position_view(self, symbol: str) -> Dict[str, Any]:
+        p = self.positions.get(symbol)
+        now = self.clock.now_ms()
+        if not p:
+            return {"symbol": symbol, "side": None, "contracts": 0.0, "contractSize": 1.0,
+                    "entryPrice": None, "markPrice": None, "unrealizedPnl": 0.0, "leverage": None,
+                    "timestamp": now, "datetime": _iso(now), "marginMode": "cross", "info": {}}
+        mark = self.price(symbol)
+        upnl = self._upnl(symbol, p)
+        notional = p["contracts"] * mark
+        return {
+            "symbol": symbol, "side": p["side"], "contracts": p["contracts"], "contractSize": 1.0,
+            "entryPrice": p["entryPrice"], "markPrice": mark, "notional": notional,
+            "unrealizedPnl": upnl, "leverage": p["leverage"], "marginMode": "cross",
+            "initialMargin": notional / max(1, p["leverage"]),
+            "percentage": upnl / (p["contracts"] * p["entryPrice"] / max(1, p["leverage"])) * 100.0,
+            "timestamp": now, "datetime": _iso(now),
+            "info": {"symbol": self.markets[symbol]["id"], "holdSide": p["side"],
+                     "total": str(p["contracts"]), "openPriceAvg": str(p["entryPrice"])},
+        }
+
+    def ticker_view(self, symbol: str) -> Dict[str, Any]:
+        now = self.clock.now_ms()
+        last = self.price(symbol)
+        tick = self.markets[symbol]["precision"]["price"]
+        st = self.market.day_stats(symbol, now)
+        change = last - st.get("open", last)
+        return {
+            "symbol": symbol, "timestamp": now, "datetime": _iso(now),
+            "high": st.get("high"), "low": st.get("low"), "bid": last - tick, "ask": last + tick,
+            "open": st.get("open"), "last": last, "close": last, "change": change,
+            "percentage": change / st["open"] * 100.0 if st.get("open") else None,
+            "baseVolume": st.get("baseVolume"), "quoteVolume": st.get("quoteVolume"),
+            "info": {"symbol": self.markets[symbol]["id"], "lastPr": str(last), "markPrice": str(last),
+                     "usdtVolume": str(st.get("quoteVolume"))},
+        }
+
+    def balance_view(self) -> Dict[str, Any]:
+        equity, used = self.equity()
+        free = max(0.0, equity - used)
+        usdt = {"free": free, "used": used, "total": equity}
+        return {
+            "USDT": usdt, "free": {"USDT": free}, "used": {"USDT": used}, "total": {"USDT": equity},
+            "info": {"data": [{"marginCoin": "USDT", "available": str(free), "locked": "0",
+                               "accountEquity": str(equity), "usdtEquity": str(equity),
+                               "crossedMaxAvailable": str(free)}]},
+        }
+
+
+# ==============================================================================
+# CLIENTS CCXT / CCXT.PRO
+# ==============================================================================
+
+class FakeExchange:
+    """Client REST synchrone, interface ccxt.Exchange (sous-ensemble utilisé par le bot)."""
+
+    def __init__(self, venue: "FakeVenue", exchange_id: str = "bitget"):
+        self.venue = venue
+        self.id = exchange_id
+        self.name = f"Fake {exchange_id}"
+        self.enableRateLimit = False
+        self.options: Dict[str, Any] = {"defaultType": "swap"}
+        self.params: Dict[str, Any] = {}
+        self.timeframes = {tf: tf for tf in ("1m", "5m", "15m", "30m", "1h", "4h", "1d", "1w")}
+        self.has = {
+            "fetchOHLCV": True, "fetchTicker": True, "fetchTickers": True, "fetchPositions": True,
+            "fetchOpenOrders": True, "fetchBalance": True, "createOrder": True, "createOrders": True,
+            "cancelOrder": True, "cancelOrders": True, "setLeverage": True, "setMarginMode": True,
+            "setPositionMode": True,
+        }
+        self.markets: Dict[str, Dict[str, Any]] = {}
+        self.symbols: List[str] = []
+
+    def __repr__(self):
+        return f"FakeExchange({self.id}, {len(self.venue.markets)} marchés)"
+
+    def _call(self, method: str) -> None:
+        self.venue.gate(method)
+        self.venue.process_orders()
+
+    # ---------------- marchés ----------------
+    def load_markets(self, reload: bool = False, params: Optional[Dict[str, Any]] = None):
+        if self.markets and not reload:
+            return self.markets
+        self._call("load_markets")
+        self.markets = dict(self.venue.markets)
+        self.symbols = sorted(self.markets)
+        return self.markets
+
+    def market(self, symbol: str) -> Dict[str, Any]:
+        return self.venue.market_of(symbol)
+
+    def amount_to_precision(self, symbol: str, amount) -> str:
+        step = self.market(symbol)["precision"]["amount"]
+        value = math.floor(float(amount) / step + 1e-9) * step
+        if value <= 0:
+            raise ccxt.InvalidOrder(f"fake {symbol}: quantité {amount} < précision {step}")
+        return f"{value:.{_decimals(step)}f}"
+
+    def price_to_precision(self, symbol: str, price) -> str:
+        tick = self.market(symbol)["precision"]["price"]
+        return f"{round(float(price) / tick) * tick:.{_decimals(tick)}f}"
+
+    def set_sandbox_mode(self, enabled: bool) -> None:
+        return None
+
+    def close(self) -> None:
+        return None
+
+    # ---------------- données publiques ----------------
+    def fetch_ohlcv(self, symbol: str, timeframe: str = "1m", since: Optional[int] = None,
+                    limit: Optional[int] = None, params: Optional[Dict[str, Any]] = None) -> List[List[float]]:
+        self._call("fetch_ohlcv")
+        self.market(symbol)
+        return self.venue.market.ohlcv(symbol, timeframe, self.venue.clock.now_ms(), since, limit)
+
+    def fetch_ticker(self, symbol: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        self._call("fetch_ticker")
+        self.market(symbol)
+        return self.venue.ticker_view(symbol)
+
+    def fetch_tickers(self, symbols: Optional[List[str]] = None,
+                      params: Optional[Dict[str, Any]] = None) -> Dict[str, Dict[str, Any]]:
+        self._call("fetch_tickers")
+        wanted = list(symbols) if symbols else list(self.venue.markets)
+        for s in wanted:
+            self.market(s)
+        return {s: self.venue.ticker_view(s) for s in wanted}
+
+    # ---------------- compte ----------------
+    def fetch_balance(self, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        self._call("fetch_balance")
+        return self.venue.balance_view()
+
+    def fetch_positions(self, symbols: Optional[List[str]] = None,
+                        params: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        self._call("fetch_positions")
+        with self.venue.lock:
+            held = [s for s in self.venue.positions if not symbols or s in symbols]
+            return [self.venue.position_view(s) for s in held]
+
+    def fetch_open_orders(self, symbol: Optional[str] = None, since: Optional[int] = None,
+                          limit: Optional[int] = None, params: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        self._call("fetch_open_orders")
+        only_trigger = bool((params or {}).get("trigger") or (params or {}).get("stop"))
+        with self.venue.lock:
+            return [self.venue.order_view(o) for o in self.venue.orders.values()
+                    if (symbol is None or o["symbol"] == symbol) and (not only_trigger or o["trigger"] is not None)]
+
+    def set_leverage(self, leverage, symbol: Optional[str] = None, params: Optional[Dict[str, Any]] = None):
+        self._call("set_leverage")
+        with self.venue.lock:
+            for s in ([symbol] if symbol else list(self.venue.markets)):
+                self.market(s)
+                self.venue.leverage[s] = max(1, int(float(leverage)))
+        return {"info": {"leverage": str(leverage)}}
+
+    def set_margin_mode(self, margin_mode: str, symbol: Optional[str] = None,
+                        params: Optional[Dict[str, Any]] = None):
+        self._call("set_margin_mode")
+        if str(margin_mode).lower() not in ("cross", "crossed"):
+            raise ccxt.NotSupported("fake: seule la marge croisée est simulée")
+        return {"info": {"marginMode": "crossed"}}
+
+    def set_position_mode(self, hedged: bool, symbol: Optional[str] = None,
+                          params: Optional[Dict[str, Any]] = None):
+        self._call("set_position_mode")
+        if hedged:
+            raise ccxt.NotSupported("fake: seul le mode one-way est simulé")
+        return {"info": {"posMode": "one_way_mode"}}
+
+    # ---------------- ordres ----------------
+    def create_order(self, symbol: str, type: str, side: str, amount, price=None,
+                     params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        self._call("create_order")
+        return self.venue.create_order(symbol, type, side, amount, price, params)
+
+    def create_orders(self, orders: List[Dict[str, Any]], params: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        self._call("create_orders")
+        # Comme Bitget: le batch-place n'accepte pas les ordres plan (TP/SL/trigger)
+        for req in orders:
+            req_params = req.get("params") or {}
+            if any(req_params.get(k) for k in ("stopLossPrice", "takeProfitPrice", "triggerPrice", "stopPrice")):
+                raise ccxt.NotSupported("fake: create_orders ne gère pas les ordres trigger (TP/SL)")
+        out = []
+        for req in orders:
+            try:
+                out.append(self.venue.create_order(req["symbol"], req.get("type"), req.get("side"),
+                                                   req.get("amount"), req.get("price"), req.get("params")))
+            except ccxt.BaseError as e:
+                out.append({"id": None, "info": {"errorCode": type(e).__name__, "errorMsg": str(e)}})
+        return out
+
+    def cancel_order(self, id: str, symbol: Optional[str] = None,
+                     params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        self._call("cancel_order")
+        return self.venue.cancel_order(id, symbol)
+
+    def cancel_orders(self, ids: List[str], symbol: Optional[str] = None,
+                      params: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        self._call("cancel_orders")
+        out = []
+        for oid in ids:
+            try:
+                out.append(self.venue.cancel_order(oid, symbol))
+            except ccxt.BaseError as e:
+                out.append({"id": str(oid), "info": {"errorCode": type(e).__name__, "errorMsg": str(e)}})
+        return out
+
+
+class FakeProExchange:
+    """Client WS (interface ccxt.pro): watch_* sur le même état que le client REST."""
+
+    POLL_SECONDS = 0.05
+
+    def __init__(self, venue: "FakeVenue", exchange_id: str = "bitget", tick_seconds: float = 1.0):
+        self.venue = venue
+        self.id = exchange_id
+        self.options: Dict[str, Any] = {"defaultType": "swap"}
+        self.has = {"ws": True, "watchTicker": True, "watchOHLCV": True,
+                    "watchPositions": True, "watchOrders": True}
+        self.markets: Dict[str, Dict[str, Any]] = {}
+        self.symbols: List[str] = []
+        self.tick_seconds = tick_seconds
+        self._order_cursor = venue._event_seq
+        self._position_cursor = venue._event_seq
+
+    async def load_markets(self, reload: bool = False, params: Optional[Dict[str, Any]] = None):
+        self.markets = dict(self.venue.markets)
+        self.symbols = sorted(self.markets)
+        return self.markets
+
+    async def close(self) -> None:
+        return None
+
+    async def watch_ticker(self, symbol: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        await asyncio.sleep(self.tick_seconds)
+        self.venue.ws_gate("ticker")
+        self.venue.process_orders()
+        return self.venue.ticker_view(symbol)
+
+    async def watch_ohlcv(self, symbol: str, timeframe: str = "1m", since: Optional[int] = None,
+                          limit: Optional[int] = None, params: Optional[Dict[str, Any]] = None):
+        await asyncio.sleep(self.tick_seconds)
+        self.venue.ws_gate("ohlcv")
+        return self.venue.market.ohlcv(symbol, timeframe, self.venue.clock.now_ms(), None, limit or 2)
+
+    async def _next_events(self, events: deque, cursor_attr: str, channel: str, symbols=None) -> List[Dict[str, Any]]:
+        while True:
+            self.venue.ws_gate(channel)
+            self.venue.process_orders()
+            cursor = getattr(self, cursor_attr)
+            with self.venue.lock:
+                fresh = [(seq, item) for seq, item in events if seq > cursor]
+            if fresh:
+                setattr(self, cursor_attr, fresh[-1][0])
+                out = [item for _, item in fresh if not symbols or item.get("symbol") in symbols]
+                if out:
+                    return out
+            await asyncio.sleep(self.POLL_SECONDS)
+
+    async def watch_positions(self, symbols: Optional[List[str]] = None, since: Optional[int] = None,
+                              limit: Optional[int] = None, params: Optional[Dict[str, Any]] = None):
+        return await self._next_events(self.venue.position_events, "_position_cursor", "positions", symbols)
+
+    async def watch_orders(self, symbol: Optional[str] = None, since: Optional[int] = None,
+                           limit: Optional[int] = None, params: Optional[Dict[str, Any]] = None):
+        return await self._next_events(self.venue.order_events, "_order_cursor", "orders",
+                                       [symbol] if symbol else None)
+
+
+# ==============================================================================
+# INSTANCE PARTAGÉE (configurée par l'environnement ou par configure())
+# ==============================================================================
+
+_VENUE: Optional[FakeVenue] = None
+_venue_lock = threading.Lock()
+
+
+def configure(n_symbols: int = FAKE_SYMBOLS, timeframe: str = FAKE_TIMEFRAME, data: str = FAKE_DATA,
+              clock: str = FAKE_CLOCK, start=FAKE_START, seed: int = FAKE_SEED,
+              archive_dir: Optional[str] = None, symbols: Optional[List[str]] = None, **venue_kwargs) -> FakeVenue:
+    """(Re)crée la place simulée partagée par create_exchange() / create_pro_exchange()."""
+    global _VENUE
+    start_ms = _parse_start(start)
+    if data == "archive":
+        market = ArchiveMarket(symbols, timeframe, archive_dir)
+        if not market.symbols:
+            raise RuntimeError("Archive OHLCV vide (lancer d'abord backtest.py download)")
+        if start_ms is None:
+            first, last = market.span_ms()
+            start_ms = first + min(1000 * market.tf_ms, (last - first) // 2)
+    else:
+        start_ms = start_ms if start_ms is not None else int(time.time() * 1000)
+        market = SyntheticMarket(n_symbols, timeframe, seed, start_ms)
+    venue = FakeVenue(market, SimClock(clock, start_ms), seed=seed, **venue_kwargs)
+    with _venue_lock:
+        _VENUE = venue
+    return venue
+
+
+def get_venue() -> FakeVenue:
+    with _venue_lock:
+        if _VENUE is not None:
+            return _VENUE
+    return configure()
+
+
+def create_exchange() -> FakeExchange:
+    return FakeExchange(get_venue())
+
+
+def create_pro_exchange() -> FakeProExchange:
+    return FakeProExchange(get_venue())
+
+
+# ==============================================================================
+# BANC: trading_engine_loop contre l'exchange simulé
+# ==============================================================================
+
+def _percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    s = sorted(values)
+    return s[min(len(s) - 1, max(0, int(round(q * (len(s) - 1)))))]
+
+
+def _peak_rss_mb() -> Optional[float]:
+    try:
+        import resource
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return round(rss / (1024.0 * 1024.0 if sys.platform == "darwin" else 1024.0), 1)
+    except Exception:
+        return None
+
+
+def run_engine(cycles: int = 3, advance_bars: int = 1, with_ws: bool = False,
+               universe_size: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Lance main.trading_engine_loop pour `cycles` itérations contre la place configurée
+    (EXCHANGE_BACKEND=fake doit être posé avant l'import de main). Horloge virtuelle:
+    avance de `advance_bars` bougies entre deux cycles ; la clôture de bougie a donc
+    lieu au début de chaque cycle, d'où la latence clôture → detect_signal par symbole.
+    """
+    import database
+    import main as bot
+    import perf_metrics
+    import loop_profiler
+    import resilience
+    import scan_priority
+
+    venue = get_venue()
+    database.enable_write_tracking()
+    database.setup_database()
+    database.set_setting("PAPER_TRADING_MODE", "false")
+    database.set_setting("UNIVERSE_SIZE", str(universe_size or len(venue.markets)))
+
+    ex = bot.create_exchange()
+    universe = bot.get_or_build_universe(ex, universe_size or len(venue.markets))
+    if with_ws:
+        bot.start_live_sync(ex)
+
+    durations: List[float] = []
+    rest_calls: List[int] = []
+    db_writes: List[int] = []
+    detect_ms: List[float] = []     # clôture → detect_signal terminé (tous les symboles)
+    signal_ms: List[float] = []     # idem, symboles avec signal
+    t_last = [time.perf_counter()]
+    calls_last = [venue.stats["rest_calls"]]
+    writes_last = [database.get_write_count()]
+
+    def _on_scan(symbol: str, signal) -> None:
+        dt = (time.perf_counter() - t_last[0]) * 1000.0
+        detect_ms.append(dt)
+        if signal:
+            signal_ms.append(dt)
+
+    def _on_cycle(n: int) -> None:
+        now = time.perf_counter()
+        durations.append(now - t_last[0])
+        calls, writes = venue.stats["rest_calls"], database.get_write_count()
+        rest_calls.append(calls - calls_last[0])
+        db_writes.append(writes - writes_last[0])
+        calls_last[0], writes_last[0] = calls, writes
+        if venue.clock.mode == "virtual" and advance_bars:
+            venue.clock.advance(advance_bars * venue.market.tf_ms)
+        t_last[0] = time.perf_counter()
+
+    t0 = time.perf_counter()
+    t_last[0] = t0
+    # Horloge de la boucle = horloge de la place (bougies, priorisation du scan)
+    now_fn = lambda: datetime.fromtimestamp(venue.clock.now_ms() / 1000.0, tz=timezone.utc)
+    bot.trading_engine_loop(ex, universe, max_cycles=cycles, on_cycle=_on_cycle, on_scan=_on_scan,
+                            now_fn=now_fn)
+    wall = time.perf_counter() - t0
+
+    equity, used = venue.equity()
+    with venue.lock:
+        open_positions = len(venue.positions)
+        open_orders = len(venue.orders)
+    loop = loop_profiler.get_stats()
+    scan = loop["phases"].get("scan", {})
+    return {
+        "cycles": len(durations), "universe": len(universe), "wall_seconds": round(wall, 3),
+        "cycle_p50_s": round(_percentile(durations, 0.50), 3),
+        "cycle_max_s": round(max(durations) if durations else 0.0, 3),
+        "scan_avg_s": round(scan.get("avg_s", 0.0), 3), "scan_max_s": round(scan.get("max_s", 0.0), 3),
+        "symbols_per_second": round(len(universe) * len(durations) / wall, 1) if wall > 0 else 0.0,
+        "rest_calls_per_cycle": round(sum(rest_calls) / len(rest_calls), 1) if rest_calls else 0.0,
+        "db_writes_per_cycle": round(sum(db_writes) / len(db_writes), 1) if db_writes else 0.0,
+        "peak_rss_mb": _peak_rss_mb(),
+        "close_to_detect_p50_ms": round(_percentile(detect_ms, 0.50), 1),
+        "close_to_detect_p99_ms": round(_percentile(detect_ms, 0.99), 1),
+        "close_to_signal_p50_ms": round(_percentile(signal_ms, 0.50), 1),
+        "close_to_signal_p99_ms": round(_percentile(signal_ms, 0.99), 1),
+        "signals": len(signal_ms), "candle_seconds": venue.market.tf_ms / 1000.0,
+        "venue": dict(venue.stats), "equity": round(equity, 2), "used_margin": round(used, 2),
+        "open_positions": open_positions, "open_orders": open_orders,
+        "methods": perf_metrics.get_method_stats(), "breakers": resilience.get_stats(),
+        "loop": loop, "scan_priority": scan_priority.get_stats(),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Exchange simulé: banc trading_engine_loop")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_run = sub.add_parser("run", help="Faire tourner trading_engine_loop contre l'exchange simulé")
+    p_run.add_argument("--symbols", type=int, default=FAKE_SYMBOLS)
+    p_run.add_argument("--cycles", type=int, default=3)
+    p_run.add_argument("--timeframe", default=FAKE_TIMEFRAME)
+    p_run.add_argument("--data", choices=("synthetic", "archive"), default=FAKE_DATA)
+    p_run.add_argument("--archive-dir")
+    p_run.add_argument("--clock", choices=("wall", "virtual"), default="virtual")
+    p_run.add_argument("--start", default=FAKE_START, help="ms epoch ou ISO (défaut: maintenant)")
+    p_run.add_argument("--advance-bars", type=int, default=1)
+    p_run.add_argument("--seed", type=int, default=FAKE_SEED)
+    p_run.add_argument("--balance", type=float, default=FAKE_BALANCE)
+    p_run.add_argument("--latency-ms", type=float, default=FAKE_LATENCY_MS)
+    p_run.add_argument("--jitter-ms", type=float, default=FAKE_LATENCY_JITTER_MS)
+    p_run.add_argument("--error-rate", type=float, default=FAKE_ERROR_RATE)
+    p_run.add_argument("--ws-disconnect-rate", type=float, default=FAKE_WS_DISCONNECT_RATE)
+    p_run.add_argument("--no-rate-limits", action="store_true")
+    p_run.add_argument("--ws", action="store_true", help="Démarrer aussi la synchro WS (watch_*)")
+    p_run.add_argument("--db-dir", help="Dossier de la base (défaut: dossier temporaire)")
+    p_run.add_argument("--out", help="Fichier JSON du rapport")
+    args = parser.parse_args(argv)
+
+    # Avant tout import de database/main: base isolée, pas d'attente entre cycles
+    os.environ["EXCHANGE_BACKEND"] = "fake"
+    os.environ["DB_BASE_DIR"] = args.db_dir or tempfile.mkdtemp(prefix="darwin_fake_")
+    os.environ.setdefault("LOOP_DELAY", "0")
+    os.environ.setdefault("TIMEFRAME", args.timeframe)
+
+    configure(n_symbols=args.symbols, timeframe=args.timeframe, data=args.data, clock=args.clock,
+              start=args.start, seed=args.seed, archive_dir=args.archive_dir, balance=args.balance,
+              latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+              rate_limits=not args.no_rate_limits, ws_disconnect_rate=args.ws_disconnect_rate)
+    report = run_engine(cycles=args.cycles, advance_bars=args.advance_bars, with_ws=args.ws,
+                        universe_size=args.symbols)
+
+    print(f"🧪 {report['cycles']} cycle(s) | univers {report['universe']} | "
+          f"{report['wall_seconds']} s | p50 cycle {report['cycle_p50_s']} s | "
+          f"{report['symbols_per_second']} symboles/s")
+    v = report["venue"]
+    print(f"   appels {v['calls']} | erreurs injectées {v['injected_errors']} | 429 {v['rate_limited']} | "
+          f"ordres {v['orders']} | positions ouvertes {report['open_positions']} | équité {report['equity']}")
+    print(f"   REST/cycle {report['rest_calls_per_cycle']} | écritures DB/cycle {report['db_writes_per_cycle']} | "
+          f"RSS max {report['peak_rss_mb']} Mo | clôture→signal p50 {report['close_to_signal_p50_ms']} ms "
+          f"p99 {report['close_to_signal_p99_ms']} ms ({report['signals']} signaux)")
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, default=str)
+        print(f"💾 {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    # main.py importe `fake_exchange`: on passe par ce module (et non __main__)
+    # pour que le bot et le banc partagent la même place simulée.
+    import fake_exchange
+    sys.exit(fake_exchange.main())
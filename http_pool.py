@@ -0,0 +1,84 @@
+# Fichier: http_pool.py
+"""
+Sessions HTTP partagées (requests.Session) par hôte: keep-alive + pool de
+connexions, pour ne plus payer un handshake TCP/TLS à chaque appel
+Telegram / CoinGecko.
+
+- session_for(host) : Session dédiée à l'hôte (créée une fois, thread-safe)
+- telegram()        : Session api.telegram.org
+- telegram_longpoll(): Session dédiée au long polling getUpdates
+- coingecko()       : Session api.coingecko.com
+
+Politique de retry (urllib3):
+- erreurs de CONNEXION: rejouées quelle que soit la méthode (rien n'est parti) ;
+- 429/5xx: rejoués pour GET uniquement (un POST sendMessage rejoué = doublon),
+  en respectant Retry-After.
+Le timeout reste fixé par appel (paramètre `timeout=` de requests).
+"""
+import os
+import threading
+from typing import Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# hôte -> (pool_maxsize, retries connexion, retries statut)
+_HOST_PROFILES = {
+    "api.telegram.org": (int(os.getenv("TG_HTTP_POOL_SIZE", "8")), 2, 2),
+    "api.coingecko.com": (4, 2, 3),
+}
+_DEFAULT_PROFILE = (4, 2, 2)
+
+_sessions: Dict[str, requests.Session] = {}
+_lock = threading.Lock()
+
+
+def _build_session(host: str) -> requests.Session:
+    pool_size, connect_retries, status_retries = _HOST_PROFILES.get(host, _DEFAULT_PROFILE)
+    retry = Retry(
+        total=connect_retries + status_retries,
+        connect=connect_retries,
+        read=0,
+        status=status_retries,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset(["GET", "HEAD"]),
+        backoff_factor=0.3,
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry, pool_block=False)
+    sess = requests.Session()
+    sess.mount(f"https://{host}", adapter)
+    sess.mount(f"http://{host}", adapter)
+    sess.headers.update({"Connection": "keep-alive", "User-Agent": "darwin-bot/1.0"})
+    return sess
+
+
+def session_for(host: str, name: Optional[str] = None) -> requests.Session:
+    """
+    Session partagée pour `host`. `name` permet d'obtenir une session dédiée
+    (pool séparé) sur le même hôte, ex: le long polling getUpdates qui garde
+    une connexion occupée jusqu'à 50 s.
+    """
+    key = f"{host}#{name}" if name else host
+    sess = _sessions.get(key)
+    if sess is not None:
+        return sess
+    with _lock:
+        sess = _sessions.get(key)
+        if sess is None:
+            sess = _sessions[key] = _build_session(host)
+        return sess
+
+
+def telegram() -> requests.Session:
+    return session_for("api.telegram.org")
+
+
+def telegram_longpoll() -> requests.Session:
+    return session_for("api.telegram.org", name="longpoll")
+
+
+def coingecko() -> requests.Session:
+    return session_for("api.coingecko.com")
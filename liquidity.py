@@ -0,0 +1,171 @@
+# Fichier: liquidity.py
+"""
+Table de liquidité de l'univers, rafraîchie en bloc.
+
+- refresh(ex, symbols): UN fetch_tickers pour tout l'univers (au plus une fois
+  par LIQUIDITY_TTL_SECONDS) → spread bid/ask, volume 24h en USDT, heure de mise
+  à jour par symbole ; les prix alimentent aussi price_service ;
+- SYMBOL_WHITELIST / MAX_SPREAD_PCT / MIN_QUOTE_VOLUME_USDT relus une seule fois
+  par rafraîchissement (pas à chaque contrôle) ;
+- check(symbol) / filter_liquid(symbols): simples lectures de dictionnaire,
+  utilisées par trader.is_tradeable_symbol et par le scan (les symboles
+  illiquides ne sont plus scannés du tout).
+
+Un symbole absent de la table (ou périmé) n'est jamais exclu du scan: seul un
+spread mesuré hors seuil l'écarte.
+"""
+import os
+import time
+import threading
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+
+import database
+import price_service
+
+LIQUIDITY_TTL_SECONDS = float(os.getenv("LIQUIDITY_TTL_SECONDS", "60"))
+# Au-delà, une entrée n'est plus jugée fiable (gate: rafraîchir ; scan: ne pas exclure)
+LIQUIDITY_STALE_SECONDS = float(os.getenv("LIQUIDITY_STALE_SECONDS", "300"))
+
+_lock = threading.Lock()
+_table: Dict[str, Dict[str, Any]] = {}
+_config: Dict[str, Any] = {"whitelist": frozenset(), "max_spread_pct": 0.2, "min_quote_volume": 0.0}
+_state: Dict[str, Any] = {"refreshed_ts": 0.0, "refreshes": 0, "errors": 0, "excluded": 0}
+
+
+def _load_config() -> None:
+    try:
+        raw = database.get_setting('SYMBOL_WHITELIST', '') or ''
+        whitelist = frozenset(s.strip().upper() for s in str(raw).split(',') if s.strip())
+    except Exception:
+        whitelist = _config["whitelist"]
+    try:
+        max_spread = float(database.get_setting('MAX_SPREAD_PCT', '0.2'))
+    except Exception:
+        max_spread = 0.2
+    try:
+        min_volume = float(database.get_setting('MIN_QUOTE_VOLUME_USDT', '0'))
+    except Exception:
+        min_volume = 0.0
+    with _lock:
+        _config.update({"whitelist": whitelist, "max_spread_pct": max_spread, "min_quote_volume": min_volume})
+
+
+def _entry(ticker: Dict[str, Any], now: float) -> Dict[str, Any]:
+    """Ligne de table depuis un ticker CCXT (spread None si bid/ask invalides)."""
+    try:
+        bid = float(ticker.get('bid') or 0)
+        ask = float(ticker.get('ask') or 0)
+    except Exception:
+        bid = ask = 0.0
+    spread = ((ask - bid) / bid) * 100 if bid > 0 and ask > 0 else None
+    try:
+        qv = ticker.get('quoteVolume')
+        if qv is None:
+            info = ticker.get('info') or {}
+            qv = info.get('usdtVolume') or info.get('quoteVolume')
+        if qv is None and ticker.get('baseVolume') is not None and ticker.get('last') is not None:
+            qv = float(ticker['baseVolume']) * float(ticker['last'])
+        quote_volume = float(qv) if qv is not None else None
+    except Exception:
+        quote_volume = None
+    return {"bid": bid, "ask": ask, "spread_pct": spread, "quote_volume": quote_volume, "ts": now}
+
+
+def update(symbol: str, ticker: Dict[str, Any]) -> Dict[str, Any]:
+    """Met à jour une ligne depuis un ticker isolé (fetch_ticker, flux WS)."""
+    e = _entry(ticker or {}, time.time())
+    with _lock:
+        _table[symbol] = e
+    return e
+
+
+def refresh(ex, symbols: Optional[Iterable[str]] = None, force: bool = False) -> bool:
+    """
+    Rafraîchit la table en UN appel fetch_tickers si elle a plus de
+    LIQUIDITY_TTL_SECONDS. Retourne True si un rafraîchissement a eu lieu.
+    """
+    now = time.time()
+    with _lock:
+        if not force and now - _state["refreshed_ts"] < LIQUIDITY_TTL_SECONDS:
+            return False
+        _state["refreshed_ts"] = now
+    _load_config()
+
+    wanted = list(symbols) if symbols else None
+    try:
+        tickers = ex.fetch_tickers(wanted) or {}
+    except Exception:
+        # Un symbole inconnu peut faire échouer le lot entier → tous les tickers
+        try:
+            tickers = ex.fetch_tickers() or {}
+        except Exception as e:
+            with _lock:
+                _state["errors"] += 1
+            print(f"⚠️ Table de liquidité: fetch_tickers échoué: {e}")
+            return False
+
+    rows = {sym: _entry(t, now) for sym, t in tickers.items() if isinstance(t, dict)}
+    with _lock:
+        _table.update(rows)
+        _state["refreshes"] += 1
+    try:
+        price_service.publish_tickers(tickers)
+    except Exception:
+        pass
+    return True
+
+
+def lookup(symbol: str, max_age: float = LIQUIDITY_STALE_SECONDS) -> Optional[Dict[str, Any]]:
+    """Ligne de la table si présente et plus récente que max_age secondes."""
+    with _lock:
+        e = _table.get(symbol)
+    if e is None or time.time() - e["ts"] > max_age:
+        return None
+    return e
+
+
+def is_whitelisted(symbol: str) -> bool:
+    base = symbol.split('/')[0].upper()
+    with _lock:
+        return base in _config["whitelist"]
+
+
+def check(symbol: str, entry: Optional[Dict[str, Any]] = None) -> Tuple[Optional[bool], str]:
+    """
+    (True, raison) liquide, (False, raison) illiquide, (None, raison) inconnu
+    (pas de ligne récente). Aucune requête réseau ni lecture DB.
+    """
+    if is_whitelisted(symbol):
+        return True, "whitelist"
+    e = entry if entry is not None else lookup(symbol)
+    if e is None:
+        return None, "absent de la table de liquidité"
+    with _lock:
+        max_spread = _config["max_spread_pct"]
+        min_volume = _config["min_quote_volume"]
+    if e["spread_pct"] is None:
+        return False, "pas de bid/ask valide"
+    if e["spread_pct"] > max_spread:
+        return False, f"spread trop large : {e['spread_pct']:.3f}% > {max_spread}%"
+    if min_volume > 0 and e["quote_volume"] is not None and e["quote_volume"] < min_volume:
+        return False, f"volume 24h {e['quote_volume']:.0f} < {min_volume:.0f} USDT"
+    return True, f"spread OK : {e['spread_pct']:.3f}%"
+
+
+def filter_liquid(symbols: Iterable[str]) -> List[str]:
+    """Retire du scan les symboles dont la dernière mesure est hors seuils (ordre conservé)."""
+    symbols = list(symbols)
+    kept = [s for s in symbols if check(s)[0] is not False]
+    with _lock:
+        _state["excluded"] = len(symbols) - len(kept)
+    return kept
+
+
+def get_stats() -> Dict[str, Any]:
+    with _lock:
+        st = dict(_state)
+        st["symbols"] = len(_table)
+        st["max_spread_pct"] = _config["max_spread_pct"]
+        st["whitelist"] = len(_config["whitelist"])
+    st["age_s"] = round(time.time() - st["refreshed_ts"], 1) if st["refreshed_ts"] else None
+    return st
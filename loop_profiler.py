@@ -0,0 +1,217 @@
+# Fichier: loop_profiler.py
+"""
+Profilage par phase de trading_engine_loop.
+
+- with loop_profiler.phase("scan"): ...  → durée de la phase (historique glissant)
+- begin_cycle() / end_cycle()            → durée totale, détection des cycles lents
+- request_capture(n)                     → cProfile des n prochains cycles,
+                                            sauvegardé dans DB_BASE_DIR/profiles
+"""
+import os
+import io
+import time
+import threading
+import cProfile
+import pstats
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Any, Optional
+
+import database
+
+HISTORY_SIZE = int(os.getenv("LOOP_PROFILER_HISTORY", "500"))
+PROFILES_DIR = os.path.join(database.DB_BASE_DIR, "profiles")
+
+_lock = threading.Lock()
+_phases: Dict[str, Dict[str, Any]] = {}
+_cycles: deque = deque(maxlen=HISTORY_SIZE)
+_slow_cycles: deque = deque(maxlen=20)
+_current: Dict[str, Any] = {"start": None, "phases": {}}
+
+# Capture cProfile demandée (via Telegram)
+_capture: Dict[str, Any] = {"remaining": 0, "total": 0, "profiler": None, "on_done": None}
+
+
+def _slow_threshold() -> float:
+    try:
+        return float(database.get_setting('SLOW_CYCLE_SECONDS', '120'))
+    except Exception:
+        return 120.0
+
+
+# ==============================================================================
+# PHASES / CYCLES
+# ==============================================================================
+
+def record_phase(name: str, dt: float) -> None:
+    """Enregistre une durée de phase mesurée par l'appelant (secondes)."""
+    with _lock:
+        st = _phases.get(name)
+        if st is None:
+            st = _phases[name] = {"history": deque(maxlen=HISTORY_SIZE), "last_run_ts": 0.0, "count": 0}
+        st["history"].append(dt)
+        st["last_run_ts"] = time.time()
+        st["count"] += 1
+        _current["phases"][name] = _current["phases"].get(name, 0.0) + dt
+
+
+@contextmanager
+def phase(name: str):
+    """Chronomètre une phase du cycle (n'absorbe jamais les exceptions)."""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_phase(name, time.perf_counter() - t0)
+
+
+def begin_cycle() -> None:
+    with _lock:
+        _current["start"] = time.perf_counter()
+        _current["phases"] = {}
+        cap = _capture
+    if cap["remaining"] > 0 and cap["profiler"] is None:
+        prof = cProfile.Profile()
+        cap["profiler"] = prof
+        prof.enable()
+    elif cap["profiler"] is not None:
+        cap["profiler"].enable()
+
+
+def end_cycle() -> Optional[float]:
+    """Clôt le cycle courant. Retourne sa durée (s) ou None si begin_cycle n'a pas été appelé."""
+    with _lock:
+        start = _current.get("start")
+        if start is None:
+            return None
+        total = time.perf_counter() - start
+        breakdown = dict(_current["phases"])
+        _current["start"] = None
+        _cycles.append({"ts": time.time(), "total": total})
+        threshold = _slow_threshold()
+        is_slow = total > threshold
+        if is_slow:
+            _slow_cycles.append({"ts": time.time(), "total": total, "phases": breakdown})
+
+    if is_slow:
+        worst = sorted(breakdown.items(), key=lambda kv: kv[1], reverse=True)[:3]
+        detail = ", ".join(f"{k}={v:.1f}s" for k, v in worst)
+        print(f"🐢 Cycle lent: {total:.1f}s (> {threshold:.0f}s) — {detail}")
+
+    _advance_capture()
+    return total
+
+
+# ==============================================================================
+# CAPTURE cProfile
+# ==============================================================================
+
+def request_capture(n_cycles: int, on_done=None) -> bool:
+    """
+    Programme une capture cProfile des n prochains cycles.
+    on_done(path_prof, summary_text) est appelé à la fin (depuis le thread trading).
+    Retourne False si une capture est déjà en cours.
+    """
+    with _lock:
+        if _capture["remaining"] > 0:
+            return False
+        _capture["remaining"] = max(1, int(n_cycles))
+        _capture["total"] = _capture["remaining"]
+        _capture["profiler"] = None
+        _capture["on_done"] = on_done
+    return True
+
+
+def _advance_capture() -> None:
+    prof = _capture.get("profiler")
+    if prof is None:
+        return
+    prof.disable()
+    _capture["remaining"] -= 1
+    if _capture["remaining"] > 0:
+        return
+
+    on_done = _capture.get("on_done")
+    n = _capture.get("total", 0)
+    _capture["profiler"] = None
+    _capture["on_done"] = None
+    path, summary = _save_profile(prof, n)
+    if on_done:
+        try:
+            on_done(path, summary)
+        except Exception as e:
+            print(f"⚠️ Callback capture profil: {e}")
+
+
+def _save_profile(prof: cProfile.Profile, n_cycles: int):
+    stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    path = os.path.join(PROFILES_DIR, f"cycles_{stamp}_{n_cycles}.prof")
+    buf = io.StringIO()
+    try:
+        stats = pstats.Stats(prof, stream=buf)
+        stats.sort_stats("cumulative").print_stats(25)
+    except Exception as e:
+        buf.write(f"pstats indisponible: {e}")
+    summary = buf.getvalue()
+    try:
+        os.makedirs(PROFILES_DIR, exist_ok=True)
+        prof.dump_stats(path)
+        with open(path.replace(".prof", ".txt"), "w", encoding="utf-8") as f:
+            f.write(summary)
+    except Exception as e:
+        print(f"⚠️ Sauvegarde profil impossible: {e}")
+        path = None
+    return path, summary
+
+
+# ==============================================================================
+# LECTURE
+# ==============================================================================
+
+def get_stats() -> Dict[str, Any]:
+    with _lock:
+        phases = {}
+        for name, st in _phases.items():
+            hist = sorted(st["history"])
+            n = len(hist)
+            phases[name] = {
+                "count": st["count"],
+                "last_s": st["history"][-1] if n else 0.0,
+                "avg_s": (sum(hist) / n) if n else 0.0,
+                "p95_s": hist[min(n - 1, int(0.95 * (n - 1)))] if n else 0.0,
+                "max_s": hist[-1] if n else 0.0,
+                "last_run_ts": st["last_run_ts"],
+            }
+        cycles = [c["total"] for c in _cycles]
+        slow = list(_slow_cycles)
+        capture_remaining = _capture["remaining"]
+    return {
+        "phases": phases,
+        "cycles": len(cycles),
+        "cycle_last_s": cycles[-1] if cycles else 0.0,
+        "cycle_avg_s": (sum(cycles) / len(cycles)) if cycles else 0.0,
+        "slow_cycles": slow,
+        "capture_remaining": capture_remaining,
+    }
+
+
+def format_stats() -> str:
+    """Résumé HTML pour Telegram."""
+    st = get_stats()
+    if not st["phases"]:
+        return "⏱️ Aucun cycle mesuré pour l'instant."
+    now = time.time()
+    lines = [f"{'phase':<18}{'last':>7}{'avg':>7}{'p95':>7}{'il y a':>8}"]
+    for name, p in st["phases"].items():
+        ago = now - p["last_run_ts"] if p["last_run_ts"] else 0.0
+        lines.append(f"{name[:17]:<18}{p['last_s']:>7.2f}{p['avg_s']:>7.2f}{p['p95_s']:>7.2f}{ago:>7.0f}s")
+    msg = (
+        "<b>⏱️ Cycle trading (s)</b>\n"
+        f"Dernier: <b>{st['cycle_last_s']:.1f}s</b> | Moyenne: {st['cycle_avg_s']:.1f}s | "
+        f"Cycles lents: {len(st['slow_cycles'])}\n"
+        "<pre>" + "\n".join(lines) + "</pre>"
+    )
+    if st["capture_remaining"]:
+        msg += f"\n🔬 Capture cProfile en cours ({st['capture_remaining']} cycle(s) restants)"
+    return msg
@@ -14,6 +14,20 @@ import trader
 import notifier
 import utils
 import reporting
+import charting
+import rate_limiter
+import sync_coordinator
+import perf_metrics
+import loop_profiler
+import scan_priority
+import correlation
+import liquidity
+import universe_cache
+import resilience
+import tg_webhook
+import tg_workers
+import fake_exchange
+import traffic_recorder
 import asyncio
 import ccxt.pro as ccxtpro
 
@@ -95,13 +109,18 @@ def get_pending_signals_message() -> str:
 
 
 def create_exchange():
-    """Crée l'objet exchange CCXT."""
-    ex = ccxt.bitget({
-        "apiKey": API_KEY, "secret": API_SECRET, "password": PASSPHRASSE,
-        "enableRateLimit": True, "options": {"defaultType": "swap"}
-    })
-    if BITGET_TESTNET: ex.set_sandbox_mode(True)
-    return ex
+    """Crée l'objet exchange CCXT (EXCHANGE_BACKEND=fake → exchange simulé local)."""
+    if fake_exchange.is_enabled():
+        ex = fake_exchange.create_exchange()
+    else:
+        ex = ccxt.bitget({
+            "apiKey": API_KEY, "secret": API_SECRET, "password": PASSPHRASSE,
+            "enableRateLimit": True, "options": {"defaultType": "swap"}
+        })
+        if BITGET_TESTNET: ex.set_sandbox_mode(True)
+    # retry/disjoncteur → ordonnanceur rate-limit → chronométrage → enregistrement → ccxt
+    ex = traffic_recorder.wrap(ex)
+    return resilience.wrap_exchange(rate_limiter.wrap_exchange(perf_metrics.instrument(ex)))
 
 def build_universe(ex: ccxt.Exchange) -> List[str]:
     """Construit la liste des paires à trader (Bitget USDT futures) avec garde-fous pour ne jamais retourner [].
@@ -109,6 +128,8 @@ def build_universe(ex: ccxt.Exchange) -> List[str]:
     2) Si vide: reload des marchés + second essai
     3) Si encore vide: fallback 'core set' filtré par marchés disponibles
     4) Persistance optionnelle pour diagnostic: settings.LAST_UNIVERSE_JSON
+    Le classement est d'abord lu dans le cache fichier (universe_cache) ; s'il est
+    périmé, il est reconstruit en arrière-plan sans bloquer l'appelant.
     """
     import json
 
@@ -127,9 +148,17 @@ def build_universe(ex: ccxt.Exchange) -> List[str]:
             pass
         return symbols[:size]
 
+    # --- 0) Cache fichier (DB_BASE_DIR/universe_cache.json.gz)
+    cached = universe_cache.get_symbols("volume", size)
+    if cached:
+        if not universe_cache.is_fresh("volume", size):
+            universe_cache.refresh_async(ex, size)
+        print(f"✅ Univers depuis le cache fichier: {len(cached)} paires.")
+        return _persist_and_log(cached, "file_cache")
+
     # --- 1) Tentative principale
     try:
-        syms = utils.get_universe_by_market_cap(ex, size)
+        syms = universe_cache.build_volume_ranking(ex, size)
     except Exception as e:
         syms = []
         try:
@@ -154,7 +183,7 @@ def build_universe(ex: ccxt.Exchange) -> List[str]:
         pass
 
     try:
-        syms2 = utils.get_universe_by_market_cap(ex, size)
+        syms2 = universe_cache.build_volume_ranking(ex, size)
     except Exception:
         syms2 = []
 
@@ -258,7 +287,7 @@ def _live_sync_worker(ex):
     interval = max(1, interval)
     while True:
         try:
-            trader.sync_positions_with_exchange(ex)
+            sync_coordinator.request_sync(ex).result(timeout=120)
         except Exception as e:
             try:
                 notifier.tg_send_error("Live sync polling", e)
@@ -280,8 +309,10 @@ async def _ws_sync_loop(ex_rest):
     PASSPHRASSE    = os.getenv("BITGET_API_PASSWORD", "") or os.getenv("BITGET_PASSPHRASSE", "")
 
     def _make_ex_ws():
-        # Exchange dédié WS (privé), options robustes
-        return ccxtpro.bitget({
+        # Exchange dédié WS (privé), options robustes (chronométré)
+        if fake_exchange.is_enabled():
+            return perf_metrics.instrument(traffic_recorder.wrap(fake_exchange.create_pro_exchange()))
+        return perf_metrics.instrument(traffic_recorder.wrap(ccxtpro.bitget({
             "apiKey": API_KEY,
             "secret": API_SECRET,
             "password": PASSPHRASSE,
@@ -292,7 +323,7 @@ async def _ws_sync_loop(ex_rest):
                 "testnet": BITGET_TESTNET,
                 "ws": {"gunzip": True},
             },
-        })
+        })))
 
     async def _backoff_sleep(attempt: int, base: float = 1.6, cap: float = 30.0):
         # Backoff exponentiel + jitter
@@ -336,10 +367,12 @@ async def _ws_sync_loop(ex_rest):
         attempt = 0
         while True:
             try:
-                await ex_ws.watch_positions()
+                positions = await ex_ws.watch_positions()
+                received_ts = time.time()
                 attempt = 0  # reset backoff si ça vit
                 positions_fail_count = 0  # ✅ Reset compteur si succès
-                trader.sync_positions_with_exchange(ex_rest)
+                # Applique le delta WS directement (DB/REST hors boucle asyncio)
+                await asyncio.to_thread(trader.apply_ws_position_deltas, ex_rest, positions, received_ts)
             except (ccxt.NetworkError, ccxt.ExchangeError) as e:
                 msg = str(e)
                 if any(k in msg for k in ("1006", "1001", "Connection closed", "abnormal closure")):
@@ -392,10 +425,13 @@ async def _ws_sync_loop(ex_rest):
         attempt = 0
         while True:
             try:
-                await ex_ws.watch_orders()
+                orders = await ex_ws.watch_orders()
                 attempt = 0
                 orders_fail_count = 0  # ✅ Reset compteur si succès
-                trader.sync_positions_with_exchange(ex_rest)
+                _, needs_full_sync = await asyncio.to_thread(trader.apply_ws_order_deltas, orders)
+                if needs_full_sync:
+                    # Un reduceOnly a été exécuté: on confirme l'état complet via REST
+                    await sync_coordinator.await_sync(ex_rest)
             except (ccxt.NetworkError, ccxt.ExchangeError) as e:
                 msg = str(e)
                 if any(k in msg for k in ("1006", "1001", "Connection closed", "abnormal closure")):
@@ -455,11 +491,25 @@ async def _ws_sync_loop(ex_rest):
                 attempt += 1
                 await _backoff_sleep(attempt)
 
-    # Lancer les 3 boucles en parallèle
+    # Filet de sécurité: sync REST complète périodique (hors boucle asyncio)
+    async def periodic_full_sync():
+        while True:
+            try:
+                interval = int(database.get_setting('LIVE_FULL_SYNC_SECONDS', 60))
+            except Exception:
+                interval = 60
+            await asyncio.sleep(max(10, interval))
+            try:
+                await sync_coordinator.await_sync(ex_rest)
+            except Exception as e:
+                print(f"⚠️ Sync REST périodique: {e}")
+
+    # Lancer les 4 boucles en parallèle
     await asyncio.gather(
         watch_positions(),
         watch_orders(),
         watch_keepalive(),
+        periodic_full_sync(),
     )
 
 
@@ -784,17 +834,8 @@ def process_callback_query(callback_query: Dict):
                 db_positions = database.get_open_positions()
                 notifier.format_synced_open_positions([], db_positions)
 
-                def _refresh_positions():
-                    try:
-                        ex_local = create_exchange()
-                        trader.sync_positions_with_exchange(ex_local)
-                    except Exception as e:
-                        try:
-                            notifier.tg_send_error("Sync positions (refresh async)", e)
-                        except Exception:
-                            pass
-
-                threading.Thread(target=_refresh_positions, daemon=True).start()
+                # Rafraîchissement asynchrone (fusionné avec les syncs déjà en cours)
+                sync_coordinator.request_sync(create_exchange())
 
             except Exception as e:
                 notifier.tg_send_error("Sync positions (manual view)", e)
@@ -1080,6 +1121,57 @@ def process_message(message: Dict):
             except ValueError:
                 notifier.tg_send("❌ Valeur invalide. Utilisez: /setrisk 2")
 
+    elif command == "/ratelimit":
+        notifier.tg_send(rate_limiter.format_stats())
+
+    elif command == "/syncstats":
+        notifier.tg_send(sync_coordinator.format_stats())
+
+    elif command == "/perf":
+        msg = perf_metrics.format_perf()
+        cst = charting.get_render_stats()
+        if cst.get("count"):
+            msg += (f"\n🖼️ Rendu graphiques ({cst['count']}): rendu moy {cst['render_avg_s']:.2f}s"
+                    f" p95 {cst['render_p95_s']:.2f}s | bout en bout p95 {cst['total_p95_s']:.2f}s")
+        notifier.tg_send(msg)
+
+    elif command == "/outbox":
+        st = notifier.outbox_stats()
+        notifier.tg_send(
+            "<b>📬 Outbox Telegram</b>\n"
+            f"- En file: <b>{st['queue_depth']}</b> (plus ancien: {st['oldest_age_s']:.0f}s)\n"
+            f"- Envoyés: {st['sent']} | Fusionnés: {st['merged']} | Jetés: {st['dropped']}\n"
+            f"- Échecs: {st['failed']} | 429 reçus: {st['rate_limited']}"
+        )
+
+    elif command == "/workers":
+        notifier.tg_send(tg_workers.format_stats())
+
+    elif command == "/breakers":
+        notifier.tg_send(resilience.format_stats())
+
+    elif command == "/loopstats":
+        notifier.tg_send(loop_profiler.format_stats())
+
+    elif command == "/profile":
+        try:
+            n_cycles = max(1, min(20, int(parts[1]))) if len(parts) > 1 else 1
+        except ValueError:
+            n_cycles = 1
+
+        def _on_profile_done(path, summary):
+            import html
+            head = html.escape("\n".join((summary or "").splitlines()[:30]))
+            notifier.tg_send(
+                f"🔬 <b>Profil cProfile ({n_cycles} cycle(s))</b>\n"
+                f"Fichier: <code>{path or 'non sauvegardé'}</code>\n<pre>{head[:3000]}</pre>"
+            )
+
+        if loop_profiler.request_capture(n_cycles, on_done=_on_profile_done):
+            notifier.tg_send(f"🔬 Capture cProfile programmée sur les <b>{n_cycles}</b> prochain(s) cycle(s).")
+        else:
+            notifier.tg_send("⚠️ Une capture cProfile est déjà en cours.")
+
     elif command == "/stats":
         ex = create_exchange()
         balance = trader.get_usdt_balance(ex)
@@ -1160,10 +1252,10 @@ def check_restart_request():
         last_uid_raw = database.get_setting('LAST_TELEGRAM_UPDATE_ID', None)
         if last_uid_raw is not None and str(last_uid_raw).strip() != "":
             try:
-                import requests  # local import pour éviter hard deps au chargement
+                import http_pool
                 from notifier import TELEGRAM_API  # réutilise la même base d'URL
                 offset = int(last_uid_raw) + 1
-                requests.get(f"{TELEGRAM_API}/getUpdates", params={"offset": offset, "timeout": 0}, timeout=3)
+                http_pool.telegram().get(f"{TELEGRAM_API}/getUpdates", params={"offset": offset, "timeout": 0}, timeout=3)
             except Exception:
                 pass
     except Exception:
@@ -1175,6 +1267,12 @@ def check_restart_request():
     except Exception:
         pass
 
+    # Laisser partir les messages Telegram encore en file
+    try:
+        notifier.outbox_flush(timeout=5.0)
+    except Exception:
+        pass
+
     # Relance "propre" du process
     try:
         import os, sys
@@ -1197,130 +1295,262 @@ def route_inline_restart_callback(update: Dict[str, Any]) -> bool:
         notifier.tg_send_error("Loop callback routing", e)
         return False
 
-def poll_telegram_updates():
-    """Récupère et distribue les mises à jour de Telegram. C'est le cœur de la réactivité."""
-    if not hasattr(poll_telegram_updates, "_last_cb_id"):
-        poll_telegram_updates._last_cb_id = None
+def _tg_long_poll_seconds() -> int:
+    """Durée du long polling getUpdates (bornée à 25–50 s)."""
+    try:
+        v = int(float(database.get_setting('TG_LONG_POLL_SECONDS', '30')))
+    except Exception:
+        v = 30
+    return max(25, min(50, v))
+
+
+# Commandes lourdes exécutées par tg_workers (le thread d'écoute ne bloque plus)
+_HEAVY_CALLBACKS = {
+    "get_stats": "stats", "list_positions": "positions", "equity_back": "stats",
+    "signals_6h": "signals", "ping": "diagnostic", "backup_dropbox": "backup",
+}
+_HEAVY_CALLBACK_PREFIXES = {"stats:": "stats", "signals_page:": "signals"}
+_HEAVY_COMMANDS = {"/stats": "stats", "/debug": "diagnostic", "/lastscan": "scan"}
+
+
+def _heavy_category(upd: Dict[str, Any]) -> Optional[str]:
+    if 'callback_query' in upd:
+        data = str((upd['callback_query'] or {}).get('data') or '')
+        if data in _HEAVY_CALLBACKS:
+            return _HEAVY_CALLBACKS[data]
+        for prefix, category in _HEAVY_CALLBACK_PREFIXES.items():
+            if data.startswith(prefix):
+                return category
+        return None
+    if 'message' in upd:
+        text = str((upd['message'] or {}).get('text') or '').strip().lower()
+        return _HEAVY_COMMANDS.get(text.split()[0] if text else "")
+    return None
+
+
+def _dispatch_telegram_update(upd: Dict[str, Any]):
+    # Routage prioritaire (OFS:, signaux, restart...) déjà géré côté notifier
+    if route_inline_restart_callback(upd):
+        return
+
+    if 'callback_query' in upd:
+        process_callback_query(upd['callback_query'])
+    elif 'message' in upd:
+        process_message(upd['message'])
+
+
+def handle_telegram_update(upd: Dict[str, Any]):
+    """Distribue UN update Telegram (commun au long polling et au mode webhook)."""
+    if not hasattr(handle_telegram_update, "_last_cb_id"):
+        handle_telegram_update._last_cb_id = None
 
     global _last_update_id
-    updates = notifier.tg_get_updates(_last_update_id + 1 if _last_update_id else None)
+    _last_update_id = upd.get("update_id", _last_update_id)
+    try:
+        # Sauvegarde l’offset courant pour un redémarrage propre
+        if _last_update_id is not None:
+            database.set_setting('LAST_TELEGRAM_UPDATE_ID', str(int(_last_update_id)))
+    except Exception:
+        pass
+
+    if 'callback_query' in upd:
+        cb = upd['callback_query']
+        cb_id = cb.get('id')
+        if cb_id and cb_id == handle_telegram_update._last_cb_id:
+            return
+        handle_telegram_update._last_cb_id = cb_id
+
+    category = _heavy_category(upd)
+    if category is None:
+        # Traitement synchrone: le handler répond lui-même (toasts restart, etc.)
+        _dispatch_telegram_update(upd)
+        return
+
+    if 'callback_query' in upd:
+        # Accusé de réception immédiat avant la file des workers
+        notifier.tg_answer_callback_query(upd['callback_query'].get('id'), "")
+        key = ("cb", upd['callback_query'].get('data'))
+    else:
+        key = ("cmd", str(upd['message'].get('text') or '').strip().lower())
+    status = tg_workers.submit(key, category, _dispatch_telegram_update, upd)
+    if status == "rejected":
+        notifier.tg_send("⏳ Trop de commandes en cours, réessayez dans un instant.")
+
+
+def poll_telegram_updates(long_poll_timeout: int = 1):
+    """Récupère et distribue les mises à jour de Telegram. C'est le cœur de la réactivité."""
+    updates = notifier.tg_get_updates(_last_update_id + 1 if _last_update_id else None,
+                                      long_poll_timeout=long_poll_timeout)
     for upd in updates:
-        _last_update_id = upd.get("update_id", _last_update_id)
-        try:
-            # Sauvegarde l’offset courant pour un redémarrage propre
-            if _last_update_id is not None:
-                database.set_setting('LAST_TELEGRAM_UPDATE_ID', str(int(_last_update_id)))
-        except Exception:
-            pass
+        handle_telegram_update(upd)
+    return len(updates)
 
-        # Routage prioritaire (OFS:, signaux, restart...) déjà géré côté notifier
-        if route_inline_restart_callback(upd):
-            continue
 
-        if 'callback_query' in upd:
-            cb = upd['callback_query']
-            cb_id = cb.get('id')
-            if cb_id and cb_id == poll_telegram_updates._last_cb_id:
-                continue
-            poll_telegram_updates._last_cb_id = cb_id
-            process_callback_query(cb)
-        elif 'message' in upd:
-            process_message(upd['message'])
+def _webhook_update(upd: Dict[str, Any]):
+    handle_telegram_update(upd)
+    check_restart_request()
+
 
-            
 def telegram_listener_loop():
-    """Thread dédié qui exécute la boucle de polling Telegram."""
+    """
+    Thread dédié à l'écoute Telegram.
+    Long polling: la requête getUpdates reste ouverte jusqu'à l'arrivée d'un update
+    (ou TG_LONG_POLL_SECONDS), donc ~2 requêtes/min au repos et réponse immédiate.
+    Mode webhook (TG_WEBHOOK_MODE=true): serveur local, plus aucun getUpdates.
+    """
     print("🤖 Thread Telegram démarré.")
+    if tg_webhook.is_enabled():
+        declared = not tg_webhook.WEBHOOK_PUBLIC_URL  # sans URL publique: webhook déclaré hors du bot
+        for attempt in range(3 if tg_webhook.WEBHOOK_PUBLIC_URL else 0):
+            if notifier.tg_set_webhook(tg_webhook.WEBHOOK_PUBLIC_URL, tg_webhook.WEBHOOK_SECRET or None):
+                print(f"🌐 Webhook Telegram déclaré: {tg_webhook.WEBHOOK_PUBLIC_URL}")
+                declared = True
+                break
+            time.sleep(2 * (attempt + 1))
+        if not declared:
+            # Aucun update ne serait poussé: le bot deviendrait sourd
+            print("❌ setWebhook Telegram refusé après 3 essais.")
+        elif tg_webhook.start(_webhook_update) is not None:
+            return
+        print("↩️ Repli sur le long polling Telegram.")
+
+    # Un webhook resté déclaré ferait échouer getUpdates (409)
+    notifier.tg_delete_webhook()
     while True:
         try:
             # ← vérifie en tête de boucle si un redémarrage a été demandé
             check_restart_request()
 
-            poll_telegram_updates()
-            check_scheduled_reports()
-            time.sleep(0.5)
+            t0 = time.time()
+            n = poll_telegram_updates(long_poll_timeout=_tg_long_poll_seconds())
+            # Retour immédiat sans update = erreur réseau/HTTP → petite pause anti-boucle
+            if n == 0 and time.time() - t0 < 1.0:
+                time.sleep(2)
         except Exception as e:
             print(f"Erreur dans le thread Telegram: {e}")
             time.sleep(5)
 
 
-def trading_engine_loop(ex: ccxt.Exchange, universe: List[str]):
+def scheduled_reports_loop():
+    """Thread minuteur des rapports automatiques (découplé de l'écoute Telegram)."""
+    print("🗓️ Thread rapports programmés démarré.")
+    while True:
+        try:
+            check_scheduled_reports()
+        except Exception as e:
+            print(f"Erreur dans le thread rapports: {e}")
+        time.sleep(max(10, int(os.getenv("REPORTS_CHECK_SECONDS", "30"))))
+
+
+def trading_engine_loop(ex: ccxt.Exchange, universe: List[str], max_cycles: Optional[int] = None,
+                        on_cycle=None, now_fn=None, on_scan=None):
+    """
+    Boucle de trading. max_cycles/on_cycle/now_fn: bornes, rappel par cycle et horloge
+    injectée (bancs fake_exchange, rejeu traffic_recorder). on_scan(symbol, signal):
+    rappel après chaque detect_signal (latence clôture → signal des bancs).
+    """
     print("📈 Thread Trading démarré.")
     last_hour = -1
     last_day = -1
     current_size = len(universe)
+    cycles = 0
+    tf_ms = int(ccxt.Exchange.parse_timeframe(TIMEFRAME) * 1000)
 
-    while True:
+    while max_cycles is None or cycles < max_cycles:
         try:
             check_restart_request()
             
             with _lock: is_paused = _paused
             if is_paused:
+                # Un cycle en pause compte pour max_cycles (sinon les bancs bornés tournent sans fin)
+                cycles += 1
                 print("   -> (Pause)"); time.sleep(LOOP_DELAY); continue
 
-            try:
-                live_equity = float(trader.get_portfolio_equity_usdt(ex))
-                if live_equity > 0.0:
-                    database.set_setting('CURRENT_BALANCE_USDT', f"{live_equity:.6f}")
-            except Exception:
-                pass
+            loop_profiler.begin_cycle()
+            traffic_recorder.mark("cycle", universe=universe)
 
-            now_utc = datetime.now(timezone.utc)
+            with loop_profiler.phase("equity"):
+                try:
+                    live_equity = float(trader.get_portfolio_equity_usdt(ex))
+                    if live_equity > 0.0:
+                        database.set_setting('CURRENT_BALANCE_USDT', f"{live_equity:.6f}")
+                except Exception:
+                    pass
+
+            now_utc = now_fn() if now_fn is not None else datetime.now(timezone.utc)
             curr_hour = now_utc.hour
             curr_day = now_utc.day
             
             # ✅ MODIFICATION 1 : Market Regime Detection (1x par heure)
             if curr_hour != last_hour:
-                try:
-                    regime = trader.detect_market_regime(ex)
-                    trader.adapt_strategy_to_regime(regime)
-                    print(f"🌐 Market Regime détecté : {regime}")
-                except Exception as e:
-                    print(f"⚠️ Erreur Market Regime : {e}")
-
-            try:
-                desired_size = int(database.get_setting('UNIVERSE_SIZE', UNIVERSE_SIZE))
-            except Exception:
-                desired_size = UNIVERSE_SIZE
-            if desired_size != current_size or not universe:
-                new_universe = build_universe(ex)
-                if new_universe:
-                    universe = new_universe[:desired_size]
-                    current_size = desired_size
-                    print(f"🔁 Univers mis à jour immédiatement ({len(universe)} paires).")
+                with loop_profiler.phase("regime"):
                     try:
-                        notifier.send_main_menu(_paused)
-                    except Exception:
-                        pass
+                        regime = trader.detect_market_regime(ex)
+                        trader.adapt_strategy_to_regime(regime)
+                        print(f"🌐 Market Regime détecté : {regime}")
+                    except Exception as e:
+                        print(f"⚠️ Erreur Market Regime : {e}")
 
-            if curr_day != last_day:
+            with loop_profiler.phase("universe"):
                 try:
-                    new_universe = utils.get_universe_by_market_cap(ex, current_size)
+                    desired_size = int(database.get_setting('UNIVERSE_SIZE', UNIVERSE_SIZE))
+                except Exception:
+                    desired_size = UNIVERSE_SIZE
+                if desired_size != current_size or not universe:
+                    new_universe = build_universe(ex)
                     if new_universe:
-                        universe = new_universe[:current_size]
-                        print(f"🔁 Univers rafraîchi ({len(universe)} paires).")
-                except Exception as e:
-                    print(f"Refresh univers échoué — on conserve l'existant: {e}")
-                last_day = curr_day
+                        universe = new_universe[:desired_size]
+                        current_size = desired_size
+                        print(f"🔁 Univers mis à jour immédiatement ({len(universe)} paires).")
+                        try:
+                            notifier.send_main_menu(_paused)
+                        except Exception:
+                            pass
+
+                # Rafraîchissement quotidien en arrière-plan ; adopté au cycle qui suit sa fin
+                if curr_day != last_day:
+                    if not universe_cache.is_fresh("volume", current_size):
+                        universe_cache.refresh_async(ex, current_size)
+                    last_day = curr_day
+                refreshed = universe_cache.take_refreshed("volume", current_size)
+                if refreshed:
+                    universe = refreshed[:current_size]
+                    print(f"🔁 Univers rafraîchi ({len(universe)} paires).")
 
             if curr_hour != last_hour:
-                select_and_execute_best_pending_signal(ex)
+                with loop_profiler.phase("execute_pending"):
+                    select_and_execute_best_pending_signal(ex)
                 last_hour = curr_hour
 
-            check_scheduled_reports()
             cleanup_recent_signals()
-            trader.manage_open_positions(ex)
+            with loop_profiler.phase("manage_positions"):
+                trader.manage_open_positions(ex)
 
             from state import set_pending_signal, get_pending_signals
             
-            print(f"--- Scan de {len(universe)} paires ---")
+            # Symboles illiquides (spread/volume hors seuils) exclus du scan
+            with loop_profiler.phase("liquidity"):
+                liquidity.refresh(ex, universe)
+                scan_universe = liquidity.filter_liquid(universe)
+
+            # Symboles proches d'un contact BB20/BB80 d'abord, les lointains moins souvent
+            now_ms = int(now_utc.timestamp() * 1000)
+            scan_list = scan_priority.select(scan_universe, now_ms, tf_ms)
+            skipped_illiquid = len(universe) - len(scan_universe)
+            print(f"--- Scan de {len(scan_list)}/{len(universe)} paires"
+                  f"{f' ({skipped_illiquid} illiquides exclues)' if skipped_illiquid else ''} ---")
             signals_found_this_scan = 0
+            scan_t0 = time.perf_counter()
             
-            for symbol in universe:
+            for symbol in scan_list:
                 df = utils.fetch_and_prepare_df(ex, symbol, TIMEFRAME)
                 if df is None: continue
+                scan_priority.record(symbol, df, now_ms, tf_ms)
+                correlation.record(symbol, df, tf_ms)
 
                 signal = trader.detect_signal(symbol, df)
+                if on_scan is not None:
+                    on_scan(symbol, signal)
                 if signal:
                     signals_found_this_scan += 1
                     
@@ -1355,11 +1585,18 @@ def trading_engine_loop(ex: ccxt.Exchange, universe: List[str]):
                     if not any(s['symbol'] == symbol and s['timestamp'] > time.time() - 3600 for s in _recent_signals):
                         _recent_signals.append({'timestamp': time.time(), 'symbol': symbol, 'signal': signal})
 
+            loop_profiler.record_phase("scan", time.perf_counter() - scan_t0)
             print(f"--- Scan terminé : {signals_found_this_scan} signal(s) détecté(s) ---\n")
             
+            loop_profiler.end_cycle()
+            cycles += 1
+            if on_cycle is not None:
+                on_cycle(cycles)
             time.sleep(LOOP_DELAY)
 
         except Exception:
+            loop_profiler.end_cycle()
+            cycles += 1
             err = traceback.format_exc()
             print(err); notifier.tg_send_error("Erreur Trading", err); time.sleep(15)
 
@@ -1369,11 +1606,12 @@ def main():
     ex = create_exchange()
 
     try:
-        trader.sync_positions_with_exchange(ex)
+        sync_coordinator.request_sync(ex).result(timeout=120)
     except Exception as e:
         notifier.tg_send_error("Sync positions au démarrage", e)
     
     start_live_sync(ex)
+    perf_metrics.start_exporter()
     
     if not database.get_setting('STRATEGY_MODE'):
         database.set_setting('STRATEGY_MODE', 'NORMAL')
@@ -1406,9 +1644,11 @@ def main():
     print(f"Univers de trading chargé avec {len(universe)} paires.")
 
     telegram_thread = threading.Thread(target=telegram_listener_loop, daemon=True)
+    reports_thread = threading.Thread(target=scheduled_reports_loop, daemon=True)
     trading_thread = threading.Thread(target=trading_engine_loop, args=(ex, universe), daemon=True)
 
     telegram_thread.start()
+    reports_thread.start()
     trading_thread.start()
     
     try:
@@ -2,24 +2,18 @@
 import os
 import time
 import html
-import requests
 import io
+import threading
+from collections import OrderedDict
+import http_pool
+import tg_outbox
+import price_service
 from typing import List, Dict, Any, Optional
 import reporting
 import database
 import trader
 import charting
 
-# ============================================================================
-# ⚡ CACHE PRIX (après les imports, avant les fonctions)
-# ============================================================================
-
-import time as _time_module  # Import explicite pour le cache
-
-# Cache global : {symbol: (price, timestamp)}
-_PRICE_CACHE = {}
-_PRICE_CACHE_TTL = 30  # secondes
-
 # ============================================================================
 # ⚡ PAGINATION STATE (après les imports et cache)
 # ============================================================================
@@ -35,8 +29,63 @@ TG_ALERTS_CHAT_ID = os.getenv("TELEGRAM_ALERTS_CHAT_ID", "")
 
 def _escape(text: str) -> str: return html.escape(str(text))
 
-def tg_send(text: str, reply_markup: Optional[Dict] = None, chat_id: Optional[str] = None):
-    """Fonction principale d'envoi de message texte."""
+# ============================================================================
+# ⚡ OUTBOX ASYNCHRONE (tg_send / tg_send_with_photo ne bloquent plus l'appelant)
+# ============================================================================
+
+TG_OUTBOX_ENABLED = os.getenv("TG_OUTBOX_ENABLED", "true").lower() in ("1", "true", "yes")
+
+
+def _tg_deliver(kind: str, payload: Dict[str, Any], files: Optional[Dict[str, Any]] = None):
+    """Envoi effectif (thread outbox). Retourne (ok, retry_after)."""
+    if kind == "photo":
+        try:
+            files["photo"][1].seek(0)
+        except Exception:
+            pass
+        r = http_pool.telegram().post(f"{TELEGRAM_API}/sendPhoto", data=payload, files=files, timeout=20)
+    else:
+        r = http_pool.telegram().post(f"{TELEGRAM_API}/sendMessage", json=payload, timeout=10)
+
+    if r.status_code == 429:
+        try:
+            retry_after = float(((r.json() or {}).get("parameters") or {}).get("retry_after", 1))
+        except Exception:
+            retry_after = 1.0
+        return False, retry_after
+
+    if not r.ok and kind == "photo":
+        # Repli: la légende seule (comme l'ancien comportement synchrone)
+        print(f"Erreur d'envoi de photo Telegram: HTTP {r.status_code}")
+        fallback = {"chat_id": payload.get("chat_id"), "text": f"⚠️ Erreur de graphique\n{payload.get('caption', '')}",
+                    "parse_mode": "HTML"}
+        r = http_pool.telegram().post(f"{TELEGRAM_API}/sendMessage", json=fallback, timeout=10)
+    elif not r.ok:
+        print(f"Erreur d'envoi Telegram: HTTP {r.status_code} {r.text[:200]}")
+    return bool(r.ok), None
+
+
+_OUTBOX = tg_outbox.Outbox(_tg_deliver)
+
+
+def _default_priority(txt: str, reply_markup: Optional[Dict]) -> int:
+    if reply_markup or txt.startswith(("❌", "⚠️ Erreur", "🚨")):
+        return tg_outbox.PRIORITY_HIGH
+    return tg_outbox.PRIORITY_NORMAL
+
+
+def outbox_stats() -> Dict[str, Any]:
+    return _OUTBOX.get_stats()
+
+
+def outbox_flush(timeout: float = 5.0) -> bool:
+    return _OUTBOX.flush(timeout=timeout)
+
+
+def tg_send(text: str, reply_markup: Optional[Dict] = None, chat_id: Optional[str] = None,
+            priority: Optional[str] = None):
+    """Fonction principale d'envoi de message texte (non bloquante via l'outbox).
+    priority: 'high' | 'normal' | 'low' (défaut: déduit du contenu)."""
     target_chat_id = chat_id or TG_CHAT_ID
     if not TG_TOKEN or not target_chat_id:
         return
@@ -61,7 +110,12 @@ def tg_send(text: str, reply_markup: Optional[Dict] = None, chat_id: Optional[st
         payload = {"chat_id": target_chat_id, "text": txt, "parse_mode": "HTML"}
         if reply_markup:
             payload['reply_markup'] = reply_markup
-        requests.post(f"{TELEGRAM_API}/sendMessage", json=payload, timeout=10)
+        if TG_OUTBOX_ENABLED:
+            prio = tg_outbox.parse_priority(priority) if priority else _default_priority(txt, reply_markup)
+            # Les messages avec clavier ne sont jamais fusionnés
+            _OUTBOX.put("text", payload, priority=prio, mergeable=not reply_markup)
+            return
+        http_pool.telegram().post(f"{TELEGRAM_API}/sendMessage", json=payload, timeout=10)
     except Exception as e:
         print(f"Erreur d'envoi Telegram: {e}")
 
@@ -79,19 +133,30 @@ def tg_edit_message_text(text: str, chat_id: str, message_id: int, reply_markup:
         }
         if reply_markup:
             payload["reply_markup"] = reply_markup
-        requests.post(f"{TELEGRAM_API}/editMessageText", json=payload, timeout=10)
+        http_pool.telegram().post(f"{TELEGRAM_API}/editMessageText", json=payload, timeout=10)
     except Exception as e:
         print(f"Erreur editMessageText: {e}")
         
+_ACKED_CALLBACKS: "OrderedDict[str, float]" = OrderedDict()
+_ACKED_LOCK = threading.Lock()
+
+
 def tg_answer_callback_query(callback_query_id: str, text: str = ""):
-    """Accuse réception d'un clic sur un bouton inline Telegram (évite l'impression que rien ne se passe)."""
+    """Accuse réception d'un clic sur un bouton inline Telegram (évite l'impression que rien ne se passe).
+    Un callback déjà acquitté sans texte (par le thread d'écoute) n'est pas ré-acquitté."""
     if not TG_TOKEN or not callback_query_id:
         return
+    with _ACKED_LOCK:
+        if not text and callback_query_id in _ACKED_CALLBACKS:
+            return
+        _ACKED_CALLBACKS[callback_query_id] = time.time()
+        while len(_ACKED_CALLBACKS) > 256:
+            _ACKED_CALLBACKS.popitem(last=False)
     try:
         payload = {"callback_query_id": callback_query_id}
         if text:
             payload["text"] = text
-        requests.post(f"{TELEGRAM_API}/answerCallbackQuery", json=payload, timeout=10)
+        http_pool.telegram().post(f"{TELEGRAM_API}/answerCallbackQuery", json=payload, timeout=10)
     except Exception as e:
         print(f"Erreur answerCallbackQuery: {e}")
 
@@ -313,7 +378,7 @@ def send_mode_message(is_testnet: bool, is_paper: bool):
                 "parse_mode": "HTML",
                 "reply_markup": keyboard
             }
-            r = requests.post(f"{TELEGRAM_API}/editMessageText", json=payload_edit, timeout=10)
+            r = http_pool.telegram().post(f"{TELEGRAM_API}/editMessageText", json=payload_edit, timeout=10)
             data = r.json()
             if data.get("ok"):
                 return
@@ -322,7 +387,7 @@ def send_mode_message(is_testnet: bool, is_paper: bool):
 
     try:
         payload_send = {"chat_id": TG_CHAT_ID, "text": text, "parse_mode": "HTML", "reply_markup": keyboard}
-        r = requests.post(f"{TELEGRAM_API}/sendMessage", json=payload_send, timeout=10)
+        r = http_pool.telegram().post(f"{TELEGRAM_API}/sendMessage", json=payload_send, timeout=10)
         data = r.json()
         if data.get("ok"):
             database.set_setting('MAIN_MENU_MESSAGE_ID', str(data["result"]["message_id"]))
@@ -565,28 +630,58 @@ def tg_send_with_photo(photo_buffer: io.BytesIO, caption: str, chat_id: Optional
         if reply_markup:
             payload["reply_markup"] = reply_markup
 
-        requests.post(f"{TELEGRAM_API}/sendPhoto", data=payload, files=files, timeout=20)
+        if TG_OUTBOX_ENABLED:
+            _OUTBOX.put("photo", payload, files=files, priority=tg_outbox.PRIORITY_HIGH)
+            return
+        http_pool.telegram().post(f"{TELEGRAM_API}/sendPhoto", data=payload, files=files, timeout=20)
     except Exception as e:
         print(f"Erreur d'envoi de photo Telegram: {e}")
         tg_send(f"⚠️ Erreur de graphique\n{caption}", chat_id=target_chat_id)
 
 
-def tg_get_updates(offset: Optional[int] = None) -> List[Dict[str, Any]]:
-    """Récupère les mises à jour de Telegram."""
-    params = {"timeout": 1}
+def tg_get_updates(offset: Optional[int] = None, long_poll_timeout: int = 1) -> List[Dict[str, Any]]:
+    """Récupère les mises à jour de Telegram.
+    long_poll_timeout > 1: long polling (Telegram garde la requête ouverte jusqu'à
+    l'arrivée d'un update), sur une session dédiée pour ne pas bloquer le pool d'envoi."""
+    lp = max(0, int(long_poll_timeout))
+    params = {"timeout": lp}
     if offset:
         params["offset"] = offset
     try:
-        r = requests.get(f"{TELEGRAM_API}/getUpdates", params=params, timeout=5)
+        sess = http_pool.telegram_longpoll() if lp > 1 else http_pool.telegram()
+        r = sess.get(f"{TELEGRAM_API}/getUpdates", params=params, timeout=lp + 10)
         if r.status_code == 200:
             data = r.json()
             if data.get("ok"):
                 return data.get("result", [])
     except Exception as e:
         print(f"Erreur lors de la récupération des updates Telegram: {e}")
-        
+
     return []
 
+
+def tg_set_webhook(url: str, secret_token: Optional[str] = None) -> bool:
+    """Déclare l'URL publique du webhook (mode webhook). getUpdates est alors refusé par Telegram."""
+    payload = {"url": url, "allowed_updates": ["message", "callback_query"]}
+    if secret_token:
+        payload["secret_token"] = secret_token
+    try:
+        r = http_pool.telegram().post(f"{TELEGRAM_API}/setWebhook", json=payload, timeout=10)
+        return r.status_code == 200 and bool(r.json().get("ok"))
+    except Exception as e:
+        print(f"Erreur setWebhook Telegram: {e}")
+        return False
+
+
+def tg_delete_webhook() -> bool:
+    """Supprime un webhook éventuel (indispensable avant de repasser en long polling)."""
+    try:
+        r = http_pool.telegram().post(f"{TELEGRAM_API}/deleteWebhook", json={"drop_pending_updates": False}, timeout=10)
+        return r.status_code == 200 and bool(r.json().get("ok"))
+    except Exception as e:
+        print(f"Erreur deleteWebhook Telegram: {e}")
+        return False
+
 def set_risk_command(message: Dict[str, Any]):
     """Commande texte: /setrisk <nombre> — met à jour RISK_PER_TRADE_PERCENT (immédiat)."""
     try:
@@ -819,7 +914,7 @@ def handle_restart_callback(callback_query: Dict[str, Any]) -> None:
         message_id = message.get("message_id")
         if chat_id and message_id:
             try:
-                requests.post(
+                http_pool.telegram().post(
                     f"{TELEGRAM_API}/editMessageReplyMarkup",
                     json={
                         "chat_id": chat_id,
@@ -886,7 +981,7 @@ def handle_restart_cancel(callback_query: Dict[str, Any]) -> None:
             chat_id = (msg.get("chat") or {}).get("id")
             message_id = msg.get("message_id")
             if chat_id and message_id:
-                requests.post(
+                http_pool.telegram().post(
                     f"{TELEGRAM_API}/editMessageText",
                     json={
                         "chat_id": chat_id,
@@ -905,10 +1000,10 @@ def handle_restart_cancel(callback_query: Dict[str, Any]) -> None:
 def handle_backup_dropbox_callback(callback_query: Dict[str, Any]):
     """
     Handler pour le bouton "Backup Dropbox".
-    
+
     ACTIONS :
     1. Acknowledge le callback
-    2. Lance run_backup() en thread
+    2. Exécute run_backup() (appelé depuis un worker tg_workers, jamais depuis le thread d'écoute)
     3. Notifie résultat (succès/échec)
     """
     try:
@@ -916,58 +1011,51 @@ def handle_backup_dropbox_callback(callback_query: Dict[str, Any]):
         tg_answer_callback_query(callback_query.get('id'), "")
     except Exception:
         pass
-    
+
     # 2. Notification lancement
     tg_send("🔄 <b>Backup Dropbox en cours...</b>")
-    
-    # 3. Lancer backup en thread
-    import threading
-    
-    def _run_backup_thread():
-        """Thread worker pour exécuter le backup."""
-        try:
-            # Import dynamique pour éviter dépendance circulaire
-            import dropbox_backup
-            
-            # Exécuter le backup
-            success = dropbox_backup.run_backup()
-            
-            # Notification résultat
-            if success:
-                tg_send(
-                    "✅ <b>Backup Dropbox réussi !</b>\n\n"
-                    "📁 Fichiers sauvegardés :\n"
-                    "  • Base de données complète\n"
-                    "  • Export CSV trades\n"
-                    "  • Résumé statistiques\n\n"
-                    "☁️ Fichiers disponibles sur Dropbox"
-                )
-            else:
-                tg_send(
-                    "❌ <b>Backup Dropbox échoué</b>\n\n"
-                    "Vérifiez :\n"
-                    "  • Token Dropbox valide\n"
-                    "  • Connexion internet\n"
-                    "  • Logs pour détails"
-                )
-        
-        except Exception as e:
-            # Erreur critique
-            import traceback
-            error_details = str(e)[:200]
-            
+
+    try:
+        # Import dynamique pour éviter dépendance circulaire
+        import dropbox_backup
+
+        # Exécuter le backup
+        success = dropbox_backup.run_backup()
+
+        # Notification résultat
+        if success:
             tg_send(
-                f"❌ <b>Erreur Backup Dropbox</b>\n\n"
-                f"<code>{error_details}</code>\n\n"
-                f"Consultez les logs pour plus de détails"
+                "✅ <b>Backup Dropbox réussi !</b>\n\n"
+                "📁 Fichiers sauvegardés :\n"
+                "  • Base de données complète\n"
+                "  • Export CSV trades\n"
+                "  • Résumé statistiques\n\n"
+                "☁️ Fichiers disponibles sur Dropbox"
             )
-            
-            print(f"❌ Erreur backup thread: {e}")
-            traceback.print_exc()
-    
-    # Lancer le thread
-    backup_thread = threading.Thread(target=_run_backup_thread, daemon=True)
-    backup_thread.start()
+        else:
+            tg_send(
+                "❌ <b>Backup Dropbox échoué</b>\n\n"
+                "Vérifiez :\n"
+                "  • Token Dropbox valide\n"
+                "  • Connexion internet\n"
+                "  • Logs pour détails"
+            )
+
+    except Exception as e:
+        # Erreur critique
+        import traceback
+        error_details = str(e)[:200]
+
+        tg_send(
+            f"❌ <b>Erreur Backup Dropbox</b>\n\n"
+            f"<code>{error_details}</code>\n\n"
+            f"Consultez les logs pour plus de détails"
+        )
+
+        print(f"❌ Erreur backup: {e}")
+        traceback.print_exc()
+
+
 def try_handle_inline_callback(event: Any) -> bool:
     """
     Route Offset/Signaux/Restart/Stats/Backup + PAGINATION.
@@ -1353,7 +1441,7 @@ def handle_equity_back_callback(update: Dict[str, Any]) -> None:
 
         # Suppression du message (graphique + boutons) côté Telegram
         try:
-            requests.post(
+            http_pool.telegram().post(
                 f"{TELEGRAM_API}/deleteMessage",
                 data={"chat_id": chat_id, "message_id": message_id},
                 timeout=10,
@@ -1466,7 +1554,7 @@ def send_main_menu(is_paused: bool):
                 "parse_mode": "HTML",
                 "reply_markup": keyboard
             }
-            r = requests.post(f"{TELEGRAM_API}/editMessageText", json=payload_edit, timeout=10)
+            r = http_pool.telegram().post(f"{TELEGRAM_API}/editMessageText", json=payload_edit, timeout=10)
             data = r.json()
             if data.get("ok"):
                 return
@@ -1475,7 +1563,7 @@ def send_main_menu(is_paused: bool):
 
     try:
         payload_send = {"chat_id": TG_CHAT_ID, "text": text, "parse_mode": "HTML", "reply_markup": keyboard}
-        r = requests.post(f"{TELEGRAM_API}/sendMessage", json=payload_send, timeout=10)
+        r = http_pool.telegram().post(f"{TELEGRAM_API}/sendMessage", json=payload_send, timeout=10)
         data = r.json()
         if data.get("ok"):
             database.set_setting('MAIN_MENU_MESSAGE_ID', str(data["result"]["message_id"]))
@@ -1499,7 +1587,7 @@ def send_config_menu():
                 "parse_mode": "HTML",
                 "reply_markup": keyboard
             }
-            r = requests.post(f"{TELEGRAM_API}/editMessageText", json=payload_edit, timeout=10)
+            r = http_pool.telegram().post(f"{TELEGRAM_API}/editMessageText", json=payload_edit, timeout=10)
             data = r.json()
             if data.get("ok"):
                 return
@@ -1509,7 +1597,7 @@ def send_config_menu():
     # Sinon, envoyer puis mémoriser l'id (premier lancement)
     try:
         payload_send = {"chat_id": TG_CHAT_ID, "text": text, "parse_mode": "HTML", "reply_markup": keyboard}
-        r = requests.post(f"{TELEGRAM_API}/sendMessage", json=payload_send, timeout=10)
+        r = http_pool.telegram().post(f"{TELEGRAM_API}/sendMessage", json=payload_send, timeout=10)
         data = r.json()
         if data.get("ok"):
             database.set_setting('MAIN_MENU_MESSAGE_ID', str(data["result"]["message_id"]))
@@ -1534,7 +1622,7 @@ def send_strategy_menu(current_strategy: str):
                 "parse_mode": "HTML",
                 "reply_markup": keyboard
             }
-            r = requests.post(f"{TELEGRAM_API}/editMessageText", json=payload_edit, timeout=10)
+            r = http_pool.telegram().post(f"{TELEGRAM_API}/editMessageText", json=payload_edit, timeout=10)
             data = r.json()
             if data.get("ok"):
                 return
@@ -1543,7 +1631,7 @@ def send_strategy_menu(current_strategy: str):
 
     try:
         payload_send = {"chat_id": TG_CHAT_ID, "text": text, "parse_mode": "HTML", "reply_markup": keyboard}
-        r = requests.post(f"{TELEGRAM_API}/sendMessage", json=payload_send, timeout=10)
+        r = http_pool.telegram().post(f"{TELEGRAM_API}/sendMessage", json=payload_send, timeout=10)
         data = r.json()
         if data.get("ok"):
             database.set_setting('MAIN_MENU_MESSAGE_ID', str(data["result"]["message_id"]))
@@ -1596,7 +1684,7 @@ def send_report(title: str, trades: List[Dict[str, Any]], balance: Optional[floa
                 "parse_mode": "HTML",
                 "reply_markup": keyboard
             }
-            r = requests.post(f"{TELEGRAM_API}/editMessageText", json=payload_edit, timeout=10)
+            r = http_pool.telegram().post(f"{TELEGRAM_API}/editMessageText", json=payload_edit, timeout=10)
             data = r.json()
             if data.get("ok"):
                 return
@@ -1611,7 +1699,7 @@ def send_report(title: str, trades: List[Dict[str, Any]], balance: Optional[floa
             "parse_mode": "HTML",
             "reply_markup": keyboard
         }
-        r = requests.post(f"{TELEGRAM_API}/sendMessage", json=payload_send, timeout=10)
+        r = http_pool.telegram().post(f"{TELEGRAM_API}/sendMessage", json=payload_send, timeout=10)
         data = r.json()
         if data.get("ok"):
             database.set_setting('MAIN_MENU_MESSAGE_ID', str(data["result"]["message_id"]))
@@ -1835,7 +1923,7 @@ def format_open_positions(positions: List[Dict[str, Any]]):
     Affiche les positions ouvertes dans le message principal avec PNL.
     
     ⚡ OPTIMISATIONS :
-    - Cache prix 30s (_fetch_public_price)
+    - Prix publics chargés en UN fetch_tickers (price_service, cache 30s)
     - Helpers locaux pour éviter répétitions
     - Recherche robuste qty/price
     """
@@ -1889,6 +1977,12 @@ def format_open_positions(positions: List[Dict[str, Any]]):
         except Exception:
             return None, None
 
+    # Un seul appel groupé pour tous les symboles affichés
+    try:
+        price_service.warm([p.get('symbol') for p in positions if p.get('symbol')])
+    except Exception:
+        pass
+
     # --- Construction du message ---
     lines = ["<b>📊 Positions Ouvertes</b>\n"]
     
@@ -1920,90 +2014,8 @@ def format_open_positions(positions: List[Dict[str, Any]]):
     edit_main(message, keyboard)
 
 def _fetch_public_price(sym: str) -> Optional[float]:
-    """
-    Tentative de récupération d'un prix 'last' public (cache 30s).
-    
-    ⚡ OPTIMISATION : Cache pour éviter appels API répétés.
-    """
-    try:
-        from importlib import import_module
-        
-        # ✅ VÉRIFIER CACHE D'ABORD
-        now = _time_module.time()
-        
-        if sym in _PRICE_CACHE:
-            cached_price, cached_time = _PRICE_CACHE[sym]
-            if now - cached_time < _PRICE_CACHE_TTL:
-                return cached_price
-        
-        # Cache expiré ou absent → Appel API
-        ccxt = import_module("ccxt")
-        exchs = []
-        
-        # Instances publiques, rate-limit ON, type swap par défaut
-        try:
-            exchs.append(ccxt.bybit({"enableRateLimit": True, "options": {"defaultType": "swap"}}))
-        except Exception:
-            pass
-        try:
-            exchs.append(ccxt.bitget({"enableRateLimit": True, "options": {"defaultType": "swap"}}))
-        except Exception:
-            pass
-        
-        if not exchs:
-            _PRICE_CACHE[sym] = (None, now)
-            return None
-
-        def _normalize_candidates(s: str) -> List[str]:
-            """Génère plusieurs variantes de symbole compatibles CCXT."""
-            if not s:
-                return []
-            s = s.strip()
-            cands = [s]
-            base = ""
-            if "/" in s:
-                base = s.split("/")[0]
-            elif s.endswith("USDT"):
-                base = s[:-4]
-            base = base or s
-            cands.append(f"{base}/USDT:USDT")
-            cands.append(f"{base}/USDT")
-            seen, out = set(), []
-            for c in cands:
-                if c and c not in seen:
-                    seen.add(c)
-                    out.append(c)
-            return out
-
-        def _to_float(x, default=None):
-            try:
-                if x is None:
-                    return default
-                return float(x)
-            except Exception:
-                return default
-
-        # Essayer tous les candidats
-        for candidate in _normalize_candidates(sym):
-            for ex in exchs:
-                try:
-                    t = ex.fetch_ticker(candidate)
-                    last = t.get("last") or t.get("close") or t.get("info", {}).get("lastPrice")
-                    last_f = _to_float(last, None)
-                    if last_f is not None:
-                        # ✅ METTRE EN CACHE
-                        _PRICE_CACHE[sym] = (last_f, now)
-                        return last_f
-                except Exception:
-                    continue
-        
-        # Aucun prix trouvé
-        _PRICE_CACHE[sym] = (None, now)
-        return None
-    
-    except Exception:
-        _PRICE_CACHE[sym] = (None, _time_module.time())
-        return None
+    """Prix 'last' public via le service partagé (cache 30s commun avec le côté trading)."""
+    return price_service.get_price(sym)
 
 
 def format_synced_open_positions(exchange_positions: List[Dict], db_positions: List[Dict]):
@@ -2126,7 +2138,7 @@ def edit_main(text: str, reply_markup: Optional[Dict] = None) -> bool:
             }
             if reply_markup:
                 payload["reply_markup"] = reply_markup
-            r = requests.post(f"{TELEGRAM_API}/editMessageText", json=payload, timeout=10)
+            r = http_pool.telegram().post(f"{TELEGRAM_API}/editMessageText", json=payload, timeout=10)
             data = r.json()
             if data.get("ok"):
                 return True
@@ -2138,7 +2150,7 @@ def edit_main(text: str, reply_markup: Optional[Dict] = None) -> bool:
         payload_send = {"chat_id": TG_CHAT_ID, "text": text, "parse_mode": "HTML"}
         if reply_markup:
             payload_send["reply_markup"] = reply_markup
-        r = requests.post(f"{TELEGRAM_API}/sendMessage", json=payload_send, timeout=10)
+        r = http_pool.telegram().post(f"{TELEGRAM_API}/sendMessage", json=payload_send, timeout=10)
         data = r.json()
         if data.get("ok"):
             database.set_setting('MAIN_MENU_MESSAGE_ID', str(data["result"]["message_id"]))
@@ -2155,6 +2167,6 @@ def tg_send_error(text: str, ex: Optional[BaseException] = None, chat_id: Option
     target_chat = (os.getenv("TELEGRAM_ALERTS_CHAT_ID", "") or chat_id or TG_ALERTS_CHAT_ID or TG_CHAT_ID)
     if not target_chat:
         return
-    tg_send(f"{prefix} : {_escape(text)}{_escape(details)}", chat_id=target_chat)
+    tg_send(f"{prefix} : {_escape(text)}{_escape(details)}", chat_id=target_chat, priority="high")
 
 
@@ -0,0 +1,554 @@
+# Fichier: optimize.py
+"""
+Optimisation des paramètres Darwin (lus via database.get_setting) sur le moteur
+de backtest: grille, tirage aléatoire ou bayésien (TPE simplifié), en parallèle
+sur un ProcessPoolExecutor, avec découpage walk-forward train/test.
+
+- Les indicateurs sont préparés une seule fois (`prepare`) et écrits en .npy ;
+  chaque worker les ouvre en memmap (lecture seule, pages partagées entre process).
+- Les jeux de paramètres sont regroupés par clé de détection (tolérance de
+  contact BB): les signaux d'un groupe sont détectés une fois, avec offsets SL/TP
+  nuls et MIN_RR=0 (backtest.DETECTION_NEUTRAL). Par jeu, backtest.reprice_signals
+  réapplique offsets et seuil RR (calcul exact, quelques µs par signal), puis seule
+  la boucle portefeuille est rejouée par fenêtre. SL_OFFSET_PCT, TP_OFFSET_PCT,
+  MIN_RR et les paramètres « portefeuille » (AVOID_HOURS_*…) ne coûtent donc
+  presque rien.
+- SL_OFFSET_PCT est balayé dans l'unité stockée: une fraction, comme l'écrit
+  l'éditeur Telegram et comme la lit adjust_sl_for_offset pour le SL d'entrée
+  (0.003 = 0,3 %). detect_signal lit la même clé en pourcentage ; le balayage
+  reproduit donc exactement le comportement live pour une valeur donnée.
+- Classement sur le score d'entraînement uniquement ; les colonnes test donnent la
+  tenue hors échantillon. Résultats: <BACKTEST_RESULTS_DIR>/sweep_<date>/results.csv
+  + walkforward.json.
+
+Usage:
+  python optimize.py prepare --timeframe 1h
+  python optimize.py sweep --mode random --n 500 --folds 4 --train-days 180 --test-days 60
+  python optimize.py sweep --mode bayes --n 300 --space space.json --objective profit_factor
+"""
+import os
+import sys
+import csv
+import json
+import math
+import time
+import random
+import argparse
+import itertools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+
+import database
+import backtest
+
+CACHE_DIR = os.getenv("BACKTEST_CACHE_DIR", os.path.join(database.DB_BASE_DIR, "backtest_cache"))
+
+# Paramètres de contact de detect_signal: une combinaison distincte = une détection complète
+# (SL_OFFSET_PCT / TP_OFFSET_PCT / MIN_RR sont réappliqués par backtest.reprice_signals)
+DETECTION_KEYS = ("BB_CONTACT_TOLERANCE_PCT", "BB_CONTACT_USE_ATR", "BB_CONTACT_ATR_K")
+
+# Liste = valeurs discrètes ; dict {min, max[, step][, int]} = intervalle
+DEFAULT_SPACE: Dict[str, Any] = {
+    "BB_CONTACT_TOLERANCE_PCT": [0.1, 0.2, 0.3, 0.5],
+    "BB_CONTACT_ATR_K": [0.2, 0.3, 0.5],
+    "SL_OFFSET_PCT": [0.002, 0.003, 0.005],  # fraction (unité stockée), cf. docstring
+    "TP_OFFSET_PCT": [0.2, 0.3, 0.5],
+    "MIN_RR": [2.5, 2.8, 3.2],
+    "AVOID_HOURS_START": [0, 2],
+    "AVOID_HOURS_END": [6, 8],
+}
+
+METRICS = ("total_trades", "win_rate", "total_pnl", "profit_factor", "return_pct",
+           "max_drawdown_percent", "sharpe_ratio")
+
+
+# ==============================================================================
+# ESPACE DE RECHERCHE
+# ==============================================================================
+
+class _Dim:
+    """Une dimension de l'espace, encodée sur [0, 1] pour le tirage bayésien."""
+
+    def __init__(self, key: str, spec: Any):
+        self.key = key
+        if isinstance(spec, dict):
+            self.choices = None
+            self.lo, self.hi = float(spec["min"]), float(spec["max"])
+            self.step = float(spec["step"]) if spec.get("step") else None
+            self.is_int = bool(spec.get("int", False))
+        else:
+            self.choices = list(spec)
+
+    def grid(self) -> List[Any]:
+        if self.choices is not None:
+            return self.choices
+        if not self.step:
+            raise ValueError(f"{self.key}: 'step' requis pour une grille")
+        vals = np.arange(self.lo, self.hi + self.step / 2, self.step)
+        return [int(round(v)) if self.is_int else round(float(v), 10) for v in vals]
+
+    def sample(self, rng: random.Random) -> Any:
+        if self.choices is not None:
+            return rng.choice(self.choices)
+        return self.decode(rng.random())
+
+    def encode(self, value: Any) -> float:
+        if self.choices is not None:
+            n = len(self.choices)
+            return self.choices.index(value) / (n - 1) if n > 1 else 0.0
+        return (float(value) - self.lo) / (self.hi - self.lo) if self.hi > self.lo else 0.0
+
+    def decode(self, x: float) -> Any:
+        x = min(1.0, max(0.0, float(x)))
+        if self.choices is not None:
+            return self.choices[int(round(x * (len(self.choices) - 1)))]
+        v = self.lo + x * (self.hi - self.lo)
+        if self.step:
+            v = self.lo + round((v - self.lo) / self.step) * self.step
+        return int(round(v)) if self.is_int else round(v, 10)
+
+
+def _param_key(params: Dict[str, Any]) -> str:
+    return json.dumps(params, sort_keys=True, default=str)
+
+
+def grid_samples(space: Dict[str, Any]) -> List[Dict[str, Any]]:
+    dims = [_Dim(k, v) for k, v in space.items()]
+    return [dict(zip([d.key for d in dims], combo)) for combo in itertools.product(*[d.grid() for d in dims])]
+
+
+def random_samples(space: Dict[str, Any], n: int, rng: random.Random) -> List[Dict[str, Any]]:
+    dims = [_Dim(k, v) for k, v in space.items()]
+    out, seen = [], set()
+    for _ in range(n * 20):
+        p = {d.key: d.sample(rng) for d in dims}
+        if _param_key(p) not in seen:
+            seen.add(_param_key(p))
+            out.append(p)
+            if len(out) >= n:
+                break
+    return out
+
+
+class BayesSampler:
+    """
+    TPE simplifié: les jeux déjà évalués sont séparés en « bons » (quantile gamma)
+    et « autres » ; on tire des candidats autour des bons et on garde celui qui
+    maximise l(x)/g(x) (densités à noyau gaussien sur l'espace encodé [0, 1]).
+    """
+
+    def __init__(self, space: Dict[str, Any], rng: random.Random, n_startup: int = 20,
+                 gamma: float = 0.25, n_candidates: int = 64, bandwidth: float = 0.15):
+        self.dims = [_Dim(k, v) for k, v in space.items()]
+        self.rng = rng
+        self.np_rng = np.random.default_rng(rng.randrange(2 ** 32))
+        self.n_startup = n_startup
+        self.gamma = gamma
+        self.n_candidates = n_candidates
+        self.bandwidth = bandwidth
+        self._X: List[np.ndarray] = []
+        self._y: List[float] = []
+        self._seen: set = set()
+
+    def observe(self, params: Dict[str, Any], score: float) -> None:
+        self._X.append(np.array([d.encode(params[d.key]) for d in self.dims]))
+        self._y.append(float(score))
+        self._seen.add(_param_key(params))
+
+    def _kde(self, cand: np.ndarray, pts: np.ndarray) -> np.ndarray:
+        d2 = ((cand[:, None, :] - pts[None, :, :]) ** 2).sum(axis=2)
+        return np.exp(-d2 / (2 * self.bandwidth ** 2)).mean(axis=1)
+
+    def suggest(self, k: int) -> List[Dict[str, Any]]:
+        out: List[Dict[str, Any]] = []
+        for _ in range(k):
+            p = None
+            if len(self._y) >= self.n_startup:
+                X, y = np.vstack(self._X), np.array(self._y)
+                order = np.argsort(-y)
+                n_good = max(1, int(math.ceil(self.gamma * len(y))))
+                good, bad = X[order[:n_good]], X[order[n_good:]]
+                if len(bad) == 0:
+                    bad = X
+                centers = good[self.np_rng.integers(len(good), size=self.n_candidates)]
+                cand = np.clip(centers + self.np_rng.normal(0, self.bandwidth, size=centers.shape), 0, 1)
+                ratio = self._kde(cand, good) / (self._kde(cand, bad) + 1e-12)
+                for idx in np.argsort(-ratio):
+                    q = {d.key: d.decode(x) for d, x in zip(self.dims, cand[idx])}
+                    if _param_key(q) not in self._seen:
+                        p = q
+                        break
+            if p is None:
+                for _ in range(50):
+                    q = {d.key: d.sample(self.rng) for d in self.dims}
+                    if _param_key(q) not in self._seen:
+                        p = q
+                        break
+            if p is None:
+                break
+            self._seen.add(_param_key(p))
+            out.append(p)
+        return out
+
+
+# ==============================================================================
+# WALK-FORWARD
+# ==============================================================================
+
+def walk_forward_windows(t0_ns: int, t1_ns: int, folds: int, train_days: float,
+                         test_days: float) -> List[Dict[str, Any]]:
+    """
+    Fenêtres glissantes ancrées sur la fin des données: chaque pli = train puis test
+    contigu ; les tests se suivent sans chevauchement. folds=0 → une fenêtre 'full'.
+    """
+    if folds <= 0:
+        return [{"fold": 0, "train": (t0_ns, t1_ns), "test": None}]
+    day = 86_400 * 1_000_000_000
+    train, test = int(train_days * day), int(test_days * day)
+    out = []
+    for f in range(folds):
+        test_end = t1_ns - (folds - 1 - f) * test
+        test_start = test_end - test
+        train_start = test_start - train
+        if train_start < t0_ns:
+            continue
+        out.append({"fold": f + 1, "train": (train_start, test_start - 1), "test": (test_start, test_end)})
+    if not out:
+        raise ValueError("Historique trop court pour ce découpage walk-forward")
+    return out
+
+
+def _task_windows(windows: List[Dict[str, Any]]) -> List[Tuple[str, int, int]]:
+    out = []
+    for w in windows:
+        out.append((f"f{w['fold']}_train", *w["train"]))
+        if w["test"]:
+            out.append((f"f{w['fold']}_test", *w["test"]))
+    return out
+
+
+# ==============================================================================
+# WORKERS
+# ==============================================================================
+
+_W: Dict[str, Any] = {}
+
+
+def _init_worker(cache_dir: str, symbols: Optional[List[str]], base_settings: Dict[str, Any],
+                 timeframe: str, sim_kwargs: Dict[str, Any], verbose: bool) -> None:
+    if not verbose:
+        sys.stdout = open(os.devnull, "w")
+    _W.update(
+        histories=backtest.load_history_cache(cache_dir, symbols),
+        base=base_settings,
+        timeframe=timeframe,
+        sim=sim_kwargs,
+        signals={},
+    )
+
+
+def _metrics(stats: Dict[str, Any]) -> Dict[str, Any]:
+    out = {k: stats.get(k, 0) for k in METRICS}
+    if out["profit_factor"] is None:
+        out["profit_factor"] = 0.0
+    return out
+
+
+def _group_signals(det_key: str, span: Tuple[int, int], params: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Signaux bruts du groupe, détectés sous DETECTION_NEUTRAL (cache local au
+    worker, 2 derniers groupes). L'overlay du jeu est rétabli en sortie.
+    """
+    cache = _W["signals"]
+    if det_key in cache:
+        return cache[det_key]
+    database.set_settings_overlay({**_W["base"], **params, **backtest.DETECTION_NEUTRAL}, snapshot=False)
+    try:
+        signals: List[Dict[str, Any]] = []
+        for hist in _W["histories"].values():
+            found, _ = backtest.detect_signals(hist, span[0], span[1])
+            signals.extend(found)
+    finally:
+        database.set_settings_overlay({**_W["base"], **params}, snapshot=False)
+    if len(cache) >= 2:
+        cache.pop(next(iter(cache)))
+    cache[det_key] = signals
+    return signals
+
+
+def _evaluate_group(task) -> List[Dict[str, Any]]:
+    det_key, sets, windows = task
+    span = (min(w[1] for w in windows), max(w[2] for w in windows))
+    out = []
+    try:
+        for set_id, params in sets:
+            database.set_settings_overlay({**_W["base"], **params}, snapshot=False)
+            signals = backtest.reprice_signals(_group_signals(det_key, span, params))
+            for name, start_ns, end_ns in windows:
+                bt = backtest.simulate(_W["histories"], signals, _W["timeframe"],
+                                       start_ns=start_ns, end_ns=end_ns, **_W["sim"])
+                out.append({"set_id": set_id, "window": name, **_metrics(backtest.summarize(bt))})
+    finally:
+        database.set_settings_overlay(None)
+    return out
+
+
+def _make_tasks(sets: List[Tuple[int, Dict[str, Any]]], windows, workers: int):
+    groups: Dict[str, List[Tuple[int, Dict[str, Any]]]] = {}
+    for set_id, params in sets:
+        det = _param_key({k: params[k] for k in DETECTION_KEYS if k in params})
+        groups.setdefault(det, []).append((set_id, params))
+    # Peu de groupes → on les découpe pour occuper tous les workers
+    per_group = max(1, workers // max(1, len(groups)))
+    tasks = []
+    for det, items in groups.items():
+        size = max(1, math.ceil(len(items) / per_group))
+        for i in range(0, len(items), size):
+            tasks.append((det, items[i:i + size], windows))
+    return tasks
+
+
+# ==============================================================================
+# SWEEP
+# ==============================================================================
+
+def _score(row: Dict[str, Any], objective: str, min_trades: int) -> float:
+    if row.get("total_trades", 0) < min_trades:
+        return -1e9
+    v = row.get(objective, 0) or 0
+    return float(min(v, 1e6)) if v != float("inf") else 1e6
+
+
+def prepare_cache(symbols: Optional[List[str]], timeframe: str, archive_dir: Optional[str] = None,
+                  cache_dir: Optional[str] = None) -> str:
+    """Indicateurs calculés une fois depuis l'archive OHLCV → cache .npy (memmap)."""
+    folder = os.path.join(cache_dir or CACHE_DIR, timeframe)
+    symbols = symbols or backtest.list_archived_symbols(timeframe, archive_dir)
+    histories = {}
+    for sym in symbols:
+        hist = backtest.load_history(sym, timeframe, archive_dir)
+        if hist is not None:
+            histories[sym] = hist
+    backtest.save_history_cache(histories, folder)
+    print(f"🗃️ Cache indicateurs: {len(histories)} symbole(s) → {folder}")
+    return folder
+
+
+def run_sweep(mode: str = "random", n: int = 200, space: Optional[Dict[str, Any]] = None,
+              symbols: Optional[List[str]] = None, timeframe: Optional[str] = None,
+              start=None, end=None, folds: int = 0, train_days: float = 180, test_days: float = 60,
+              objective: str = "return_pct", min_trades: int = 10, workers: Optional[int] = None,
+              fixed: Optional[Dict[str, Any]] = None, initial_balance: float = 1000.0,
+              fee_pct: float = backtest.DEFAULT_FEE_PCT, slippage_pct: float = backtest.DEFAULT_SLIPPAGE_PCT,
+              seed: int = 42, cache_dir: Optional[str] = None, archive_dir: Optional[str] = None,
+              out_dir: Optional[str] = None, verbose: bool = False) -> Dict[str, Any]:
+    t0 = time.perf_counter()
+    timeframe = timeframe or backtest.DEFAULT_TIMEFRAME
+    space = space or DEFAULT_SPACE
+    fixed = fixed or {}
+    workers = workers or int(os.getenv("BACKTEST_WORKERS", str(os.cpu_count() or 1)))
+    rng = random.Random(seed)
+
+    folder = os.path.join(cache_dir or CACHE_DIR, timeframe)
+    if not os.path.exists(os.path.join(folder, "manifest.json")):
+        prepare_cache(symbols, timeframe, archive_dir, cache_dir)
+    histories = backtest.load_history_cache(folder, symbols)
+    if not histories:
+        raise RuntimeError("Aucun historique en cache (archive OHLCV vide ?)")
+    t_first = min(int(h.ts[backtest.WINDOW_BARS]) for h in histories.values() if len(h) > backtest.WINDOW_BARS)
+    t_last = max(int(h.ts[-1]) for h in histories.values())
+    t_first = max(t_first, backtest._to_ns(start) or t_first)
+    t_last = min(t_last, backtest._to_ns(end) or t_last)
+    windows = _task_windows(walk_forward_windows(t_first, t_last, folds, train_days, test_days))
+    del histories
+
+    base = database.settings_snapshot()
+    base.update({k: str(v) for k, v in fixed.items()})
+    sim_kwargs = {"initial_balance": initial_balance, "fee_pct": fee_pct, "slippage_pct": slippage_pct}
+
+    by_set: Dict[int, Dict[str, Any]] = {}
+    rows_by_set: Dict[int, List[Dict[str, Any]]] = {}
+
+    def _train_score(set_id: int) -> float:
+        trains = [r for r in rows_by_set.get(set_id, []) if r["window"].endswith("_train")]
+        return float(np.mean([_score(r, objective, min_trades) for r in trains])) if trains else -1e9
+
+    print(f"🧬 Sweep {mode} ({workers} workers, {len(windows)} fenêtre(s), objectif {objective})...")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                             initializer=_init_worker,
+                             initargs=(folder, symbols, base, timeframe, sim_kwargs, verbose)) as pool:
+
+        def _evaluate(param_sets: List[Dict[str, Any]]) -> List[int]:
+            ids = []
+            for p in param_sets:
+                set_id = len(by_set) + 1
+                by_set[set_id] = p
+                ids.append(set_id)
+            tasks = _make_tasks([(i, by_set[i]) for i in ids], windows, workers)
+            futures = [pool.submit(_evaluate_group, t) for t in tasks]
+            for fut in as_completed(futures):
+                for row in fut.result():
+                    rows_by_set.setdefault(row["set_id"], []).append(row)
+            return ids
+
+        if mode == "grid":
+            _evaluate(grid_samples(space))
+        elif mode == "random":
+            _evaluate(random_samples(space, n, rng))
+        elif mode == "bayes":
+            sampler = BayesSampler(space, rng)
+            batch = max(workers * 2, 8)
+            while len(by_set) < n:
+                proposals = sampler.suggest(min(batch, n - len(by_set)))
+                if not proposals:
+                    break
+                for set_id in _evaluate(proposals):
+                    sampler.observe(by_set[set_id], _train_score(set_id))
+                best = max(by_set, key=_train_score)
+                print(f"   {len(by_set)}/{n} jeux | meilleur {objective}(train) = {_train_score(best):.2f}")
+        else:
+            raise ValueError(f"Mode inconnu: {mode}")
+
+    elapsed = time.perf_counter() - t0
+    result = _write_results(by_set, rows_by_set, windows, objective, min_trades, out_dir, {
+        "mode": mode, "timeframe": timeframe, "objective": objective, "min_trades": min_trades,
+        "folds": folds, "train_days": train_days, "test_days": test_days, "fixed": fixed,
+        "space": space, "seed": seed, "elapsed_seconds": round(elapsed, 1),
+        "sets_per_hour": round(len(by_set) / elapsed * 3600.0, 1) if elapsed > 0 else 0.0,
+    })
+    return result
+
+
+def _write_results(by_set, rows_by_set, windows, objective, min_trades, out_dir, meta) -> Dict[str, Any]:
+    out_dir = out_dir or os.path.join(backtest.RESULTS_DIR, f"sweep_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}")
+    os.makedirs(out_dir, exist_ok=True)
+    keys = sorted({k for p in by_set.values() for k in p})
+
+    table = []
+    for set_id, params in by_set.items():
+        rows = rows_by_set.get(set_id, [])
+        train = [r for r in rows if r["window"].endswith("_train")]
+        test = [r for r in rows if r["window"].endswith("_test")]
+        entry = {"set_id": set_id, **{k: params.get(k) for k in keys}}
+        entry["train_score"] = round(float(np.mean([_score(r, objective, min_trades) for r in train])), 4) if train else None
+        entry["test_score"] = round(float(np.mean([_score(r, objective, min_trades) for r in test])), 4) if test else None
+        for prefix, subset in (("train", train), ("test", test)):
+            for m in METRICS:
+                vals = [float(min(r[m], 1e6)) for r in subset if r.get(m) is not None]
+                entry[f"{prefix}_{m}"] = round(float(np.mean(vals)), 4) if vals else None
+        table.append(entry)
+    table.sort(key=lambda e: -(e["train_score"] if e["train_score"] is not None else -1e9))
+    for rank, entry in enumerate(table, 1):
+        entry["rank"] = rank
+
+    csv_path = os.path.join(out_dir, "results.csv")
+    cols = ["rank", "set_id", *keys, "train_score", "test_score",
+            *[f"train_{m}" for m in METRICS], *[f"test_{m}" for m in METRICS]]
+    with open(csv_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=cols)
+        writer.writeheader()
+        for entry in table:
+            writer.writerow({c: entry.get(c) for c in cols})
+
+    # Walk-forward: pour chaque pli, le meilleur jeu sur train, mesuré sur le test qui suit
+    folds = sorted({name.split("_")[0] for name, _, _ in windows})
+    wf = []
+    for fold in folds:
+        train_name, test_name = f"{fold}_train", f"{fold}_test"
+
+        def _row(set_id, name):
+            return next((r for r in rows_by_set.get(set_id, []) if r["window"] == name), None)
+
+        scored = [(s, _row(s, train_name)) for s in by_set]
+        scored = [(s, r) for s, r in scored if r is not None]
+        if not scored:
+            continue
+        best_id, best_train = max(scored, key=lambda sr: _score(sr[1], objective, min_trades))
+        wf.append({"fold": fold, "set_id": best_id, "params": by_set[best_id],
+                   "train": best_train, "test": _row(best_id, test_name)})
+
+    summary = {**meta, "sets": len(by_set), "walk_forward": wf,
+               "best": table[0] if table else None, "results_csv": csv_path}
+    oos = [w["test"] for w in wf if w.get("test")]
+    if oos:
+        summary["oos_return_pct_sum"] = round(sum(float(t.get("return_pct", 0)) for t in oos), 2)
+        summary["oos_trades"] = int(sum(int(t.get("total_trades", 0)) for t in oos))
+    with open(os.path.join(out_dir, "walkforward.json"), "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2, default=str)
+    summary["out_dir"] = out_dir
+    return summary
+
+
+# ==============================================================================
+# CLI
+# ==============================================================================
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Optimisation des paramètres Darwin (backtest)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_prep = sub.add_parser("prepare", help="Pré-calculer le cache d'indicateurs")
+    p_prep.add_argument("--symbols")
+    p_prep.add_argument("--symbols-file")
+    p_prep.add_argument("--timeframe", default=backtest.DEFAULT_TIMEFRAME)
+    p_prep.add_argument("--archive-dir")
+    p_prep.add_argument("--cache-dir")
+
+    p_sw = sub.add_parser("sweep", help="Lancer un balayage")
+    p_sw.add_argument("--mode", choices=("grid", "random", "bayes"), default="random")
+    p_sw.add_argument("--n", type=int, default=200, help="Nb de jeux (random/bayes)")
+    p_sw.add_argument("--space", help="Fichier JSON de l'espace (défaut: DEFAULT_SPACE)")
+    p_sw.add_argument("--symbols")
+    p_sw.add_argument("--symbols-file")
+    p_sw.add_argument("--timeframe", default=backtest.DEFAULT_TIMEFRAME)
+    p_sw.add_argument("--start")
+    p_sw.add_argument("--end")
+    p_sw.add_argument("--folds", type=int, default=0)
+    p_sw.add_argument("--train-days", type=float, default=180)
+    p_sw.add_argument("--test-days", type=float, default=60)
+    p_sw.add_argument("--objective", default="return_pct")
+    p_sw.add_argument("--min-trades", type=int, default=10)
+    p_sw.add_argument("--workers", type=int)
+    p_sw.add_argument("--set", action="append", metavar="CLE=VALEUR", help="Paramètre fixe (répétable)")
+    p_sw.add_argument("--balance", type=float, default=1000.0)
+    p_sw.add_argument("--fee-pct", type=float, default=backtest.DEFAULT_FEE_PCT)
+    p_sw.add_argument("--slippage-pct", type=float, default=backtest.DEFAULT_SLIPPAGE_PCT)
+    p_sw.add_argument("--seed", type=int, default=42)
+    p_sw.add_argument("--cache-dir")
+    p_sw.add_argument("--archive-dir")
+    p_sw.add_argument("--out")
+    p_sw.add_argument("--verbose", action="store_true")
+
+    args = parser.parse_args(argv)
+    symbols = backtest._parse_symbols(args.symbols, args.symbols_file)
+
+    if args.command == "prepare":
+        prepare_cache(symbols, args.timeframe, args.archive_dir, args.cache_dir)
+        return 0
+
+    space = None
+    if args.space:
+        with open(args.space, "r", encoding="utf-8") as f:
+            space = json.load(f)
+    summary = run_sweep(
+        mode=args.mode, n=args.n, space=space, symbols=symbols, timeframe=args.timeframe,
+        start=args.start, end=args.end, folds=args.folds, train_days=args.train_days,
+        test_days=args.test_days, objective=args.objective, min_trades=args.min_trades,
+        workers=args.workers, fixed=backtest._parse_overrides(args.set), initial_balance=args.balance,
+        fee_pct=args.fee_pct, slippage_pct=args.slippage_pct, seed=args.seed,
+        cache_dir=args.cache_dir, archive_dir=args.archive_dir, out_dir=args.out, verbose=args.verbose,
+    )
+    best = summary.get("best") or {}
+    print(f"🏆 Meilleur jeu #{best.get('set_id')} — {args.objective} train={best.get('train_score')} "
+          f"test={best.get('test_score')}")
+    print(f"⏱️ {summary['sets']} jeux en {summary['elapsed_seconds']} s ({summary['sets_per_hour']} jeux/h)")
+    print(f"💾 {summary['results_csv']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
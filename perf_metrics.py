@@ -0,0 +1,260 @@
+# Fichier: perf_metrics.py
+"""
+Instrumentation des appels CCXT (REST et ccxt.pro).
+
+- instrument(ex) : proxy qui chronomètre chaque méthode fetch_/create_/cancel_/...
+  et enregistre compte, erreurs et histogramme de latence par
+  (méthode, classe de symbole, statut HTTP).
+- format_perf()  : tableau p50/p95/p99 par méthode (commande Telegram /perf).
+- write_prometheus() / start_exporter() : fichier texte au format Prometheus
+  pour le textfile collector du node exporter local.
+"""
+import os
+import re
+import time
+import asyncio
+import threading
+from collections import deque
+from typing import Dict, Any, Optional, Tuple, List
+
+# Bornes d'histogramme (secondes) — style Prometheus
+BUCKETS_S: Tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# Échantillons conservés par méthode pour les percentiles
+RESERVOIR_SIZE = int(os.getenv("PERF_RESERVOIR_SIZE", "2048"))
+
+_DB_BASE_DIR = os.getenv("DB_BASE_DIR", "/var/data")
+PROM_TEXTFILE_PATH = os.getenv("PROM_TEXTFILE_PATH", os.path.join(_DB_BASE_DIR, "metrics", "darwin_bot.prom"))
+PROM_EXPORT_SECONDS = int(os.getenv("PROM_EXPORT_SECONDS", "15"))
+
+INSTRUMENTED_PREFIXES = ("fetch_", "create_", "cancel_", "edit_", "set_", "load_", "watch_")
+MAJOR_BASES = ("BTC", "ETH")
+
+_HTTP_STATUS_RE = re.compile(r"\b([45]\d\d)\b")
+
+_lock = threading.Lock()
+# (method, symbol_class, status) -> {"count", "sum", "buckets": [..]}
+_series: Dict[Tuple[str, str, str], Dict[str, Any]] = {}
+# method -> {"count", "errors", "samples": deque}
+_by_method: Dict[str, Dict[str, Any]] = {}
+
+
+# ==============================================================================
+# ENREGISTREMENT
+# ==============================================================================
+
+def symbol_class(symbol: Optional[str]) -> str:
+    """Classe grossière pour limiter la cardinalité: major / alt / none."""
+    if not symbol or not isinstance(symbol, str):
+        return "none"
+    base = symbol.split("/")[0].upper()
+    return "major" if base in MAJOR_BASES else "alt"
+
+
+def status_of(exc: Optional[BaseException]) -> str:
+    """'200' si succès, sinon le code HTTP trouvé dans l'erreur CCXT, sinon le type d'erreur."""
+    if exc is None:
+        return "200"
+    code = getattr(exc, "http_status", None) or getattr(exc, "status", None)
+    if code:
+        return str(code)
+    m = _HTTP_STATUS_RE.search(str(exc))
+    if m:
+        return m.group(1)
+    return type(exc).__name__
+
+
+def record(method: str, duration_s: float, symbol: Optional[str] = None,
+           exc: Optional[BaseException] = None) -> None:
+    key = (method, symbol_class(symbol), status_of(exc))
+    with _lock:
+        s = _series.get(key)
+        if s is None:
+            s = _series[key] = {"count": 0, "sum": 0.0, "buckets": [0] * len(BUCKETS_S)}
+        s["count"] += 1
+        s["sum"] += duration_s
+        for i, le in enumerate(BUCKETS_S):
+            if duration_s <= le:
+                s["buckets"][i] += 1
+                break
+
+        m = _by_method.get(method)
+        if m is None:
+            m = _by_method[method] = {"count": 0, "errors": 0, "samples": deque(maxlen=RESERVOIR_SIZE)}
+        m["count"] += 1
+        if exc is not None:
+            m["errors"] += 1
+        m["samples"].append(duration_s)
+
+
+def _first_symbol(args, kwargs) -> Optional[str]:
+    sym = kwargs.get("symbol")
+    if sym is None and args:
+        sym = args[0]
+    return sym if isinstance(sym, str) else None
+
+
+# ==============================================================================
+# PROXY CCXT
+# ==============================================================================
+
+class InstrumentedExchange:
+    """Proxy transparent qui chronomètre les méthodes CCXT (sync et async)."""
+
+    def __init__(self, ex):
+        object.__setattr__(self, "_ex", ex)
+
+    def __getattr__(self, name):
+        attr = getattr(self._ex, name)
+        if not callable(attr) or not name.startswith(INSTRUMENTED_PREFIXES):
+            return attr
+
+        if asyncio.iscoroutinefunction(attr):
+            async def _timed_async(*args, **kwargs):
+                t0 = time.perf_counter()
+                try:
+                    res = await attr(*args, **kwargs)
+                except BaseException as e:
+                    record(name, time.perf_counter() - t0, _first_symbol(args, kwargs), e)
+                    raise
+                record(name, time.perf_counter() - t0, _first_symbol(args, kwargs))
+                return res
+            _timed_async.__name__ = name
+            return _timed_async
+
+        def _timed(*args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                res = attr(*args, **kwargs)
+            except BaseException as e:
+                record(name, time.perf_counter() - t0, _first_symbol(args, kwargs), e)
+                raise
+            record(name, time.perf_counter() - t0, _first_symbol(args, kwargs))
+            return res
+        _timed.__name__ = name
+        return _timed
+
+    def __setattr__(self, name, value):
+        setattr(self._ex, name, value)
+
+    def __repr__(self):
+        return f"InstrumentedExchange({self._ex!r})"
+
+    def __str__(self):
+        return str(self._ex)
+
+
+def instrument(ex):
+    """Enveloppe une instance CCXT (no-op si PERF_METRICS_ENABLED=false)."""
+    if ex is None or isinstance(ex, InstrumentedExchange):
+        return ex
+    if os.getenv("PERF_METRICS_ENABLED", "true").lower() not in ("1", "true", "yes"):
+        return ex
+    return InstrumentedExchange(ex)
+
+
+# ==============================================================================
+# LECTURE: PERCENTILES / TELEGRAM / PROMETHEUS
+# ==============================================================================
+
+def _percentile(sorted_vals: List[float], q: float) -> float:
+    if not sorted_vals:
+        return 0.0
+    idx = min(len(sorted_vals) - 1, max(0, int(round(q * (len(sorted_vals) - 1)))))
+    return sorted_vals[idx]
+
+
+def get_method_stats() -> Dict[str, Dict[str, float]]:
+    """method -> {count, errors, p50_ms, p95_ms, p99_ms}."""
+    with _lock:
+        snap = {k: (v["count"], v["errors"], list(v["samples"])) for k, v in _by_method.items()}
+    out: Dict[str, Dict[str, float]] = {}
+    for method, (count, errors, samples) in snap.items():
+        samples.sort()
+        out[method] = {
+            "count": count,
+            "errors": errors,
+            "p50_ms": _percentile(samples, 0.50) * 1000.0,
+            "p95_ms": _percentile(samples, 0.95) * 1000.0,
+            "p99_ms": _percentile(samples, 0.99) * 1000.0,
+        }
+    return out
+
+
+def format_perf() -> str:
+    """Tableau HTML (<pre>) pour la commande Telegram /perf."""
+    stats = get_method_stats()
+    if not stats:
+        return "⏱️ Aucune mesure CCXT pour l'instant."
+    rows = sorted(stats.items(), key=lambda kv: kv[1]["count"], reverse=True)
+    lines = [f"{'méthode':<20}{'n':>7}{'err':>5}{'p50':>7}{'p95':>7}{'p99':>7}"]
+    for method, st in rows:
+        lines.append(
+            f"{method[:19]:<20}{int(st['count']):>7}{int(st['errors']):>5}"
+            f"{st['p50_ms']:>7.0f}{st['p95_ms']:>7.0f}{st['p99_ms']:>7.0f}"
+        )
+    return "<b>⏱️ Latences CCXT (ms)</b>\n<pre>" + "\n".join(lines) + "</pre>"
+
+
+def _labels(method: str, sym_class: str, status: str, extra: str = "") -> str:
+    base = f'method="{method}",symbol_class="{sym_class}",status="{status}"'
+    return "{" + base + (("," + extra) if extra else "") + "}"
+
+
+def render_prometheus() -> str:
+    """Exposition texte Prometheus (histogrammes + compteurs)."""
+    with _lock:
+        snap = {k: (v["count"], v["sum"], list(v["buckets"])) for k, v in _series.items()}
+    out = [
+        "# HELP darwin_ccxt_request_duration_seconds Latence des appels CCXT.",
+        "# TYPE darwin_ccxt_request_duration_seconds histogram",
+    ]
+    for (method, sym_class, status), (count, total, buckets) in sorted(snap.items()):
+        cumulative = 0
+        for le, n in zip(BUCKETS_S, buckets):
+            cumulative += n
+            le_label = 'le="%s"' % le
+            out.append(f"darwin_ccxt_request_duration_seconds_bucket{_labels(method, sym_class, status, le_label)} {cumulative}")
+        inf_label = 'le="+Inf"'
+        out.append(f"darwin_ccxt_request_duration_seconds_bucket{_labels(method, sym_class, status, inf_label)} {count}")
+        out.append(f"darwin_ccxt_request_duration_seconds_sum{_labels(method, sym_class, status)} {total:.6f}")
+        out.append(f"darwin_ccxt_request_duration_seconds_count{_labels(method, sym_class, status)} {count}")
+
+    out.append("# HELP darwin_ccxt_errors_total Appels CCXT en erreur.")
+    out.append("# TYPE darwin_ccxt_errors_total counter")
+    for method, st in sorted(get_method_stats().items()):
+        out.append(f'darwin_ccxt_errors_total{{method="{method}"}} {int(st["errors"])}')
+    return "\n".join(out) + "\n"
+
+
+def write_prometheus(path: Optional[str] = None) -> bool:
+    """Écriture atomique (tmp + rename) pour que le collector ne lise jamais un fichier partiel."""
+    path = path or PROM_TEXTFILE_PATH
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(render_prometheus())
+        os.replace(tmp, path)
+        return True
+    except Exception as e:
+        print(f"⚠️ Export Prometheus impossible ({path}): {e}")
+        return False
+
+
+_exporter_started = False
+
+
+def start_exporter(interval: Optional[int] = None) -> None:
+    """Thread daemon qui réécrit le fichier Prometheus périodiquement (idempotent)."""
+    global _exporter_started
+    if _exporter_started:
+        return
+    _exporter_started = True
+    period = max(5, int(interval or PROM_EXPORT_SECONDS))
+
+    def _loop():
+        while True:
+            time.sleep(period)
+            write_prometheus()
+
+    threading.Thread(target=_loop, name="perf-exporter", daemon=True).start()
@@ -0,0 +1,160 @@
+# Fichier: price_service.py
+"""
+Service de prix publics partagé (rapports Telegram, vues positions).
+
+- un client CCXT public long-vécu (Bitget swap, repli Bybit), créé une seule fois ;
+- warm(symbols): un seul fetch_tickers pour tous les symboles absents du cache
+  (au lieu d'un fetch_ticker par symbole × variante × exchange) ;
+- cache unique (TTL 30 s) alimenté aussi par le côté trading via publish(),
+  pour qu'un rapport de positions réutilise les tickers déjà lus par
+  manage_open_positions.
+"""
+import os
+import time
+import threading
+from typing import Dict, Any, Iterable, List, Optional
+
+import perf_metrics
+
+PRICE_CACHE_TTL = float(os.getenv("PRICE_CACHE_TTL", "30"))
+
+# symbole normalisé (BASE/USDT:USDT) -> (prix ou None, ts)
+_CACHE: Dict[str, tuple] = {}
+_cache_lock = threading.Lock()
+
+_clients: List[Any] = []
+_clients_lock = threading.Lock()
+
+
+def _public_clients() -> List[Any]:
+    """Instances publiques (sans clés) créées une seule fois, rate-limit ON, type swap."""
+    if _clients:
+        return _clients
+    with _clients_lock:
+        if not _clients:
+            import fake_exchange
+            if fake_exchange.is_enabled():
+                _clients.append(perf_metrics.instrument(fake_exchange.create_exchange()))
+                return _clients
+            import ccxt
+            for name in ("bitget", "bybit"):
+                try:
+                    ex = getattr(ccxt, name)({"enableRateLimit": True, "options": {"defaultType": "swap"}})
+                    _clients.append(perf_metrics.instrument(ex))
+                except Exception as e:
+                    print(f"⚠️ Client prix public {name} indisponible: {e}")
+    return _clients
+
+
+def normalize_symbol(sym: str) -> str:
+    """'BTC', 'BTCUSDT', 'BTC/USDT' ou 'BTC/USDT:USDT' -> 'BTC/USDT:USDT'."""
+    s = (sym or "").strip().upper()
+    if not s:
+        return ""
+    if "/" in s:
+        base = s.split("/")[0]
+    elif s.endswith("USDT"):
+        base = s[:-4]
+    else:
+        base = s
+    return f"{base}/USDT:USDT"
+
+
+def _ticker_price(t: Dict[str, Any]) -> Optional[float]:
+    try:
+        last = t.get("last") or t.get("close") or (t.get("info") or {}).get("lastPrice")
+        return float(last) if last is not None else None
+    except Exception:
+        return None
+
+
+# ==============================================================================
+# CACHE
+# ==============================================================================
+
+def _cached(key: str, now: float):
+    """(trouvé, prix) — trouvé=False si absent ou expiré."""
+    with _cache_lock:
+        hit = _CACHE.get(key)
+    if hit is not None and now - hit[1] < PRICE_CACHE_TTL:
+        return True, hit[0]
+    return False, None
+
+
+def publish(symbol: str, ticker_or_price, ts: Optional[float] = None) -> None:
+    """Alimente le cache depuis le côté trading (ticker CCXT ou prix brut)."""
+    key = normalize_symbol(symbol)
+    if not key:
+        return
+    price = _ticker_price(ticker_or_price) if isinstance(ticker_or_price, dict) else ticker_or_price
+    try:
+        price = float(price) if price is not None else None
+    except Exception:
+        return
+    if price is None or price <= 0:
+        return
+    with _cache_lock:
+        _CACHE[key] = (price, ts or time.time())
+
+
+def publish_tickers(tickers: Dict[str, Dict[str, Any]]) -> None:
+    now = time.time()
+    for sym, t in (tickers or {}).items():
+        if isinstance(t, dict):
+            publish(sym, t, now)
+
+
+# ==============================================================================
+# LECTURE
+# ==============================================================================
+
+def warm(symbols: Iterable[str]) -> None:
+    """Charge en bloc (fetch_tickers) les symboles absents/expirés du cache."""
+    now = time.time()
+    missing = []
+    for s in symbols or []:
+        key = normalize_symbol(s)
+        if key and key not in missing and not _cached(key, now)[0]:
+            missing.append(key)
+    if not missing:
+        return
+
+    for ex in _public_clients():
+        try:
+            tickers = ex.fetch_tickers(missing) or {}
+        except Exception:
+            # Un symbole inconnu peut faire échouer le lot entier → tous les tickers
+            try:
+                tickers = ex.fetch_tickers() or {}
+            except Exception as e:
+                print(f"⚠️ fetch_tickers public échoué: {e}")
+                continue
+        with _cache_lock:
+            for sym, t in tickers.items():
+                price = _ticker_price(t) if isinstance(t, dict) else None
+                key = normalize_symbol(sym)
+                if price is not None and key in missing:
+                    _CACHE[key] = (price, now)
+        missing = [k for k in missing if not _cached(k, now)[0]]
+        if not missing:
+            return
+
+    # Introuvables partout: cache négatif (évite de re-solliciter l'API à chaque rapport)
+    with _cache_lock:
+        for key in missing:
+            _CACHE[key] = (None, now)
+
+
+def get_prices(symbols: Iterable[str]) -> Dict[str, Optional[float]]:
+    symbols = list(symbols or [])
+    warm(symbols)
+    now = time.time()
+    return {s: _cached(normalize_symbol(s), now)[1] for s in symbols}
+
+
+def get_price(symbol: str) -> Optional[float]:
+    """Dernier prix public (cache 30 s), None si indisponible."""
+    try:
+        return get_prices([symbol]).get(symbol)
+    except Exception:
+        return None
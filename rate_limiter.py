@@ -0,0 +1,336 @@
+# Fichier: rate_limiter.py
+"""
+Ordonnanceur de requêtes CCXT par endpoint, avec files de priorité.
+
+Objectif: un scan OHLCV de 500 symboles ne doit jamais retarder un
+déplacement de SL ou une clôture manuelle. Chaque famille d'endpoints
+Bitget possède son propre seau à jetons (limites publiées par Bitget),
+et à l'intérieur d'un seau les appels sont servis par lane:
+ORDER (placement/annulation) > POSITION (gestion) > SCAN (marché).
+
+Usage:
+    ex = rate_limiter.wrap_exchange(ccxt.bitget({...}))
+    with rate_limiter.lane(rate_limiter.LANE_ORDER):
+        ex.fetch_positions([symbol])   # servi en priorité ORDER
+"""
+import os
+import time
+import heapq
+import itertools
+import threading
+import functools
+from contextlib import contextmanager
+from typing import Dict, Any, Optional, Tuple, List
+
+# --- Lanes (plus petit = plus prioritaire) ---
+LANE_ORDER = 0
+LANE_POSITION = 1
+LANE_SCAN = 2
+LANE_NAMES = {LANE_ORDER: "order", LANE_POSITION: "position", LANE_SCAN: "scan"}
+
+RATE_SCHEDULER_ENABLED = os.getenv("RATE_SCHEDULER_ENABLED", "true").lower() in ("1", "true", "yes")
+# Marge de sécurité appliquée aux limites publiées (0.8 = 80% du quota)
+RATE_SCHEDULER_HEADROOM = float(os.getenv("RATE_SCHEDULER_HEADROOM", "0.8"))
+# Attente max (s) avant de laisser passer un appel de toute façon (anti-blocage)
+RATE_SCHEDULER_MAX_WAIT = float(os.getenv("RATE_SCHEDULER_MAX_WAIT", "30"))
+
+# ==============================================================================
+# LIMITES BITGET (req/s) — API v2 mix
+# ==============================================================================
+# nom du seau -> (req/s publiées, burst)
+BITGET_BUCKETS: Dict[str, Tuple[float, float]] = {
+    "place_order":   (10.0, 10.0),   # /api/v2/mix/order/place-order (UID)
+    "batch_place":   (5.0, 5.0),     # /api/v2/mix/order/batch-place-order
+    "cancel_order":  (10.0, 10.0),   # /api/v2/mix/order/cancel-order
+    "batch_cancel":  (5.0, 5.0),     # /api/v2/mix/order/batch-cancel-orders
+    "open_orders":   (10.0, 10.0),   # /api/v2/mix/order/orders-pending (+ plan)
+    "positions":     (5.0, 5.0),     # /api/v2/mix/position/all-position
+    "account":       (10.0, 10.0),   # /api/v2/mix/account/accounts
+    "leverage":      (5.0, 5.0),     # /api/v2/mix/account/set-leverage
+    "candles":       (20.0, 20.0),   # /api/v2/mix/market/candles (IP)
+    "ticker":        (20.0, 20.0),   # /api/v2/mix/market/ticker
+    "tickers":       (20.0, 20.0),   # /api/v2/mix/market/tickers
+    "markets":       (20.0, 5.0),    # /api/v2/mix/market/contracts
+    "order_history": (10.0, 10.0),   # fills / historique
+    "default":       (10.0, 10.0),
+}
+
+# méthode ccxt -> (seau, lane par défaut)
+METHOD_ROUTES: Dict[str, Tuple[str, int]] = {
+    "create_order":         ("place_order", LANE_ORDER),
+    "create_market_order":  ("place_order", LANE_ORDER),
+    "create_limit_order":   ("place_order", LANE_ORDER),
+    "edit_order":           ("place_order", LANE_ORDER),
+    "create_orders":        ("batch_place", LANE_ORDER),
+    "cancel_order":         ("cancel_order", LANE_ORDER),
+    "cancel_orders":        ("batch_cancel", LANE_ORDER),
+    "cancel_all_orders":    ("batch_cancel", LANE_ORDER),
+    "fetch_open_orders":    ("open_orders", LANE_POSITION),
+    "fetch_order":          ("open_orders", LANE_POSITION),
+    "fetch_positions":      ("positions", LANE_POSITION),
+    "fetch_position":       ("positions", LANE_POSITION),
+    "fetch_balance":        ("account", LANE_POSITION),
+    "set_leverage":         ("leverage", LANE_POSITION),
+    "set_margin_mode":      ("leverage", LANE_POSITION),
+    "set_position_mode":    ("leverage", LANE_POSITION),
+    "fetch_my_trades":      ("order_history", LANE_POSITION),
+    "fetch_closed_orders":  ("order_history", LANE_POSITION),
+    "fetch_orders":         ("order_history", LANE_POSITION),
+    "fetch_ohlcv":          ("candles", LANE_SCAN),
+    "fetch_ticker":         ("ticker", LANE_SCAN),
+    "fetch_tickers":        ("tickers", LANE_SCAN),
+    "fetch_order_book":     ("ticker", LANE_SCAN),
+    "load_markets":         ("markets", LANE_SCAN),
+    "fetch_markets":        ("markets", LANE_SCAN),
+}
+
+# Méthodes réseau sans entrée dans METHOD_ROUTES (fetch_funding_rate, API
+# implicite private_mix_*...): le throttle CCXT étant coupé, elles passent par
+# le seau "default" en lane SCAN plutôt que de contourner l'ordonnanceur.
+DEFAULT_ROUTE: Tuple[str, int] = ("default", LANE_SCAN)
+_NETWORK_PREFIXES = ("fetch", "create", "cancel", "edit", "set", "close", "transfer", "withdraw",
+                     "add_margin", "addMargin", "reduce_margin", "reduceMargin", "private", "public")
+# Helpers locaux CCXT qui partagent ces préfixes (aucune requête)
+_LOCAL_METHODS = {"set_sandbox_mode", "setSandboxMode", "set_markets", "setMarkets",
+                  "set_headers", "setHeaders", "set_property", "setProperty",
+                  "create_order_request", "createOrderRequest"}
+
+
+def route_for(name: str) -> Optional[Tuple[str, int]]:
+    """(seau, lane par défaut) d'une méthode CCXT, None si elle ne fait pas de requête."""
+    route = METHOD_ROUTES.get(name)
+    if route is not None:
+        return route
+    if name.startswith("_") or name in _LOCAL_METHODS or not name.startswith(_NETWORK_PREFIXES):
+        return None
+    return DEFAULT_ROUTE
+
+_tls = threading.local()
+
+
+@contextmanager
+def lane(priority: int):
+    """Élève la priorité de tous les appels CCXT du thread courant dans ce bloc."""
+    stack = getattr(_tls, "stack", None)
+    if stack is None:
+        stack = _tls.stack = []
+    stack.append(int(priority))
+    try:
+        yield
+    finally:
+        stack.pop()
+
+
+def in_lane(priority: int):
+    """Décorateur équivalent à `with lane(priority):` sur toute la fonction."""
+    def _deco(fn):
+        @functools.wraps(fn)
+        def _wrapped(*args, **kwargs):
+            with lane(priority):
+                return fn(*args, **kwargs)
+        return _wrapped
+    return _deco
+
+
+def current_lane(default: int = LANE_SCAN) -> int:
+    """Lane effective: la plus prioritaire entre le défaut de la méthode et le contexte."""
+    stack = getattr(_tls, "stack", None)
+    if stack:
+        return min(default, min(stack))
+    return default
+
+
+# ==============================================================================
+# SEAUX À JETONS + ORDONNANCEUR
+# ==============================================================================
+
+class _TokenBucket:
+    def __init__(self, name: str, rate: float, burst: float):
+        self.name = name
+        self.rate = max(0.1, float(rate))
+        self.capacity = max(1.0, float(burst))
+        self.tokens = self.capacity
+        self.ts = time.monotonic()
+        self.waiters: List[Tuple[int, int]] = []  # heap (lane, seq)
+        self.calls = 0
+
+    def refill(self, now: float) -> None:
+        if now > self.ts:
+            self.tokens = min(self.capacity, self.tokens + (now - self.ts) * self.rate)
+            self.ts = now
+
+
+class RateScheduler:
+    """Seaux par endpoint partagés par toutes les instances CCXT du process."""
+
+    def __init__(self, buckets: Dict[str, Tuple[float, float]], headroom: float = 1.0):
+        self._cond = threading.Condition(threading.Lock())
+        self._seq = itertools.count()
+        self._buckets: Dict[str, _TokenBucket] = {
+            name: _TokenBucket(name, rate * headroom, max(1.0, burst * headroom))
+            for name, (rate, burst) in buckets.items()
+        }
+        self._lane_stats: Dict[int, Dict[str, float]] = {
+            ln: {"calls": 0, "waited": 0, "wait_total": 0.0, "wait_max": 0.0, "depth": 0, "depth_max": 0}
+            for ln in LANE_NAMES
+        }
+
+    def _bucket(self, name: str) -> _TokenBucket:
+        b = self._buckets.get(name)
+        if b is None:
+            b = self._buckets["default"]
+        return b
+
+    def acquire(self, bucket_name: str, priority: int) -> float:
+        """Bloque jusqu'à obtention d'un jeton. Retourne le temps d'attente (s)."""
+        entry = (int(priority), next(self._seq))
+        t0 = time.monotonic()
+        with self._cond:
+            b = self._bucket(bucket_name)
+            heapq.heappush(b.waiters, entry)
+            st = self._lane_stats.setdefault(entry[0], {"calls": 0, "waited": 0, "wait_total": 0.0,
+                                                        "wait_max": 0.0, "depth": 0, "depth_max": 0})
+            st["depth"] += 1
+            st["depth_max"] = max(st["depth_max"], st["depth"])
+            try:
+                while True:
+                    now = time.monotonic()
+                    b.refill(now)
+                    is_head = bool(b.waiters) and b.waiters[0] == entry
+                    if is_head and (b.tokens >= 1.0 or now - t0 >= RATE_SCHEDULER_MAX_WAIT):
+                        heapq.heappop(b.waiters)
+                        b.tokens = max(0.0, b.tokens - 1.0)
+                        b.calls += 1
+                        break
+                    if is_head:
+                        timeout = max(0.001, (1.0 - b.tokens) / b.rate)
+                    else:
+                        timeout = 0.05
+                    self._cond.wait(timeout=timeout)
+            except BaseException:
+                try:
+                    b.waiters.remove(entry)
+                    heapq.heapify(b.waiters)
+                except ValueError:
+                    pass
+                st["depth"] -= 1
+                self._cond.notify_all()
+                raise
+
+            waited = time.monotonic() - t0
+            st["depth"] -= 1
+            st["calls"] += 1
+            if waited > 0.001:
+                st["waited"] += 1
+            st["wait_total"] += waited
+            st["wait_max"] = max(st["wait_max"], waited)
+            self._cond.notify_all()
+        return waited
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Profondeur des files et temps d'attente par lane / par seau."""
+        with self._cond:
+            lanes = {}
+            for ln, st in self._lane_stats.items():
+                calls = int(st["calls"])
+                lanes[LANE_NAMES.get(ln, str(ln))] = {
+                    "calls": calls,
+                    "waited": int(st["waited"]),
+                    "wait_avg_ms": (st["wait_total"] / calls * 1000.0) if calls else 0.0,
+                    "wait_max_ms": st["wait_max"] * 1000.0,
+                    "queue_depth": int(st["depth"]),
+                    "queue_depth_max": int(st["depth_max"]),
+                }
+            buckets = {
+                name: {"calls": b.calls, "queue_depth": len(b.waiters),
+                       "tokens": round(b.tokens, 2), "rate": round(b.rate, 2)}
+                for name, b in self._buckets.items() if b.calls or b.waiters
+            }
+        return {"lanes": lanes, "buckets": buckets}
+
+
+_scheduler = RateScheduler(BITGET_BUCKETS, headroom=RATE_SCHEDULER_HEADROOM)
+
+
+def get_scheduler() -> RateScheduler:
+    return _scheduler
+
+
+def get_stats() -> Dict[str, Any]:
+    return _scheduler.get_stats()
+
+
+def format_stats() -> str:
+    """Résumé HTML pour Telegram."""
+    try:
+        stats = _scheduler.get_stats()
+    except Exception:
+        return "⚠️ Statistiques rate-limit indisponibles."
+    lines = ["<b>🚦 Rate-limit (par lane)</b>"]
+    for name, st in stats.get("lanes", {}).items():
+        lines.append(
+            f"- <b>{name}</b>: {st['calls']} appels | attente moy {st['wait_avg_ms']:.0f}ms"
+            f" | max {st['wait_max_ms']:.0f}ms | file {st['queue_depth']} (max {st['queue_depth_max']})"
+        )
+    busy = [(n, b) for n, b in stats.get("buckets", {}).items() if b.get("queue_depth")]
+    if busy:
+        lines.append("")
+        lines.append("<b>Seaux saturés</b>")
+        for n, b in busy:
+            lines.append(f"- {n}: file {b['queue_depth']} | {b['rate']}/s")
+    return "\n".join(lines)
+
+
+# ==============================================================================
+# PROXY CCXT
+# ==============================================================================
+
+class ScheduledExchange:
+    """
+    Proxy transparent autour d'une instance CCXT: chaque méthode réseau
+    passe par l'ordonnanceur avant d'atteindre l'exchange (route_for).
+    Les attributs (options, markets, has...) sont lus/écrits sur l'instance réelle.
+    """
+
+    def __init__(self, ex, scheduler: Optional[RateScheduler] = None):
+        object.__setattr__(self, "_ex", ex)
+        object.__setattr__(self, "_scheduler", scheduler or _scheduler)
+
+    def __getattr__(self, name):
+        attr = getattr(self._ex, name)
+        route = route_for(name)
+        if route is None or not callable(attr):
+            return attr
+        bucket_name, default_lane = route
+        scheduler = self._scheduler
+
+        def _scheduled(*args, **kwargs):
+            scheduler.acquire(bucket_name, current_lane(default_lane))
+            return attr(*args, **kwargs)
+
+        _scheduled.__name__ = name
+        return _scheduled
+
+    def __setattr__(self, name, value):
+        setattr(self._ex, name, value)
+
+    def __repr__(self):
+        return f"ScheduledExchange({self._ex!r})"
+
+    def __str__(self):
+        return str(self._ex)
+
+
+def wrap_exchange(ex):
+    """
+    Place l'ordonnanceur devant l'instance CCXT (no-op si désactivé).
+    Le throttle global de CCXT est coupé: il sérialiserait à nouveau tous
+    les endpoints derrière une seule file, ce qu'on cherche justement à éviter.
+    """
+    if not RATE_SCHEDULER_ENABLED or ex is None or isinstance(ex, ScheduledExchange):
+        return ex
+    try:
+        ex.enableRateLimit = False
+    except Exception:
+        pass
+    return ScheduledExchange(ex)
@@ -0,0 +1,237 @@
+# Fichier: resilience.py
+"""
+Politique unique de retry + disjoncteur (circuit breaker) pour les appels CCXT.
+
+- Classification par TYPE d'exception CCXT (plus de recherche de sous-chaînes):
+    rate_limit  : RateLimitExceeded, DDoSProtection
+    unavailable : ExchangeNotAvailable, OnMaintenance
+    network     : RequestTimeout, NetworkError
+    fatal       : tout le reste (InvalidOrder, AuthenticationError, BadSymbol...)
+- Retries avec backoff exponentiel + jitter, adaptés à la classe d'erreur.
+- Les méthodes NON idempotentes (create_*, edit_*) ne sont rejouées que sur
+  rate_limit (requête refusée avant traitement) — jamais sur timeout.
+- Disjoncteur par endpoint: après N échecs consécutifs l'endpoint est coupé
+  pendant un délai de refroidissement; les appels échouent immédiatement
+  (CircuitOpenError) sans consommer de jeton du rate-limiter, puis un appel
+  test (half-open) décide de la réouverture.
+- Placement / annulation d'ordres: jamais court-circuités par un disjoncteur
+  ouvert (le SL d'une position tout juste remplie doit toujours partir), et les
+  rate_limit ne comptent pas pour leur disjoncteur.
+"""
+import os
+import time
+import random
+import threading
+from typing import Dict, Any, Optional, Callable
+
+import ccxt
+
+RETRY_MAX_ATTEMPTS = int(os.getenv("RETRY_MAX_ATTEMPTS", "4"))
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "8"))
+BREAKER_COOLDOWN_SECONDS = float(os.getenv("BREAKER_COOLDOWN_SECONDS", "30"))
+
+# classe -> (base backoff s, plafond s)
+_BACKOFF = {
+    "rate_limit": (1.0, 8.0),
+    "unavailable": (1.0, 10.0),
+    "network": (0.5, 4.0),
+}
+
+_NON_IDEMPOTENT_PREFIXES = ("create_", "edit_")
+_WRAPPED_PREFIXES = ("fetch_", "create_", "cancel_", "edit_", "set_", "load_")
+# Ordres: toujours tentés, même disjoncteur ouvert
+_ORDER_METHODS = frozenset({"create_order", "create_orders", "cancel_order", "cancel_orders", "edit_order"})
+
+
+class CircuitOpenError(ccxt.ExchangeNotAvailable):
+    """Endpoint coupé par le disjoncteur (hérite de NetworkError pour les handlers existants)."""
+
+
+def classify(exc: BaseException) -> str:
+    # L'ordre compte: ces classes héritent toutes de NetworkError
+    if isinstance(exc, CircuitOpenError):
+        return "fatal"
+    if isinstance(exc, (ccxt.RateLimitExceeded, ccxt.DDoSProtection)):
+        return "rate_limit"
+    if isinstance(exc, (ccxt.ExchangeNotAvailable, ccxt.OnMaintenance)):
+        return "unavailable"
+    if isinstance(exc, (ccxt.RequestTimeout, ccxt.NetworkError)):
+        return "network"
+    return "fatal"
+
+
+def _is_retriable(method: str, err_class: str) -> bool:
+    if err_class == "fatal":
+        return False
+    if method.startswith(_NON_IDEMPOTENT_PREFIXES):
+        return err_class == "rate_limit"
+    return True
+
+
+def _backoff_delay(err_class: str, attempt: int) -> float:
+    base, cap = _BACKOFF.get(err_class, (0.5, 4.0))
+    # "full jitter" borné: évite que tous les threads réessaient en même temps
+    return random.uniform(base * 0.5, min(cap, base * (2 ** attempt)))
+
+
+# ==============================================================================
+# DISJONCTEUR
+# ==============================================================================
+
+class CircuitBreaker:
+    def __init__(self, name: str, threshold: int, cooldown: float):
+        self.name = name
+        self.threshold = max(1, int(threshold))
+        self.cooldown = float(cooldown)
+        self.state = "closed"          # closed | open | half_open
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trips = 0
+        self.rejected = 0
+        self._probe_inflight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.time() - self.opened_at >= self.cooldown:
+                self.state = "half_open"
+                self._probe_inflight = False
+            if self.state == "half_open" and not self._probe_inflight:
+                self._probe_inflight = True
+                return True
+            self.rejected += 1
+            return False
+
+    def on_success(self) -> None:
+        with self._lock:
+            if self.state != "closed":
+                print(f"✅ Disjoncteur {self.name}: refermé")
+            self.state = "closed"
+            self.failures = 0
+            self._probe_inflight = False
+
+    def on_failure(self, err_class: str) -> None:
+        # Seules les pannes côté exchange/réseau comptent (pas les ordres invalides)
+        if err_class == "fatal":
+            with self._lock:
+                self._probe_inflight = False
+                if self.state == "half_open":
+                    self.state = "closed"
+                    self.failures = 0
+            return
+        with self._lock:
+            self.failures += 1
+            self._probe_inflight = False
+            if self.state == "half_open" or self.failures >= self.threshold:
+                if self.state != "open":
+                    self.trips += 1
+                    print(f"⛔ Disjoncteur {self.name}: ouvert pour {self.cooldown:.0f}s "
+                          f"({self.failures} échecs, dernier: {err_class})")
+                self.state = "open"
+                self.opened_at = time.time()
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(endpoint: str) -> CircuitBreaker:
+    with _breakers_lock:
+        br = _breakers.get(endpoint)
+        if br is None:
+            br = _breakers[endpoint] = CircuitBreaker(endpoint, BREAKER_FAILURE_THRESHOLD, BREAKER_COOLDOWN_SECONDS)
+        return br
+
+
+# ==============================================================================
+# APPEL AVEC POLITIQUE
+# ==============================================================================
+
+def run_with_policy(method: str, fn: Callable, *args, max_attempts: Optional[int] = None, **kwargs):
+    """Exécute fn(*args, **kwargs) sous la politique retry + disjoncteur de l'endpoint `method`."""
+    breaker = get_breaker(method)
+    is_order = method in _ORDER_METHODS
+    attempts = max(1, int(max_attempts or RETRY_MAX_ATTEMPTS))
+    for attempt in range(attempts):
+        if not is_order and not breaker.allow():
+            raise CircuitOpenError(f"{method}: disjoncteur ouvert (endpoint dégradé)")
+        try:
+            res = fn(*args, **kwargs)
+        except Exception as e:
+            err_class = classify(e)
+            if not (is_order and err_class == "rate_limit"):
+                breaker.on_failure(err_class)
+            if attempt < attempts - 1 and _is_retriable(method, err_class):
+                time.sleep(_backoff_delay(err_class, attempt))
+                continue
+            raise
+        breaker.on_success()
+        return res
+
+
+class ResilientExchange:
+    """Proxy CCXT appliquant run_with_policy à chaque méthode d'I/O."""
+
+    def __init__(self, ex):
+        object.__setattr__(self, "_ex", ex)
+
+    def __getattr__(self, name):
+        attr = getattr(self._ex, name)
+        if not callable(attr) or not name.startswith(_WRAPPED_PREFIXES):
+            return attr
+
+        def _guarded(*args, **kwargs):
+            return run_with_policy(name, attr, *args, **kwargs)
+
+        _guarded.__name__ = name
+        return _guarded
+
+    def __setattr__(self, name, value):
+        setattr(self._ex, name, value)
+
+    def __repr__(self):
+        return f"ResilientExchange({self._ex!r})"
+
+    def __str__(self):
+        return str(self._ex)
+
+
+def wrap_exchange(ex):
+    if ex is None or isinstance(ex, ResilientExchange):
+        return ex
+    return ResilientExchange(ex)
+
+
+def call(ex, method: str, *args, **kwargs):
+    """
+    Appelle ex.<method> sous la politique, sans double retry si l'instance
+    est déjà enveloppée (ResilientExchange).
+    """
+    fn = getattr(ex, method)
+    if isinstance(ex, ResilientExchange):
+        return fn(*args, **kwargs)
+    return run_with_policy(method, fn, *args, **kwargs)
+
+
+def get_stats() -> Dict[str, Any]:
+    with _breakers_lock:
+        items = list(_breakers.items())
+    return {
+        name: {"state": br.state, "failures": br.failures, "trips": br.trips, "rejected": br.rejected}
+        for name, br in items
+    }
+
+
+def format_stats() -> str:
+    stats = get_stats()
+    degraded = {k: v for k, v in stats.items() if v["state"] != "closed" or v["trips"]}
+    if not degraded:
+        return "<b>🛡️ Disjoncteurs</b>\nTous les endpoints sont fermés (OK)."
+    icons = {"closed": "🟢", "half_open": "🟡", "open": "🔴"}
+    lines = ["<b>🛡️ Disjoncteurs</b>"]
+    for name, st in sorted(degraded.items()):
+        lines.append(f"{icons.get(st['state'], '⚪')} {name}: {st['state']} | déclenchements {st['trips']}"
+                     f" | rejets {st['rejected']}")
+    return "\n".join(lines)
@@ -0,0 +1,130 @@
+# Fichier: scale_harness.py
+"""
+Banc de montée en charge: fait tourner la boucle de trading complète
+(main.trading_engine_loop) contre l'exchange simulé à des tailles d'univers
+croissantes, un sous-process par taille (RSS max non pollué par la taille
+précédente).
+
+Par taille: temps de scan / cycle, appels REST par cycle, RSS max, écritures DB
+par cycle, latence clôture de bougie → signal (p50/p99). Affiche la plus grande
+taille dont un cycle complet tient dans une bougie du timeframe.
+
+  python scale_harness.py --sizes 500,1000,2000,5000 --cycles 3 --latency-ms 40
+"""
+import os
+import sys
+import json
+import argparse
+import tempfile
+import subprocess
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional
+
+import fake_exchange
+
+DEFAULT_SIZES = os.getenv("SCALE_SIZES", "500,1000,2000,5000")
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def run_size(size: int, cycles: int, timeframe: str, passthrough: List[str],
+             timeout: Optional[float] = None) -> Dict[str, Any]:
+    """Un run `fake_exchange.py run` isolé ; retourne son rapport (ou {'error': ...})."""
+    with tempfile.TemporaryDirectory(prefix="darwin_scale_") as tmp:
+        out = os.path.join(tmp, "report.json")
+        cmd = [sys.executable, os.path.join(HERE, "fake_exchange.py"), "run",
+               "--symbols", str(size), "--cycles", str(cycles), "--timeframe", timeframe,
+               "--clock", "virtual", "--db-dir", tmp, "--out", out] + passthrough
+        env = dict(os.environ, TELEGRAM_BOT_TOKEN="", UNIVERSE_SIZE=str(size))
+        try:
+            proc = subprocess.run(cmd, env=env, capture_output=True, text=True, timeout=timeout)
+        except subprocess.TimeoutExpired:
+            return {"universe": size, "error": f"timeout après {timeout:.0f}s"}
+        if proc.returncode != 0 or not os.path.exists(out):
+            tail = (proc.stderr or proc.stdout or "").strip().splitlines()[-5:]
+            return {"universe": size, "error": f"code {proc.returncode}: " + " | ".join(tail)}
+        with open(out, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+
+def _row(size: int, r: Dict[str, Any]) -> Dict[str, Any]:
+    if "error" in r:
+        return {"size": size, "error": r["error"]}
+    return {
+        "size": size, "universe": r["universe"], "cycles": r["cycles"],
+        "scan_avg_s": r["scan_avg_s"], "scan_max_s": r["scan_max_s"], "cycle_max_s": r["cycle_max_s"],
+        "rest_calls_per_cycle": r["rest_calls_per_cycle"], "db_writes_per_cycle": r["db_writes_per_cycle"],
+        "peak_rss_mb": r["peak_rss_mb"],
+        "close_to_detect_p50_ms": r["close_to_detect_p50_ms"], "close_to_detect_p99_ms": r["close_to_detect_p99_ms"],
+        "close_to_signal_p50_ms": r["close_to_signal_p50_ms"], "close_to_signal_p99_ms": r["close_to_signal_p99_ms"],
+        "signals": r["signals"], "rate_limited": r["venue"].get("rate_limited", 0),
+        "candle_seconds": r["candle_seconds"], "fits_candle": r["cycle_max_s"] <= r["candle_seconds"],
+    }
+
+
+def summarize(rows: List[Dict[str, Any]], candle_seconds: float) -> Dict[str, Any]:
+    """Plus grand univers mesuré tenant dans une bougie + extrapolation linéaire (coût/symbole)."""
+    ok = [r for r in rows if "error" not in r]
+    fitting = [r["universe"] for r in ok if r["fits_candle"]]
+    est = None
+    if ok:
+        biggest = max(ok, key=lambda r: r["universe"])
+        per_symbol = biggest["cycle_max_s"] / max(1, biggest["universe"])
+        est = int(candle_seconds / per_symbol) if per_symbol > 0 else None
+    return {"largest_fitting_universe": max(fitting) if fitting else None,
+            "estimated_max_universe": est, "candle_seconds": candle_seconds}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Montée en charge de la boucle de trading (exchange simulé)")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="Tailles d'univers, séparées par des virgules")
+    parser.add_argument("--cycles", type=int, default=3)
+    parser.add_argument("--timeframe", default=fake_exchange.FAKE_TIMEFRAME)
+    parser.add_argument("--latency-ms", type=float, default=fake_exchange.FAKE_LATENCY_MS)
+    parser.add_argument("--jitter-ms", type=float, default=fake_exchange.FAKE_LATENCY_JITTER_MS)
+    parser.add_argument("--error-rate", type=float, default=fake_exchange.FAKE_ERROR_RATE)
+    parser.add_argument("--no-rate-limits", action="store_true")
+    parser.add_argument("--seed", type=int, default=fake_exchange.FAKE_SEED)
+    parser.add_argument("--timeout", type=float, help="Durée max d'un run (s)")
+    parser.add_argument("--out", help="Fichier JSON du rapport")
+    args = parser.parse_args(argv)
+
+    sizes = sorted({int(s) for s in args.sizes.split(",") if s.strip()})
+    passthrough = ["--latency-ms", str(args.latency_ms), "--jitter-ms", str(args.jitter_ms),
+                   "--error-rate", str(args.error_rate), "--seed", str(args.seed)]
+    if args.no_rate_limits:
+        passthrough.append("--no-rate-limits")
+    candle_seconds = fake_exchange.timeframe_ms(args.timeframe) / 1000.0
+
+    rows: List[Dict[str, Any]] = []
+    print(f"{'univers':>8}{'scan s':>9}{'cycle s':>9}{'REST/c':>8}{'DB/c':>7}{'RSS Mo':>8}"
+          f"{'sig p50':>9}{'sig p99':>9}{'det p99':>9}  bougie")
+    for size in sizes:
+        r = _row(size, run_size(size, args.cycles, args.timeframe, passthrough, args.timeout))
+        rows.append(r)
+        if "error" in r:
+            print(f"{size:>8}  ❌ {r['error']}")
+            continue
+        print(f"{r['universe']:>8}{r['scan_max_s']:>9.1f}{r['cycle_max_s']:>9.1f}{r['rest_calls_per_cycle']:>8.0f}"
+              f"{r['db_writes_per_cycle']:>7.0f}{r['peak_rss_mb'] or 0:>8.0f}{r['close_to_signal_p50_ms']:>9.0f}"
+              f"{r['close_to_signal_p99_ms']:>9.0f}{r['close_to_detect_p99_ms']:>9.0f}  "
+              f"{'✅' if r['fits_candle'] else '❌'}", flush=True)
+
+    summary = summarize(rows, candle_seconds)
+    largest = summary["largest_fitting_universe"]
+    print(f"\n🕯️ Bougie {args.timeframe} = {candle_seconds:.0f}s")
+    print(f"🏁 Plus grand univers mesuré tenant dans une bougie: {largest if largest else 'aucun'}")
+    if summary["estimated_max_universe"]:
+        print(f"📈 Extrapolation linéaire: ~{summary['estimated_max_universe']} symboles")
+
+    if args.out:
+        report = {"created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                  "timeframe": args.timeframe, "cycles": args.cycles, "args": passthrough,
+                  "rows": rows, "summary": summary}
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 {args.out}")
+    return 0 if any("error" not in r for r in rows) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
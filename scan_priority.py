@@ -0,0 +1,181 @@
+# Fichier: scan_priority.py
+"""
+Priorisation du scan de l'univers (trading_engine_loop).
+
+Chaque scan d'un symbole laisse ici un instantané de ses indicateurs (BB20,
+BB80, ATR, extrêmes des dernières bougies). La distance à la zone de contact
+la plus proche est exprimée en ATR, donc adaptée à la volatilité du symbole:
+
+  d = min(low - bb20_lo, low - bb80_lo, bb20_up - high, bb80_up - high) / ATR
+
+sur la fenêtre de contact de detect_signal (3 bougies closes + bougie en cours),
+puis réduite avec le temps écoulé (≈ DRIFT ATR × √bougies) pour couvrir le
+mouvement possible depuis la dernière mesure.
+
+Paliers:
+  - chaud (d ≤ SCAN_HOT_ATR) ou inconnu : scanné à chaque cycle, en premier ;
+  - tiède (d ≤ SCAN_WARM_ATR)           : tous les SCAN_WARM_EVERY cycles ;
+  - froid                               : tous les SCAN_COLD_EVERY cycles.
+Garantie: un symbole pas encore scanné sur la bougie courante est forcé dès
+que le prochain cycle (estimé sur l'intervalle entre cycles) tomberait dans la
+bougie suivante. Chaque symbole est donc scanné au moins une fois par bougie.
+
+Paramètres (DB, défaut env): SCAN_PRIORITY_ENABLED, SCAN_HOT_ATR, SCAN_WARM_ATR,
+SCAN_WARM_EVERY, SCAN_COLD_EVERY, SCAN_DRIFT_ATR.
+"""
+import os
+import math
+import threading
+from collections import deque
+from typing import Dict, Any, List, Optional
+
+import database
+
+SCAN_PRIORITY_ENABLED = os.getenv("SCAN_PRIORITY_ENABLED", "true").lower() in ("1", "true", "yes")
+SCAN_HOT_ATR = float(os.getenv("SCAN_HOT_ATR", "1.0"))
+SCAN_WARM_ATR = float(os.getenv("SCAN_WARM_ATR", "3.0"))
+SCAN_WARM_EVERY = int(os.getenv("SCAN_WARM_EVERY", "2"))
+SCAN_COLD_EVERY = int(os.getenv("SCAN_COLD_EVERY", "4"))
+SCAN_DRIFT_ATR = float(os.getenv("SCAN_DRIFT_ATR", "1.0"))
+
+# Fenêtre de contact de detect_signal: bougies len-4..len-2 (+ bougie en cours)
+_CONTACT_WINDOW = 4
+
+_lock = threading.Lock()
+_snapshots: Dict[str, Dict[str, Any]] = {}
+_state: Dict[str, Any] = {"cycle": 0, "last_now_ms": None, "intervals": deque(maxlen=5)}
+_stats: Dict[str, int] = {"cycles": 0, "scanned": 0, "skipped": 0, "forced": 0,
+                          "hot": 0, "warm": 0, "cold": 0, "unknown": 0}
+
+
+def _setting_float(key: str, default: float) -> float:
+    try:
+        return float(database.get_setting(key, default))
+    except Exception:
+        return default
+
+
+def _setting_int(key: str, default: int) -> int:
+    try:
+        return max(1, int(float(database.get_setting(key, default))))
+    except Exception:
+        return default
+
+
+def is_enabled() -> bool:
+    try:
+        return str(database.get_setting('SCAN_PRIORITY_ENABLED', SCAN_PRIORITY_ENABLED)).lower() in ("1", "true", "yes")
+    except Exception:
+        return SCAN_PRIORITY_ENABLED
+
+
+def contact_distance_atr(df) -> Optional[float]:
+    """Distance (en ATR) entre les extrêmes récents et la bande BB20/BB80 la plus proche."""
+    try:
+        tail = df.iloc[-_CONTACT_WINDOW:]
+        atr = float(df['atr'].iloc[-2])
+        if not math.isfinite(atr) or atr <= 0:
+            return None
+        best = math.inf
+        for low, high, b20l, b20u, b80l, b80u in zip(tail['low'], tail['high'], tail['bb20_lo'],
+                                                     tail['bb20_up'], tail['bb80_lo'], tail['bb80_up']):
+            best = min(best, low - b20l, low - b80l, b20u - high, b80u - high)
+        if not math.isfinite(best):
+            return None
+        return max(0.0, best / atr)
+    except Exception:
+        return None
+
+
+def record(symbol: str, df, now_ms: int, tf_ms: int) -> None:
+    """Mémorise l'instantané d'un symbole qui vient d'être scanné."""
+    dist = contact_distance_atr(df) if df is not None else None
+    with _lock:
+        _snapshots[symbol] = {
+            "dist_atr": dist, "scanned_ms": int(now_ms),
+            "candle": int(now_ms) // tf_ms, "cycle": _state["cycle"],
+        }
+
+
+def effective_distance(snap: Optional[Dict[str, Any]], now_ms: int, tf_ms: int,
+                       drift_atr: float = SCAN_DRIFT_ATR) -> Optional[float]:
+    """Distance mesurée, diminuée du mouvement possible depuis (≈ drift × √bougies)."""
+    if not snap or snap.get("dist_atr") is None:
+        return None
+    bars = max(0.0, (now_ms - snap["scanned_ms"]) / float(tf_ms))
+    return max(0.0, snap["dist_atr"] - drift_atr * math.sqrt(bars))
+
+
+def select(universe: List[str], now_ms: int, tf_ms: int) -> List[str]:
+    """
+    Retourne les symboles à scanner pour ce cycle, du plus proche d'un contact
+    au plus lointain. Désactivé: l'univers complet, dans l'ordre.
+    """
+    now_ms = int(now_ms)
+    with _lock:
+        last = _state["last_now_ms"]
+        if last is not None and now_ms > last:
+            _state["intervals"].append(now_ms - last)
+        _state["last_now_ms"] = now_ms
+        _state["cycle"] += 1
+        cycle = _state["cycle"]
+        # Estimation prudente de la durée du prochain cycle: le plus long des derniers
+        interval = max(_state["intervals"]) if _state["intervals"] else 0
+        snaps = {s: _snapshots.get(s) for s in universe}
+
+    if not is_enabled():
+        with _lock:
+            _stats["cycles"] += 1
+            _stats["scanned"] += len(universe)
+        return list(universe)
+
+    hot_atr = _setting_float('SCAN_HOT_ATR', SCAN_HOT_ATR)
+    warm_atr = _setting_float('SCAN_WARM_ATR', SCAN_WARM_ATR)
+    warm_every = _setting_int('SCAN_WARM_EVERY', SCAN_WARM_EVERY)
+    cold_every = _setting_int('SCAN_COLD_EVERY', SCAN_COLD_EVERY)
+    drift = _setting_float('SCAN_DRIFT_ATR', SCAN_DRIFT_ATR)
+
+    candle = now_ms // tf_ms
+    # Dernier cycle de la bougie si le suivant (estimé) tombe dans la bougie d'après
+    last_chance = interval <= 0 or (now_ms + interval) // tf_ms > candle
+
+    due: List[tuple] = []
+    counts = {"hot": 0, "warm": 0, "cold": 0, "unknown": 0, "forced": 0}
+    for sym in universe:
+        snap = snaps[sym]
+        d = effective_distance(snap, now_ms, tf_ms, drift)
+        if d is None:
+            counts["unknown"] += 1
+            due.append((-1.0, sym))
+            continue
+        if d <= hot_atr:
+            counts["hot"] += 1
+            due.append((d, sym))
+            continue
+        tier_every = warm_every if d <= warm_atr else cold_every
+        counts["warm" if d <= warm_atr else "cold"] += 1
+        if cycle - snap["cycle"] >= tier_every:
+            due.append((d, sym))
+        elif snap["candle"] < candle and last_chance:
+            counts["forced"] += 1
+            due.append((d, sym))
+
+    due.sort(key=lambda t: t[0])
+    with _lock:
+        _stats["cycles"] += 1
+        _stats["scanned"] += len(due)
+        _stats["skipped"] += len(universe) - len(due)
+        for k, v in counts.items():
+            _stats[k] += v
+    return [sym for _, sym in due]
+
+
+def get_stats() -> Dict[str, Any]:
+    with _lock:
+        st = dict(_stats)
+        st["tracked"] = len(_snapshots)
+        st["interval_ms"] = max(_state["intervals"]) if _state["intervals"] else 0
+    cycles = max(1, st["cycles"])
+    st["scanned_per_cycle"] = round(st["scanned"] / cycles, 1)
+    st["skipped_per_cycle"] = round(st["skipped"] / cycles, 1)
+    return st
@@ -0,0 +1,218 @@
+# Fichier: sync_coordinator.py
+"""
+Coordinateur de synchronisation positions ⇄ exchange.
+
+sync_positions_with_exchange peut être demandé simultanément par le WS
+positions, le WS orders, le polling de secours, manage_open_positions,
+execute_trade et le démarrage. Ce module fusionne ces demandes:
+- une seule sync en vol à la fois (thread dédié) ;
+- toutes les demandes arrivées pendant une sync en cours partagent UNE
+  sync de rattrapage (trailing run), lancée après un intervalle minimum ;
+- une demande peut accepter un résultat récent (max_age) au lieu d'en relancer un ;
+- chaque demande reçoit un concurrent.futures.Future (attendable en thread
+  via .result() ou en asyncio via await_sync()) ;
+- les écritures incrémentales du WS positions passent par delta_write():
+  elles sont sérialisées avec la sync REST (même verrou) et un delta reçu
+  avant le début de la dernière sync (donc plus ancien que son instantané
+  REST) est ignoré.
+"""
+import time
+import asyncio
+import threading
+import contextlib
+from concurrent.futures import Future
+from typing import Dict, Any, Optional
+
+import database
+
+# Intervalle minimum entre deux syncs REST (secondes)
+_DEFAULT_MIN_INTERVAL = 1.0
+
+
+class SyncCoordinator:
+    def __init__(self, min_interval: Optional[float] = None):
+        self._cond = threading.Condition(threading.Lock())
+        self._min_interval_override = min_interval
+        self._pending: Optional[Future] = None
+        self._pending_ex = None
+        self._inflight: Optional[Future] = None
+        self._last_done: Optional[Future] = None
+        self._last_start_ts = 0.0
+        self._last_end_ts = 0.0
+        self._last_duration = 0.0
+        self._worker: Optional[threading.Thread] = None
+        # Tenu pendant toute la sync REST (lecture exchange + écritures DB)
+        self._write_lock = threading.Lock()
+        self._snapshot_ts = 0.0
+        self._stats = {"requests": 0, "runs": 0, "coalesced": 0, "fresh_hits": 0, "errors": 0,
+                       "stale_deltas": 0}
+
+    # ------------------------------------------------------------------
+    def _min_interval(self) -> float:
+        if self._min_interval_override is not None:
+            return float(self._min_interval_override)
+        try:
+            return max(0.0, float(database.get_setting('SYNC_MIN_INTERVAL_SECONDS', _DEFAULT_MIN_INTERVAL)))
+        except Exception:
+            return _DEFAULT_MIN_INTERVAL
+
+    def _ensure_worker(self) -> None:
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(target=self._run_loop, name="sync-coordinator", daemon=True)
+            self._worker.start()
+
+    def request(self, ex, max_age: float = 0.0) -> Future:
+        """
+        Demande une sync. Retourne un Future résolu à la fin de la sync qui
+        reflète l'état exchange postérieur à la demande.
+        max_age > 0 : si une sync a DÉMARRÉ il y a moins de max_age secondes
+        (et qu'aucune n'est en vol), on renvoie son résultat sans relancer.
+        """
+        with self._cond:
+            self._stats["requests"] += 1
+
+            if max_age and max_age > 0:
+                # Une sync en vol démarrée récemment suffit aussi
+                if self._inflight is not None and (time.time() - self._last_start_ts) <= max_age:
+                    self._stats["fresh_hits"] += 1
+                    return self._inflight
+                if (self._inflight is None and self._pending is None and self._last_done is not None
+                        and (time.time() - self._last_start_ts) <= max_age):
+                    self._stats["fresh_hits"] += 1
+                    return self._last_done
+
+            if self._pending is not None:
+                # Une sync de rattrapage est déjà planifiée: on s'y greffe
+                self._stats["coalesced"] += 1
+                if ex is not None:
+                    self._pending_ex = ex
+                return self._pending
+
+            fut: Future = Future()
+            self._pending = fut
+            self._pending_ex = ex
+            self._ensure_worker()
+            self._cond.notify_all()
+            return fut
+
+    def sync_now(self, ex, timeout: Optional[float] = 60.0, max_age: float = 0.0) -> None:
+        """Version bloquante de request() (ne lève pas)."""
+        try:
+            self.request(ex, max_age=max_age).result(timeout=timeout)
+        except Exception as e:
+            print(f"⚠️ sync_now: {e}")
+
+    async def await_sync(self, ex, max_age: float = 0.0) -> None:
+        """Version asyncio: n'occupe pas la boucle pendant la sync."""
+        await asyncio.wrap_future(self.request(ex, max_age=max_age))
+
+    @contextlib.contextmanager
+    def delta_write(self, received_ts: float):
+        """
+        Sérialise une écriture delta avec la sync REST. Cède True si le delta
+        (reçu à received_ts) est postérieur à l'instantané de la dernière sync,
+        False s'il est périmé et ne doit pas être appliqué.
+        """
+        with self._write_lock:
+            fresh = received_ts >= self._snapshot_ts
+            if not fresh:
+                with self._cond:
+                    self._stats["stale_deltas"] += 1
+            yield fresh
+
+    # ------------------------------------------------------------------
+    def _run_loop(self) -> None:
+        import trader  # import tardif (trader importe ce module)
+
+        while True:
+            with self._cond:
+                while self._pending is None:
+                    self._cond.wait()
+                # Debounce: respecte l'intervalle minimum depuis la dernière sync;
+                # les demandes qui arrivent pendant l'attente rejoignent ce même run.
+                wait = self._last_end_ts + self._min_interval() - time.time()
+                while wait > 0:
+                    self._cond.wait(timeout=wait)
+                    wait = self._last_end_ts + self._min_interval() - time.time()
+                fut = self._pending
+                ex = self._pending_ex
+                self._pending = None
+                self._pending_ex = None
+                self._inflight = fut
+                self._last_start_ts = time.time()
+                self._stats["runs"] += 1
+
+            t0 = time.time()
+            try:
+                # La sync avale ses exceptions et signale l'échec par False
+                with self._write_lock:
+                    self._snapshot_ts = time.time()
+                    ok = trader.sync_positions_with_exchange(ex) is not False
+                if not ok:
+                    with self._cond:
+                        self._stats["errors"] += 1
+                fut.set_result(ok)
+            except Exception as e:
+                with self._cond:
+                    self._stats["errors"] += 1
+                fut.set_exception(e)
+
+            with self._cond:
+                self._inflight = None
+                self._last_done = fut
+                self._last_end_ts = time.time()
+                self._last_duration = self._last_end_ts - t0
+                self._cond.notify_all()
+
+    # ------------------------------------------------------------------
+    def get_stats(self) -> Dict[str, Any]:
+        with self._cond:
+            st = dict(self._stats)
+            st["avoided"] = max(0, st["requests"] - st["runs"])
+            st["in_flight"] = self._inflight is not None
+            st["pending"] = self._pending is not None
+            st["last_run_ts"] = self._last_start_ts
+            st["last_duration_ms"] = self._last_duration * 1000.0
+        return st
+
+
+_coordinator = SyncCoordinator()
+
+
+def get_coordinator() -> SyncCoordinator:
+    return _coordinator
+
+
+def request_sync(ex, max_age: float = 0.0) -> Future:
+    return _coordinator.request(ex, max_age=max_age)
+
+
+def sync_now(ex, timeout: Optional[float] = 60.0, max_age: float = 0.0) -> None:
+    _coordinator.sync_now(ex, timeout=timeout, max_age=max_age)
+
+
+async def await_sync(ex, max_age: float = 0.0) -> None:
+    await _coordinator.await_sync(ex, max_age=max_age)
+
+
+def delta_write(received_ts: float):
+    return _coordinator.delta_write(received_ts)
+
+
+def get_stats() -> Dict[str, Any]:
+    return _coordinator.get_stats()
+
+
+def format_stats() -> str:
+    """Résumé HTML pour Telegram."""
+    try:
+        st = _coordinator.get_stats()
+    except Exception:
+        return "⚠️ Statistiques de sync indisponibles."
+    return (
+        "<b>🔄 Sync positions</b>\n"
+        f"- Demandes: <b>{st['requests']}</b> | Syncs REST: <b>{st['runs']}</b>\n"
+        f"- Évitées: <b>{st['avoided']}</b> (fusionnées {st['coalesced']}, récentes {st['fresh_hits']})\n"
+        f"- Erreurs: {st['errors']} | Deltas WS périmés: {st['stale_deltas']} | Dernière durée: {st['last_duration_ms']:.0f}ms\n"
+        f"- En cours: {'oui' if st['in_flight'] else 'non'} | Planifiée: {'oui' if st['pending'] else 'non'}"
+    )
@@ -0,0 +1,179 @@
+# Fichier: tg_outbox.py
+"""
+Boîte d'envoi Telegram asynchrone.
+
+tg_send ne bloque plus le thread appelant (boucle trading, chemins d'ordres):
+les messages sont déposés dans une file bornée et envoyés par un thread dédié
+qui respecte les limites Telegram (≈1 msg/s par chat, ≈30 msg/s global).
+
+- FIFO (l'ordre des messages est conservé) ;
+- rafales fusionnées: plusieurs textes simples consécutifs vers le même chat
+  partent en un seul message (≤ 4096 caractères) ;
+- saturation: les messages LOW sont sacrifiés en premier, puis NORMAL ;
+  les messages HIGH (erreurs, trades, menus) ne sont jamais jetés au profit
+  d'un message moins prioritaire ;
+- 429 Telegram: on respecte retry_after puis on réessaie.
+"""
+import os
+import time
+import threading
+from collections import deque
+from typing import Dict, Any, Optional, Callable
+
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2
+_PRIORITY_NAMES = {"high": PRIORITY_HIGH, "normal": PRIORITY_NORMAL, "low": PRIORITY_LOW}
+
+TG_MAX_TEXT = 4096
+OUTBOX_MAX_SIZE = int(os.getenv("TG_OUTBOX_MAX_SIZE", "200"))
+PER_CHAT_INTERVAL = float(os.getenv("TG_PER_CHAT_INTERVAL", "1.05"))   # s entre 2 messages d'un chat
+GLOBAL_RATE = float(os.getenv("TG_GLOBAL_RATE", "25"))                 # msg/s tous chats confondus
+MERGE_SEPARATOR = "\n\n"
+
+
+def parse_priority(priority) -> int:
+    if isinstance(priority, int):
+        return max(PRIORITY_HIGH, min(PRIORITY_LOW, priority))
+    return _PRIORITY_NAMES.get(str(priority or "normal").lower(), PRIORITY_NORMAL)
+
+
+class Outbox:
+    """
+    deliver(kind, payload, files) -> (ok: bool, retry_after: Optional[float])
+    est fourni par notifier (seul module qui connaît l'URL de l'API).
+    """
+
+    def __init__(self, deliver: Callable, max_size: int = OUTBOX_MAX_SIZE):
+        self._deliver = deliver
+        self._max_size = max(10, int(max_size))
+        self._queue: deque = deque()
+        self._cond = threading.Condition(threading.Lock())
+        self._thread: Optional[threading.Thread] = None
+        self._last_sent_per_chat: Dict[str, float] = {}
+        self._last_global = 0.0
+        self._inflight = False
+        self._stats = {"enqueued": 0, "sent": 0, "merged": 0, "dropped": 0, "failed": 0, "rate_limited": 0}
+
+    # ------------------------------------------------------------------
+    def start(self) -> None:
+        with self._cond:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="tg-outbox", daemon=True)
+                self._thread.start()
+
+    def put(self, kind: str, payload: Dict[str, Any], files: Optional[Dict[str, Any]] = None,
+            priority: int = PRIORITY_NORMAL, mergeable: bool = False) -> bool:
+        """Dépose un message. Retourne False s'il a été jeté (file saturée)."""
+        item = {"kind": kind, "payload": payload, "files": files, "priority": int(priority),
+                "mergeable": bool(mergeable), "ts": time.time()}
+        with self._cond:
+            if len(self._queue) >= self._max_size and not self._make_room(item["priority"]):
+                self._stats["dropped"] += 1
+                return False
+            self._queue.append(item)
+            self._stats["enqueued"] += 1
+            self._cond.notify_all()
+        self.start()
+        return True
+
+    def _make_room(self, incoming_priority: int) -> bool:
+        """Jette le message le moins prioritaire (le plus ancien à priorité égale) si moins prioritaire que l'entrant."""
+        worst_idx, worst_prio = None, -1
+        for i, it in enumerate(self._queue):
+            if it["priority"] > worst_prio:
+                worst_idx, worst_prio = i, it["priority"]
+        if worst_idx is None or worst_prio < incoming_priority or (worst_prio == PRIORITY_HIGH and incoming_priority == PRIORITY_HIGH):
+            return False
+        del self._queue[worst_idx]
+        self._stats["dropped"] += 1
+        return True
+
+    # ------------------------------------------------------------------
+    def _pop_batch(self) -> Dict[str, Any]:
+        """Retire le prochain message, fusionné avec les textes simples qui le suivent (même chat)."""
+        first = self._queue.popleft()
+        if first["kind"] != "text" or not first["mergeable"]:
+            return first
+        chat = first["payload"].get("chat_id")
+        text = first["payload"].get("text", "")
+        prio = first["priority"]
+        while self._queue:
+            nxt = self._queue[0]
+            if nxt["kind"] != "text" or not nxt["mergeable"] or nxt["payload"].get("chat_id") != chat:
+                break
+            candidate = text + MERGE_SEPARATOR + nxt["payload"].get("text", "")
+            if len(candidate) > TG_MAX_TEXT:
+                break
+            text = candidate
+            prio = min(prio, nxt["priority"])
+            self._queue.popleft()
+            self._stats["merged"] += 1
+        merged = dict(first)
+        merged["payload"] = {**first["payload"], "text": text}
+        merged["priority"] = prio
+        return merged
+
+    def _wait_rate(self, chat_id: str) -> None:
+        now = time.time()
+        wait_chat = self._last_sent_per_chat.get(chat_id, 0.0) + PER_CHAT_INTERVAL - now
+        wait_global = self._last_global + (1.0 / max(0.1, GLOBAL_RATE)) - now
+        wait = max(wait_chat, wait_global, 0.0)
+        if wait > 0:
+            time.sleep(wait)
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._queue:
+                    self._cond.wait()
+                item = self._pop_batch()
+                self._inflight = True
+
+            chat_id = str(item["payload"].get("chat_id", ""))
+            for attempt in range(3):
+                self._wait_rate(chat_id)
+                try:
+                    ok, retry_after = self._deliver(item["kind"], item["payload"], item.get("files"))
+                except Exception as e:
+                    print(f"Erreur d'envoi Telegram (outbox): {e}")
+                    ok, retry_after = False, None
+                now = time.time()
+                self._last_sent_per_chat[chat_id] = now
+                self._last_global = now
+                if ok:
+                    self._stats["sent"] += 1
+                    break
+                if retry_after:
+                    self._stats["rate_limited"] += 1
+                    time.sleep(min(60.0, float(retry_after)))
+                    continue
+                self._stats["failed"] += 1
+                break
+
+            with self._cond:
+                self._inflight = False
+                self._cond.notify_all()
+
+    # ------------------------------------------------------------------
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Attend que la file soit vide (ex: avant redémarrage). Retourne True si vidée."""
+        deadline = time.time() + timeout
+        with self._cond:
+            while self._queue or self._inflight:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(timeout=remaining)
+        return True
+
+    def depth(self) -> int:
+        with self._cond:
+            return len(self._queue)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._cond:
+            st = dict(self._stats)
+            st["queue_depth"] = len(self._queue)
+            st["oldest_age_s"] = (time.time() - self._queue[0]["ts"]) if self._queue else 0.0
+        return st
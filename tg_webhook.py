@@ -0,0 +1,81 @@
+# Fichier: tg_webhook.py
+"""
+Mode webhook Telegram (optionnel) : petit serveur HTTP local (stdlib) qui reçoit
+les updates poussés par Telegram, typiquement derrière un reverse proxy TLS.
+
+- POST <TG_WEBHOOK_PATH> avec l'en-tête X-Telegram-Bot-Api-Secret-Token
+  (vérifié si TG_WEBHOOK_SECRET est défini) ;
+- la réponse 200 part immédiatement : l'update est déposé dans une file et
+  traité par un thread dédié, dans l'ordre d'arrivée (Telegram ne renvoie pas
+  l'update et n'attend pas la fin du traitement).
+"""
+import os
+import json
+import queue
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from typing import Callable, Dict, Any, Optional
+
+WEBHOOK_HOST = os.getenv("TG_WEBHOOK_HOST", "127.0.0.1")
+WEBHOOK_PORT = int(os.getenv("TG_WEBHOOK_PORT", "8088"))
+WEBHOOK_PATH = os.getenv("TG_WEBHOOK_PATH", "/telegram")
+WEBHOOK_SECRET = os.getenv("TG_WEBHOOK_SECRET", "")
+WEBHOOK_PUBLIC_URL = os.getenv("TG_WEBHOOK_PUBLIC_URL", "")
+MAX_BODY_BYTES = 1_000_000
+
+
+def is_enabled() -> bool:
+    return os.getenv("TG_WEBHOOK_MODE", "false").lower() in ("1", "true", "yes")
+
+
+def _make_handler(inbox: "queue.Queue"):
+    class _Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            if self.path.split("?")[0] != WEBHOOK_PATH:
+                self.send_error(404)
+                return
+            if WEBHOOK_SECRET and self.headers.get("X-Telegram-Bot-Api-Secret-Token") != WEBHOOK_SECRET:
+                self.send_error(403)
+                return
+            try:
+                length = min(int(self.headers.get("Content-Length", "0")), MAX_BODY_BYTES)
+                update = json.loads(self.rfile.read(length) or b"{}")
+            except Exception:
+                self.send_error(400)
+                return
+            inbox.put(update)
+            self.send_response(200)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def log_message(self, fmt, *args):
+            # Pas de log HTTP par requête (bruit)
+            pass
+
+    return _Handler
+
+
+def _dispatch_loop(inbox: "queue.Queue", on_update: Callable[[Dict[str, Any]], None]) -> None:
+    while True:
+        update = inbox.get()
+        try:
+            on_update(update)
+        except Exception as e:
+            print(f"Erreur traitement update webhook: {e}")
+
+
+def start(on_update: Callable[[Dict[str, Any]], None]) -> Optional[HTTPServer]:
+    """
+    Démarre le serveur (thread daemon) et le thread de traitement.
+    Retourne le serveur, ou None si le port n'a pas pu être ouvert.
+    """
+    inbox: "queue.Queue" = queue.Queue()
+    try:
+        server = HTTPServer((WEBHOOK_HOST, WEBHOOK_PORT), _make_handler(inbox))
+    except Exception as e:
+        print(f"❌ Webhook Telegram: impossible d'écouter sur {WEBHOOK_HOST}:{WEBHOOK_PORT}: {e}")
+        return None
+    threading.Thread(target=server.serve_forever, name="tg-webhook-http", daemon=True).start()
+    threading.Thread(target=_dispatch_loop, args=(inbox, on_update), name="tg-webhook-dispatch", daemon=True).start()
+    print(f"🌐 Webhook Telegram à l'écoute sur http://{WEBHOOK_HOST}:{WEBHOOK_PORT}{WEBHOOK_PATH}")
+    return server
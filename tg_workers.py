@@ -0,0 +1,126 @@
+# Fichier: tg_workers.py
+"""
+Pool de workers pour les commandes Telegram lourdes (stats + graphique
+d'équité, vue positions synchronisée, scan test, diagnostic, backup Dropbox).
+
+Le thread d'écoute Telegram ne fait plus que router: il accuse réception
+du callback puis dépose la commande ici, et reste disponible pour les
+updates suivants.
+
+- pool borné (TG_WORKERS threads) + file d'attente bornée ;
+- limite de concurrence par catégorie (ex: un seul backup à la fois) ;
+- déduplication: une commande identique déjà en file ou en cours
+  (deux clics sur /stats) n'est pas relancée.
+"""
+import os
+import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Callable, Hashable, Optional
+
+MAX_WORKERS = int(os.getenv("TG_WORKERS", "4"))
+MAX_PENDING = int(os.getenv("TG_WORKERS_MAX_PENDING", "32"))
+
+# catégorie -> exécutions simultanées max (défaut: 1)
+CATEGORY_LIMITS: Dict[str, int] = {
+    "stats": 1,
+    "positions": 1,
+    "signals": 2,
+    "diagnostic": 1,
+    "scan": 1,
+    "backup": 1,
+}
+
+
+class CommandPool:
+    def __init__(self, max_workers: int = MAX_WORKERS, max_pending: int = MAX_PENDING):
+        self._executor = ThreadPoolExecutor(max_workers=max(1, int(max_workers)), thread_name_prefix="tg-worker")
+        self._max_pending = max(1, int(max_pending))
+        self._lock = threading.Lock()
+        self._inflight: Dict[Hashable, float] = {}          # clé de dédup -> ts de dépôt
+        self._running: Dict[str, int] = {}                   # catégorie -> en cours
+        self._waiting: Dict[str, deque] = {}                 # catégorie -> tâches en attente
+        self._stats = {"submitted": 0, "deduped": 0, "rejected": 0, "done": 0, "failed": 0}
+
+    # ------------------------------------------------------------------
+    def submit(self, key: Hashable, category: str, fn: Callable, *args, **kwargs) -> str:
+        """
+        Dépose fn(*args, **kwargs). Retourne:
+        'queued' (accepté), 'duplicate' (identique déjà en cours) ou 'rejected' (file pleine).
+        """
+        task = (key, category, fn, args, kwargs)
+        with self._lock:
+            if key in self._inflight:
+                self._stats["deduped"] += 1
+                return "duplicate"
+            if len(self._inflight) >= self._max_pending:
+                self._stats["rejected"] += 1
+                return "rejected"
+            self._inflight[key] = time.time()
+            self._stats["submitted"] += 1
+            if self._running.get(category, 0) < CATEGORY_LIMITS.get(category, 1):
+                self._running[category] = self._running.get(category, 0) + 1
+            else:
+                self._waiting.setdefault(category, deque()).append(task)
+                return "queued"
+        self._executor.submit(self._run, task)
+        return "queued"
+
+    def _run(self, task) -> None:
+        key, category, fn, args, kwargs = task
+        try:
+            fn(*args, **kwargs)
+            ok = True
+        except Exception as e:
+            ok = False
+            print(f"⚠️ Commande Telegram '{key}' en erreur (worker): {e}")
+
+        nxt = None
+        with self._lock:
+            self._inflight.pop(key, None)
+            self._stats["done" if ok else "failed"] += 1
+            waiting = self._waiting.get(category)
+            if waiting:
+                nxt = waiting.popleft()   # le slot de la catégorie passe directement à la suivante
+            else:
+                self._running[category] = max(0, self._running.get(category, 0) - 1)
+        if nxt is not None:
+            self._executor.submit(self._run, nxt)
+
+    # ------------------------------------------------------------------
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            st = dict(self._stats)
+            st["inflight"] = len(self._inflight)
+            st["running"] = {k: v for k, v in self._running.items() if v}
+            st["waiting"] = sum(len(q) for q in self._waiting.values())
+        return st
+
+
+_POOL: Optional[CommandPool] = None
+_POOL_LOCK = threading.Lock()
+
+
+def get_pool() -> CommandPool:
+    global _POOL
+    if _POOL is None:
+        with _POOL_LOCK:
+            if _POOL is None:
+                _POOL = CommandPool()
+    return _POOL
+
+
+def submit(key: Hashable, category: str, fn: Callable, *args, **kwargs) -> str:
+    return get_pool().submit(key, category, fn, *args, **kwargs)
+
+
+def format_stats() -> str:
+    st = get_pool().get_stats()
+    running = ", ".join(f"{k}={v}" for k, v in sorted(st["running"].items())) or "aucune"
+    return (
+        "<b>🧵 Workers Telegram</b>\n"
+        f"- En cours: {running} | En attente: {st['waiting']}\n"
+        f"- Exécutées: {st['done']} | Erreurs: {st['failed']}\n"
+        f"- Doublons ignorés: {st['deduped']} | Refusées (file pleine): {st['rejected']}"
+    )
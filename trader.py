@@ -8,6 +8,18 @@ import database
 import notifier
 import charting
 import utils
+import rate_limiter
+import sync_coordinator
+import batch_orders
+import perf_metrics
+import resilience
+import http_pool
+import price_service
+import liquidity
+import correlation
+import universe_cache
+import fake_exchange
+import traffic_recorder
 
 # --- Paramètres de Trading ---
 try:
@@ -42,18 +54,23 @@ BE_OFFSET_PCT   = float(os.getenv("BE_OFFSET_PCT", "0.005"))   # 0.5% pour couvr
 # ==============================================================================
 
 def create_exchange():
-    ex = ccxt.bitget({
-        'apiKey': os.getenv('BITGET_API_KEY'),
-        'secret': os.getenv('BITGET_API_SECRET'),
-        'password': os.getenv('BITGET_PASSPHRASSE'),
-        'options': {
-            'defaultType': 'swap',
-            'defaultSubType': 'linear',
-        },
-        'timeout': 15000,  # 15 secondes
-        'enableRateLimit': True,  # ← IMPORTANT
-    })
-    return ex
+    if fake_exchange.is_enabled():
+        ex = fake_exchange.create_exchange()
+    else:
+        ex = ccxt.bitget({
+            'apiKey': os.getenv('BITGET_API_KEY'),
+            'secret': os.getenv('BITGET_API_SECRET'),
+            'password': os.getenv('BITGET_PASSPHRASSE'),
+            'options': {
+                'defaultType': 'swap',
+                'defaultSubType': 'linear',
+            },
+            'timeout': 15000,  # 15 secondes
+            'enableRateLimit': True,  # ← IMPORTANT
+        })
+    # même chaîne que main.create_exchange : l'exchange simulé est aussi enregistré
+    ex = traffic_recorder.wrap(ex)
+    return resilience.wrap_exchange(rate_limiter.wrap_exchange(perf_metrics.instrument(ex)))
 
 def get_universe_size() -> int:
     """
@@ -78,7 +95,9 @@ def is_tradeable_symbol(ex, symbol: str) -> bool:
     2. OU dans whitelist manuelle
     3. Spread bid/ask acceptable (< 0.2%)
     
-    PAS de check volume (manipulable, instable).
+    PAS de check volume (manipulable, instable) sauf MIN_QUOTE_VOLUME_USDT > 0.
+    Lecture dans la table de liquidité (liquidity.py, un fetch_tickers pour tout
+    l'univers) ; fetch_ticker unitaire seulement si le symbole y est absent.
     
     Args:
         ex: Exchange
@@ -89,52 +108,113 @@ def is_tradeable_symbol(ex, symbol: str) -> bool:
     """
     try:
         base = symbol.split('/')[0].upper()
+        liquidity.refresh(ex)
         
-        # ====== WHITELIST (bypass tous les checks) ======
-        try:
-            whitelist_str = database.get_setting('SYMBOL_WHITELIST', '')
-            if whitelist_str:
-                whitelist = [s.strip().upper() for s in whitelist_str.split(',')]
-                if base in whitelist:
-                    print(f"✅ {base} dans whitelist")
-                    return True
-        except Exception:
-            pass
-        
-        # ====== SPREAD BID/ASK (indicateur liquidité RÉEL) ======
-        try:
-            ticker = ex.fetch_ticker(symbol)
-            
-            bid = float(ticker.get('bid', 0))
-            ask = float(ticker.get('ask', 0))
-            
-            if bid <= 0 or ask <= 0:
-                print(f"❌ {base} : Pas de bid/ask valide")
-                return False
-            
-            spread_pct = ((ask - bid) / bid) * 100
-            
-            # Seuil configurable
+        entry = liquidity.lookup(symbol)
+        if entry is None and not liquidity.is_whitelisted(symbol):
             try:
-                max_spread = float(database.get_setting('MAX_SPREAD_PCT', '0.2'))
-            except Exception:
-                max_spread = 0.2  # 0.2% par défaut
-            
-            if spread_pct > max_spread:
-                print(f"❌ {base} spread trop large : {spread_pct:.3f}% > {max_spread}%")
+                entry = liquidity.update(symbol, ex.fetch_ticker(symbol))
+            except Exception as e:
+                print(f"❌ {base} erreur spread check : {e}")
                 return False
-            
-            print(f"✅ {base} spread OK : {spread_pct:.3f}%")
-            return True
         
-        except Exception as e:
-            print(f"❌ {base} erreur spread check : {e}")
-            return False
+        ok, reason = liquidity.check(symbol, entry)
+        print(f"{'✅' if ok else '❌'} {base} {reason}")
+        return bool(ok)
     
     except Exception as e:
         print(f"❌ Erreur is_tradeable_symbol : {e}")
         return False
 
+def correlation_rejection_reason(open_positions: List[Dict[str, Any]], new_symbol: str,
+                                 new_side: str, use_correlation: bool = False) -> Optional[str]:
+    """
+    Règles d'exposition de check_correlation_risk, sans effet de bord (réutilisées
+    par le backtest). Retourne le message de rejet, ou None si le risque est acceptable.
+
+    use_correlation: exposition corrélée mesurée (matrice EWMA de correlation.py)
+    au lieu des groupes sectoriels figés ; ceux-ci ne servent plus que si la
+    matrice n'a encore aucune corrélation fiable pour le nouveau symbole.
+    """
+    # ====== LIMITE GLOBALE PAR DIRECTION ======
+    same_direction_count = sum(
+        1 for pos in open_positions 
+        if pos.get('side') == new_side
+    )
+    
+    try:
+        max_same_direction = int(database.get_setting('MAX_SAME_DIRECTION', '3'))
+    except Exception:
+        max_same_direction = 3
+    
+    if same_direction_count >= max_same_direction:
+        return (
+            f"⚠️ Trade {new_symbol} {new_side.upper()} rejeté\n"
+            f"Déjà {same_direction_count} positions {new_side.upper()} ouvertes\n"
+            f"Max autorisé : {max_same_direction}\n"
+            f"➡️ Risque systémique trop élevé"
+        )
+    
+    # ====== EXPOSITION CORRÉLÉE (matrice glissante) ======
+    if use_correlation:
+        exposure, unknown, detail = correlation.exposure(new_symbol, new_side, open_positions)
+        if detail:
+            try:
+                max_exposure = float(database.get_setting('MAX_CORRELATED_EXPOSURE', '1.8'))
+            except Exception:
+                max_exposure = 1.8
+            if exposure >= max_exposure:
+                top = sorted(detail, key=lambda d: d[1], reverse=True)[:3]
+                return (
+                    f"⚠️ Trade {new_symbol} {new_side.upper()} rejeté\n"
+                    f"Exposition corrélée {exposure:.2f} ≥ {max_exposure}\n"
+                    + "".join(f"• {sym} ρ·sens={c:+.2f}\n" for sym, c in top)
+                    + "➡️ Diversification insuffisante"
+                )
+            return None
+
+    # ====== LIMITE PAR SECTEUR (repli sans données de corrélation) ======
+    correlated_groups = {
+        'L1_ALTS': ['SOL', 'AVAX', 'NEAR', 'FTM', 'ATOM', 'DOT', 'ADA', 'ALGO', 'TIA'],
+        'DEFI': ['UNI', 'AAVE', 'SNX', 'COMP', 'MKR', 'CRV', 'SUSHI', 'BAL', 'YFI'],
+        'MEME': ['DOGE', 'SHIB', 'PEPE', 'FLOKI', 'WIF', 'BONK'],
+        'GAMING': ['AXS', 'SAND', 'MANA', 'ENJ', 'GALA', 'IMX', 'BEAM'],
+        'LAYER2': ['ARB', 'OP', 'MATIC', 'LRC', 'METIS', 'STRK'],
+        'AI': ['FET', 'AGIX', 'RNDR', 'GRT', 'OCEAN'],
+    }
+    
+    new_base = new_symbol.split('/')[0].upper()
+    
+    # Trouver groupe du nouveau trade
+    new_group = None
+    for group_name, symbols in correlated_groups.items():
+        if new_base in symbols:
+            new_group = group_name
+            break
+    
+    if new_group:
+        # Compter positions dans le même groupe + même direction
+        same_sector_count = sum(
+            1 for pos in open_positions
+            if pos.get('side') == new_side and 
+               pos.get('symbol', '').split('/')[0].upper() in correlated_groups[new_group]
+        )
+        
+        try:
+            max_per_sector = int(database.get_setting('MAX_PER_SECTOR', '2'))
+        except Exception:
+            max_per_sector = 2
+        
+        if same_sector_count >= max_per_sector:
+            return (
+                f"⚠️ Trade {new_symbol} rejeté\n"
+                f"Déjà {same_sector_count} positions dans secteur {new_group}\n"
+                f"➡️ Diversification insuffisante"
+            )
+    
+    return None
+
+
 def check_correlation_risk(ex, new_symbol: str, new_side: str) -> bool:
     """
     Évite sur-exposition même sur paires "décorrélées".
@@ -142,7 +222,8 @@ def check_correlation_risk(ex, new_symbol: str, new_side: str) -> bool:
     RÈGLE PRO :
     - Max 3 positions LONG en même temps (toutes paires confondues)
     - Max 3 positions SHORT en même temps
-    - Max 2 dans le même secteur (L1, DeFi, Meme...)
+    - Exposition corrélée (Σ ρ × sens) < MAX_CORRELATED_EXPOSURE, ρ mesurée
+      sur les rendements récents (repli: max 2 dans le même secteur)
     
     POURQUOI ?
     - Lors d'un crash BTC -10%, TOUT dump ensemble
@@ -158,68 +239,11 @@ def check_correlation_risk(ex, new_symbol: str, new_side: str) -> bool:
         True si risque acceptable, False si rejet
     """
     try:
-        open_positions = database.get_open_positions()
-        
-        # ====== LIMITE GLOBALE PAR DIRECTION ======
-        same_direction_count = sum(
-            1 for pos in open_positions 
-            if pos.get('side') == new_side
-        )
-        
-        try:
-            max_same_direction = int(database.get_setting('MAX_SAME_DIRECTION', '3'))
-        except Exception:
-            max_same_direction = 3
-        
-        if same_direction_count >= max_same_direction:
-            notifier.tg_send(
-                f"⚠️ Trade {new_symbol} {new_side.upper()} rejeté\n"
-                f"Déjà {same_direction_count} positions {new_side.upper()} ouvertes\n"
-                f"Max autorisé : {max_same_direction}\n"
-                f"➡️ Risque systémique trop élevé"
-            )
+        open_positions = database.get_open_positions_cached()
+        reason = correlation_rejection_reason(open_positions, new_symbol, new_side, use_correlation=True)
+        if reason:
+            notifier.tg_send(reason, priority="low")
             return False
-        
-        # ====== LIMITE PAR SECTEUR (bonus) ======
-        correlated_groups = {
-            'L1_ALTS': ['SOL', 'AVAX', 'NEAR', 'FTM', 'ATOM', 'DOT', 'ADA', 'ALGO', 'TIA'],
-            'DEFI': ['UNI', 'AAVE', 'SNX', 'COMP', 'MKR', 'CRV', 'SUSHI', 'BAL', 'YFI'],
-            'MEME': ['DOGE', 'SHIB', 'PEPE', 'FLOKI', 'WIF', 'BONK'],
-            'GAMING': ['AXS', 'SAND', 'MANA', 'ENJ', 'GALA', 'IMX', 'BEAM'],
-            'LAYER2': ['ARB', 'OP', 'MATIC', 'LRC', 'METIS', 'STRK'],
-            'AI': ['FET', 'AGIX', 'RNDR', 'GRT', 'OCEAN'],
-        }
-        
-        new_base = new_symbol.split('/')[0].upper()
-        
-        # Trouver groupe du nouveau trade
-        new_group = None
-        for group_name, symbols in correlated_groups.items():
-            if new_base in symbols:
-                new_group = group_name
-                break
-        
-        if new_group:
-            # Compter positions dans le même groupe + même direction
-            same_sector_count = sum(
-                1 for pos in open_positions
-                if pos.get('side') == new_side and 
-                   pos.get('symbol', '').split('/')[0].upper() in correlated_groups[new_group]
-            )
-            
-            try:
-                max_per_sector = int(database.get_setting('MAX_PER_SECTOR', '2'))
-            except Exception:
-                max_per_sector = 2
-            
-            if same_sector_count >= max_per_sector:
-                notifier.tg_send(
-                    f"⚠️ Trade {new_symbol} rejeté\n"
-                    f"Déjà {same_sector_count} positions dans secteur {new_group}\n"
-                    f"➡️ Diversification insuffisante"
-                )
-                return False
-        
         return True
     
     except Exception as e:
@@ -232,19 +256,10 @@ def get_universe_by_market_cap(ex: ccxt.Exchange, size: int) -> List[str]:
     sans limite artificielle à 100. Supporte jusqu'à 500 via pagination (250/par page).
     On retourne strictement les 'size' premières paires disponibles sur Bitget.
 
-    Cache léger en RAM pour la journée courante + taille demandée.
+    Classement persisté (universe_cache, 'market_cap'), réutilisé 24 h et après redémarrage.
     """
-    import time
-    import requests
-
-    # --- cache process-local (clé = (jour_utc, size)) ---
-    now_day = time.gmtime().tm_yday
-    key = (now_day, int(size))
-    if not hasattr(get_universe_by_market_cap, "_cache"):
-        get_universe_by_market_cap._cache = {}
-    cache = get_universe_by_market_cap._cache
-    if key in cache:
-        return cache[key][:size]
+    if universe_cache.is_fresh("market_cap", size):
+        return universe_cache.get_symbols("market_cap", size)
 
     # Charger les marchés Bitget une fois
     try:
@@ -263,6 +278,7 @@ def get_universe_by_market_cap(ex: ccxt.Exchange, size: int) -> List[str]:
     per_page = 250
     pages = (int(size) + per_page - 1) // per_page
     picked: List[str] = []
+    mcaps: Dict[str, float] = {}
 
     for page in range(1, pages + 1):
         try:
@@ -275,7 +291,7 @@ def get_universe_by_market_cap(ex: ccxt.Exchange, size: int) -> List[str]:
                 "price_change_percentage": "24h",
                 "sparkline": "false",
             }
-            r = requests.get(url, params=params, timeout=15)
+            r = http_pool.coingecko().get(url, params=params, timeout=15)
             r.raise_for_status()
             items = r.json() or []
         except Exception:
@@ -287,52 +303,53 @@ def get_universe_by_market_cap(ex: ccxt.Exchange, size: int) -> List[str]:
             if not base:
                 continue
             for cand in _to_ccxt_candidates(base):
-                if cand in symbols_set:
+                if cand in symbols_set and cand not in mcaps:
                     picked.append(cand)
+                    mcaps[cand] = float(it.get("market_cap") or 0.0)
                     break  # on a mappé cette base => passe à la suivante
             if len(picked) >= size:
                 break
         if len(picked) >= size:
             break
 
-    # Mémorise dans le cache du jour (même si incomplet, on laisse le fallback du caller gérer)
-    cache[key] = picked[:]
+    # Persiste le classement (même incomplet, on laisse le fallback du caller gérer)
+    if picked:
+        universe_cache.put_ranking("market_cap", [{"symbol": s, "score": mcaps.get(s, 0.0)} for s in picked], size)
     return picked[:size]
 
 
 
-def _coingecko_coin_list_cached() -> list:
+def _coingecko_symbol_index() -> Dict[str, List[str]]:
     """
-    Retourne la liste CoinGecko (id, symbol, name) avec cache 1×/jour
-    dans settings.COINGECKO_COIN_LIST_JSON et settings.COINGECKO_COIN_LIST_TS.
+    Index CoinGecko {SYMBOLE: [ids]} rafraîchi 1×/jour, stocké dans le cache
+    fichier (universe_cache) au lieu de la liste complète en JSON dans settings.
     """
-    import time, json, requests
+    import json
+    if universe_cache.coingecko_index_fresh():
+        return universe_cache.coingecko_index()
+
+    # Migration: ancienne liste en settings.COINGECKO_COIN_LIST_JSON → index fichier
     try:
-        ts = float(database.get_setting('COINGECKO_COIN_LIST_TS', '0') or '0')
-    except Exception:
-        ts = 0.0
-    now = time.time()
-    if now - ts < 23 * 3600:
-        try:
-            raw = database.get_setting('COINGECKO_COIN_LIST_JSON', '[]') or '[]'
+        raw = database.get_setting('COINGECKO_COIN_LIST_JSON', '') or ''
+        if raw:
+            database.set_setting('COINGECKO_COIN_LIST_JSON', '')
             data = json.loads(raw)
-            if isinstance(data, list) and data:
-                return data
-        except Exception:
-            pass
+            if isinstance(data, list) and data and not universe_cache.coingecko_index():
+                universe_cache.put_coingecko_index(data)
+    except Exception:
+        pass
 
     url = "https://api.coingecko.com/api/v3/coins/list"
     try:
-        r = requests.get(url, timeout=20)
+        r = http_pool.coingecko().get(url, timeout=20)
         r.raise_for_status()
         data = r.json() if r.content else []
-        if isinstance(data, list):
-            database.set_setting('COINGECKO_COIN_LIST_JSON', json.dumps(data))
-            database.set_setting('COINGECKO_COIN_LIST_TS', str(now))
-            return data
+        if isinstance(data, list) and data:
+            return universe_cache.put_coingecko_index(data)
     except Exception:
         pass
-    return []
+    # Réseau indisponible: index périmé plutôt que rien
+    return universe_cache.coingecko_index()
 
 
 def _coingecko_market_caps_for_symbols(bases: list, sym_to_ids: dict) -> dict:
@@ -341,7 +358,7 @@ def _coingecko_market_caps_for_symbols(bases: list, sym_to_ids: dict) -> dict:
     sur tous les ids possibles du symbole et retient la market cap max.
     Retourne { 'BTC': mcap_usd, ... }.
     """
-    import math, json, requests
+    import math, json
     result = {}
     if not bases:
         return result
@@ -376,7 +393,7 @@ def _coingecko_market_caps_for_symbols(bases: list, sym_to_ids: dict) -> dict:
                 "sparkline": "false",
                 "price_change_percentage": "24h"
             }
-            r = requests.get(url, params=params, timeout=25)
+            r = http_pool.coingecko().get(url, params=params, timeout=25)
             r.raise_for_status()
             data = r.json() if r.content else []
             for item in data or []:
@@ -647,9 +664,10 @@ def adapt_strategy_to_regime(regime: str) -> dict:
             'enable_ct': True,
         }
 
-def is_good_trading_session() -> bool:
+def is_good_trading_session(now=None) -> bool:
     """
     Filtre les sessions de trading optimales.
+    `now` (datetime UTC) permet d'évaluer une heure passée (backtest) ; défaut: maintenant.
     
     ÉVITE :
     - Weekend (volume -60%, spreads x3)
@@ -682,7 +700,8 @@ def is_good_trading_session() -> bool:
         if not enable_filter:
             return True
         
-        now = datetime.datetime.utcnow()
+        if now is None:
+            now = datetime.datetime.utcnow()
         hour = now.hour
         weekday = now.weekday()  # 0=Monday, 6=Sunday
         
@@ -2006,9 +2025,165 @@ def _estimate_pnl_for_closed_trade(ex, row: Dict[str, Any]) -> float:
     except Exception:
         return 0.0
 
-def sync_positions_with_exchange(ex) -> None:
+def _positions_to_ex_map(ex_positions: List[Dict[str, Any]]) -> Dict[str, Optional[Dict[str, Any]]]:
+    """
+    Normalise des positions (format _fetch_positions_safe) par symbole → {symbol, side, qty, entry}.
+    Une taille nulle donne None (exchange FLAT sur ce symbole).
+    """
+    ex_map: Dict[str, Optional[Dict[str, Any]]] = {}
+    for p in ex_positions or []:
+        sym = p.get("symbol")
+        if not sym:
+            continue
+        raw_size = float(p.get("size") or p.get("contracts") or p.get("positionAmt") or 0.0)
+        if raw_size == 0:
+            ex_map.setdefault(sym, None)
+            continue
+        side = p.get("side") or ("long" if raw_size > 0 else "short")
+        qty = abs(raw_size)
+        entry = float(p.get("entryPrice") or 0.0)
+        # Canonise side pour notre DB: 'buy'/'sell'
+        side_db = "buy" if str(side).lower() in ("long", "buy") else "sell"
+        ex_map[sym] = {"symbol": sym, "side": side_db, "qty": qty, "entry": entry}
+    return ex_map
+
+
+def _open_trades_by_symbol() -> Dict[str, List[Dict[str, Any]]]:
+    db_by_symbol: Dict[str, List[Dict[str, Any]]] = {}
+    for r in database.get_open_positions() or []:
+        db_by_symbol.setdefault(r.get("symbol", ""), []).append(r)
+    return db_by_symbol
+
+
+def _reconcile_symbol(ex, sym: str, ex_info: Optional[Dict[str, Any]],
+                      db_list: List[Dict[str, Any]], refresh_tp_sl: bool = True) -> None:
+    """
+    Aligne la DB sur l'état exchange d'UN symbole (cas A/B/C de sync_positions_with_exchange).
+    refresh_tp_sl=False évite le fetch_open_orders REST du cas C (chemin WS).
+    """
+    # --- Cas A: exchange FLAT, DB a des OPEN → fermer tous en DB (avec PnL estimé)
+    if ex_info is None and db_list:
+        for row in db_list:
+            try:
+                estimated_pnl = _estimate_pnl_for_closed_trade(ex, row)
+            except Exception:
+                estimated_pnl = 0.0
+            try:
+                database.close_trade(
+                    int(row["id"]),
+                    status="CLOSED_BY_EXCHANGE",
+                    pnl=float(estimated_pnl),
+                )
+            except Exception:
+                # fallback: ancien comportement (pnl=0)
+                try:
+                    database.close_trade(
+                        int(row["id"]),
+                        status="CLOSED_BY_EXCHANGE",
+                        pnl=0.0,
+                    )
+                except Exception:
+                    pass
+        return
+
+    # --- Cas B: exchange a une position, DB n’a rien → créer + recopie TP/SL si trouvés
+    if ex_info is not None and not db_list:
+        try:
+            # Crée un trade importé
+            database.create_trade(
+                symbol=sym,
+                side=ex_info["side"],
+                regime="Importé",
+                entry_price=float(ex_info["entry"] or 0.0),
+                sl_price=float(ex_info["entry"] or 0.0),
+                tp_price=float(ex_info["entry"] or 0.0),
+                quantity=float(ex_info["qty"] or 0.0),
+                risk_percent=RISK_PER_TRADE_PERCENT,
+                management_strategy=str(database.get_setting('STRATEGY_MODE', 'NORMAL') or 'NORMAL'),
+                entry_atr=0.0,
+                entry_rsi=0.0,
+            )
+        except Exception:
+            pass
+        # Recopie TP/SL éventuels depuis les ordres
+        try:
+            tp_ex, sl_ex = _fetch_existing_tp_sl(ex, sym)
+            if tp_ex or sl_ex:
+                # retrouver le trade nouvellement créé (le plus récent pour ce symbole)
+                fresh = [t for t in database.get_open_positions() if t.get("symbol") == sym]
+                if fresh:
+                    keep = max(fresh, key=lambda x: int(x.get("open_timestamp") or 0))
+                    if tp_ex:
+                        database.update_trade_tp(int(keep["id"]), float(tp_ex))
+                    if sl_ex:
+                        try:
+                            database.update_trade_sl(int(keep["id"]), float(sl_ex))
+                        except AttributeError:
+                            database.update_trade_to_breakeven(
+                                int(keep["id"]),
+                                float(keep.get("quantity") or 0.0),
+                                float(sl_ex),
+                            )
+        except Exception:
+            pass
+        return
+
+    # --- Cas C: exchange a une position, DB a ≥1 OPEN → agrège: on garde 1, on ferme les autres
+    if ex_info is not None and db_list:
+        # Sélectionne le "keeper": le plus récent (open_timestamp) puis id
+        try:
+            keeper = max(db_list, key=lambda x: (int(x.get("open_timestamp") or 0), int(x.get("id") or 0)))
+        except Exception:
+            keeper = db_list[0]
+        keep_id = int(keeper["id"])
+
+        # Ferme les doublons
+        for row in db_list:
+            rid = int(row["id"])
+            if rid == keep_id:
+                continue
+            try:
+                database.close_trade(rid, status='MERGED_BY_SYNC', pnl=0.0)
+            except Exception:
+                pass
+
+        # Met à jour le trade conservé pour refléter l’exchange (side/qty/entry)
+        try:
+            database.update_trade_core(
+                trade_id=keep_id,
+                side=str(ex_info["side"]),
+                entry_price=float(ex_info["entry"] or 0.0),
+                quantity=float(ex_info["qty"] or 0.0),
+                regime=keeper.get("regime") or "Importé"
+            )
+        except Exception:
+            pass
+
+        # Recopie TP/SL si présents sur l’exchange (le flux WS orders s'en charge déjà)
+        if not refresh_tp_sl:
+            return
+        try:
+            tp_ex, sl_ex = _fetch_existing_tp_sl(ex, sym)
+            if tp_ex:
+                database.update_trade_tp(keep_id, float(tp_ex))
+            if sl_ex:
+                try:
+                    database.update_trade_sl(keep_id, float(sl_ex))
+                except AttributeError:
+                    database.update_trade_to_breakeven(
+                        keep_id,
+                        float(ex_info["qty"] or 0.0),
+                        float(sl_ex),
+                    )
+        except Exception:
+            pass
+
+
+@rate_limiter.in_lane(rate_limiter.LANE_POSITION)
+def sync_positions_with_exchange(ex) -> bool:
     """
     Synchronise la table trades avec L’EXCHANGE COMME SOURCE DE VÉRITÉ (agrégation par symbole).
+    Ne lève pas: retourne False si la sync n'a pas pu aboutir (compté par sync_coordinator).
     - 1 seul trade OPEN par symbole côté DB (on agrège et on ferme les doublons).
     - Si exchange est flat pour un symbole ⇒ on ferme en DB (CLOSED_BY_EXCHANGE) en estimant le PnL.
     - Si exchange a une position et DB n’en a pas ⇒ on crée (regime='Importé').
@@ -2019,159 +2194,128 @@ def sync_positions_with_exchange(ex) -> None:
         if ex is None and hasattr(globals(), "create_exchange"):
             ex = create_exchange()
         if ex is None:
-            return
+            return False
 
         # --- Positions réelles exchange (nettes) ---
         ex_positions = _fetch_positions_safe(ex, None) or []
-        # Normalise par symbole → une seule entrée par symbole avec side/qty/entry
-        ex_map: Dict[str, Dict[str, Any]] = {}
-        for p in ex_positions:
-            sym = p.get("symbol")
-            if not sym:
-                continue
-            raw_size = float(p.get("size") or p.get("contracts") or p.get("positionAmt") or 0.0)
-            if raw_size == 0:
-                continue
-            side = p.get("side") or ("long" if raw_size > 0 else "short")
-            qty = abs(raw_size)
-            entry = float(p.get("entryPrice") or 0.0)
-            # Canonise side pour notre DB: 'buy'/'sell'
-            side_db = "buy" if str(side).lower() in ("long", "buy") else "sell"
-            ex_map[sym] = {"symbol": sym, "side": side_db, "qty": qty, "entry": entry}
-
-        # --- DB: liste des OPEN ---
-        db_open = database.get_open_positions() or []
-        # Grouper par symbole
-        db_by_symbol: Dict[str, List[Dict[str, Any]]] = {}
-        for r in db_open:
-            db_by_symbol.setdefault(r.get("symbol", ""), []).append(r)
+        ex_map = {k: v for k, v in _positions_to_ex_map(ex_positions).items() if v is not None}
+
+        # --- DB: liste des OPEN, groupée par symbole ---
+        db_by_symbol = _open_trades_by_symbol()
 
         # Ensemble des symboles impliqués
         symbols_all = set(db_by_symbol.keys()) | set(ex_map.keys())
 
         for sym in symbols_all:
-            ex_info = ex_map.get(sym)            # None si flat côté exchange
-            db_list = db_by_symbol.get(sym, [])  # [] si pas de trade DB
+            _reconcile_symbol(ex, sym, ex_map.get(sym), db_by_symbol.get(sym, []))
+        return True
 
-            # --- Cas A: exchange FLAT, DB a des OPEN → fermer tous en DB (avec PnL estimé)
-            if ex_info is None and db_list:
-                for row in db_list:
-                    try:
-                        estimated_pnl = _estimate_pnl_for_closed_trade(ex, row)
-                    except Exception:
-                        estimated_pnl = 0.0
-                    try:
-                        database.close_trade(
-                            int(row["id"]),
-                            status="CLOSED_BY_EXCHANGE",
-                            pnl=float(estimated_pnl),
-                        )
-                    except Exception:
-                        # fallback: ancien comportement (pnl=0)
-                        try:
-                            database.close_trade(
-                                int(row["id"]),
-                                status="CLOSED_BY_EXCHANGE",
-                                pnl=0.0,
-                            )
-                        except Exception:
-                            pass
-                continue
+    except Exception as e:
+        print(f"[sync_positions_with_exchange] error: {e}")
+        return False
 
-            # --- Cas B: exchange a une position, DB n’a rien → créer + recopie TP/SL si trouvés
-            if ex_info is not None and not db_list:
-                try:
-                    # Crée un trade importé
-                    database.create_trade(
-                        symbol=sym,
-                        side=ex_info["side"],
-                        regime="Importé",
-                        entry_price=float(ex_info["entry"] or 0.0),
-                        sl_price=float(ex_info["entry"] or 0.0),
-                        tp_price=float(ex_info["entry"] or 0.0),
-                        quantity=float(ex_info["qty"] or 0.0),
-                        risk_percent=RISK_PER_TRADE_PERCENT,
-                        management_strategy=str(database.get_setting('STRATEGY_MODE', 'NORMAL') or 'NORMAL'),
-                        entry_atr=0.0,
-                        entry_rsi=0.0,
-                    )
-                except Exception:
-                    pass
-                # Recopie TP/SL éventuels depuis les ordres
-                try:
-                    tp_ex, sl_ex = _fetch_existing_tp_sl(ex, sym)
-                    if tp_ex or sl_ex:
-                        # retrouver le trade nouvellement créé (le plus récent pour ce symbole)
-                        fresh = [t for t in database.get_open_positions() if t.get("symbol") == sym]
-                        if fresh:
-                            keep = max(fresh, key=lambda x: int(x.get("open_timestamp") or 0))
-                            if tp_ex:
-                                database.update_trade_tp(int(keep["id"]), float(tp_ex))
-                            if sl_ex:
-                                try:
-                                    database.update_trade_sl(int(keep["id"]), float(sl_ex))
-                                except AttributeError:
-                                    database.update_trade_to_breakeven(
-                                        int(keep["id"]),
-                                        float(keep.get("quantity") or 0.0),
-                                        float(sl_ex),
-                                    )
-                except Exception:
-                    pass
-                continue
 
-            # --- Cas C: exchange a une position, DB a ≥1 OPEN → agrège: on garde 1, on ferme les autres
-            if ex_info is not None and db_list:
-                # Sélectionne le "keeper": le plus récent (open_timestamp) puis id
-                try:
-                    keeper = max(db_list, key=lambda x: (int(x.get("open_timestamp") or 0), int(x.get("id") or 0)))
-                except Exception:
-                    keeper = db_list[0]
-                keep_id = int(keeper["id"])
+# ==============================================================================
+# RÉCONCILIATION INCRÉMENTALE (flux WebSocket)
+# ==============================================================================
 
-                # Ferme les doublons
-                for row in db_list:
-                    rid = int(row["id"])
-                    if rid == keep_id:
-                        continue
-                    try:
-                        database.close_trade(rid, status='MERGED_BY_SYNC', pnl=0.0)
-                    except Exception:
-                        pass
+def _normalize_ws_positions(positions: list) -> List[Dict[str, Any]]:
+    """Met les positions ccxt.pro au format de _fetch_positions_safe."""
+    out: List[Dict[str, Any]] = []
+    for p in positions or []:
+        try:
+            sym = p.get("symbol") or (p.get("info", {}) or {}).get("symbol")
+            size = float(p.get("contracts") or p.get("contractsSize") or p.get("positionAmt") or 0.0)
+            side = p.get("side") or ("long" if size > 0 else "short" if size < 0 else None)
+            entry = float(p.get("entryPrice") or p.get("averagePrice") or 0.0)
+            if sym:
+                out.append({"symbol": sym, "side": side, "size": size, "entryPrice": entry, "raw": p})
+        except Exception:
+            continue
+    return out
 
-                # Met à jour le trade conservé pour refléter l’exchange (side/qty/entry)
-                try:
-                    database.update_trade_core(
-                        trade_id=keep_id,
-                        side=str(ex_info["side"]),
-                        entry_price=float(ex_info["entry"] or 0.0),
-                        quantity=float(ex_info["qty"] or 0.0),
-                        regime=keeper.get("regime") or "Importé"
-                    )
-                except Exception:
-                    pass
 
-                # Recopie TP/SL si présents sur l’exchange
-                try:
-                    tp_ex, sl_ex = _fetch_existing_tp_sl(ex, sym)
-                    if tp_ex:
-                        database.update_trade_tp(keep_id, float(tp_ex))
-                    if sl_ex:
-                        try:
-                            database.update_trade_sl(keep_id, float(sl_ex))
-                        except AttributeError:
-                            database.update_trade_to_breakeven(
-                                keep_id,
-                                float(ex_info["qty"] or 0.0),
-                                float(sl_ex),
-                            )
-                except Exception:
-                    pass
+@rate_limiter.in_lane(rate_limiter.LANE_POSITION)
+def apply_ws_position_deltas(ex, positions: list, received_ts: Optional[float] = None) -> List[str]:
+    """
+    Applique directement en DB les positions reçues par watch_positions.
+    Seuls les symboles présents dans le message sont touchés: les autres
+    restent couverts par la sync REST complète périodique.
+    received_ts: heure de réception du message; sérialisé avec la sync REST,
+    il est ignoré s'il précède l'instantané de la dernière sync.
+    Retourne la liste des symboles réconciliés.
+    """
+    touched: List[str] = []
+    if received_ts is None:
+        received_ts = time.time()
+    try:
+        ex_map = _positions_to_ex_map(_normalize_ws_positions(positions))
+        if not ex_map:
+            return touched
+        with sync_coordinator.delta_write(received_ts) as fresh:
+            if not fresh:
+                return touched
+            db_by_symbol = _open_trades_by_symbol()
+            for sym, ex_info in ex_map.items():
+                db_list = db_by_symbol.get(sym, [])
+                if ex_info is None and not db_list:
+                    continue
+                _reconcile_symbol(ex, sym, ex_info, db_list, refresh_tp_sl=False)
+                touched.append(sym)
+    except Exception as e:
+        print(f"[apply_ws_position_deltas] error: {e}")
+    return touched
 
-        # Optionnel: cas exotiques déjà couverts par la clé exacte 'symbol'
 
+def apply_ws_order_deltas(orders: list) -> Tuple[List[str], bool]:
+    """
+    Recopie en DB les TP/SL portés par les ordres reçus via watch_orders
+    (ordres trigger encore ouverts uniquement — aucun appel REST).
+    Retourne (symboles mis à jour, needs_full_sync) — needs_full_sync=True si un
+    ordre reduceOnly a été exécuté (la position a probablement changé).
+    """
+    updated: List[str] = []
+    needs_full_sync = False
+    try:
+        by_symbol: Dict[str, List[Dict[str, Any]]] = {}
+        for o in orders or []:
+            sym = o.get("symbol")
+            if not sym:
+                continue
+            status = str(o.get("status") or "").lower()
+            info = o.get("info", {}) or {}
+            reduce_only = bool(o.get("reduceOnly") or str(info.get("reduceOnly", "")).lower() in ("yes", "true"))
+            if status == "closed" and reduce_only:
+                needs_full_sync = True
+            if status == "open":
+                by_symbol.setdefault(sym, []).append(o)
+        if not by_symbol:
+            return updated, needs_full_sync
+
+        db_by_symbol = _open_trades_by_symbol()
+        for sym, sym_orders in by_symbol.items():
+            db_list = db_by_symbol.get(sym, [])
+            if not db_list:
+                continue
+            tp_ex, sl_ex = _extract_tp_sl_from_orders(sym_orders)
+            if not tp_ex and not sl_ex:
+                continue
+            try:
+                keeper = max(db_list, key=lambda x: (int(x.get("open_timestamp") or 0), int(x.get("id") or 0)))
+            except Exception:
+                keeper = db_list[0]
+            keep_id = int(keeper["id"])
+            try:
+                if tp_ex:
+                    database.update_trade_tp(keep_id, float(tp_ex))
+                if sl_ex:
+                    database.update_trade_sl(keep_id, float(sl_ex))
+                updated.append(sym)
+            except Exception:
+                pass
     except Exception as e:
-        print(f"[sync_positions_with_exchange] error: {e}")
+        print(f"[apply_ws_order_deltas] error: {e}")
+    return updated, needs_full_sync
             
 
 def _validate_tp_for_side(side: str, tp_price: float, current_price: float, tick_size: float) -> float:
@@ -2234,6 +2378,21 @@ def _prepare_validated_tp(exchange, symbol: str, side: str, raw_tp: float) -> fl
     tick_size = _bitget_tick_size(market)
     return _validate_tp_for_side(side, float(raw_tp), current_price, tick_size)
     
+def _prepare_validated_sl(exchange, symbol: str, side: str, raw_sl: float) -> Optional[float]:
+    """
+    SL conforme aux règles Bitget vis-à-vis du mark price (side = sens de la
+    position). None si le SL reste du mauvais côté du mark après correction.
+    """
+    mark = _current_mark_price(exchange, symbol)
+    if mark <= 0:
+        return float(raw_sl)
+    market = exchange.market(symbol) or {}
+    sl = _validate_sl_for_side(side, float(raw_sl), mark, _bitget_tick_size(market))
+    is_long = str(side).lower() in ('buy', 'long')
+    if (is_long and sl >= mark) or (not is_long and sl <= mark):
+        return None
+    return sl
+
 # --- à placer près de _prepare_validated_tp / _bitget_tick_size ---
 
 def _current_mark_price(exchange, symbol: str) -> float:
@@ -2308,6 +2467,56 @@ def _ensure_bitget_mix_options(ex: ccxt.Exchange) -> None:
     except Exception:
         pass
 
+def _create_entry_with_attached_tpsl(ex: ccxt.Exchange, symbol: str, side: str, quantity: float,
+                                     ref_price: float, sl: float, tp: float,
+                                     params: Dict[str, Any]) -> Tuple[Optional[Dict[str, Any]], bool]:
+    """
+    Entrée MARKET avec TP/SL preset attachés (params unifiés ccxt stopLoss/takeProfit →
+    presetStopLossPrice/presetStopSurplusPrice chez Bitget): la position naît protégée.
+    - ENTRY_ATTACHED_TPSL=false → entrée simple (protection posée ensuite par l'appelant).
+    - SL validé contre le mark price avant attache (_prepare_validated_sl, comme
+      _place_sl_tp_safe) ; SL invalide → entrée simple.
+    - Rejet exchange de la variante attachée → nouvelle tentative SANS TP/SL.
+      Les erreurs réseau ne sont PAS rejouées (l'ordre a pu passer).
+    Returns:
+        (order, protected_on_entry)
+    """
+    try:
+        attached = str(database.get_setting('ENTRY_ATTACHED_TPSL', 'true')).lower() == 'true'
+    except Exception:
+        attached = True
+
+    if attached and sl and tp:
+        try:
+            sl = _prepare_validated_sl(ex, symbol, side, float(sl))
+        except Exception as e:
+            print(f"⚠️ {symbol} : validation SL avant attache impossible ({e}) → entrée simple")
+            sl = None
+        if sl is None:
+            attached = False
+
+    if attached and sl and tp:
+        attached_params = {
+            **params,
+            'stopLoss': {'triggerPrice': float(sl)},
+            'takeProfit': {'triggerPrice': float(tp)},
+        }
+        try:
+            order = create_market_order_smart(
+                ex, symbol, side, quantity, ref_price=ref_price, params=attached_params
+            )
+            return order, True
+        except ccxt.NetworkError:
+            raise
+        except ccxt.ExchangeError as e:
+            print(f"⚠️ {symbol} : entrée avec TP/SL attachés refusée → entrée simple ({e})")
+
+    order = create_market_order_smart(
+        ex, symbol, side, quantity, ref_price=ref_price, params=params
+    )
+    return order, False
+
+
 def create_market_order_smart(ex: ccxt.Exchange, symbol: str, side: str, amount: float,
                               ref_price: Optional[float] = None,
                               params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
@@ -2387,6 +2596,7 @@ def _fetch_positions_safe(ex: ccxt.Exchange, symbols: Optional[List[str]] = None
     except Exception:
         return []
 
+@rate_limiter.in_lane(rate_limiter.LANE_ORDER)
 def _cancel_all_orders_safe(ex: ccxt.Exchange, symbol: str) -> None:
     """
     Annule TOUS les ordres ouverts sur un symbole de manière robuste.
@@ -2403,21 +2613,8 @@ def _cancel_all_orders_safe(ex: ccxt.Exchange, symbol: str) -> None:
         symbol: Symbole à nettoyer
     """
     try:
-        # Récupérer tous les ordres ouverts
-        orders = ex.fetch_open_orders(symbol)
-        
-        if not orders:
-            return
-        
-        # Annuler chaque ordre individuellement
-        for order in orders:
-            try:
-                order_id = order.get('id')
-                if order_id:
-                    ex.cancel_order(order_id, symbol)
-            except Exception:
-                # Skip silencieusement si ordre déjà annulé/exécuté
-                continue
+        # Annulation groupée (batch-cancel) avec repli un par un
+        batch_orders.cancel_all_open_orders(ex, symbol)
     
     except Exception:
         # Fail-safe : ne jamais casser l'exécution
@@ -3130,6 +3327,7 @@ def _recalc_sl_tp_live(
     except Exception as e:
         return 0.0, 0.0, f"recalc_error:{e}"
 
+@rate_limiter.in_lane(rate_limiter.LANE_ORDER)
 def execute_signal_with_gates(
     ex: ccxt.Exchange,
     symbol: str,
@@ -3483,6 +3681,8 @@ def execute_signal_with_gates(
         management_strategy = "SPLIT"
     
     common_params = {'tdMode': 'cross', 'posMode': 'oneway'}
+    entry_protect_ms = None
+    protect_mode = None
     
     if not is_paper_mode:
         try:
@@ -3510,12 +3710,16 @@ def execute_signal_with_gates(
                         notifier.tg_send(f"⚠️ Fermeture position inverse échouée pour {symbol}: {e_close}")
                         continue
             
-            # Ordre marché d'entrée
-            order = create_market_order_smart(
-                ex, symbol, side, quantity, ref_price=final_entry_price, params=common_params
+            # Ordre marché d'entrée (+ TP/SL attachés si activé)
+            t_entry_sent = time.time()
+            order, protected_on_entry = _create_entry_with_attached_tpsl(
+                ex, symbol, side, quantity, final_entry_price, float(sl), float(tp), common_params
             )
             if order and order.get('price'):
                 final_entry_price = float(order['price'])
+            if protected_on_entry:
+                protect_mode = "attached"
+                t_protected = time.time()
             
             clear_balance_cache()
             
@@ -3553,14 +3757,21 @@ def execute_signal_with_gates(
             except Exception:
                 tick_size = 0.0001
             
-            sl_ok, tp_ok = _place_sl_tp_safe(
-                ex, symbol, side, quantity,
-                sl=float(sl),
-                tp=float(tp),
-                params=common_params,
-                is_long=is_long,
-                tick_size=tick_size
-            )
+            if not protected_on_entry:
+                # Repli: SL et TP envoyés en parallèle
+                sl_ok, tp_ok = _place_sl_tp_safe(
+                    ex, symbol, side, quantity,
+                    sl=float(sl),
+                    tp=float(tp),
+                    params=common_params,
+                    is_long=is_long,
+                    tick_size=tick_size
+                )
+                protect_mode = "parallel" if (sl_ok or tp_ok) else "unprotected"
+                t_protected = time.time()
+            
+            entry_protect_ms = (t_protected - t_entry_sent) * 1000.0
+            print(f"⏱️ {symbol} : entrée → protégée en {entry_protect_ms:.0f} ms ({protect_mode})")
         
         except Exception as e:
             try:
@@ -3580,7 +3791,7 @@ def execute_signal_with_gates(
     signal['sl'] = float(sl)
     signal['tp'] = float(tp)
     
-    database.create_trade(
+    trade_id = database.create_trade(
         symbol=symbol,
         side=side,
         regime=regime,
@@ -3594,10 +3805,19 @@ def execute_signal_with_gates(
         entry_rsi=float(signal.get('entry_rsi', 0.0) or 0.0),
     )
     
+    if entry_protect_ms is not None and trade_id:
+        try:
+            database.update_trade_meta(int(trade_id), {
+                'entry_protect_ms': round(float(entry_protect_ms), 1),
+                'protect_mode': protect_mode,
+            })
+        except Exception:
+            pass
+    
     _update_signal_state(symbol, timeframe, signal, final_entry_price, "VALID_TAKEN", tp=float(tp), sl=float(sl))
     
-    # GÉNÉRATION GRAPHIQUE
-    chart_image = None
+    # GÉNÉRATION GRAPHIQUE (pool de rendu: le chemin de trade n'attend jamais le PNG)
+    chart_future = None
     
     try:
         required_keys = ['contact_index', 'reaction_index', 'entry_index']
@@ -3637,12 +3857,7 @@ def execute_signal_with_gates(
             else:
                 print(f"📊 Génération graphique {symbol}...")
                 
-                chart_image = charting.generate_trade_chart(symbol, df, signal)
-                
-                if chart_image:
-                    print(f"✅ Graphique {symbol} généré avec succès")
-                else:
-                    print(f"⚠️ Graphique {symbol} retourné None")
+                chart_future = charting.submit_trade_chart(symbol, df, signal)
     
     except Exception as e:
         print(f"❌ ERREUR génération graphique {symbol}: {e}")
@@ -3661,16 +3876,36 @@ def execute_signal_with_gates(
         except Exception:
             pass
         
-        chart_image = None
+        chart_future = None
     
     mode_text = "PAPIER" if is_paper_mode else "RÉEL"
     trade_message = notifier.format_trade_message(symbol, signal, quantity, mode_text, RISK_PER_TRADE_PERCENT)
     
+    def _send_trade_notification(fut=None):
+        chart_image = None
+        if fut is not None:
+            try:
+                chart_image = fut.result()
+            except Exception as e:
+                print(f"❌ ERREUR rendu graphique {symbol}: {e}")
+            if chart_image:
+                print(f"✅ Graphique {symbol} généré avec succès")
+            else:
+                print(f"⚠️ Graphique {symbol} retourné None")
+        try:
+            if chart_image is not None:
+                notifier.tg_send_with_photo(photo_buffer=chart_image, caption=trade_message)
+            else:
+                notifier.tg_send(trade_message)
+        except Exception as e:
+            print(f"❌ Erreur envoi notification {symbol}: {e}")
+
     try:
-        if chart_image is not None:
-            notifier.tg_send_with_photo(photo_buffer=chart_image, caption=trade_message)
+        if chart_future is not None:
+            # Notification envoyée à la fin du rendu (callback hors thread trading)
+            chart_future.add_done_callback(_send_trade_notification)
         else:
-            notifier.tg_send(trade_message)
+            _send_trade_notification()
     except Exception as e:
         print(f"❌ Erreur envoi notification {symbol}: {e}")
         try:
@@ -3764,7 +3999,7 @@ def execute_trade(ex: ccxt.Exchange, symbol: str, timeframe: str, signal: Dict[s
         # 1) Sync optionnelle avant exécution
         try:
             if str(database.get_setting('SYNC_BEFORE_EXECUTE', 'true')).lower() == 'true':
-                sync_positions_with_exchange(ex)
+                sync_coordinator.request_sync(ex, max_age=2.0).result(timeout=60)
         except Exception:
             pass
 
@@ -4103,6 +4338,7 @@ def should_pyramid_position(ex, pos: dict, df: pd.DataFrame) -> Optional[Dict[st
         traceback.print_exc()
         return None
 
+@rate_limiter.in_lane(rate_limiter.LANE_ORDER)
 def execute_pyramid_add(ex, pyramid_info: Dict[str, Any]) -> bool:
     """
     Exécute l'ajout pyramiding sur une position gagnante.
@@ -4497,6 +4733,7 @@ def should_take_partial_profit(pos: dict, current_price: float) -> Optional[Dict
         return None
 
 
+@rate_limiter.in_lane(rate_limiter.LANE_ORDER)
 def execute_partial_exit(ex, exit_info: Dict[str, Any]) -> bool:
     """
     Exécute une sortie partielle.
@@ -4650,14 +4887,21 @@ def execute_partial_exit(ex, exit_info: Dict[str, Any]) -> bool:
                 except Exception:
                     new_qty_prec = new_qty
                 
-                ex.create_order(
-                    symbol, 'market', close_side, new_qty_prec, price=None,
-                    params={**common_params, 'stopLossPrice': float(new_sl), 'triggerType': 'mark'}
-                )
-                ex.create_order(
-                    symbol, 'market', close_side, new_qty_prec, price=None,
-                    params={**common_params, 'takeProfitPrice': float(tp), 'triggerType': 'mark'}
-                )
+                # Flatten & re-arm : annule les anciens SL/TP (qty obsolète, preset
+                # de position compris) et replace SL + TP sur le reste
+                rearm = batch_orders.replace_orders(ex, symbol, [
+                    batch_orders.order_request(
+                        symbol, 'market', close_side, new_qty_prec, None,
+                        {**common_params, 'stopLossPrice': float(new_sl), 'triggerType': 'mark'}
+                    ),
+                    batch_orders.order_request(
+                        symbol, 'market', close_side, new_qty_prec, None,
+                        {**common_params, 'takeProfitPrice': float(tp), 'triggerType': 'mark'}
+                    ),
+                ])
+                for _order, err in rearm:
+                    if err is not None:
+                        print(f"⚠️ {symbol} : re-arm SL/TP après partial exit → {err}")
                 
                 try:
                     database.update_trade_sl(position_id, float(new_sl))
@@ -4720,33 +4964,12 @@ def update_dynamic_tp_and_trailing_be(
         is_long = (side == 'buy')
         
         # ✅ CORRECTION : Noms de colonnes cohérents
-        bb20_upper = float(df['bb20_up'].iloc[-1])
-        bb20_lower = float(df['bb20_lo'].iloc[-1])
         bb20_mid = float(df['bb20_mid'].iloc[-1]) if 'bb20_mid' in df.columns else float(df['sma20'].iloc[-1])
-        bb80_upper = float(df['bb80_up'].iloc[-1])
-        bb80_lower = float(df['bb80_lo'].iloc[-1])
-        
-        # Offsets
-        try:
-            tp_offset_pct = float(database.get_setting('TP_BB_OFFSET_PCT', '0.0100'))
-        except Exception:
-            tp_offset_pct = 0.01
         
         # ========================================================================
         # 1. TP MOBILE (suit les Bollinger Bands)
         # ========================================================================
-        new_tp = None
-        
-        if is_long:
-            if regime == 'COUNTER_TREND':
-                new_tp = bb20_lower * (1 - tp_offset_pct)
-            else:
-                new_tp = bb80_upper * (1 + tp_offset_pct)
-        else:
-            if regime == 'COUNTER_TREND':
-                new_tp = bb20_upper * (1 + tp_offset_pct)
-            else:
-                new_tp = bb80_lower * (1 - tp_offset_pct)
+        new_tp = _dynamic_tp_level(df, is_long, regime)
         
         # Vérifier que le TP s'améliore (écart >0.1%)
         if new_tp is not None and abs(new_tp - tp_price) / tp_price > 0.001:
@@ -4883,6 +5106,7 @@ def _validate_sl_never_backward(trade_id: int, new_sl: float, side: str) -> bool
         # En cas d'erreur, on refuse par sécurité
         return False
 
+@rate_limiter.in_lane(rate_limiter.LANE_ORDER)
 def _update_exchange_tp(ex, symbol: str, side: str, new_tp: float):
     """
     Met à jour le TP sur l'exchange en annulant l'ancien et plaçant le nouveau.
@@ -4917,6 +5141,9 @@ def _update_exchange_tp(ex, symbol: str, side: str, new_tp: float):
         except Exception:
             pass
         
+        # Annuler l'ancien TP plan, y compris le TP preset attaché à l'entrée
+        batch_orders.cancel_protective_orders(ex, symbol, ("tp",))
+
         # Annuler anciens ordres TP
         try:
             open_orders = ex.fetch_open_orders(symbol)
@@ -4952,6 +5179,7 @@ def _update_exchange_tp(ex, symbol: str, side: str, new_tp: float):
         raise Exception(f"Erreur _update_exchange_tp: {e}")
 
 
+@rate_limiter.in_lane(rate_limiter.LANE_ORDER)
 def _update_exchange_sl(ex, symbol: str, side: str, new_sl: float):
     """
     Met à jour le SL sur l'exchange en annulant l'ancien et plaçant le nouveau.
@@ -4995,6 +5223,9 @@ def _update_exchange_sl(ex, symbol: str, side: str, new_sl: float):
         except Exception:
             pass
         
+        # Annuler l'ancien SL plan, y compris le SL preset attaché à l'entrée
+        batch_orders.cancel_protective_orders(ex, symbol, ("sl",))
+
         # Annuler anciens ordres SL
         try:
             open_orders = ex.fetch_open_orders(symbol)
@@ -5126,6 +5357,7 @@ def _validate_sl_for_side(side: str, sl_price: float, current_price: float, tick
     return sl_price
 
 
+@rate_limiter.in_lane(rate_limiter.LANE_ORDER)
 def _place_sl_tp_safe(ex, symbol: str, side: str, qty: float, sl: Optional[float], tp: Optional[float], 
                       params: dict, is_long: bool, tick_size: float) -> tuple:
     """
@@ -5141,6 +5373,8 @@ def _place_sl_tp_safe(ex, symbol: str, side: str, qty: float, sl: Optional[float
     """
     sl_ok = False
     tp_ok = False
+    sl_req = None
+    tp_req = None
     
     # Récupérer mark price pour validation
     try:
@@ -5181,24 +5415,11 @@ def _place_sl_tp_safe(ex, symbol: str, side: str, qty: float, sl: Optional[float
             
             # Ne pas placer le SL si invalide, mais CONTINUER vers le TP
             if not sl_invalid:
-                # Placement SL
                 sl_side = 'sell' if is_long else 'buy'
-                
-                try:
-                    ex.create_order(
-                        symbol, 'market', sl_side, qty, price=None,
-                        params={**params, 'stopLossPrice': float(sl_validated), 'triggerType': 'mark'}
-                    )
-                    sl_ok = True
-                    print(f"✅ {symbol} : SL placé à {sl_validated:.6f}")
-                
-                except Exception as e_sl:
-                    err_msg = str(e_sl)
-                    # Détection erreur 40836 (SL invalide)
-                    if '40836' in err_msg or 'stop loss price' in err_msg.lower():
-                        print(f"⚠️ {symbol} : SL invalide (40836) → SL skippé, mais TP va être tenté")
-                    else:
-                        print(f"❌ {symbol} : Erreur SL → {e_sl}")
+                sl_req = batch_orders.order_request(
+                    symbol, 'market', sl_side, qty, None,
+                    {**params, 'stopLossPrice': float(sl_validated), 'triggerType': 'mark'}
+                )
             
             else:
                 print(f"⚠️ {symbol} : SL invalide (règles Bitget) → SL skippé, mais TP va être tenté")
@@ -5222,17 +5443,39 @@ def _place_sl_tp_safe(ex, symbol: str, side: str, qty: float, sl: Optional[float
                 print(f"⚠️ {symbol} : Erreur validation TP → {e_val}")
                 tp_validated = float(tp)
             
-            # Placement TP
-            try:
-                ex.create_order(
-                    symbol, 'market', tp_side, qty, price=None,
-                    params={**params, 'takeProfitPrice': float(tp_validated), 'triggerType': 'mark'}
-                )
+            tp_req = batch_orders.order_request(
+                symbol, 'market', tp_side, qty, None,
+                {**params, 'takeProfitPrice': float(tp_validated), 'triggerType': 'mark'}
+            )
+        
+        except Exception as e:
+            print(f"❌ {symbol} : Erreur TP → {e}")
+    
+    # ========================================================================
+    # ========== ENVOI GROUPÉ SL + TP (batch-place, repli séquentiel) ==========
+    # ========================================================================
+    
+    legs = [(name, req) for name, req in (('sl', sl_req), ('tp', tp_req)) if req is not None]
+    results = batch_orders.create_orders(ex, [req for _, req in legs], parallel=True) if legs else []
+    
+    for (name, req), (order, err) in zip(legs, results):
+        if name == 'sl':
+            if err is None:
+                sl_ok = True
+                print(f"✅ {symbol} : SL placé à {sl_validated:.6f}")
+            else:
+                err_msg = str(err)
+                # Détection erreur 40836 (SL invalide)
+                if '40836' in err_msg or 'stop loss price' in err_msg.lower():
+                    print(f"⚠️ {symbol} : SL invalide (40836)")
+                else:
+                    print(f"❌ {symbol} : Erreur SL → {err}")
+        else:
+            if err is None:
                 tp_ok = True
                 print(f"✅ {symbol} : TP placé à {tp_validated:.6f}")
-            
-            except Exception as e_tp:
-                err_msg = str(e_tp)
+            else:
+                err_msg = str(err)
                 
                 # ✅ CORRECTION : DÉTECTER ERREUR 40836 MAIS NE PAS NOTIFIER
                 # La notification sera gérée par manage_open_positions qui marque le flag
@@ -5249,9 +5492,6 @@ def _place_sl_tp_safe(ex, symbol: str, side: str, qty: float, sl: Optional[float
                     print(f"   Prix mark : {mark:.6f}")
                     print(f"   Quantité : {qty:.6f}")
                     print(f"   Erreur : {err_msg}")
-        
-        except Exception as e:
-            print(f"❌ {symbol} : Erreur TP → {e}")
     
     # ========================================================================
     # ========== RÉSUMÉ ==========
@@ -5265,6 +5505,156 @@ def _place_sl_tp_safe(ex, symbol: str, side: str, qty: float, sl: Optional[float
     
     return sl_ok, tp_ok
 
+def _dynamic_tp_level(df: pd.DataFrame, is_long: bool, regime: str) -> float:
+    """TP mobile: BB80 opposée (BB20 en contre-tendance) + offset TP_BB_OFFSET_PCT, sur la dernière bougie."""
+    try:
+        tp_offset_pct = float(database.get_setting('TP_BB_OFFSET_PCT', '0.0100'))
+    except Exception:
+        tp_offset_pct = 0.01
+
+    if is_long:
+        if regime == 'COUNTER_TREND':
+            return float(df['bb20_lo'].iloc[-1]) * (1 - tp_offset_pct)
+        return float(df['bb80_up'].iloc[-1]) * (1 + tp_offset_pct)
+    if regime == 'COUNTER_TREND':
+        return float(df['bb20_up'].iloc[-1]) * (1 + tp_offset_pct)
+    return float(df['bb80_lo'].iloc[-1]) * (1 - tp_offset_pct)
+
+
+def _trailing_sl_level(is_long: bool, entry_price: float, tp_distance: float, pnl_pct: float) -> Optional[float]:
+    """Trailing multi-paliers: progression vers le TP (%) 25/50/75/90 → SL à 25/50/75/95% du chemin."""
+    if pnl_pct >= 90.0:
+        lock = 0.95
+    elif pnl_pct >= 75.0:
+        lock = 0.75
+    elif pnl_pct >= 50.0:
+        lock = 0.50
+    elif pnl_pct >= 25.0:
+        lock = 0.25
+    else:
+        return None
+    return entry_price + tp_distance * lock if is_long else entry_price - tp_distance * lock
+
+
+def _detect_be_trigger(df: pd.DataFrame, symbol: str, is_long: bool, entry_price: float,
+                       current_price: float, open_timestamp: int) -> Tuple[bool, Optional[float]]:
+    """
+    Détection du contact BB20_mid qui déclenche le breakeven.
+    Retourne (should_activate_be, be_trigger_price).
+    """
+    should_activate_be = False
+    be_trigger_price = None
+
+    try:
+        bb20_mid_col = 'bb20_mid' if 'bb20_mid' in df.columns else 'sma20'
+
+        # Récupérer BB20_mid actuel (dernière bougie fermée)
+        try:
+            bb20_mid_latest = float(df.iloc[-1][bb20_mid_col])
+        except Exception:
+            bb20_mid_latest = None
+
+        # ====================================================================
+        # CAS 1 : DÉTECTION IMMÉDIATE VIA PRIX ACTUEL (TICKER)
+        # ====================================================================
+
+        if bb20_mid_latest is not None:
+            # LONG : Si entry < BB20_mid ET prix actuel > BB20_mid → TRAVERSÉ !
+            if is_long:
+                if entry_price < bb20_mid_latest and current_price > bb20_mid_latest:
+                    should_activate_be = True
+                    be_trigger_price = bb20_mid_latest
+                    print(f"   ✅ BE activé (IMMÉDIAT) - Prix a traversé BB20_mid !")
+                    print(f"      Entry: {entry_price:.6f} < BB20: {bb20_mid_latest:.6f} < Current: {current_price:.6f}")
+
+            # SHORT : Si entry > BB20_mid ET prix actuel < BB20_mid → TRAVERSÉ !
+            else:
+                if entry_price > bb20_mid_latest and current_price < bb20_mid_latest:
+                    should_activate_be = True
+                    be_trigger_price = bb20_mid_latest
+                    print(f"   ✅ BE activé (IMMÉDIAT) - Prix a traversé BB20_mid !")
+                    print(f"      Entry: {entry_price:.6f} > BB20: {bb20_mid_latest:.6f} > Current: {current_price:.6f}")
+
+        # ====================================================================
+        # CAS 2 : DÉTECTION VIA BOUGIES FERMÉES (FALLBACK)
+        # ====================================================================
+
+        if not should_activate_be:
+            # Trouver l'index de la bougie d'ouverture
+            entry_idx = None
+            use_iloc = False
+
+            if 'timestamp' in df.columns:
+                try:
+                    mask = df['timestamp'] >= open_timestamp
+                    if mask.any():
+                        entry_idx = df[mask].index[0]
+                except Exception:
+                    pass
+
+            # ✅ CORRECTION : Déterminer si on doit utiliser iloc ou loc
+            if entry_idx is None:
+                entry_idx = max(0, len(df) - 20)
+                use_iloc = True  # entry_idx est un entier
+            else:
+                # Vérifier si entry_idx est un entier (position) ou un label (datetime)
+                if isinstance(entry_idx, int):
+                    use_iloc = True
+
+            # ✅ Utiliser iloc pour position numérique, loc pour DatetimeIndex
+            if use_iloc:
+                df_after_entry = df.iloc[entry_idx:]
+            else:
+                df_after_entry = df.loc[entry_idx:]
+
+            if len(df_after_entry) >= 1:
+                for idx in df_after_entry.index:
+                    try:
+                        bar = df_after_entry.loc[idx]
+                        bb20_mid_val = float(bar[bb20_mid_col])
+
+                        bar_high = float(bar['high'])
+                        bar_low = float(bar['low'])
+                        bar_open = float(bar['open'])
+                        bar_close = float(bar['close'])
+
+                        contact_detected = False
+
+                        if is_long:
+                            # Traverse de bas en haut
+                            traverse_up = (bar_open < bb20_mid_val) and (bar_close > bb20_mid_val)
+                            # Mèche touche
+                            wick_touches = (bar_low <= bb20_mid_val <= bar_high)
+
+                            contact_detected = traverse_up or wick_touches
+
+                        else:
+                            # Traverse de haut en bas
+                            traverse_down = (bar_open > bb20_mid_val) and (bar_close < bb20_mid_val)
+                            # Mèche touche
+                            wick_touches = (bar_low <= bb20_mid_val <= bar_high)
+
+                            contact_detected = traverse_down or wick_touches
+
+                        if contact_detected:
+                            should_activate_be = True
+                            be_trigger_price = bb20_mid_val
+                            print(f"   ✅ BE activé (BOUGIE FERMÉE) - Contact BB20_mid détecté !")
+                            print(f"      Bar index: {idx}, BB20_mid: {bb20_mid_val:.6f}")
+                            break
+
+                    except Exception:
+                        continue
+
+    except Exception as e:
+        print(f"⚠️ Erreur détection BE pour {symbol}: {e}")
+        import traceback
+        traceback.print_exc()
+
+    return should_activate_be, be_trigger_price
+
+
+@rate_limiter.in_lane(rate_limiter.LANE_POSITION)
 def manage_open_positions(ex):
     """
     Gère toutes les positions ouvertes :
@@ -5283,7 +5673,8 @@ def manage_open_positions(ex):
     ✅ CORRECTION INDEX : Gestion robuste iloc vs loc pour DatetimeIndex
     """
     try:
-        sync_positions_with_exchange(ex)
+        # Le flux WS tient la DB à jour: une sync récente (< 5s) suffit
+        sync_coordinator.request_sync(ex, max_age=5.0).result(timeout=60)
     except Exception as e:
         print(f"⚠️ Erreur sync positions dans manage_open_positions: {e}")
 
@@ -5395,6 +5786,7 @@ def manage_open_positions(ex):
             try:
                 ticker = ex.fetch_ticker(symbol)
                 current_price = float(ticker.get('last', entry_price))
+                price_service.publish(symbol, ticker)
             except Exception as e:
                 print(f"⚠️ Erreur fetch ticker pour {symbol}: {e}")
                 continue
@@ -5406,27 +5798,7 @@ def manage_open_positions(ex):
             
             if not tp_placement_failed:
                 try:
-                    bb20_upper = float(df['bb20_up'].iloc[-1])
-                    bb20_lower = float(df['bb20_lo'].iloc[-1])
-                    bb80_upper = float(df['bb80_up'].iloc[-1])
-                    bb80_lower = float(df['bb80_lo'].iloc[-1])
-
-                    # Offset TP (Bollinger)
-                    try:
-                        tp_offset_pct = float(database.get_setting('TP_BB_OFFSET_PCT', '0.0100'))
-                    except Exception:
-                        tp_offset_pct = 0.01
-
-                    if is_long:
-                        if regime == 'COUNTER_TREND':
-                            new_tp = bb20_lower * (1 - tp_offset_pct)
-                        else:
-                            new_tp = bb80_upper * (1 + tp_offset_pct)
-                    else:
-                        if regime == 'COUNTER_TREND':
-                            new_tp = bb20_upper * (1 + tp_offset_pct)
-                        else:
-                            new_tp = bb80_lower * (1 - tp_offset_pct)
+                    new_tp = _dynamic_tp_level(df, is_long, regime)
 
                     # Mettre à jour si écart significatif (>0.1%)
                     if abs(new_tp - tp_price) / tp_price > 0.001:
@@ -5460,115 +5832,10 @@ def manage_open_positions(ex):
             # ✅ CORRECTION INDEX : Gestion robuste iloc vs loc
             # ========================================================================
             if breakeven_status == 'PENDING':
-                should_activate_be = False
                 be_sl = entry_price
-                be_trigger_price = None
-
-                try:
-                    bb20_mid_col = 'bb20_mid' if 'bb20_mid' in df.columns else 'sma20'
-                    
-                    # Récupérer BB20_mid actuel (dernière bougie fermée)
-                    try:
-                        bb20_mid_latest = float(df.iloc[-1][bb20_mid_col])
-                    except Exception:
-                        bb20_mid_latest = None
-                    
-                    # ====================================================================
-                    # CAS 1 : DÉTECTION IMMÉDIATE VIA PRIX ACTUEL (TICKER)
-                    # ====================================================================
-                    
-                    if bb20_mid_latest is not None:
-                        # LONG : Si entry < BB20_mid ET prix actuel > BB20_mid → TRAVERSÉ !
-                        if is_long:
-                            if entry_price < bb20_mid_latest and current_price > bb20_mid_latest:
-                                should_activate_be = True
-                                be_trigger_price = bb20_mid_latest
-                                print(f"   ✅ BE activé (IMMÉDIAT) - Prix a traversé BB20_mid !")
-                                print(f"      Entry: {entry_price:.6f} < BB20: {bb20_mid_latest:.6f} < Current: {current_price:.6f}")
-                        
-                        # SHORT : Si entry > BB20_mid ET prix actuel < BB20_mid → TRAVERSÉ !
-                        else:
-                            if entry_price > bb20_mid_latest and current_price < bb20_mid_latest:
-                                should_activate_be = True
-                                be_trigger_price = bb20_mid_latest
-                                print(f"   ✅ BE activé (IMMÉDIAT) - Prix a traversé BB20_mid !")
-                                print(f"      Entry: {entry_price:.6f} > BB20: {bb20_mid_latest:.6f} > Current: {current_price:.6f}")
-                    
-                    # ====================================================================
-                    # CAS 2 : DÉTECTION VIA BOUGIES FERMÉES (FALLBACK)
-                    # ====================================================================
-                    
-                    if not should_activate_be:
-                        # Trouver l'index de la bougie d'ouverture
-                        entry_idx = None
-                        use_iloc = False
-                        
-                        if 'timestamp' in df.columns:
-                            try:
-                                mask = df['timestamp'] >= open_timestamp
-                                if mask.any():
-                                    entry_idx = df[mask].index[0]
-                            except Exception:
-                                pass
-                        
-                        # ✅ CORRECTION : Déterminer si on doit utiliser iloc ou loc
-                        if entry_idx is None:
-                            entry_idx = max(0, len(df) - 20)
-                            use_iloc = True  # entry_idx est un entier
-                        else:
-                            # Vérifier si entry_idx est un entier (position) ou un label (datetime)
-                            if isinstance(entry_idx, int):
-                                use_iloc = True
-                        
-                        # ✅ Utiliser iloc pour position numérique, loc pour DatetimeIndex
-                        if use_iloc:
-                            df_after_entry = df.iloc[entry_idx:]
-                        else:
-                            df_after_entry = df.loc[entry_idx:]
-                        
-                        if len(df_after_entry) >= 1:
-                            for idx in df_after_entry.index:
-                                try:
-                                    bar = df_after_entry.loc[idx]
-                                    bb20_mid_val = float(bar[bb20_mid_col])
-                                    
-                                    bar_high = float(bar['high'])
-                                    bar_low = float(bar['low'])
-                                    bar_open = float(bar['open'])
-                                    bar_close = float(bar['close'])
-                                    
-                                    contact_detected = False
-                                    
-                                    if is_long:
-                                        # Traverse de bas en haut
-                                        traverse_up = (bar_open < bb20_mid_val) and (bar_close > bb20_mid_val)
-                                        # Mèche touche
-                                        wick_touches = (bar_low <= bb20_mid_val <= bar_high)
-                                        
-                                        contact_detected = traverse_up or wick_touches
-                                    
-                                    else:
-                                        # Traverse de haut en bas
-                                        traverse_down = (bar_open > bb20_mid_val) and (bar_close < bb20_mid_val)
-                                        # Mèche touche
-                                        wick_touches = (bar_low <= bb20_mid_val <= bar_high)
-                                        
-                                        contact_detected = traverse_down or wick_touches
-                                    
-                                    if contact_detected:
-                                        should_activate_be = True
-                                        be_trigger_price = bb20_mid_val
-                                        print(f"   ✅ BE activé (BOUGIE FERMÉE) - Contact BB20_mid détecté !")
-                                        print(f"      Bar index: {idx}, BB20_mid: {bb20_mid_val:.6f}")
-                                        break
-                                
-                                except Exception:
-                                    continue
-
-                except Exception as e:
-                    print(f"⚠️ Erreur détection BE pour {symbol}: {e}")
-                    import traceback
-                    traceback.print_exc()
+                should_activate_be, be_trigger_price = _detect_be_trigger(
+                    df, symbol, is_long, entry_price, current_price, open_timestamp
+                )
 
                 if should_activate_be:
                     # ✅ VALIDATION STRICTE BE (Règles 1 & 2)
@@ -5657,31 +5924,7 @@ def manage_open_positions(ex):
                         else:
                             pnl_pct = ((entry_price - current_price) / tp_distance) * 100.0
 
-                        new_trailing_sl = None
-
-                        if pnl_pct >= 90.0:
-                            if is_long:
-                                new_trailing_sl = entry_price + tp_distance * 0.95
-                            else:
-                                new_trailing_sl = entry_price - tp_distance * 0.95
-
-                        elif pnl_pct >= 75.0:
-                            if is_long:
-                                new_trailing_sl = entry_price + tp_distance * 0.75
-                            else:
-                                new_trailing_sl = entry_price - tp_distance * 0.75
-
-                        elif pnl_pct >= 50.0:
-                            if is_long:
-                                new_trailing_sl = entry_price + tp_distance * 0.50
-                            else:
-                                new_trailing_sl = entry_price - tp_distance * 0.50
-
-                        elif pnl_pct >= 25.0:
-                            if is_long:
-                                new_trailing_sl = entry_price + tp_distance * 0.25
-                            else:
-                                new_trailing_sl = entry_price - tp_distance * 0.25
+                        new_trailing_sl = _trailing_sl_level(is_long, entry_price, tp_distance, pnl_pct)
 
                         if new_trailing_sl is not None:
                             if is_long and new_trailing_sl > sl_price:
@@ -5867,6 +6110,7 @@ def calculate_position_size(balance: float, risk_percent: float, entry_price: fl
     return risk_amount_usdt / price_diff_per_unit if price_diff_per_unit > 0 else 0.0
 
 
+@rate_limiter.in_lane(rate_limiter.LANE_ORDER)
 def close_position_manually(ex: ccxt.Exchange, trade_id: int):
     """(MODIFIÉ) Clôture manuelle robuste :
     - utilise create_market_order_smart() pour BUY et SELL
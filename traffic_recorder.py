@@ -0,0 +1,586 @@
+# Fichier: traffic_recorder.py
+"""
+Enregistrement / rejeu du trafic CCXT pour les régressions de performance.
+
+Enregistrement (EXCHANGE_RECORD_DIR non vide):
+- wrap(ex) : proxy qui écrit chaque appel fetch_/create_/cancel_/set_/load_/watch_
+  (arguments, réponse ou erreur, horodatage, durée) ;
+- segments JSONL gzip rotatifs <dir>/<session>/seg-000001.jsonl.gz, écrits par un
+  thread dédié (file bornée: la boucle de trading n'attend jamais le disque) ;
+- mark("cycle", ...) : repère de début de cycle posé par trading_engine_loop ;
+- copie de la base SQLite à l'ouverture de la session (état initial du rejeu).
+
+Rejeu (python traffic_recorder.py replay <session>):
+- ReplayExchange sert les réponses enregistrées, cycle par cycle (file FIFO par
+  (méthode, arguments), repli sur la dernière réponse connue du même symbole) ;
+- les écritures (create_/cancel_/set_) ne partent nulle part: elles sont journalisées
+  comme « décisions » du code rejoué ;
+- trading_engine_loop (ou manage_open_positions seul) tourne sans délai ;
+  rapport JSON: durées de cycle, phases du loop_profiler, décisions.
+- compare A.json B.json : écarts de durées et de décisions entre deux versions.
+"""
+import os
+import sys
+import json
+import glob
+import gzip
+import time
+import queue
+import shutil
+import sqlite3
+import asyncio
+import argparse
+import tempfile
+import threading
+from collections import deque
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional, Tuple
+
+RECORD_DIR = os.getenv("EXCHANGE_RECORD_DIR", "").strip()
+SEGMENT_RECORDS = int(os.getenv("EXCHANGE_RECORD_SEGMENT_RECORDS", "5000"))
+QUEUE_MAX = int(os.getenv("EXCHANGE_RECORD_QUEUE_MAX", "20000"))
+
+RECORDED_PREFIXES = ("fetch_", "create_", "cancel_", "edit_", "set_", "load_", "watch_")
+WRITE_PREFIXES = ("create_", "cancel_", "edit_", "set_")
+
+
+def _record_dir() -> str:
+    return os.getenv("EXCHANGE_RECORD_DIR", RECORD_DIR).strip()
+
+
+def is_enabled() -> bool:
+    return bool(_record_dir())
+
+
+def _jsonable(obj):
+    return json.loads(json.dumps(obj, default=str))
+
+
+def _call_key(method: str, args, kwargs) -> str:
+    return json.dumps([method, list(args), kwargs], sort_keys=True, default=str)
+
+
+def _symbol_of(args, kwargs) -> Optional[str]:
+    sym = kwargs.get("symbol")
+    if sym is None and args:
+        sym = args[0]
+    return sym if isinstance(sym, str) else None
+
+
+# ==============================================================================
+# ENREGISTREMENT
+# ==============================================================================
+
+class SessionWriter:
+    """Écrit les enregistrements dans des segments gzip rotatifs (thread dédié)."""
+
+    def __init__(self, base_dir: str, segment_records: int = SEGMENT_RECORDS):
+        self.session = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S")
+        self.path = os.path.join(base_dir, self.session)
+        os.makedirs(self.path, exist_ok=True)
+        self._segment_records = max(100, int(segment_records))
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max(100, QUEUE_MAX))
+        self._seq = 0
+        self._seq_lock = threading.Lock()
+        self.stats = {"records": 0, "dropped": 0, "segments": 0}
+        self._snapshot_db()
+        with open(os.path.join(self.path, "session.json"), "w", encoding="utf-8") as f:
+            json.dump({"session": self.session, "started_ms": int(time.time() * 1000), "pid": os.getpid(),
+                       "timeframe": os.getenv("TIMEFRAME", "1h")}, f, indent=2)
+        threading.Thread(target=self._run, name="traffic-recorder", daemon=True).start()
+
+    def _snapshot_db(self) -> None:
+        try:
+            import database
+            dst = sqlite3.connect(os.path.join(self.path, "initial.db"))
+            src = database.get_db_connection()
+            try:
+                src.backup(dst)
+            finally:
+                src.close()
+                dst.close()
+        except Exception as e:
+            print(f"⚠️ Enregistrement: copie de la base impossible: {e}")
+
+    def put(self, record: Dict[str, Any]) -> None:
+        with self._seq_lock:
+            self._seq += 1
+            record["seq"] = self._seq
+        try:
+            line = json.dumps(record, default=str, separators=(",", ":"))
+            self._queue.put_nowait(line)
+        except queue.Full:
+            self.stats["dropped"] += 1
+        except Exception:
+            self.stats["dropped"] += 1
+
+    def _run(self) -> None:
+        fh, count = None, 0
+        while True:
+            line = self._queue.get()
+            try:
+                if fh is None or count >= self._segment_records:
+                    if fh is not None:
+                        fh.close()
+                    self.stats["segments"] += 1
+                    name = os.path.join(self.path, f"seg-{self.stats['segments']:06d}.jsonl.gz")
+                    fh, count = gzip.open(name, "at", encoding="utf-8", compresslevel=5), 0
+                fh.write(line + "\n")
+                count += 1
+                self.stats["records"] += 1
+                if self._queue.empty():
+                    fh.flush()
+            except Exception as e:
+                print(f"⚠️ Enregistrement: écriture segment échouée: {e}")
+
+
+_writer: Optional[SessionWriter] = None
+_writer_lock = threading.Lock()
+_last_universe: Optional[List[str]] = None
+
+
+def _get_writer() -> Optional[SessionWriter]:
+    global _writer
+    if not is_enabled():
+        return None
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                try:
+                    _writer = SessionWriter(_record_dir())
+                    print(f"🎙️ Enregistrement du trafic exchange → {_writer.path}")
+                except Exception as e:
+                    print(f"⚠️ Enregistrement indisponible: {e}")
+                    return None
+    return _writer
+
+
+def mark(event: str, **data) -> None:
+    """Repère dans le flux (ex: début de cycle). L'univers n'est écrit que s'il change."""
+    global _last_universe
+    w = _get_writer()
+    if w is None:
+        return
+    universe = data.pop("universe", None)
+    if universe is not None and universe != _last_universe:
+        _last_universe = list(universe)
+        data["universe"] = _last_universe
+    w.put({"kind": "mark", "t": int(time.time() * 1000), "event": event, "data": data})
+
+
+class RecordingExchange:
+    """Proxy transparent: enregistre les appels d'I/O CCXT (sync et async)."""
+
+    def __init__(self, ex, writer: SessionWriter):
+        object.__setattr__(self, "_ex", ex)
+        object.__setattr__(self, "_writer", writer)
+        object.__setattr__(self, "_markets_ref", None)
+
+    def _record(self, name, args, kwargs, t0, res=None, exc=None) -> None:
+        rec = {"kind": "call", "t": int(time.time() * 1000), "method": name,
+               "thread": threading.current_thread().name, "args": list(args), "kwargs": kwargs,
+               "dur_ms": round((time.perf_counter() - t0) * 1000.0, 3)}
+        if exc is not None:
+            rec["error"] = {"type": type(exc).__name__, "msg": str(exc)}
+        elif name == "load_markets" and res is not None and res is self._markets_ref:
+            rec["cached"] = True   # ccxt renvoie le même dict tant qu'il n'y a pas de reload
+        else:
+            rec["result"] = res
+            if name == "load_markets":
+                object.__setattr__(self, "_markets_ref", res)
+        self._writer.put(rec)
+
+    def __getattr__(self, name):
+        attr = getattr(self._ex, name)
+        if not callable(attr) or not name.startswith(RECORDED_PREFIXES):
+            return attr
+
+        if asyncio.iscoroutinefunction(attr):
+            async def _rec_async(*args, **kwargs):
+                t0 = time.perf_counter()
+                try:
+                    res = await attr(*args, **kwargs)
+                except Exception as e:
+                    self._record(name, args, kwargs, t0, exc=e)
+                    raise
+                self._record(name, args, kwargs, t0, res=res)
+                return res
+            _rec_async.__name__ = name
+            return _rec_async
+
+        def _rec(*args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                res = attr(*args, **kwargs)
+            except Exception as e:
+                self._record(name, args, kwargs, t0, exc=e)
+                raise
+            self._record(name, args, kwargs, t0, res=res)
+            return res
+        _rec.__name__ = name
+        return _rec
+
+    def __setattr__(self, name, value):
+        setattr(self._ex, name, value)
+
+    def __repr__(self):
+        return f"RecordingExchange({self._ex!r})"
+
+    def __str__(self):
+        return str(self._ex)
+
+
+def wrap(ex):
+    """Enveloppe une instance CCXT brute (no-op si EXCHANGE_RECORD_DIR est vide)."""
+    if ex is None or isinstance(ex, RecordingExchange):
+        return ex
+    w = _get_writer()
+    return RecordingExchange(ex, w) if w is not None else ex
+
+
+# ==============================================================================
+# LECTURE D'UNE SESSION
+# ==============================================================================
+
+def iter_records(session_dir: str):
+    for seg in sorted(glob.glob(os.path.join(session_dir, "seg-*.jsonl.gz"))):
+        try:
+            with gzip.open(seg, "rt", encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if line:
+                        try:
+                            yield json.loads(line)
+                        except Exception:
+                            continue   # dernière ligne tronquée (arrêt brutal)
+        except (EOFError, OSError):
+            continue
+
+
+def load_session(session_dir: str) -> Dict[str, Any]:
+    """
+    Découpe le flux en cycles (repères 'cycle'). Les appels antérieurs au 1er repère
+    (démarrage, sync initiale) forment le préambule: ils ne servent qu'en repli.
+    Sans aucun repère, toute la session est un seul cycle.
+    """
+    records = sorted(iter_records(session_dir), key=lambda r: r.get("seq", 0))
+    preamble: List[Dict[str, Any]] = []
+    cycles: List[Dict[str, Any]] = []
+    markets = None
+    universe = None
+    for r in records:
+        if r.get("kind") == "mark" and r.get("event") == "cycle":
+            universe = (r.get("data") or {}).get("universe") or universe
+            cycles.append({"t": r.get("t"), "universe": universe, "calls": []})
+        elif r.get("kind") == "call":
+            (cycles[-1]["calls"] if cycles else preamble).append(r)
+            if markets is None and r.get("method") == "load_markets" and isinstance(r.get("result"), dict):
+                markets = r["result"]
+    if not cycles and preamble:
+        cycles, preamble = [{"t": preamble[0].get("t"), "universe": None, "calls": preamble}], []
+    return {"cycles": cycles, "preamble": preamble, "markets": markets or {}, "records": len(records)}
+
+
+# ==============================================================================
+# REJEU
+# ==============================================================================
+
+def _to_precision(value: float, prec, truncate: bool) -> str:
+    """Précision CCXT: pas (TICK_SIZE, Bitget) si < 1 ou non entier, sinon nb de décimales."""
+    import math
+    if prec is None:
+        return str(value)
+    prec = float(prec)
+    if prec < 1 or prec != int(prec):
+        n = value / prec
+        n = math.floor(n + 1e-9) if truncate else round(n)
+        decimals = max(0, len(f"{prec:.12f}".rstrip("0").split(".")[1]))
+        return f"{n * prec:.{decimals}f}"
+    factor = 10 ** int(prec)
+    v = math.floor(value * factor + 1e-9) / factor if truncate else round(value, int(prec))
+    return f"{v:.{int(prec)}f}"
+
+
+class ReplayExchange:
+    """Sert les réponses enregistrées ; les écritures deviennent des décisions journalisées."""
+
+    def __init__(self, session: Dict[str, Any], exchange_id: str = "bitget"):
+        self.id = exchange_id
+        self.options: Dict[str, Any] = {"defaultType": "swap"}
+        self.params: Dict[str, Any] = {}
+        self.enableRateLimit = False
+        self.markets: Dict[str, Any] = dict(session.get("markets") or {})
+        self.symbols: List[str] = sorted(self.markets)
+        self.has = {"fetchPositions": True, "fetchTickers": True, "fetchOHLCV": True,
+                    "createOrders": True, "cancelOrders": True}
+        self._cycles = session["cycles"]
+        self._idx = -1
+        self._queues: Dict[str, deque] = {}
+        self._last_by_key: Dict[str, Dict[str, Any]] = {}
+        self._last_by_symbol: Dict[Tuple[str, Optional[str]], Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._order_seq = 0
+        self.decisions: List[Dict[str, Any]] = []
+        self.stats = {"hits": 0, "fallbacks": 0, "misses": 0, "writes": 0}
+        for r in session.get("preamble") or []:
+            if not r.get("method", "").startswith(WRITE_PREFIXES):
+                key = _call_key(r["method"], r.get("args") or [], r.get("kwargs") or {})
+                self._last_by_key[key] = r
+                self._last_by_symbol[(r["method"], _symbol_of(r.get("args") or [], r.get("kwargs") or {}))] = r
+        self.next_cycle()
+
+    # ---------------- navigation ----------------
+    @property
+    def cycle_index(self) -> int:
+        return self._idx
+
+    def cycle_time(self) -> Optional[datetime]:
+        t = self._cycles[self._idx]["t"] if 0 <= self._idx < len(self._cycles) else None
+        return datetime.fromtimestamp(t / 1000.0, tz=timezone.utc) if t else None
+
+    def next_cycle(self, *_args) -> bool:
+        """Passe au cycle enregistré suivant ; les réponses non consommées restent en repli."""
+        with self._lock:
+            if self._idx + 1 >= len(self._cycles):
+                return False
+            self._idx += 1
+            self._queues = {}
+            for r in self._cycles[self._idx]["calls"]:
+                key = _call_key(r["method"], r.get("args") or [], r.get("kwargs") or {})
+                self._queues.setdefault(key, deque()).append(r)
+            return True
+
+    # ---------------- réponses ----------------
+    def _respond(self, method: str, args, kwargs):
+        args, kwargs = _jsonable(list(args)), _jsonable(kwargs)
+        key = _call_key(method, args, kwargs)
+        with self._lock:
+            q = self._queues.get(key)
+            if q:
+                rec = q.popleft()
+                self.stats["hits"] += 1
+            else:
+                rec = self._last_by_key.get(key) or self._last_by_symbol.get((method, _symbol_of(args, kwargs)))
+                self.stats["fallbacks" if rec else "misses"] += 1
+            if rec is not None:
+                self._last_by_key[key] = rec
+                self._last_by_symbol[(method, _symbol_of(args, kwargs))] = rec
+        if rec is None:
+            import ccxt
+            raise ccxt.NetworkError(f"replay: aucun enregistrement pour {method}")
+        err = rec.get("error")
+        if err:
+            import ccxt
+            raise getattr(ccxt, err.get("type", ""), ccxt.NetworkError)(err.get("msg", ""))
+        return json.loads(json.dumps(rec.get("result")))
+
+    def _write(self, method: str, args, kwargs):
+        """Décision du code rejoué: journalisée, réponse enregistrée si identique, sinon synthétique."""
+        args_j, kwargs_j = _jsonable(list(args)), _jsonable(kwargs)
+        with self._lock:
+            self.stats["writes"] += 1
+            self._order_seq += 1
+            self.decisions.append({"cycle": self._idx, "method": method, "args": args_j, "kwargs": kwargs_j})
+            q = self._queues.get(_call_key(method, args_j, kwargs_j))
+            rec = q.popleft() if q else None
+        if rec is not None and not rec.get("error"):
+            return json.loads(json.dumps(rec.get("result")))
+        if method.startswith("create_orders"):
+            return [{"id": f"replay-{self._order_seq}-{i}", "status": "open", "info": {}} for i, _ in enumerate(args[0])]
+        if method.startswith("create_"):
+            symbol, type_, side, amount = (list(args) + [None] * 4)[:4]
+            return {"id": f"replay-{self._order_seq}", "symbol": symbol, "type": type_, "side": side,
+                    "amount": amount, "filled": amount if type_ == "market" else 0.0,
+                    "status": "closed" if type_ == "market" else "open", "info": {}}
+        if method.startswith("cancel_orders"):
+            return [{"id": str(i), "status": "canceled", "info": {}} for i in (args[0] if args else [])]
+        return {"id": str(args[0]) if args else None, "status": "canceled", "info": {}}
+
+    def __getattr__(self, name):
+        if name.startswith(WRITE_PREFIXES):
+            return lambda *a, **k: self._write(name, a, k)
+        if name.startswith(RECORDED_PREFIXES):
+            return lambda *a, **k: self._respond(name, a, k)
+        raise AttributeError(name)
+
+    # ---------------- méthodes locales CCXT ----------------
+    def load_markets(self, reload: bool = False, params=None):
+        if not self.markets or reload:
+            try:
+                self.markets = self._respond("load_markets", (), {} if not reload else {"reload": True}) or self.markets
+            except Exception:
+                pass
+            self.symbols = sorted(self.markets)
+        return self.markets
+
+    def market(self, symbol: str) -> Dict[str, Any]:
+        m = self.markets.get(symbol)
+        if m is None:
+            import ccxt
+            raise ccxt.BadSymbol(f"replay: marché inconnu {symbol}")
+        return m
+
+    def amount_to_precision(self, symbol: str, amount) -> str:
+        return _to_precision(float(amount), (self.market(symbol).get("precision") or {}).get("amount"), True)
+
+    def price_to_precision(self, symbol: str, price) -> str:
+        return _to_precision(float(price), (self.market(symbol).get("precision") or {}).get("price"), False)
+
+    def set_sandbox_mode(self, enabled: bool) -> None:
+        return None
+
+
+def _percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    s = sorted(values)
+    return s[min(len(s) - 1, max(0, int(round(q * (len(s) - 1)))))]
+
+
+def replay(session_dir: str, mode: str = "engine", max_cycles: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Rejoue une session (la base de travail doit déjà pointer sur la copie initial.db,
+    cf. main()). mode='engine' → trading_engine_loop ; 'manage' → manage_open_positions seul.
+    """
+    import rate_limiter
+    import resilience
+    import perf_metrics
+    import loop_profiler
+
+    session = load_session(session_dir)
+    cycles = session["cycles"]
+    n = min(len(cycles), max_cycles or len(cycles))
+    if not n:
+        raise RuntimeError(f"Session vide: {session_dir}")
+    rex = ReplayExchange(session)
+    ex = resilience.wrap_exchange(rate_limiter.wrap_exchange(perf_metrics.instrument(rex)))
+
+    durations: List[float] = []
+    t_last = [time.perf_counter()]
+
+    def _on_cycle(_n: int) -> None:
+        now = time.perf_counter()
+        durations.append(now - t_last[0])
+        t_last[0] = now
+        rex.next_cycle()
+
+    t0 = time.perf_counter()
+    if mode == "manage":
+        import trader
+        for _ in range(n):
+            trader.manage_open_positions(ex)
+            _on_cycle(0)
+    else:
+        import main as bot
+        universe = next((c["universe"] for c in cycles if c.get("universe")), None) or sorted(rex.markets)[:1]
+        bot.trading_engine_loop(ex, list(universe), max_cycles=n, on_cycle=_on_cycle,
+                                now_fn=lambda: rex.cycle_time() or datetime.now(timezone.utc))
+    wall = time.perf_counter() - t0
+
+    per_cycle: Dict[int, List[Dict[str, Any]]] = {}
+    for d in rex.decisions:
+        per_cycle.setdefault(d["cycle"], []).append(d)
+    return {
+        "session": os.path.basename(os.path.normpath(session_dir)), "mode": mode,
+        "cycles": len(durations), "recorded_cycles": len(cycles), "wall_seconds": round(wall, 3),
+        "cycle_p50_s": round(_percentile(durations, 0.50), 4),
+        "cycle_p95_s": round(_percentile(durations, 0.95), 4),
+        "cycle_durations_s": [round(d, 4) for d in durations],
+        "replay": dict(rex.stats), "decisions": rex.decisions,
+        "decisions_per_cycle": {str(k): len(v) for k, v in sorted(per_cycle.items())},
+        "loop": loop_profiler.get_stats(), "methods": perf_metrics.get_method_stats(),
+    }
+
+
+def _decision_sig(d: Dict[str, Any]) -> str:
+    return json.dumps([d.get("cycle"), d.get("method"), d.get("args")], sort_keys=True, default=str)
+
+
+def compare(path_a: str, path_b: str) -> Dict[str, Any]:
+    """Compare deux rapports de rejeu (même session): durées et décisions."""
+    with open(path_a, "r", encoding="utf-8") as f:
+        a = json.load(f)
+    with open(path_b, "r", encoding="utf-8") as f:
+        b = json.load(f)
+    sig_a = [_decision_sig(d) for d in a.get("decisions", [])]
+    sig_b = [_decision_sig(d) for d in b.get("decisions", [])]
+    only_a = sorted(set(sig_a) - set(sig_b))
+    only_b = sorted(set(sig_b) - set(sig_a))
+
+    def _delta(key):
+        va, vb = float(a.get(key) or 0.0), float(b.get(key) or 0.0)
+        return {"a": va, "b": vb, "delta_pct": round((vb / va - 1) * 100.0, 1) if va else None}
+
+    return {
+        "same_session": a.get("session") == b.get("session"),
+        "wall_seconds": _delta("wall_seconds"), "cycle_p50_s": _delta("cycle_p50_s"),
+        "cycle_p95_s": _delta("cycle_p95_s"),
+        "decisions": {"a": len(sig_a), "b": len(sig_b), "identical": sig_a == sig_b,
+                      "only_a": [json.loads(s) for s in only_a[:50]],
+                      "only_b": [json.loads(s) for s in only_b[:50]]},
+    }
+
+
+# ==============================================================================
+# CLI
+# ==============================================================================
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Rejeu du trafic exchange enregistré")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_rep = sub.add_parser("replay", help="Rejouer une session enregistrée")
+    p_rep.add_argument("session", help="Dossier de session (EXCHANGE_RECORD_DIR/<session>)")
+    p_rep.add_argument("--mode", choices=("engine", "manage"), default="engine")
+    p_rep.add_argument("--cycles", type=int)
+    p_rep.add_argument("--out", help="Rapport JSON")
+
+    p_cmp = sub.add_parser("compare", help="Comparer deux rapports de rejeu")
+    p_cmp.add_argument("a")
+    p_cmp.add_argument("b")
+
+    p_info = sub.add_parser("info", help="Résumé d'une session")
+    p_info.add_argument("session")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "compare":
+        print(json.dumps(compare(args.a, args.b), indent=2, default=str))
+        return 0
+
+    if args.command == "info":
+        s = load_session(args.session)
+        methods: Dict[str, int] = {}
+        for c in s["cycles"]:
+            for r in c["calls"]:
+                methods[r["method"]] = methods.get(r["method"], 0) + 1
+        print(f"📼 {args.session}: {s['records']} enregistrements, {len(s['cycles'])} cycle(s), "
+              f"{len(s['markets'])} marchés")
+        for m, cnt in sorted(methods.items(), key=lambda kv: -kv[1]):
+            print(f"   {m}: {cnt}")
+        return 0
+
+    # Base de travail = copie de l'état initial ; aucun appel réseau, aucun délai, pas de réenregistrement
+    work = tempfile.mkdtemp(prefix="darwin_replay_")
+    initial = os.path.join(args.session, "initial.db")
+    if os.path.exists(initial):
+        shutil.copy(initial, os.path.join(work, "darwin_bot.db"))
+    os.environ.update({"DB_BASE_DIR": work, "DB_FILENAME": "darwin_bot.db", "LOOP_DELAY": "0",
+                       "EXCHANGE_RECORD_DIR": "", "RATE_SCHEDULER_ENABLED": "false",
+                       "TELEGRAM_BOT_TOKEN": ""})
+    import database
+    database.setup_database()
+
+    report = replay(args.session, mode=args.mode, max_cycles=args.cycles)
+    print(f"🔁 {report['cycles']}/{report['recorded_cycles']} cycle(s) rejoué(s) en {report['wall_seconds']} s "
+          f"| p50 {report['cycle_p50_s']} s | p95 {report['cycle_p95_s']} s | {len(report['decisions'])} décision(s)")
+    print(f"   réponses: {report['replay']}")
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, default=str)
+        print(f"💾 {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
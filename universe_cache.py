@@ -0,0 +1,252 @@
+# Fichier: universe_cache.py
+"""
+Cache persistant de l'univers et de l'index CoinGecko, dans un fichier gzip
+(DB_BASE_DIR/universe_cache.json.gz) plutôt que dans la table settings.
+
+Contenu:
+  - rankings[nom]: classement avec scores ({symbol, score}), horodaté
+      'volume'     → utils.get_universe_by_market_cap (volume 24h + priorités)
+      'market_cap' → trader.get_universe_by_market_cap (CoinGecko)
+  - coingecko: index symbole → ids CoinGecko (au lieu de la liste complète
+    de dizaines de milliers d'entrées re-parsée à chaque appel).
+
+Le fichier est lu une fois puis gardé en mémoire ; chaque écriture est
+atomique (fichier temporaire + os.replace). refresh_async() reconstruit le
+classement dans un thread dédié (un seul à la fois): ni le démarrage ni le
+rafraîchissement quotidien ne bloquent le thread de trading tant qu'un
+classement, même périmé, existe déjà.
+"""
+import os
+import gzip
+import json
+import time
+import tempfile
+import threading
+from typing import Dict, Any, List, Optional, Callable
+
+import database
+
+UNIVERSE_CACHE_PATH = os.getenv("UNIVERSE_CACHE_PATH",
+                                os.path.join(database.DB_BASE_DIR, "universe_cache.json.gz"))
+UNIVERSE_CACHE_MAX_AGE = float(os.getenv("UNIVERSE_CACHE_MAX_AGE_HOURS", "24")) * 3600
+COINGECKO_INDEX_MAX_AGE = float(os.getenv("COINGECKO_INDEX_MAX_AGE_HOURS", "23")) * 3600
+
+_lock = threading.Lock()
+# Sérialise copie → écriture → os.replace (thread de trading vs thread de rafraîchissement)
+_write_lock = threading.Lock()
+_data: Optional[Dict[str, Any]] = None
+_refresh: Dict[str, Any] = {"thread": None, "done_seq": {}, "taken_seq": {}, "last_error": None}
+
+
+# ==============================================================================
+# FICHIER
+# ==============================================================================
+
+def _empty() -> Dict[str, Any]:
+    return {"version": 1, "rankings": {}, "coingecko": {"fetched_at": 0, "index": {}}}
+
+
+def _read() -> Dict[str, Any]:
+    try:
+        with gzip.open(UNIVERSE_CACHE_PATH, "rt", encoding="utf-8") as f:
+            data = json.load(f)
+        if isinstance(data, dict) and data.get("version") == 1:
+            data.setdefault("rankings", {})
+            data.setdefault("coingecko", {"fetched_at": 0, "index": {}})
+            return data
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        print(f"⚠️ Cache univers illisible ({UNIVERSE_CACHE_PATH}): {e}")
+    return _empty()
+
+
+def _write(data: Dict[str, Any]) -> None:
+    """Écriture atomique via un fichier temporaire unique du même répertoire."""
+    tmp = None
+    try:
+        directory = os.path.dirname(UNIVERSE_CACHE_PATH) or "."
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(prefix=".universe_cache.", suffix=".tmp", dir=directory)
+        with os.fdopen(fd, "wb") as raw, gzip.open(raw, "wt", encoding="utf-8", compresslevel=6) as f:
+            json.dump(data, f, separators=(",", ":"), ensure_ascii=False)
+        os.replace(tmp, UNIVERSE_CACHE_PATH)
+        tmp = None
+    except Exception as e:
+        print(f"⚠️ Écriture cache univers impossible: {e}")
+    finally:
+        if tmp is not None:
+            try:
+                os.remove(tmp)
+            except Exception:
+                pass
+
+
+def _loaded() -> Dict[str, Any]:
+    global _data
+    with _lock:
+        if _data is None:
+            _data = _read()
+        return _data
+
+
+def _update(fn: Callable[[Dict[str, Any]], None]) -> None:
+    """
+    Applique fn sur une copie puis écrit le fichier (lecteurs jamais bloqués).
+    _write_lock couvre copie + écriture: pas d'écritures concurrentes, et un
+    instantané plus ancien ne peut pas remplacer un plus récent sur disque.
+    """
+    global _data
+    with _write_lock:
+        current = _loaded()
+        with _lock:
+            new = dict(current)
+            new["rankings"] = dict(current.get("rankings", {}))
+            new["coingecko"] = dict(current.get("coingecko", {}))
+            fn(new)
+            _data = new
+        _write(new)
+
+
+# ==============================================================================
+# CLASSEMENTS
+# ==============================================================================
+
+def put_ranking(name: str, items: List[Dict[str, Any]], size: int) -> None:
+    """Mémorise un classement [{symbol, score}] (ordre = rang)."""
+    entry = {"built_at": time.time(), "size": int(size), "items": list(items)}
+
+    def _set(d: Dict[str, Any]) -> None:
+        d["rankings"][name] = entry
+    _update(_set)
+
+
+def get_ranking(name: str) -> Optional[Dict[str, Any]]:
+    return _loaded()["rankings"].get(name)
+
+
+def ranking_age(name: str) -> Optional[float]:
+    r = get_ranking(name)
+    return time.time() - float(r.get("built_at", 0)) if r else None
+
+
+def get_symbols(name: str, size: int, max_age: Optional[float] = None) -> List[str]:
+    """Symboles du classement (les `size` premiers) ; [] si absent ou plus vieux que max_age."""
+    r = get_ranking(name)
+    if not r or not r.get("items"):
+        return []
+    if max_age is not None and time.time() - float(r.get("built_at", 0)) > max_age:
+        return []
+    return [it["symbol"] for it in r["items"][:max(1, int(size))]]
+
+
+def is_fresh(name: str, size: int) -> bool:
+    """Classement de moins de UNIVERSE_CACHE_MAX_AGE et construit pour au moins `size` paires."""
+    r = get_ranking(name)
+    age = ranking_age(name)
+    return bool(r and r.get("items")) and age is not None and age < UNIVERSE_CACHE_MAX_AGE \
+        and int(r.get("size", 0)) >= int(size)
+
+
+def build_volume_ranking(ex, size: int) -> List[str]:
+    """Reconstruit le classement 'volume' (utils) et l'écrit ; retourne les symboles."""
+    import utils
+
+    scores: Dict[str, float] = {}
+    symbols = utils.get_universe_by_market_cap(ex, size, scores_out=scores)
+    if symbols:
+        put_ranking("volume", [{"symbol": s, "score": round(float(scores.get(s, 0.0)), 2)} for s in symbols],
+                    size)
+    return symbols
+
+
+def refresh_async(ex, size: int, builder: Optional[Callable] = None, name: str = "volume") -> bool:
+    """
+    Lance la reconstruction du classement `name` dans un thread (un seul à la fois).
+    Retourne False si une reconstruction est déjà en cours.
+    """
+    builder = builder or build_volume_ranking
+
+    def _run():
+        try:
+            t0 = time.perf_counter()
+            symbols = builder(ex, size)
+            print(f"🌐 Cache univers reconstruit: {len(symbols)} paires en {time.perf_counter() - t0:.1f}s")
+            with _lock:
+                _refresh["last_error"] = None if symbols else "classement vide"
+                if symbols:
+                    _refresh["done_seq"][name] = _refresh["done_seq"].get(name, 0) + 1
+        except Exception as e:
+            with _lock:
+                _refresh["last_error"] = str(e)
+            print(f"⚠️ Reconstruction univers échouée: {e}")
+
+    with _lock:
+        th = _refresh["thread"]
+        if th is not None and th.is_alive():
+            return False
+        th = threading.Thread(target=_run, name="universe-refresh", daemon=True)
+        _refresh["thread"] = th
+    th.start()
+    return True
+
+
+def take_refreshed(name: str, size: int) -> Optional[List[str]]:
+    """Nouveau classement si une reconstruction s'est terminée depuis le dernier appel."""
+    with _lock:
+        done = _refresh["done_seq"].get(name, 0)
+        if done == _refresh["taken_seq"].get(name, 0):
+            return None
+        _refresh["taken_seq"][name] = done
+    return get_symbols(name, size) or None
+
+
+# ==============================================================================
+# INDEX COINGECKO (symbole → ids)
+# ==============================================================================
+
+def _index_from_coin_list(coins: List[Dict[str, Any]]) -> Dict[str, List[str]]:
+    index: Dict[str, List[str]] = {}
+    for c in coins or []:
+        try:
+            sym = str(c.get("symbol") or "").upper()
+            cid = str(c.get("id") or "")
+        except Exception:
+            continue
+        if sym and cid:
+            index.setdefault(sym, []).append(cid)
+    return index
+
+
+def put_coingecko_index(coins: List[Dict[str, Any]]) -> Dict[str, List[str]]:
+    index = _index_from_coin_list(coins)
+
+    def _set(d: Dict[str, Any]) -> None:
+        d["coingecko"] = {"fetched_at": time.time(), "index": index}
+    if index:
+        _update(_set)
+    return index
+
+
+def coingecko_index() -> Dict[str, List[str]]:
+    return _loaded().get("coingecko", {}).get("index") or {}
+
+
+def coingecko_index_fresh() -> bool:
+    cg = _loaded().get("coingecko", {})
+    return bool(cg.get("index")) and time.time() - float(cg.get("fetched_at", 0)) < COINGECKO_INDEX_MAX_AGE
+
+
+def get_stats() -> Dict[str, Any]:
+    data = _loaded()
+    with _lock:
+        th = _refresh["thread"]
+        st = {"refreshing": bool(th is not None and th.is_alive()), "last_error": _refresh["last_error"]}
+    try:
+        st["file_bytes"] = os.path.getsize(UNIVERSE_CACHE_PATH)
+    except Exception:
+        st["file_bytes"] = 0
+    st["rankings"] = {n: {"items": len(r.get("items", [])), "age_s": round(time.time() - r.get("built_at", 0))}
+                      for n, r in data.get("rankings", {}).items()}
+    st["coingecko_symbols"] = len(data.get("coingecko", {}).get("index") or {})
+    return st
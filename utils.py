@@ -2,15 +2,14 @@
 import ccxt
 import pandas as pd
 import numpy as np
-import time
-import random
 from typing import Optional
 from ta.volatility import BollingerBands, AverageTrueRange
+import resilience
 
 _MIN_ROWS = 100          # pour BB80 + ATR confortablement
 _EPS = 1e-9              # tolérance numérique
 
-def get_universe_by_market_cap(ex, universe_size):
+def get_universe_by_market_cap(ex, universe_size, scores_out: Optional[dict] = None):
     """
     Construit un univers de paires USDT-perp triées par volume/turnover 24h (avec fallbacks).
 
@@ -27,6 +26,7 @@ def get_universe_by_market_cap(ex, universe_size):
     Args:
         ex: instance ccxt (Bybit/Bitget) déjà configurée (rate limit, defaultType=swap si possible)
         universe_size: nombre maximum de paires à renvoyer (prioritaires + auto)
+        scores_out: dict optionnel rempli avec {symbole: volume 24h USDT} (cache univers)
 
     Returns:
         list[str]: symboles CCXT (priorité perp 'BASE/USDT:USDT', fallback spot 'BASE/USDT')
@@ -201,6 +201,8 @@ def get_universe_by_market_cap(ex, universe_size):
         return []
 
     scored_sorted = sorted(scored, key=lambda x: (x[1], x[0]), reverse=True)
+    if scores_out is not None:
+        scores_out.update(scored)
 
     # 7.a) Sélection des symboles prioritaires (bases dans preferred_bases)
     preferred_symbols = []
@@ -260,6 +262,42 @@ def get_universe_by_market_cap(ex, universe_size):
     return final_symbols
 
 
+def add_indicators(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Ajoute mm80, BB(20,2), BB(80,2) et ATR(14) à un DataFrame OHLCV (calcul vectorisé,
+    en place). Utilisé par fetch_and_prepare_df et par le backtest sur tout l'historique.
+    """
+    # ========================================================================
+    # CALCUL MOYENNE MOBILE 80 (mm80) - AJOUTÉ
+    # ========================================================================
+    df["mm80"] = df["close"].rolling(window=80).mean()
+
+    # ========================================================================
+    # CALCUL BOLLINGER BANDS 20
+    # ========================================================================
+    bb20 = BollingerBands(close=df["close"], window=20, window_dev=2)
+    df["bb20_up"]  = bb20.bollinger_hband()
+    df["bb20_mid"] = bb20.bollinger_mavg()
+    df["bb20_lo"]  = bb20.bollinger_lband()
+
+    # ========================================================================
+    # CALCUL BOLLINGER BANDS 80
+    # ========================================================================
+    bb80 = BollingerBands(close=df["close"], window=80, window_dev=2)
+    df["bb80_up"]  = bb80.bollinger_hband()
+    df["bb80_mid"] = bb80.bollinger_mavg()
+    df["bb80_lo"]  = bb80.bollinger_lband()
+
+    # ========================================================================
+    # CALCUL ATR 14
+    # ========================================================================
+    atr = AverageTrueRange(
+        high=df["high"], low=df["low"], close=df["close"], window=14
+    ).average_true_range()
+    df["atr"] = atr
+
+    return df
+
 
 def fetch_and_prepare_df(ex: ccxt.Exchange, symbol: str, timeframe: str, limit: int = 200) -> Optional[pd.DataFrame]:
     """
@@ -295,34 +333,7 @@ def fetch_and_prepare_df(ex: ccxt.Exchange, symbol: str, timeframe: str, limit:
         for c in ["open", "high", "low", "close", "volume"]:
             df[c] = pd.to_numeric(df[c], errors="coerce")
 
-        # ========================================================================
-        # CALCUL MOYENNE MOBILE 80 (mm80) - AJOUTÉ
-        # ========================================================================
-        df["mm80"] = df["close"].rolling(window=80).mean()
-
-        # ========================================================================
-        # CALCUL BOLLINGER BANDS 20
-        # ========================================================================
-        bb20 = BollingerBands(close=df["close"], window=20, window_dev=2)
-        df["bb20_up"]  = bb20.bollinger_hband()
-        df["bb20_mid"] = bb20.bollinger_mavg()
-        df["bb20_lo"]  = bb20.bollinger_lband()
-
-        # ========================================================================
-        # CALCUL BOLLINGER BANDS 80
-        # ========================================================================
-        bb80 = BollingerBands(close=df["close"], window=80, window_dev=2)
-        df["bb80_up"]  = bb80.bollinger_hband()
-        df["bb80_mid"] = bb80.bollinger_mavg()
-        df["bb80_lo"]  = bb80.bollinger_lband()
-
-        # ========================================================================
-        # CALCUL ATR 14
-        # ========================================================================
-        atr = AverageTrueRange(
-            high=df["high"], low=df["low"], close=df["close"], window=14
-        ).average_true_range()
-        df["atr"] = atr
+        df = add_indicators(df)
 
         # Nettoyage final
         df = df.dropna().copy()
@@ -337,30 +348,18 @@ def fetch_and_prepare_df(ex: ccxt.Exchange, symbol: str, timeframe: str, limit:
         
 def _safe_fetch_ohlcv_with_retries(ex, symbol: str, timeframe: str, limit: int = 200, params: Optional[dict] = None):
     """
-    Wrapper robuste autour ex.fetch_ohlcv avec retries exponentiels + jitter.
+    Wrapper robuste autour ex.fetch_ohlcv: retries (backoff + jitter selon le type
+    d'exception CCXT) et disjoncteur via resilience.
     Retourne [] en cas d'échec final (le caller gère ensuite len/None).
     """
     if params is None:
         params = {}
 
-    max_retries = 4
-    backoffs = [0.5, 1.0, 2.0, 4.0]  # secondes
-
-    for attempt in range(max_retries):
-        try:
-            return ex.fetch_ohlcv(symbol, timeframe, limit=limit, params=params)
-        except Exception as e:
-            msg = str(e)
-            retriable = any(substr in msg for substr in (
-                "502", "504", "429", "timeout", "timed out",
-                "Service Unavailable", "Bad Gateway", "Temporary", "Connection", "Network"
-            ))
-            if attempt < max_retries - 1 and retriable:
-                sleep_s = backoffs[min(attempt, len(backoffs)-1)] + random.random() * 0.3
-                time.sleep(sleep_s)
-                continue
-            print(f"_safe_fetch_ohlcv_with_retries final error on {symbol} {timeframe}: {e}")
-            return []
+    try:
+        return resilience.call(ex, "fetch_ohlcv", symbol, timeframe, limit=limit, params=params)
+    except Exception as e:
+        print(f"_safe_fetch_ohlcv_with_retries final error on {symbol} {timeframe}: {e}")
+        return []
 
 def close_inside_bb20(close_price: float, bb_lo: float, bb_up: float) -> bool:
     """Vrai si la clôture est à l'intérieur (ou sur) la BB20. Garde-fous NaN."""